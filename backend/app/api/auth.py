@@ -4,7 +4,8 @@ from sqlalchemy.orm import Session
 from app.database.connection import get_db
 from app.models import User
 from app.schemas.user import UserCreate, UserResponse, UserLogin, Token, PasswordChangeRequest
-from app.core.auth import create_access_token, get_current_active_user
+from app.core.auth import create_access_token, get_current_active_user_model
+from app.core.password_hasher import password_hasher
 from app.core.rate_limiter import auth_rate_limit, password_change_rate_limit, read_rate_limit
 from app.core.logging_config import SecurityEventLogger
 
@@ -21,8 +22,8 @@ async def register(request: Request, user: UserCreate, db: Session = Depends(get
             detail="用戶名已存在"
         )
     
-    # 創建新用戶
-    hashed_password = User.get_password_hash(user.password)
+    # 創建新用戶（bcrypt 在專用線程池中執行，不阻塞事件循環）
+    hashed_password = await password_hasher.hash(user.password)
     db_user = User(
         username=user.username,
         hashed_password=hashed_password
@@ -48,7 +49,7 @@ async def login(request: Request, user_credentials: UserLogin, db: Session = Dep
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    if not user.verify_password(user_credentials.password):
+    if not await password_hasher.verify(user_credentials.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="密碼錯誤，請檢查後重試",
@@ -71,7 +72,7 @@ async def login(request: Request, user_credentials: UserLogin, db: Session = Dep
 
 @router.get("/me", response_model=UserResponse)
 @read_rate_limit()
-async def get_current_user_info(request: Request, current_user: User = Depends(get_current_active_user)):
+async def get_current_user_info(request: Request, current_user: User = Depends(get_current_active_user_model)):
     """獲取當前用戶信息"""
     return current_user
 
@@ -80,12 +81,12 @@ async def get_current_user_info(request: Request, current_user: User = Depends(g
 async def change_password(
     request: Request,
     password_data: PasswordChangeRequest,
-    current_user: User = Depends(get_current_active_user),
+    current_user: User = Depends(get_current_active_user_model),
     db: Session = Depends(get_db)
 ):
     """修改用戶密碼"""
     # 驗證當前密碼
-    if not current_user.verify_password(password_data.current_password):
+    if not await password_hasher.verify(password_data.current_password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="當前密碼錯誤"
@@ -99,7 +100,7 @@ async def change_password(
         )
     
     # 更新密碼
-    current_user.hashed_password = User.get_password_hash(password_data.new_password)
+    current_user.hashed_password = await password_hasher.hash(password_data.new_password)
     db.commit()
     
     return {"message": "密碼修改成功"}
\ No newline at end of file
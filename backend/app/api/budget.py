@@ -1,15 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from app.database.connection import get_db
-from app.models import User, Budget
+from app.models import Budget
 from app.schemas.budget import BudgetCreate, BudgetUpdate, BudgetResponse
 from app.core.auth import get_current_active_user
+from app.core.user_cache import AuthenticatedUser
 
 router = APIRouter(prefix="/budget", tags=["預算管理"])
 
 @router.get("/", response_model=BudgetResponse)
 async def get_budget(
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthenticatedUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """獲取用戶預算"""
@@ -27,7 +28,7 @@ async def get_budget(
 @router.post("/", response_model=BudgetResponse, status_code=status.HTTP_201_CREATED)
 async def create_or_update_budget(
     budget_data: BudgetCreate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthenticatedUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """創建或更新用戶預算"""
@@ -53,7 +54,7 @@ async def create_or_update_budget(
 @router.put("/", response_model=BudgetResponse)
 async def update_budget(
     budget_update: BudgetUpdate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthenticatedUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """更新預算"""
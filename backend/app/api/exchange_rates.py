@@ -1,11 +1,11 @@
 from fastapi import APIRouter, HTTPException
 from typing import Dict
 from pydantic import BaseModel
-from app.services.exchange_rate_service import ExchangeRateService
+from app.services.exchange_rate_service import exchange_rate_service
 from app.models.subscription import Currency
 
 router = APIRouter()
-exchange_service = ExchangeRateService()
+exchange_service = exchange_rate_service
 
 @router.get("/rates", response_model=Dict[str, float])
 async def get_exchange_rates():
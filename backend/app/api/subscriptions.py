@@ -2,11 +2,12 @@ from fastapi import APIRouter, Depends, HTTPException, status, Request
 from sqlalchemy.orm import Session
 from typing import List
 from app.database.connection import get_db
-from app.models import User, Subscription
+from app.models import Subscription
 from app.schemas.subscription import SubscriptionCreate, SubscriptionUpdate, SubscriptionResponse
 from app.core.auth import get_current_active_user
+from app.core.user_cache import AuthenticatedUser
 from app.core.rate_limiter import read_rate_limit, create_rate_limit, general_rate_limit
-from app.services.exchange_rate_service import ExchangeRateService
+from app.services.exchange_rate_service import exchange_rate_service
 
 router = APIRouter(prefix="/subscriptions", tags=["訂閱管理"])
 
@@ -14,7 +15,7 @@ router = APIRouter(prefix="/subscriptions", tags=["訂閱管理"])
 @read_rate_limit()
 async def get_subscriptions(
     request: Request,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthenticatedUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """獲取用戶的所有訂閱"""
@@ -28,11 +29,11 @@ async def get_subscriptions(
 async def create_subscription(
     request: Request,
     subscription: SubscriptionCreate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthenticatedUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """創建新訂閱"""
-    exchange_service = ExchangeRateService()
+    exchange_service = exchange_rate_service
     
     # 如果不是台幣，需要轉換價格
     price_twd = subscription.original_price  # 預設使用原始價格
@@ -61,7 +62,7 @@ async def create_subscription(
 @router.get("/{subscription_id}", response_model=SubscriptionResponse)
 async def get_subscription(
     subscription_id: int,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthenticatedUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """獲取特定訂閱"""
@@ -82,7 +83,7 @@ async def get_subscription(
 async def update_subscription(
     subscription_id: int,
     subscription_update: SubscriptionUpdate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthenticatedUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """更新訂閱"""
@@ -104,7 +105,7 @@ async def update_subscription(
     need_currency_recalc = ('original_price' in update_data or 'currency' in update_data)
     
     if need_currency_recalc:
-        exchange_service = ExchangeRateService()
+        exchange_service = exchange_rate_service
         
         # 獲取更新後的值（如果沒有提供就用現有值）
         new_original_price = update_data.get('original_price', db_subscription.original_price)
@@ -134,7 +135,7 @@ async def update_subscription(
 @router.delete("/{subscription_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_subscription(
     subscription_id: int,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthenticatedUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """刪除訂閱"""
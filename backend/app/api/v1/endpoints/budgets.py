@@ -10,8 +10,8 @@ from app.application.dtos.budget_dtos import (
     BudgetAnalyticsDto
 )
 from app.common.responses import ApiResponse
-from app.models import User
 from app.core.auth import get_current_active_user
+from app.core.user_cache import AuthenticatedUser
 from app.core.rate_limiter import read_rate_limit, create_rate_limit, general_rate_limit
 from app.infrastructure.dependencies import get_budget_application_service
 
@@ -21,7 +21,7 @@ router = APIRouter()
 @read_rate_limit()
 async def get_budget(
     request: Request,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthenticatedUser = Depends(get_current_active_user),
     service: BudgetApplicationService = Depends(get_budget_application_service)
 ):
     """獲取用戶預算"""
@@ -37,7 +37,7 @@ async def get_budget(
 async def create_budget(
     request: Request,
     command: CreateBudgetCommand,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthenticatedUser = Depends(get_current_active_user),
     service: BudgetApplicationService = Depends(get_budget_application_service)
 ):
     """創建預算"""
@@ -54,7 +54,7 @@ async def update_budget(
     request: Request,
     budget_id: int,
     command: UpdateBudgetCommand,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthenticatedUser = Depends(get_current_active_user),
     service: BudgetApplicationService = Depends(get_budget_application_service)
 ):
     """更新預算"""
@@ -70,7 +70,7 @@ async def update_budget(
 @general_rate_limit()
 async def delete_budget(
     request: Request,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthenticatedUser = Depends(get_current_active_user),
     service: BudgetApplicationService = Depends(get_budget_application_service)
 ):
     """刪除預算"""
@@ -80,7 +80,7 @@ async def delete_budget(
 @read_rate_limit()
 async def get_budget_usage(
     request: Request,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthenticatedUser = Depends(get_current_active_user),
     service: BudgetApplicationService = Depends(get_budget_application_service)
 ):
     """獲取預算使用情況"""
@@ -95,7 +95,7 @@ async def get_budget_usage(
 @read_rate_limit()
 async def get_budget_analytics(
     request: Request,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthenticatedUser = Depends(get_current_active_user),
     service: BudgetApplicationService = Depends(get_budget_application_service)
 ):
     """獲取預算分析數據"""
@@ -1,9 +1,11 @@
-from typing import Dict
+from datetime import date
+from typing import Any, Dict, Optional
 from fastapi import APIRouter, Depends, Request
 
 from app.common.responses import ApiResponse
-from app.services.exchange_rate_service import ExchangeRateService
 from app.core.rate_limiter import read_rate_limit
+from app.infrastructure.dependencies import get_live_exchange_rate_service
+from app.services.exchange_rate_service import ExchangeRateService
 
 router = APIRouter()
 
@@ -11,13 +13,13 @@ router = APIRouter()
 @read_rate_limit()
 async def get_exchange_rates(
     request: Request,
-    base_currency: str = "TWD"
+    base_currency: str = "TWD",
+    service: ExchangeRateService = Depends(get_live_exchange_rate_service)
 ):
     """獲取匯率信息"""
-    service = ExchangeRateService()
     
     # 獲取支持的貨幣列表
-    supported_currencies = await service.get_supported_currencies()
+    supported_currencies = service.get_supported_currencies()
     rates = {}
     
     for currency_code in supported_currencies.keys():
@@ -35,36 +37,43 @@ async def get_exchange_rates(
 
 @router.get("/currencies", response_model=ApiResponse[Dict[str, str]])
 @read_rate_limit()
-async def get_supported_currencies(request: Request):
+async def get_supported_currencies(
+    request: Request,
+    service: ExchangeRateService = Depends(get_live_exchange_rate_service)
+):
     """獲取支持的貨幣列表"""
-    service = ExchangeRateService()
-    currencies = await service.get_supported_currencies()
+    currencies = service.get_supported_currencies()
     
     return ApiResponse.success(
         data=currencies,
         message="成功獲取支持的貨幣列表"
     )
 
-@router.get("/convert", response_model=ApiResponse[Dict[str, float]])
+@router.get("/convert", response_model=ApiResponse[Dict[str, Any]])
 @read_rate_limit()
 async def convert_currency(
     request: Request,
     amount: float,
     from_currency: str,
-    to_currency: str
+    to_currency: str,
+    on: Optional[date] = None,
+    service: ExchangeRateService = Depends(get_live_exchange_rate_service)
 ):
-    """貨幣轉換"""
-    service = ExchangeRateService()
+    """貨幣轉換；指定 on 時使用該日期生效的歷史匯率"""
     
-    converted_amount = await service.convert_currency(amount, from_currency, to_currency)
-    exchange_rate = await service.get_exchange_rate(from_currency, to_currency)
+    if on is not None:
+        exchange_rate = await service.get_exchange_rate_on(from_currency, to_currency, on)
+        converted_amount = await service.convert_currency(amount, from_currency, to_currency, on=on)
+    else:
+        converted_amount = await service.convert_currency(amount, from_currency, to_currency)
+        exchange_rate = await service.get_exchange_rate(from_currency, to_currency)
     
     result = {
         "original_amount": amount,
         "converted_amount": converted_amount,
         "from_currency": from_currency,
         "to_currency": to_currency,
-        "exchange_rate": float(exchange_rate)
+        "exchange_rate": float(exchange_rate) if exchange_rate is not None else None
     }
     
     return ApiResponse.success(
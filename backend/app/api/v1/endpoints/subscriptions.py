@@ -1,5 +1,6 @@
-from typing import List
-from fastapi import APIRouter, Depends, Request, status
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from app.domain.interfaces.repositories import IUnitOfWork
 from app.domain.services.subscription_domain_service import SubscriptionDomainService
@@ -10,11 +11,19 @@ from app.application.dtos.subscription_dtos import (
     SubscriptionQuery,
     SubscriptionDto,
     SubscriptionSummaryDto,
-    BulkSubscriptionOperationCommand
+    BulkSubscriptionOperationCommand,
+    SubscriptionImportResultDto
 )
-from app.common.responses import ApiResponse
-from app.models import User
-from app.core.auth import get_current_active_user
+from app.application.services.subscription_export import EXPORT_MEDIA_TYPES
+from app.application.services.subscription_import import (
+    IMPORT_CONTENT_TYPES,
+    import_format_for,
+    parse_import_stream
+)
+from app.common.responses import ApiResponse, ResponseStatus
+from app.core.auth import get_current_active_user, get_current_admin_user
+from app.core.config import settings
+from app.core.user_cache import AuthenticatedUser
 from app.core.rate_limiter import read_rate_limit, create_rate_limit, general_rate_limit
 from app.infrastructure.dependencies import get_subscription_application_service
 
@@ -26,16 +35,39 @@ async def get_subscriptions(
     request: Request,
     category: str = None,
     include_inactive: bool = False,
-    current_user: User = Depends(get_current_active_user),
+    limit: Optional[int] = Query(None, ge=1, le=settings.subscription_page_max_limit),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+    current_user: AuthenticatedUser = Depends(get_current_active_user),
     service: SubscriptionApplicationService = Depends(get_subscription_application_service)
 ):
-    """獲取用戶的所有訂閱"""
+    """獲取用戶的訂閱
+
+    傳入 limit 或 cursor 時按 (created_at, id) 倒序分頁，下一頁的游標在 metadata.next_cursor；
+    都不傳時返回全部訂閱。
+    """
     query = SubscriptionQuery(
         user_id=current_user.id,
         include_inactive=include_inactive,
-        category=category
+        category=category,
+        limit=limit,
+        cursor=cursor,
+        include_total=include_total
     )
     
+    if limit is not None or cursor is not None:
+        if query.limit is None:
+            query.limit = settings.subscription_page_default_limit
+        page = await service.get_subscription_page(query)
+        metadata = {"limit": query.limit, "next_cursor": page.next_cursor, "has_more": page.has_more}
+        if page.total is not None:
+            metadata["total"] = page.total
+        return ApiResponse.success(
+            data=page.items,
+            message=f"成功獲取 {len(page.items)} 個訂閱",
+            metadata=metadata
+        )
+    
     subscriptions = await service.get_subscriptions(query)
     
     return ApiResponse.success(
@@ -48,7 +80,7 @@ async def get_subscriptions(
 async def create_subscription(
     request: Request,
     command: CreateSubscriptionCommand,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthenticatedUser = Depends(get_current_active_user),
     service: SubscriptionApplicationService = Depends(get_subscription_application_service)
 ):
     """創建新訂閱"""
@@ -63,7 +95,7 @@ async def create_subscription(
 @read_rate_limit()
 async def get_subscription_summary(
     request: Request,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthenticatedUser = Depends(get_current_active_user),
     service: SubscriptionApplicationService = Depends(get_subscription_application_service)
 ):
     """獲取訂閱摘要"""
@@ -74,12 +106,42 @@ async def get_subscription_summary(
         message="成功獲取訂閱摘要"
     )
 
+def export_response(service: SubscriptionApplicationService, user_id: Optional[int], export_format: str, filename: str):
+    """以 StreamingResponse 流式返回導出內容"""
+    return StreamingResponse(
+        service.export_subscriptions(user_id, export_format, settings.subscription_export_batch_size),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format}"'}
+    )
+
+@router.get("/export")
+@read_rate_limit()
+async def export_subscriptions(
+    request: Request,
+    export_format: str = Query("ndjson", alias="format", pattern="^(csv|ndjson)$"),
+    current_user: AuthenticatedUser = Depends(get_current_active_user),
+    service: SubscriptionApplicationService = Depends(get_subscription_application_service)
+):
+    """流式導出當前用戶的所有訂閱（NDJSON 或 CSV）"""
+    return export_response(service, current_user.id, export_format, "subscriptions")
+
+@router.get("/export/all")
+@read_rate_limit()
+async def export_all_subscriptions(
+    request: Request,
+    export_format: str = Query("ndjson", alias="format", pattern="^(csv|ndjson)$"),
+    current_user: AuthenticatedUser = Depends(get_current_admin_user),
+    service: SubscriptionApplicationService = Depends(get_subscription_application_service)
+):
+    """流式導出所有用戶的訂閱（僅管理員，用於報表）"""
+    return export_response(service, None, export_format, "subscriptions-all")
+
 @router.get("/{subscription_id}", response_model=ApiResponse[SubscriptionDto])
 @read_rate_limit()
 async def get_subscription(
     request: Request,
     subscription_id: int,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthenticatedUser = Depends(get_current_active_user),
     service: SubscriptionApplicationService = Depends(get_subscription_application_service)
 ):
     """獲取特定訂閱"""
@@ -96,7 +158,7 @@ async def update_subscription(
     request: Request,
     subscription_id: int,
     command: UpdateSubscriptionCommand,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthenticatedUser = Depends(get_current_active_user),
     service: SubscriptionApplicationService = Depends(get_subscription_application_service)
 ):
     """更新訂閱"""
@@ -113,7 +175,7 @@ async def update_subscription(
 async def delete_subscription(
     request: Request,
     subscription_id: int,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthenticatedUser = Depends(get_current_active_user),
     service: SubscriptionApplicationService = Depends(get_subscription_application_service)
 ):
     """刪除訂閱"""
@@ -124,7 +186,7 @@ async def delete_subscription(
 async def bulk_subscription_operation(
     request: Request,
     command: BulkSubscriptionOperationCommand,
-    current_user: User = Depends(get_current_active_user),
+    current_user: AuthenticatedUser = Depends(get_current_active_user),
     service: SubscriptionApplicationService = Depends(get_subscription_application_service)
 ):
     """批量操作訂閱"""
@@ -133,4 +195,52 @@ async def bulk_subscription_operation(
     return ApiResponse.success(
         data=result,
         message=f"批量{command.operation}操作完成"
-    )
\ No newline at end of file
+    )
+
+@router.post("/import", response_model=ApiResponse[SubscriptionImportResultDto])
+@create_rate_limit()
+async def import_subscriptions(
+    request: Request,
+    import_format: Optional[str] = Query(None, alias="format", pattern="^(csv|ndjson)$"),
+    current_user: AuthenticatedUser = Depends(get_current_active_user),
+    service: SubscriptionApplicationService = Depends(get_subscription_application_service)
+):
+    """批量導入訂閱
+
+    請求體為 CSV（text/csv，首行為表頭）或 NDJSON（application/x-ndjson），
+    也可用 format 參數指定格式。請求體邊接收邊解析，不整體讀入內存。
+    """
+    import_format = import_format or import_format_for(request.headers.get("content-type", ""))
+    if import_format is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"導入文件的 Content-Type 必須是 {' 或 '.join(IMPORT_CONTENT_TYPES)}"
+        )
+    
+    records = parse_import_stream(
+        request.stream(),
+        import_format,
+        settings.subscription_import_max_bytes,
+        settings.subscription_import_max_record_bytes
+    )
+    result = await service.import_subscriptions(
+        current_user.id,
+        records,
+        batch_size=settings.subscription_import_batch_size,
+        max_errors=settings.subscription_import_max_errors
+    )
+    
+    if result.aborted:
+        # 請求體中途出錯：返回對應的錯誤狀態碼，同時帶上已導入的結果供客戶端續傳
+        response = ApiResponse[SubscriptionImportResultDto](
+            status=ResponseStatus.ERROR,
+            message=f"導入中斷（已導入 {result.imported} 個訂閱）",
+            data=result,
+            errors=[result.abort_reason]
+        )
+        return JSONResponse(status_code=result.abort_status_code, content=response.model_dump(mode="json"))
+    
+    return ApiResponse.success(
+        data=result,
+        message=f"成功導入 {result.imported} 個訂閱，{result.failed} 行無法導入"
+    )
@@ -28,6 +28,10 @@ class SubscriptionQuery(BaseModel):
     user_id: int
     include_inactive: bool = False
     category: Optional[SubscriptionCategory] = None
+    # 分頁（鍵集分頁）：limit 為每頁數量，cursor 為上一頁返回的 next_cursor
+    limit: Optional[int] = Field(None, ge=1)
+    cursor: Optional[str] = None
+    include_total: bool = False
 
 class SubscriptionDto(BaseModel):
     """訂閱數據傳輸對象"""
@@ -52,6 +56,13 @@ class SubscriptionDto(BaseModel):
     class Config:
         from_attributes = True
 
+class SubscriptionPageDto(BaseModel):
+    """訂閱列表的一頁"""
+    items: List[SubscriptionDto]
+    next_cursor: Optional[str] = None  # 沒有下一頁時為 None
+    has_more: bool
+    total: Optional[int] = None  # 僅在請求 include_total 時返回
+
 class SubscriptionSummaryDto(BaseModel):
     """訂閱摘要數據傳輸對象"""
     total_subscriptions: int
@@ -64,4 +75,20 @@ class SubscriptionSummaryDto(BaseModel):
 class BulkSubscriptionOperationCommand(BaseModel):
     """批量訂閱操作命令"""
     subscription_ids: List[int]
-    operation: str  # 'activate', 'deactivate', 'delete'
\ No newline at end of file
+    operation: str  # 'activate', 'deactivate', 'delete'
+
+class SubscriptionImportRowError(BaseModel):
+    """批量導入中無法導入的行"""
+    row: int  # 數據行號（從 1 開始，不含 CSV 表頭）
+    errors: List[str]
+
+class SubscriptionImportResultDto(BaseModel):
+    """批量導入結果"""
+    total_rows: int
+    imported: int
+    failed: int
+    errors: List[SubscriptionImportRowError]
+    errors_truncated: bool = False  # 錯誤行超過上限時只返回前面的部分
+    aborted: bool = False  # 請求體中途出錯，後續的行沒有被讀取
+    abort_status_code: Optional[int] = None
+    abort_reason: Optional[str] = None
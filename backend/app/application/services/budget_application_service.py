@@ -2,6 +2,7 @@ from typing import Optional
 from fastapi import HTTPException, status
 
 from app.domain.interfaces.repositories import IUnitOfWork
+from app.common.async_utils import maybe_await
 from app.domain.services.budget_domain_service import BudgetDomainService
 from app.application.dtos.budget_dtos import (
     CreateBudgetCommand,
@@ -33,7 +34,7 @@ class BudgetApplicationService:
                 )
             
             # 檢查用戶是否已經有預算
-            existing_budget = self._uow.budgets.get_by_user_id(user_id)
+            existing_budget = await maybe_await(self._uow.budgets.get_by_user_id(user_id))
             if existing_budget:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
@@ -47,14 +48,14 @@ class BudgetApplicationService:
             )
             
             # 保存到資料庫
-            self._uow.begin()
-            created_budget = self._uow.budgets.create(budget)
-            self._uow.commit()
+            await maybe_await(self._uow.begin())
+            created_budget = await maybe_await(self._uow.budgets.create(budget))
+            await maybe_await(self._uow.commit())
             
             return BudgetDto.model_validate(created_budget)
             
         except Exception as e:
-            self._uow.rollback()
+            await maybe_await(self._uow.rollback())
             if isinstance(e, HTTPException):
                 raise
             raise HTTPException(
@@ -62,11 +63,11 @@ class BudgetApplicationService:
                 detail="創建預算失敗"
             )
         finally:
-            self._uow.close()
+            await maybe_await(self._uow.close())
     
     async def get_budget(self, user_id: int) -> Optional[BudgetDto]:
         """獲取用戶預算"""
-        budget = self._uow.budgets.get_by_user_id(user_id)
+        budget = await maybe_await(self._uow.budgets.get_by_user_id(user_id))
         
         if not budget:
             return None
@@ -76,7 +77,7 @@ class BudgetApplicationService:
     async def update_budget(self, user_id: int, command: UpdateBudgetCommand) -> BudgetDto:
         """更新預算"""
         try:
-            budget = self._uow.budgets.get_by_user_id(user_id)
+            budget = await maybe_await(self._uow.budgets.get_by_user_id(user_id))
             
             if not budget:
                 raise HTTPException(
@@ -99,19 +100,19 @@ class BudgetApplicationService:
                         detail={"errors": validation["errors"]}
                     )
             
-            self._uow.begin()
+            await maybe_await(self._uow.begin())
             
             # 更新字段
             if command.monthly_limit is not None:
                 budget.monthly_limit = command.monthly_limit
             
-            updated_budget = self._uow.budgets.update(budget)
-            self._uow.commit()
+            updated_budget = await maybe_await(self._uow.budgets.update(budget))
+            await maybe_await(self._uow.commit())
             
             return BudgetDto.model_validate(updated_budget)
             
         except Exception as e:
-            self._uow.rollback()
+            await maybe_await(self._uow.rollback())
             if isinstance(e, HTTPException):
                 raise
             raise HTTPException(
@@ -119,12 +120,12 @@ class BudgetApplicationService:
                 detail="更新預算失敗"
             )
         finally:
-            self._uow.close()
+            await maybe_await(self._uow.close())
     
     async def delete_budget(self, user_id: int) -> bool:
         """刪除預算"""
         try:
-            budget = self._uow.budgets.get_by_user_id(user_id)
+            budget = await maybe_await(self._uow.budgets.get_by_user_id(user_id))
             
             if not budget:
                 raise HTTPException(
@@ -132,14 +133,14 @@ class BudgetApplicationService:
                     detail="預算不存在"
                 )
             
-            self._uow.begin()
-            result = self._uow.budgets.delete(budget.id)
-            self._uow.commit()
+            await maybe_await(self._uow.begin())
+            result = await maybe_await(self._uow.budgets.delete(budget.id))
+            await maybe_await(self._uow.commit())
             
             return result
             
         except Exception as e:
-            self._uow.rollback()
+            await maybe_await(self._uow.rollback())
             if isinstance(e, HTTPException):
                 raise
             raise HTTPException(
@@ -147,26 +148,24 @@ class BudgetApplicationService:
                 detail="刪除預算失敗"
             )
         finally:
-            self._uow.close()
+            await maybe_await(self._uow.close())
     
     async def get_budget_usage(self, user_id: int) -> BudgetUsageDto:
         """獲取預算使用情況"""
-        budget = self._uow.budgets.get_by_user_id(user_id)
-        subscriptions = self._uow.subscriptions.get_active_by_user_id(user_id)
+        budget = await maybe_await(self._uow.budgets.get_by_user_id(user_id))
+        # 由資料庫按類別匯總成本，不載入訂閱實體
+        category_totals = await maybe_await(self._uow.subscriptions.get_category_cost_totals(user_id))
         
-        usage_info = self._domain_service.calculate_budget_usage(budget, subscriptions)
-        category_usage = self._domain_service.calculate_category_budget_usage(budget, subscriptions)
-        recommendations = self._domain_service.get_budget_recommendations(budget, subscriptions)
-        savings_potential = self._domain_service.calculate_savings_potential(subscriptions)
+        analysis = self._domain_service.analyze_totals(budget, category_totals)
         
         budget_dto = BudgetDto.model_validate(budget) if budget else None
         
         return BudgetUsageDto(
             budget=budget_dto,
-            usage_info=usage_info,
-            category_usage=category_usage,
-            recommendations=recommendations,
-            savings_potential=savings_potential
+            usage_info=analysis["usage_info"],
+            category_usage=analysis["category_usage"],
+            recommendations=analysis["recommendations"],
+            savings_potential=analysis["savings_potential"]
         )
     
     async def get_budget_analytics(self, user_id: int) -> BudgetAnalyticsDto:
@@ -1,16 +1,27 @@
-from typing import List, Optional
+from datetime import date
+from decimal import Decimal
+from typing import AsyncIterator, Dict, List, Optional
 from fastapi import HTTPException, status
+from pydantic import ValidationError
 
 from app.domain.interfaces.repositories import IUnitOfWork
+from app.domain.interfaces.subscription_spec import SubscriptionSpec
+from app.common.async_utils import maybe_aiter, maybe_await
+from app.common.pagination import decode_cursor, encode_cursor
 from app.domain.services.subscription_domain_service import SubscriptionDomainService
 from app.application.dtos.subscription_dtos import (
     CreateSubscriptionCommand,
     UpdateSubscriptionCommand,
     SubscriptionQuery,
     SubscriptionDto,
+    SubscriptionPageDto,
     SubscriptionSummaryDto,
-    BulkSubscriptionOperationCommand
+    BulkSubscriptionOperationCommand,
+    SubscriptionImportRowError,
+    SubscriptionImportResultDto
 )
+from app.application.services.subscription_export import encode_export
+from app.application.services.subscription_import import ImportRecord
 from app.models.subscription import Subscription
 
 class SubscriptionApplicationService:
@@ -34,9 +45,9 @@ class SubscriptionApplicationService:
                     detail={"errors": validation["errors"]}
                 )
             
-            # 計算台幣價格
+            # 按開始日期生效的匯率計算台幣價格
             twd_price = await self._domain_service.calculate_twd_price(
-                command.original_price, command.currency.value
+                command.original_price, command.currency.value, on=command.start_date
             )
             
             # 創建訂閱實體
@@ -52,15 +63,15 @@ class SubscriptionApplicationService:
             )
             
             # 保存到資料庫
-            self._uow.begin()
-            created_subscription = self._uow.subscriptions.create(subscription)
-            self._uow.commit()
+            await maybe_await(self._uow.begin())
+            created_subscription = await maybe_await(self._uow.subscriptions.create(subscription))
+            await maybe_await(self._uow.commit())
             
             # 轉換為 DTO 返回
             return await self._to_subscription_dto(created_subscription)
             
         except Exception as e:
-            self._uow.rollback()
+            await maybe_await(self._uow.rollback())
             if isinstance(e, HTTPException):
                 raise
             raise HTTPException(
@@ -68,19 +79,18 @@ class SubscriptionApplicationService:
                 detail="創建訂閱失敗"
             )
         finally:
-            self._uow.close()
+            await maybe_await(self._uow.close())
     
     async def get_subscriptions(self, query: SubscriptionQuery) -> List[SubscriptionDto]:
         """獲取訂閱列表"""
         try:
-            if query.include_inactive:
-                subscriptions = self._uow.subscriptions.get_by_user_id(query.user_id)
-            else:
-                subscriptions = self._uow.subscriptions.get_active_by_user_id(query.user_id)
-            
-            # 按類別過濾
+            # 活躍狀態和類別在數據庫中篩選
+            spec = SubscriptionSpec.for_user(query.user_id)
+            if not query.include_inactive:
+                spec = spec.active()
             if query.category:
-                subscriptions = [s for s in subscriptions if s.category == query.category]
+                spec = spec.in_categories(query.category)
+            subscriptions = await maybe_await(self._uow.subscriptions.find(spec))
             
             # 轉換為 DTO
             result = []
@@ -96,9 +106,48 @@ class SubscriptionApplicationService:
                 detail="獲取訂閱列表失敗"
             )
     
+    async def get_subscription_page(self, query: SubscriptionQuery) -> SubscriptionPageDto:
+        """按 (created_at, id) 倒序獲取一頁訂閱
+
+        多取一行判斷是否還有下一頁；總數只在 include_total 時返回，且讀自數量緩存。
+        """
+        try:
+            after = decode_cursor(query.cursor) if query.cursor else None
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="無效的分頁游標"
+            )
+        
+        try:
+            subscriptions = await maybe_await(self._uow.subscriptions.get_page(
+                query.user_id, query.limit + 1, after, query.include_inactive, query.category
+            ))
+            has_more = len(subscriptions) > query.limit
+            subscriptions = subscriptions[:query.limit]
+            total = None
+            if query.include_total:
+                total = await maybe_await(self._uow.subscriptions.count_listed(
+                    query.user_id, query.include_inactive, query.category
+                ))
+            
+            last = subscriptions[-1] if subscriptions else None
+            return SubscriptionPageDto(
+                items=[await self._to_subscription_dto(subscription) for subscription in subscriptions],
+                next_cursor=encode_cursor(last.created_at, last.id) if has_more else None,
+                has_more=has_more,
+                total=total
+            )
+            
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="獲取訂閱列表失敗"
+            )
+    
     async def get_subscription(self, user_id: int, subscription_id: int) -> SubscriptionDto:
         """獲取單個訂閱"""
-        subscription = self._uow.subscriptions.get_by_user_and_id(user_id, subscription_id)
+        subscription = await maybe_await(self._uow.subscriptions.get_by_user_and_id(user_id, subscription_id))
         
         if not subscription:
             raise HTTPException(
@@ -111,7 +160,7 @@ class SubscriptionApplicationService:
     async def update_subscription(self, user_id: int, command: UpdateSubscriptionCommand) -> SubscriptionDto:
         """更新訂閱"""
         try:
-            subscription = self._uow.subscriptions.get_by_user_and_id(user_id, command.subscription_id)
+            subscription = await maybe_await(self._uow.subscriptions.get_by_user_and_id(user_id, command.subscription_id))
             
             if not subscription:
                 raise HTTPException(
@@ -119,7 +168,7 @@ class SubscriptionApplicationService:
                     detail="訂閱不存在"
                 )
             
-            self._uow.begin()
+            await maybe_await(self._uow.begin())
             
             # 更新字段
             if command.name is not None:
@@ -137,22 +186,22 @@ class SubscriptionApplicationService:
             if command.is_active is not None:
                 subscription.is_active = command.is_active
             
-            # 如果價格或貨幣有變化，重新計算台幣價格
-            if command.original_price is not None or command.currency is not None:
+            # 價格、貨幣或開始日期有變化時，按開始日期生效的匯率重新計算台幣價格
+            if command.original_price is not None or command.currency is not None or command.start_date is not None:
                 current_currency = command.currency.value if command.currency else subscription.currency.value
                 current_price = command.original_price if command.original_price is not None else subscription.original_price
                 
                 subscription.price = await self._domain_service.calculate_twd_price(
-                    current_price, current_currency
+                    current_price, current_currency, on=subscription.start_date
                 )
             
-            updated_subscription = self._uow.subscriptions.update(subscription)
-            self._uow.commit()
+            updated_subscription = await maybe_await(self._uow.subscriptions.update(subscription))
+            await maybe_await(self._uow.commit())
             
             return await self._to_subscription_dto(updated_subscription)
             
         except Exception as e:
-            self._uow.rollback()
+            await maybe_await(self._uow.rollback())
             if isinstance(e, HTTPException):
                 raise
             raise HTTPException(
@@ -160,12 +209,12 @@ class SubscriptionApplicationService:
                 detail="更新訂閱失敗"
             )
         finally:
-            self._uow.close()
+            await maybe_await(self._uow.close())
     
     async def delete_subscription(self, user_id: int, subscription_id: int) -> bool:
         """刪除訂閱"""
         try:
-            subscription = self._uow.subscriptions.get_by_user_and_id(user_id, subscription_id)
+            subscription = await maybe_await(self._uow.subscriptions.get_by_user_and_id(user_id, subscription_id))
             
             if not subscription:
                 raise HTTPException(
@@ -173,14 +222,14 @@ class SubscriptionApplicationService:
                     detail="訂閱不存在"
                 )
             
-            self._uow.begin()
-            result = self._uow.subscriptions.delete(subscription_id)
-            self._uow.commit()
+            await maybe_await(self._uow.begin())
+            result = await maybe_await(self._uow.subscriptions.delete(subscription_id))
+            await maybe_await(self._uow.commit())
             
             return result
             
         except Exception as e:
-            self._uow.rollback()
+            await maybe_await(self._uow.rollback())
             if isinstance(e, HTTPException):
                 raise
             raise HTTPException(
@@ -188,27 +237,31 @@ class SubscriptionApplicationService:
                 detail="刪除訂閱失敗"
             )
         finally:
-            self._uow.close()
+            await maybe_await(self._uow.close())
     
     async def get_subscription_summary(self, user_id: int) -> SubscriptionSummaryDto:
         """獲取訂閱摘要"""
-        subscriptions = self._uow.subscriptions.get_by_user_id(user_id)
-        active_subscriptions = [s for s in subscriptions if s.is_active]
+        # 成本由資料庫按類別匯總，不載入訂閱實體
+        category_totals = await maybe_await(self._uow.subscriptions.get_category_cost_totals(user_id))
+        total_subscriptions = await maybe_await(self._uow.subscriptions.count_by_user_id(user_id))
         
-        total_monthly_cost = self._domain_service.calculate_total_monthly_cost(subscriptions)
-        total_yearly_cost = self._domain_service.calculate_total_yearly_cost(subscriptions)
-        category_costs = self._domain_service.calculate_category_costs(subscriptions)
+        total_monthly_cost = sum(totals["monthly_cost"] for totals in category_totals.values())
+        total_yearly_cost = sum(totals["yearly_cost"] for totals in category_totals.values())
+        category_costs = {category: totals["monthly_cost"] for category, totals in category_totals.items()}
         
-        # 找出即將續費的訂閱
+        # 找出即將續費的訂閱：先在 SQL 中按開始日期預篩選，再精確判斷
+        candidates = await maybe_await(self._uow.subscriptions.get_active_started_before(
+            user_id, self._domain_service.renewal_start_cutoffs(days_ahead=7)
+        ))
         upcoming_renewals = []
-        for subscription in active_subscriptions:
+        for subscription in candidates:
             if self._domain_service.is_due_soon(subscription, days_ahead=7):
                 dto = await self._to_subscription_dto(subscription)
                 upcoming_renewals.append(dto)
         
         return SubscriptionSummaryDto(
-            total_subscriptions=len(subscriptions),
-            active_subscriptions=len(active_subscriptions),
+            total_subscriptions=total_subscriptions,
+            active_subscriptions=sum(totals["count"] for totals in category_totals.values()),
             total_monthly_cost=total_monthly_cost,
             total_yearly_cost=total_yearly_cost,
             categories=category_costs,
@@ -216,34 +269,157 @@ class SubscriptionApplicationService:
         )
     
     async def bulk_operation(self, user_id: int, command: BulkSubscriptionOperationCommand) -> bool:
-        """批量操作訂閱"""
+        """批量操作訂閱
+
+        以集合方式執行：每塊 ID 一條 UPDATE / DELETE，不再逐筆查詢和寫入；
+        不屬於該用戶的 ID 會被忽略。
+        """
         try:
-            self._uow.begin()
+            await maybe_await(self._uow.begin())
             
-            for subscription_id in command.subscription_ids:
-                subscription = self._uow.subscriptions.get_by_user_and_id(user_id, subscription_id)
-                
-                if subscription:
-                    if command.operation == "activate":
-                        subscription.is_active = True
-                        self._uow.subscriptions.update(subscription)
-                    elif command.operation == "deactivate":
-                        subscription.is_active = False
-                        self._uow.subscriptions.update(subscription)
-                    elif command.operation == "delete":
-                        self._uow.subscriptions.delete(subscription_id)
-            
-            self._uow.commit()
+            if command.operation in ("activate", "deactivate"):
+                await maybe_await(self._uow.subscriptions.bulk_set_active(
+                    user_id, command.subscription_ids, command.operation == "activate"
+                ))
+            elif command.operation == "delete":
+                await maybe_await(self._uow.subscriptions.bulk_delete(user_id, command.subscription_ids))
+            
+            await maybe_await(self._uow.commit())
             return True
             
         except Exception as e:
-            self._uow.rollback()
+            await maybe_await(self._uow.rollback())
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="批量操作失敗"
             )
         finally:
-            self._uow.close()
+            await maybe_await(self._uow.close())
+    
+    async def import_subscriptions(
+        self,
+        user_id: int,
+        records: AsyncIterator[ImportRecord],
+        batch_size: int = 1000,
+        max_errors: int = 1000
+    ) -> SubscriptionImportResultDto:
+        """批量導入訂閱
+
+        邊解析邊驗證，有效行攢滿 batch_size 即在一個事務內以一條 executemany INSERT 寫入；
+        台幣價格按開始日期生效的匯率換算，同一天開始的行共用一份匯率快照。無效行不影響其他行，錯誤按行號返回（最多 max_errors 行）。
+        請求體中途出錯（超出大小上限、編碼錯誤）時停止讀取，已讀取的有效行照常寫入，
+        結果標記為 aborted 並帶上錯誤原因，客戶端可從第 total_rows + 1 行續傳。
+        數據庫寫入失敗時已提交的批次保留，響應中說明已導入的行數。
+        """
+        snapshots: Dict[date, Dict[str, Decimal]] = {}
+        total_rows = imported = failed = 0
+        errors: List[SubscriptionImportRowError] = []
+        batch = []
+        abort: Optional[HTTPException] = None
+        
+        try:
+            rows = records.__aiter__()
+            while True:
+                try:
+                    row_number, data, error = await rows.__anext__()
+                except StopAsyncIteration:
+                    break
+                except HTTPException as e:
+                    abort = e
+                    break
+                total_rows += 1
+                row_errors = [error] if error else []
+                if data is not None:
+                    command, row_errors = self._parse_import_row(data)
+                    if command is not None:
+                        on = command.start_date.date()
+                        if on not in snapshots:
+                            snapshots[on] = await self._domain_service.twd_rate_snapshot(on)
+                        values, row_errors = self._import_row_values(user_id, command, snapshots[on])
+                        if values is not None:
+                            batch.append(values)
+                if row_errors:
+                    failed += 1
+                    if len(errors) < max_errors:
+                        errors.append(SubscriptionImportRowError(row=row_number, errors=row_errors))
+                if len(batch) >= batch_size:
+                    imported += await self._insert_import_batch(batch, imported)
+                    batch = []
+            if batch:
+                imported += await self._insert_import_batch(batch, imported)
+        finally:
+            await maybe_await(self._uow.close())
+        
+        return SubscriptionImportResultDto(
+            total_rows=total_rows,
+            imported=imported,
+            failed=failed,
+            errors=errors,
+            errors_truncated=failed > len(errors),
+            aborted=abort is not None,
+            abort_status_code=abort.status_code if abort is not None else None,
+            abort_reason=str(abort.detail) if abort is not None else None
+        )
+    
+    async def export_subscriptions(
+        self, user_id: Optional[int], export_format: str, batch_size: int = 1000
+    ) -> AsyncIterator[bytes]:
+        """流式導出訂閱（user_id 為 None 時導出所有用戶）
+
+        以服務端遊標每次讀取 batch_size 行並逐塊編碼輸出，不構造 ORM 實體和 DTO 列表；
+        迭代結束或中途被關閉時釋放工作單元。
+        """
+        try:
+            rows = maybe_aiter(self._uow.subscriptions.iter_export_rows(user_id, batch_size))
+            async for chunk in encode_export(rows, export_format):
+                yield chunk
+        finally:
+            await maybe_await(self._uow.close())
+    
+    def _parse_import_row(self, data: dict):
+        """驗證一行導入數據，返回 (創建命令, 錯誤列表)"""
+        try:
+            command = CreateSubscriptionCommand.model_validate(data)
+        except ValidationError as e:
+            return None, [
+                f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors()
+            ]
+        if not command.name.strip():
+            return None, ["訂閱名稱不能為空"]
+        return command, []
+    
+    def _import_row_values(self, user_id: int, command: CreateSubscriptionCommand, snapshot: dict):
+        """按匯率快照換算一行導入數據，返回 (插入用的列值, 錯誤列表)"""
+        twd_price = self._domain_service.twd_price_from_snapshot(
+            command.original_price, command.currency.value, snapshot
+        )
+        if twd_price is None:
+            return None, [f"無法獲取 {command.currency.value} 到 TWD 的匯率"]
+        return {
+            "user_id": user_id,
+            "name": command.name,
+            "price": twd_price,
+            "original_price": command.original_price,
+            "currency": command.currency,
+            "cycle": command.cycle,
+            "category": command.category,
+            "start_date": command.start_date,
+            "is_active": True,
+        }, []
+    
+    async def _insert_import_batch(self, batch: List[dict], imported: int) -> int:
+        """在一個事務內插入一批導入行"""
+        try:
+            await maybe_await(self._uow.begin())
+            inserted = await maybe_await(self._uow.subscriptions.bulk_insert(batch))
+            await maybe_await(self._uow.commit())
+            return inserted
+        except Exception:
+            await maybe_await(self._uow.rollback())
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"批量導入失敗（已導入 {imported} 筆）"
+            )
     
     async def _to_subscription_dto(self, subscription: Subscription) -> SubscriptionDto:
         """轉換為 DTO"""
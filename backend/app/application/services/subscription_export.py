@@ -0,0 +1,70 @@
+"""
+訂閱流式導出
+
+把 Repository 逐行產出的訂閱列值編碼為 NDJSON 或 CSV，每攢滿一定行數輸出一個字節塊，
+內存佔用與導出的總行數無關。CSV 的欄位包含導入所需的全部欄位，可直接重新導入。
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from enum import Enum
+from typing import Any, AsyncIterator
+
+from app.application.services.subscription_import import CSV_FORMAT, NDJSON_FORMAT
+
+# 與 subscription_queries.EXPORT_COLUMNS 的順序一致
+EXPORT_FIELDS = (
+    "id", "user_id", "name", "price", "original_price", "currency", "cycle",
+    "category", "start_date", "is_active", "created_at", "updated_at",
+)
+
+EXPORT_MEDIA_TYPES = {
+    CSV_FORMAT: "text/csv; charset=utf-8",
+    NDJSON_FORMAT: "application/x-ndjson",
+}
+
+# 每個響應塊包含的行數
+EXPORT_CHUNK_ROWS = 500
+
+
+def export_value(value: Any) -> Any:
+    """枚舉導出為值，時間導出為 ISO 8601 字符串"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+# 枚舉都是 str 子類，json 直接按值編碼；default 只會遇到時間
+_json_encoder = json.JSONEncoder(ensure_ascii=False, default=export_value)
+
+
+async def encode_export(
+    rows: AsyncIterator[Any], export_format: str, chunk_rows: int = EXPORT_CHUNK_ROWS
+) -> AsyncIterator[bytes]:
+    """把導出行編碼為 UTF-8 字節塊（CSV 第一塊包含表頭）"""
+    buffer = io.StringIO()
+    if export_format == CSV_FORMAT:
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(EXPORT_FIELDS)
+
+        def write(row):
+            writer.writerow([export_value(value) for value in row])
+    else:
+        def write(row):
+            buffer.write(_json_encoder.encode(dict(zip(EXPORT_FIELDS, row))))
+            buffer.write("\n")
+
+    pending = 0
+    async for row in rows:
+        write(row)
+        pending += 1
+        if pending >= chunk_rows:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
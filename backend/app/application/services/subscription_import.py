@@ -0,0 +1,138 @@
+"""
+訂閱批量導入的流式解析
+
+把上傳的 CSV / NDJSON 請求體按塊解碼並切分為記錄，逐條產出 (行號, 數據, 錯誤)，
+整個文件不會被讀入內存。行號為數據行的序號（從 1 開始，不含 CSV 表頭和空行）。
+"""
+import codecs
+import csv
+import json
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+CSV_FORMAT = "csv"
+NDJSON_FORMAT = "ndjson"
+
+# 請求 Content-Type 對應的導入格式
+IMPORT_CONTENT_TYPES = {
+    "text/csv": CSV_FORMAT,
+    "application/x-ndjson": NDJSON_FORMAT,
+}
+
+# CSV 表頭必須包含的欄位（與 CreateSubscriptionCommand 一致）
+IMPORT_FIELDS = ("name", "original_price", "currency", "cycle", "category", "start_date")
+
+ImportRecord = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+def import_format_for(content_type: str) -> Optional[str]:
+    """由 Content-Type 推斷導入格式，不支持時返回 None"""
+    return IMPORT_CONTENT_TYPES.get(content_type.split(";")[0].strip().lower())
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_bytes: Optional[int] = None) -> AsyncIterator[str]:
+    """把字節塊增量解碼為文本行（UTF-8，允許 BOM），累計超過 max_bytes 時返回 413"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    received = 0
+    async for chunk in chunks:
+        received += len(chunk)
+        if max_bytes is not None and received > max_bytes:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"導入文件超過 {max_bytes} 字節上限"
+            )
+        try:
+            text = decoder.decode(chunk)
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="導入文件必須是 UTF-8 編碼")
+        if not text:
+            continue
+        lines = (pending + text).split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def iter_csv_records(
+    lines: AsyncIterator[str], max_record_bytes: Optional[int] = None
+) -> AsyncIterator[ImportRecord]:
+    """解析帶表頭的 CSV；引號內的換行會與下一行合併為同一條記錄
+
+    跨行記錄累計超過 max_record_bytes 時報告該行錯誤並丟棄已緩衝的內容，
+    從下一行重新開始解析，避免未閉合的引號吞掉文件剩餘部分。
+    """
+    header = None
+    row_number = 0
+    record = None
+    record_bytes = 0
+    async for line in lines:
+        record = line if record is None else record + "\n" + line
+        record_bytes += len(line.encode("utf-8")) + 1
+        if record.count('"') % 2:
+            # 引號未閉合，記錄延續到下一行
+            if max_record_bytes is not None and record_bytes > max_record_bytes:
+                record, record_bytes = None, 0
+                if header is None:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail="CSV 表頭引號未閉合"
+                    )
+                row_number += 1
+                yield row_number, None, f"記錄超過 {max_record_bytes} 字節上限（引號可能未閉合）"
+            continue
+        text, record, record_bytes = record, None, 0
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [column.strip().lower() for column in values]
+            missing = [field for field in IMPORT_FIELDS if field not in header]
+            if missing:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"CSV 表頭缺少欄位: {', '.join(missing)}"
+                )
+            continue
+        row_number += 1
+        if len(values) != len(header):
+            yield row_number, None, f"欄位數量應為 {len(header)}，實際為 {len(values)}"
+        else:
+            yield row_number, dict(zip(header, values)), None
+    if record is not None:
+        yield row_number + 1, None, "引號未閉合"
+
+
+async def iter_ndjson_records(lines: AsyncIterator[str]) -> AsyncIterator[ImportRecord]:
+    """解析每行一個 JSON 對象的 NDJSON"""
+    row_number = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield row_number, None, f"JSON 格式錯誤: {e}"
+            continue
+        if not isinstance(data, dict):
+            yield row_number, None, "每行必須是一個 JSON 對象"
+            continue
+        yield row_number, data, None
+
+
+def parse_import_stream(
+    chunks: AsyncIterator[bytes],
+    import_format: str,
+    max_bytes: Optional[int] = None,
+    max_record_bytes: Optional[int] = None
+) -> AsyncIterator[ImportRecord]:
+    """按格式把請求體字節流解析為導入記錄"""
+    lines = iter_lines(chunks, max_bytes)
+    if import_format == CSV_FORMAT:
+        return iter_csv_records(lines, max_record_bytes)
+    return iter_ndjson_records(lines)
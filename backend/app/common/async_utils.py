@@ -0,0 +1,23 @@
+import inspect
+from typing import Any, AsyncIterator
+
+async def maybe_await(value: Any) -> Any:
+    """如果值是 awaitable 則等待其結果，否則原樣返回
+    
+    讓應用服務同時支持同步與異步的 Unit of Work / Repository 實現。
+    """
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+async def maybe_aiter(iterable: Any) -> AsyncIterator[Any]:
+    """把同步或異步可迭代對象統一為異步迭代
+
+    同步迭代器（如同步 Repository 的遊標）在事件循環中直接迭代，與 maybe_await 的同步路徑一致。
+    """
+    if hasattr(iterable, "__aiter__"):
+        async for item in iterable:
+            yield item
+    else:
+        for item in iterable:
+            yield item
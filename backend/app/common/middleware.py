@@ -1,117 +1,261 @@
 from fastapi import Request, Response
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import time
+import uuid
 import logging
-from typing import Callable
+from typing import Callable, Dict, List, Optional, Tuple
 
 from app.common.responses import ApiResponse
 from app.common.validators import RequestSizeValidator
+from app.core.access_log import AccessLogSampler, access_log_sampler
+from app.core.logging_config import (
+    APILogger,
+    bind_log_context,
+    get_log_context,
+    reset_log_context
+)
+from app.core.metrics import (
+    UNMATCHED_ROUTE,
+    MetricsRegistry,
+    end_request_queries,
+    metrics_registry,
+    start_request_queries
+)
+from app.middleware.logging_middleware import (
+    SENSITIVE_ENDPOINTS,
+    check_suspicious_activity,
+    get_client_ip,
+    log_sensitive_endpoint_access
+)
 
 logger = logging.getLogger(__name__)
 
-class RequestValidationMiddleware(BaseHTTPMiddleware):
-    """請求驗證中間件"""
-    
-    def __init__(self, app: ASGIApp, max_request_size: int = 1024 * 1024):
-        super().__init__(app)
+
+class RequestPipelineMiddleware:
+    """請求處理管道（純 ASGI 中間件）
+
+    在一次調用內完成原先多層 BaseHTTPMiddleware 分別做的事情：
+    請求大小與 Content-Type 驗證、請求 ID、計時、安全響應頭、請求指標
+    （按路由模板記錄到指標註冊表，含請求內的 SQL 數量和耗時），
+    以及可選的訪問日誌（按採樣器的決定逐條寫入，並按路由匯總）和安全事件日誌。
+    不經過 BaseHTTPMiddleware 的任務組和內存流，響應體直接透傳，不做緩衝。
+    """
+
+    BODY_METHODS = {"POST", "PUT", "PATCH"}
+    ALLOWED_CONTENT_TYPES = ("application/json", "multipart/form-data", "text/csv", "application/x-ndjson")
+
+    SECURITY_HEADERS: List[Tuple[bytes, bytes]] = [
+        (b"x-content-type-options", b"nosniff"),
+        (b"x-frame-options", b"DENY"),
+        (b"x-xss-protection", b"1; mode=block"),
+        (b"strict-transport-security", b"max-age=31536000; includeSubDomains"),
+        (b"x-api-version", b"1.0"),
+    ]
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_request_size: int = 1024 * 1024,
+        validate_requests: bool = True,
+        security_headers: bool = True,
+        access_log: bool = False,
+        security_log: bool = False,
+        metrics: Optional[MetricsRegistry] = None,
+        access_sampler: Optional[AccessLogSampler] = None,
+        body_size_limits: Optional[Dict[str, int]] = None
+    ):
+        self.app = app
         self.max_request_size = max_request_size
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        # 驗證請求大小
-        content_length = request.headers.get("content-length")
+        # 按路徑後綴覆蓋請求體大小上限（如批量導入允許更大的上傳）；
+        # 以後綴匹配，同一路由掛載在多個前綴下（/api/v1 和 /api）時都生效
+        self.body_size_limits = body_size_limits or {}
+        self.validate_requests = validate_requests
+        self.security_headers = security_headers
+        self.access_log = access_log
+        self.security_log = security_log
+        self.metrics = metrics if metrics is not None else metrics_registry
+        self.access_sampler = access_sampler if access_sampler is not None else access_log_sampler
+        self.request_count = 0
+        self.error_count = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        self.request_count += 1
+        request_id = str(uuid.uuid4())
+        scope.setdefault("state", {})["request_id"] = request_id
+        headers = dict(scope["headers"])
+        client_ip = get_client_ip(scope, headers)
+        # 請求上下文只綁定一次，之後本請求內（包括線程池中）的日誌都帶上這些字段
+        log_context_token = bind_log_context(
+            request_id=request_id, ip_address=client_ip, endpoint=scope["path"], method=scope["method"]
+        )
+        try:
+            await self._handle(scope, receive, send, start_time, request_id, headers, client_ip)
+        finally:
+            reset_log_context(log_context_token)
+
+    async def _handle(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        start_time: float,
+        request_id: str,
+        headers: dict,
+        client_ip: str
+    ) -> None:
+        method = scope["method"]
+        path = scope["path"]
+
+        if self.security_log:
+            check_suspicious_activity(
+                client_ip,
+                headers.get(b"user-agent", b"").decode("latin-1").lower(),
+                scope.get("query_string", b"").decode("latin-1").lower()
+            )
+
+        status_code = 500
+        response_started = False
+        queries, queries_token = start_request_queries()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, response_started
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                response_started = True
+                response_headers = list(message.get("headers", []))
+                response_headers.append((b"x-request-id", request_id.encode()))
+                response_headers.append(
+                    (b"x-process-time", str(time.perf_counter() - start_time).encode())
+                )
+                if self.security_headers:
+                    response_headers.extend(self.SECURITY_HEADERS)
+                app = scope.get("app")
+                if app is not None and getattr(app, "debug", False):
+                    # 開發環境下在響應頭中附帶指標
+                    response_headers.append((b"x-request-count", str(self.request_count).encode()))
+                    response_headers.append((b"x-error-count", str(self.error_count).encode()))
+                message["headers"] = response_headers
+            await send(message)
+
+        try:
+            rejection = self._validate(method, path, headers) if self.validate_requests else None
+            if rejection is not None:
+                await rejection(scope, receive, send_wrapper)
+            else:
+                await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            self.error_count += 1
+            process_time = time.perf_counter() - start_time
+            if not self.access_log or response_started:
+                logger.error(f"請求處理異常: {str(e)}")
+                raise
+            APILogger.log_api_error(
+                method=method,
+                endpoint=path,
+                error=e,
+                user_id=get_log_context().get("user_id"),
+                ip_address=client_ip
+            )
+            response = JSONResponse(
+                status_code=500,
+                content={"error": "內部服務器錯誤", "request_id": request_id},
+                headers={"X-Request-ID": request_id, "X-Process-Time": str(process_time)}
+            )
+            await response(scope, receive, send)
+            return
+        finally:
+            end_request_queries(queries_token)
+            route = self._route_template(scope)
+            elapsed = time.perf_counter() - start_time
+            self.metrics.observe_request(method, route, status_code, elapsed, queries)
+            # 所有請求都計入路由匯總；逐條日誌只寫被採樣的請求（錯誤和慢請求始終寫）
+            sampled = self.access_sampler.record(method, route, status_code, elapsed)
+
+        process_time = time.perf_counter() - start_time
+        if status_code >= 400:
+            self.error_count += 1
+        if sampled:
+            if self.access_log:
+                APILogger.log_request(
+                    method=method,
+                    endpoint=path,
+                    user_id=get_log_context().get("user_id"),
+                    ip_address=client_ip,
+                    response_status=status_code,
+                    response_time=process_time
+                )
+            else:
+                logger.info(f"{method} {path} - {status_code} - {process_time:.4f}s")
+        if self.security_log and path in SENSITIVE_ENDPOINTS:
+            log_sensitive_endpoint_access(method, path, status_code, client_ip)
+
+    @staticmethod
+    def _route_template(scope: Scope) -> str:
+        """匹配到的完整路由模板（如 /api/v1/subscriptions/{subscription_id}）
+
+        嵌套路由時 scope["route"] 只帶最內層的路徑，這裡用路徑參數還原出實際路徑的後綴，
+        再把前綴（各層路由的 prefix）拼回去。
+        """
+        route = scope.get("route")
+        template = getattr(route, "path_format", None)
+        if template is None:
+            return UNMATCHED_ROUTE
+        path = scope["path"]
+        params = {name: str(value) for name, value in scope.get("path_params", {}).items()}
+        try:
+            rendered = template.format(**params)
+        except (KeyError, IndexError, ValueError):
+            return template
+        if path.endswith(rendered):
+            return path[:len(path) - len(rendered)] + template
+        return template
+
+    def _body_size_limit(self, path: str) -> int:
+        """該路徑的請求體大小上限"""
+        for suffix, limit in self.body_size_limits.items():
+            if path.endswith(suffix):
+                return limit
+        return self.max_request_size
+
+    def _validate(self, method: str, path: str, headers: dict) -> Optional[JSONResponse]:
+        """驗證請求大小和 Content-Type，不通過時返回錯誤響應"""
+        content_length = headers.get(b"content-length")
         if content_length:
             try:
-                content_length = int(content_length)
                 errors = RequestSizeValidator.validate_content_length(
-                    content_length, self.max_request_size
+                    int(content_length), self._body_size_limit(path)
                 )
-                if errors:
-                    response = ApiResponse.error(
-                        message="請求驗證失敗",
-                        errors=errors
-                    )
-                    return JSONResponse(
-                        status_code=413,
-                        content=response.dict()
-                    )
             except ValueError:
-                pass
-        
-        # 驗證Content-Type（對於POST/PUT請求）
-        if request.method in ["POST", "PUT", "PATCH"]:
-            content_type = request.headers.get("content-type", "")
-            if not content_type.startswith("application/json") and not content_type.startswith("multipart/form-data"):
+                errors = []
+            if errors:
+                response = ApiResponse.error(
+                    message="請求驗證失敗",
+                    errors=errors
+                )
+                return JSONResponse(
+                    status_code=413,
+                    content=response.dict()
+                )
+
+        if method in self.BODY_METHODS:
+            content_type = headers.get(b"content-type", b"").decode("latin-1")
+            if not content_type.startswith(self.ALLOWED_CONTENT_TYPES):
                 response = ApiResponse.error(
                     message="不支持的Content-Type",
-                    errors=[f"當前Content-Type: {content_type}，支持的類型: application/json, multipart/form-data"]
+                    errors=[f"當前Content-Type: {content_type}，支持的類型: {', '.join(self.ALLOWED_CONTENT_TYPES)}"]
                 )
                 return JSONResponse(
                     status_code=415,
                     content=response.dict()
                 )
-        
-        response = await call_next(request)
-        return response
-
-class ResponseHeadersMiddleware(BaseHTTPMiddleware):
-    """響應頭中間件"""
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        response = await call_next(request)
-        
-        # 添加安全頭
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-        
-        # 添加API版本頭
-        response.headers["X-API-Version"] = "1.0"
-        
-        # 添加響應時間
-        if hasattr(request.state, "start_time"):
-            process_time = time.time() - request.state.start_time
-            response.headers["X-Process-Time"] = str(process_time)
-        
-        return response
-
-class RequestTimingMiddleware(BaseHTTPMiddleware):
-    """請求計時中間件"""
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        start_time = time.time()
-        request.state.start_time = start_time
-        
-        response = await call_next(request)
-        
-        process_time = time.time() - start_time
-        logger.info(
-            f"{request.method} {request.url.path} - {response.status_code} - {process_time:.4f}s"
-        )
-        
-        return response
-
-class RequestIDMiddleware(BaseHTTPMiddleware):
-    """請求ID中間件"""
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        import uuid
-        
-        # 生成請求ID
-        request_id = str(uuid.uuid4())
-        request.state.request_id = request_id
-        
-        # 添加到日誌上下文
-        logger.info(f"Request {request_id}: {request.method} {request.url.path}")
-        
-        response = await call_next(request)
-        
-        # 添加請求ID到響應頭
-        response.headers["X-Request-ID"] = request_id
-        
-        return response
+        return None
 
 class CORSCustomMiddleware(BaseHTTPMiddleware):
     """自定義CORS中間件"""
@@ -142,33 +286,3 @@ class CORSCustomMiddleware(BaseHTTPMiddleware):
         response.headers["Access-Control-Allow-Credentials"] = "true"
         
         return response
-
-class APIMetricsMiddleware(BaseHTTPMiddleware):
-    """API指標中間件"""
-    
-    def __init__(self, app: ASGIApp):
-        super().__init__(app)
-        self.request_count = 0
-        self.error_count = 0
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        self.request_count += 1
-        
-        try:
-            response = await call_next(request)
-            
-            # 記錄錯誤狀態碼
-            if response.status_code >= 400:
-                self.error_count += 1
-            
-            # 添加指標到響應頭（僅在開發環境）
-            if request.app.debug:
-                response.headers["X-Request-Count"] = str(self.request_count)
-                response.headers["X-Error-Count"] = str(self.error_count)
-            
-            return response
-            
-        except Exception as e:
-            self.error_count += 1
-            logger.error(f"請求處理異常: {str(e)}")
-            raise
\ No newline at end of file
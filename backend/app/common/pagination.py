@@ -0,0 +1,29 @@
+"""
+鍵集分頁游標
+
+游標記錄上一頁最後一行的 (created_at, id)，編碼為 URL 安全的 base64 字符串，
+對客戶端是不透明的；客戶端只需把響應 metadata 中的 next_cursor 原樣傳回。
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """把一行的 (created_at, id) 編碼為游標"""
+    payload = json.dumps([created_at.isoformat(), row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """解碼游標，格式不正確時拋出 ValueError"""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(payload)
+        if not isinstance(row_id, int) or isinstance(row_id, bool):
+            raise ValueError(row_id)
+        return datetime.fromisoformat(created_at), row_id
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as e:
+        raise ValueError(f"無效的分頁游標: {cursor}") from e
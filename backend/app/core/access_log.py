@@ -0,0 +1,141 @@
+"""
+訪問日誌採樣與按路由匯總
+
+成功且不慢的請求按比例採樣寫入訪問日誌，錯誤（4xx / 5xx）和慢請求始終寫入；
+所有請求（無論是否被採樣）按路由模板累計，每隔一段時間為每個路由寫一行匯總
+（請求數、錯誤數、延遲分位數），在日誌量大幅減少的同時保留完整的流量概況。
+"""
+import logging
+import random
+import threading
+import time
+from contextvars import Context
+from typing import Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import LATENCY_BUCKETS, QUANTILES, Histogram
+
+access_logger = logging.getLogger('access')
+
+
+class RouteRollup:
+    """單個路由在一個匯總週期內的統計"""
+
+    __slots__ = ("count", "errors", "slow", "logged", "latency")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.slow = 0
+        self.logged = 0
+        self.latency = Histogram(LATENCY_BUCKETS)
+
+
+class AccessLogSampler:
+    """訪問日誌採樣器
+
+    sample_rate 為 1.0 時每個請求都寫日誌（與原行為一致）；rollup_interval 為 0（默認）時不寫匯總行。
+    匯總在記錄請求時順帶檢查是否到期，不需要額外的定時線程。
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = 1.0,
+        slow_threshold: float = 1.0,
+        rollup_interval: float = 0.0,
+        rng: Optional[random.Random] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError(f"採樣比例必須在 0 到 1 之間: {sample_rate}")
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold
+        self.rollup_interval = rollup_interval
+        self._random = (rng or random.Random()).random
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._routes: Dict[Tuple[str, str], RouteRollup] = {}
+        self._window_start = clock()
+        self.requests = 0
+        self.logged = 0
+        self.rollups = 0
+
+    def record(self, method: str, route: str, status_code: int, response_time: float) -> bool:
+        """記錄一個請求，返回是否應寫入逐條訪問日誌"""
+        is_error = status_code >= 400
+        is_slow = response_time >= self.slow_threshold
+        should_log = is_error or is_slow or self.sample_rate >= 1.0 or self._random() < self.sample_rate
+        due = False
+        with self._lock:
+            self.requests += 1
+            if should_log:
+                self.logged += 1
+            if self.rollup_interval > 0:
+                rollup = self._routes.get((method, route))
+                if rollup is None:
+                    rollup = self._routes[(method, route)] = RouteRollup()
+                rollup.count += 1
+                rollup.errors += is_error
+                rollup.slow += is_slow
+                rollup.logged += should_log
+                rollup.latency.observe(response_time)
+                due = self._clock() - self._window_start >= self.rollup_interval
+        if due:
+            self.flush()
+        return should_log
+
+    def flush(self) -> int:
+        """寫出當前週期的匯總行並開始新週期，返回寫出的行數"""
+        with self._lock:
+            routes, self._routes = self._routes, {}
+            now = self._clock()
+            window, self._window_start = now - self._window_start, now
+            self.rollups += len(routes)
+        # 在空上下文中寫出，匯總行不帶觸發本次匯總的那個請求的 request_id / user_id
+        Context().run(self._write_rollups, routes, window)
+        return len(routes)
+
+    @staticmethod
+    def _write_rollups(routes: Dict[Tuple[str, str], RouteRollup], window: float) -> None:
+        for (method, route), rollup in sorted(routes.items()):
+            latency_ms = {
+                f"p{int(q * 100)}": round(rollup.latency.quantile(q) * 1000, 1) for q in QUANTILES
+            }
+            access_logger.info(
+                f"ROLLUP {method} {route} - Count: {rollup.count} - Errors: {rollup.errors} - "
+                f"Slow: {rollup.slow} - p50/p95/p99: {latency_ms['p50']}/{latency_ms['p95']}/{latency_ms['p99']}ms",
+                extra={
+                    'method': method,
+                    'endpoint': route,
+                    'event_type': 'api_rollup',
+                    'rollup': {
+                        'window_seconds': round(window, 1),
+                        'count': rollup.count,
+                        'errors': rollup.errors,
+                        'slow': rollup.slow,
+                        'logged': rollup.logged,
+                        'latency_ms': latency_ms,
+                    }
+                }
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sample_rate": self.sample_rate,
+                "slow_threshold": self.slow_threshold,
+                "rollup_interval": self.rollup_interval,
+                "requests": self.requests,
+                "logged": self.logged,
+                "skipped": self.requests - self.logged,
+                "rollup_lines": self.rollups,
+                "pending_routes": len(self._routes),
+            }
+
+
+# 全局實例
+access_log_sampler = AccessLogSampler(
+    sample_rate=settings.access_log_sample_rate,
+    slow_threshold=settings.access_log_slow_threshold,
+    rollup_interval=settings.access_log_rollup_interval
+)
@@ -3,10 +3,14 @@ from typing import Optional
 from jose import JWTError, jwt
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from app.core.config import settings
 from app.database.connection import get_db
 from app.models import User
+from app.core.user_cache import AuthenticatedUser, authenticated_user_cache
+from app.core.token_cache import verified_token_cache
+from app.core.logging_config import update_log_context
 
 security = HTTPBearer()
 
@@ -23,9 +27,16 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 def verify_token(token: str) -> Optional[str]:
-    """驗證 JWT 令牌並返回用戶名"""
+    """驗證 JWT 令牌並返回用戶名；已驗證過的令牌直接從緩存讀取聲明"""
+    if not token:
+        return None
+    payload = verified_token_cache.get(token)
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        if payload is None:
+            payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+            if verified_token_cache.is_revoked(token, payload):
+                return None
+            verified_token_cache.set(token, payload)
         username: str = payload.get("sub")
         if username is None:
             return None
@@ -33,11 +44,25 @@ def verify_token(token: str) -> Optional[str]:
     except JWTError:
         return None
 
+def _revalidate_cached_user(
+    db: Session, cached: AuthenticatedUser, generation: int
+) -> Optional[AuthenticatedUser]:
+    """按主鍵重新讀取用戶狀態（可能已被其他 worker 修改）；用戶已刪除或改名時使緩存失效並返回 None"""
+    row = db.execute(
+        select(User.username, User.is_active).where(User.id == cached.id)
+    ).first()
+    if row is None or row.username != cached.username:
+        authenticated_user_cache.invalidate(cached.username)
+        return None
+    current_user = AuthenticatedUser(id=cached.id, username=row.username, is_active=bool(row.is_active))
+    authenticated_user_cache.revalidated(current_user, generation)
+    return current_user
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
-) -> User:
-    """獲取當前用戶"""
+) -> AuthenticatedUser:
+    """獲取當前用戶；命中緩存時不查詢數據庫"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="無效的認證信息",
@@ -48,16 +73,50 @@ async def get_current_user(
     if username is None:
         raise credentials_exception
     
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
-        raise credentials_exception
+    # 在讀取數據庫之前取代數，讀取期間提交的修改不會被舊數據覆蓋
+    generation = authenticated_user_cache.generation()
+    current_user = authenticated_user_cache.get(username)
+    if current_user is not None and authenticated_user_cache.needs_revalidation(username):
+        current_user = _revalidate_cached_user(db, current_user, generation)
+    if current_user is None:
+        user = db.query(User).filter(User.username == username).first()
+        if user is None:
+            raise credentials_exception
+        
+        current_user = AuthenticatedUser.from_user(user)
+        authenticated_user_cache.set(current_user, generation)
     
-    return user
+    # 本請求之後的日誌都帶上用戶 ID
+    update_log_context(user_id=current_user.id)
+    return current_user
 
 async def get_current_active_user(
-    current_user: User = Depends(get_current_user)
-) -> User:
+    current_user: AuthenticatedUser = Depends(get_current_user)
+) -> AuthenticatedUser:
     """獲取當前活躍用戶"""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="用戶已停用")
-    return current_user
\ No newline at end of file
+    return current_user
+
+async def get_current_admin_user(
+    current_user: AuthenticatedUser = Depends(get_current_active_user)
+) -> AuthenticatedUser:
+    """獲取當前管理員用戶（用戶名在 settings.admin_usernames 中）"""
+    if current_user.username not in settings.admin_usernames:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="需要管理員權限")
+    return current_user
+
+async def get_current_active_user_model(
+    current_user: AuthenticatedUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+) -> User:
+    """獲取當前活躍用戶的完整模型（需要讀取或修改用戶資料的端點使用）"""
+    user = db.get(User, current_user.id)
+    if user is None:
+        authenticated_user_cache.invalidate(current_user.username)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="無效的認證信息",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
\ No newline at end of file
@@ -9,11 +9,87 @@ class Settings(BaseSettings):
     
     # 數據庫設定  
     database_url: str = os.getenv("DATABASE_URL", "sqlite:///./subscription_db.sqlite")
+    # 是否使用異步引擎 (AsyncSession) 處理 v1 API 的數據訪問
+    use_async_database: bool = False
+    # 異步連接字串，未設置時由 database_url 推導 (例如 sqlite -> sqlite+aiosqlite)
+    async_database_url: Optional[str] = None
+    
+    # 連接池設定 (SQLite 內存數據庫不適用)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0  # 等待可用連接的秒數
+    db_pool_recycle: int = 1800  # 連接最長存活秒數，避免使用被服務端關閉的連接
+    db_pool_pre_ping: bool = True
+    
+    # SQLite 性能設定，於每個新連接上以 PRAGMA 應用
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_mmap_size: int = 256 * 1024 * 1024  # 256MB
+    sqlite_cache_size: int = -64000  # 負值單位為 KiB，約 64MB
+    sqlite_busy_timeout: int = 5000  # 毫秒，鎖等待時間，避免立即拋出 database is locked
     
     # JWT 設定
     secret_key: str = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production")
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    jwt_cache_max_size: int = 10000  # 已驗證令牌緩存的最大條目數
+    auth_user_cache_ttl: float = 60.0  # 秒，已認證用戶緩存的有效期
+    # 秒，緩存條目超過此時間後重新核對用戶狀態；其他 worker 停用或刪除用戶最多延遲這麼久生效
+    auth_user_cache_revalidate_after: float = 5.0
+    auth_user_cache_max_size: int = 10000
+    password_hash_workers: int = 4  # bcrypt 專用線程池大小
+    password_hash_max_queue: int = 64  # 排隊超過此數時返回 503
+    
+    # 匯率 API 設定
+    exchange_rate_api_url: str = "https://api.exchangerate-api.com/v4/latest"
+    exchange_rate_cache_ttl: int = 3600  # 秒，匯率緩存有效期
+    exchange_rate_refresh_interval: int = 3000  # 秒，後台刷新間隔，應短於緩存有效期
+    exchange_rate_max_staleness: int = 6 * 3600  # 秒，過期後仍可提供舊匯率的最長時間
+    
+    # 對外 HTTP 客戶端設定（應用內共享一個連接池）
+    http_timeout: float = 10.0  # 秒，讀取 / 寫入 / 等待連接池的超時
+    http_connect_timeout: float = 5.0  # 秒，建立連接的超時
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_max_connections_per_host: int = 10
+    http_keepalive_expiry: float = 30.0  # 秒，空閒連接保留時間
+    http2_enabled: bool = True  # 需安裝 h2（httpx[http2]），未安裝時使用 HTTP/1.1
+    
+    # 指標設定
+    # 多個 worker 共享的指標目錄；設置後各 worker 定期寫入快照，/metrics 合併全部 worker。
+    # 目錄須在啟動 worker 之前清空（run_dev.py 會自動清空；其他啟動方式需在部署腳本中清空）
+    metrics_multiproc_dir: Optional[str] = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    metrics_flush_interval: float = 5.0  # 秒，worker 後台寫入快照的間隔
+    
+    # 日誌隊列設定（記錄線程只入隊，由後台線程批量寫文件）
+    log_queue_size: int = 10000
+    log_queue_policy: str = "drop"  # drop：隊列滿時丟棄並計數；block：等待空間
+    log_queue_block_timeout: float = 1.0  # 秒，block 策略（以及 drop 策略下的 ERROR 記錄）的最長等待
+    log_batch_size: int = 256  # 每次寫入的最大記錄數
+    
+    # 訪問日誌採樣（錯誤和慢請求始終記錄，其餘按比例採樣；按路由定期寫匯總行）
+    access_log_sample_rate: float = 1.0
+    access_log_slow_threshold: float = 1.0  # 秒
+    # 秒，0 表示不寫匯總行；全量記錄時匯總行只會增加日誌量，調低採樣比例時再開啟
+    access_log_rollup_interval: float = 0.0
+    
+    # 訂閱批量導入
+    subscription_import_max_bytes: int = 50 * 1024 * 1024  # 50MB
+    subscription_import_max_record_bytes: int = 64 * 1024  # 單條 CSV 記錄（含引號內換行）的上限
+    subscription_import_batch_size: int = 1000  # 每個事務插入的行數
+    subscription_import_max_errors: int = 1000  # 響應中最多列出的錯誤行
+    
+    # 訂閱列表分頁
+    subscription_page_default_limit: int = 50  # 只傳 cursor 時的每頁數量
+    subscription_page_max_limit: int = 200
+    subscription_count_cache_ttl: float = 300.0  # 秒，分頁總數緩存
+    subscription_count_cache_max_users: int = 10000
+    
+    # 訂閱導出
+    subscription_export_batch_size: int = 1000  # 每次從遊標讀取的行數
+    
+    # 管理員（可訪問全量導出等管理端點的用戶名）
+    admin_usernames: list = []
     
     # CORS 設定
     allowed_origins: list = [
@@ -24,4 +100,4 @@ class Settings(BaseSettings):
     class Config:
         env_file = ".env"
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
@@ -0,0 +1,95 @@
+import asyncio
+import importlib.util
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+from app.core.config import settings
+
+
+def http2_available() -> bool:
+    """是否可以使用 HTTP/2（需安裝 h2）"""
+    return settings.http2_enabled and importlib.util.find_spec("h2") is not None
+
+
+class HostLimitedTransport(httpx.AsyncBaseTransport):
+    """限制每個主機同時進行的請求數，避免單個上游佔滿整個連接池"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_per_host: int):
+        self._transport = transport
+        self._max_per_host = max_per_host
+        self._semaphores: Dict[Tuple[bytes, bytes, Optional[int]], asyncio.Semaphore] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        url = request.url
+        key = (url.raw_scheme, url.raw_host, url.port)
+        semaphore = self._semaphores.get(key)
+        if semaphore is None:
+            semaphore = self._semaphores.setdefault(key, asyncio.Semaphore(self._max_per_host))
+        async with semaphore:
+            response = await self._transport.handle_async_request(request)
+            # 在許可內讀完響應體，連接歸還連接池後才放行下一個請求
+            await response.aread()
+            return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """按配置創建帶連接池的 AsyncClient"""
+    limits = httpx.Limits(
+        max_connections=settings.http_max_connections,
+        max_keepalive_connections=settings.http_max_keepalive_connections,
+        keepalive_expiry=settings.http_keepalive_expiry
+    )
+    timeout = httpx.Timeout(settings.http_timeout, connect=settings.http_connect_timeout)
+    http2 = http2_available()
+    transport = HostLimitedTransport(
+        httpx.AsyncHTTPTransport(limits=limits, http2=http2),
+        settings.http_max_connections_per_host
+    )
+    return httpx.AsyncClient(transport=transport, timeout=timeout, http2=http2)
+
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """獲取應用共享的 HTTP 客戶端
+
+    正常由啟動事件創建；在沒有啟動事件的場景（腳本、測試）中按需創建。
+    連接池綁定事件循環，換了事件循環時重新創建。
+    """
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = create_http_client()
+        _client_loop = loop
+    return _client
+
+
+async def start_http_client() -> httpx.AsyncClient:
+    """應用啟動時創建共享客戶端"""
+    return get_http_client()
+
+
+async def close_http_client() -> None:
+    """應用關閉時關閉共享客戶端及其連接"""
+    global _client, _client_loop
+    if _client is not None and _client_loop is asyncio.get_running_loop():
+        await _client.aclose()
+    _client = None
+    _client_loop = None
+
+
+def get_http_client_status() -> Dict[str, object]:
+    """共享客戶端的配置與狀態"""
+    return {
+        "started": _client is not None and not _client.is_closed,
+        "http2": http2_available(),
+        "max_connections": settings.http_max_connections,
+        "max_keepalive_connections": settings.http_max_keepalive_connections,
+        "max_connections_per_host": settings.http_max_connections_per_host,
+    }
@@ -0,0 +1,222 @@
+"""
+隊列化日誌管道
+
+記錄日誌的線程只把記錄放入有界隊列；格式化（json.dumps）、寫文件和輪轉
+都在後台線程中批量完成，事件循環不再被文件 I/O 阻塞。
+"""
+import copy
+import logging
+import logging.handlers
+import queue
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+
+# 隊列滿時的處理策略
+DROP = "drop"    # 丟棄新記錄（ERROR 及以上級別仍會短暫等待）並計數
+BLOCK = "block"  # 等待隊列騰出空間，超時後丟棄並計數
+
+_STOP = object()
+
+
+class LogQueueStats:
+    """隊列日誌統計（入隊、丟棄、批量寫入）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.enqueued = 0
+        self.dropped = 0
+        self.dropped_by_level: Dict[str, int] = defaultdict(int)
+        self.batches = 0
+        self.records_written = 0
+        self.max_batch = 0
+
+    def record_enqueued(self) -> None:
+        with self._lock:
+            self.enqueued += 1
+
+    def record_dropped(self, record: logging.LogRecord) -> None:
+        with self._lock:
+            self.dropped += 1
+            self.dropped_by_level[record.levelname] += 1
+
+    def record_batch(self, size: int) -> None:
+        with self._lock:
+            self.batches += 1
+            self.records_written += size
+            self.max_batch = max(self.max_batch, size)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enqueued": self.enqueued,
+                "dropped": self.dropped,
+                "dropped_by_level": dict(self.dropped_by_level),
+                "batches": self.batches,
+                "records_written": self.records_written,
+                "avg_batch": round(self.records_written / self.batches, 1) if self.batches else 0.0,
+                "max_batch": self.max_batch,
+            }
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """把記錄放入有界隊列的處理器
+
+    target 標明記錄來自哪個記錄器的處理器組（root / security / access），
+    後台線程據此把記錄交給對應的文件處理器。
+    """
+
+    def __init__(
+        self,
+        log_queue: "queue.Queue",
+        target: str,
+        stats: LogQueueStats,
+        policy: str = DROP,
+        block_timeout: Optional[float] = 1.0
+    ):
+        super().__init__(log_queue)
+        if policy not in (DROP, BLOCK):
+            raise ValueError(f"不支持的日誌隊列策略: {policy}")
+        self.target = target
+        self.stats = stats
+        self.policy = policy
+        self.block_timeout = block_timeout
+
+    def prepare(self, record: logging.LogRecord):
+        # 只在調用線程合併消息參數（參數可能是之後會被修改的對象），其餘格式化留給後台線程
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return self.target, record
+
+    def enqueue(self, item) -> None:
+        record = item[1]
+        try:
+            self.queue.put_nowait(item)
+            self.stats.record_enqueued()
+            return
+        except queue.Full:
+            pass
+        if self.policy == BLOCK or record.levelno >= logging.ERROR:
+            try:
+                self.queue.put(item, timeout=self.block_timeout)
+                self.stats.record_enqueued()
+                return
+            except queue.Full:
+                pass
+        self.stats.record_dropped(record)
+
+
+class BatchWriteMixin:
+    """批量寫入：一批記錄格式化後合併為一次 write 和一次 flush"""
+
+    def emit_batch(self, records: Iterable[logging.LogRecord]) -> None:
+        lines = []
+        for record in records:
+            if record.levelno < self.level or not self.filter(record):
+                continue
+            try:
+                lines.append(self.format(record) + self.terminator)
+            except Exception:
+                self.handleError(record)
+        if not lines:
+            return
+        self.acquire()
+        try:
+            self.write_batch("".join(lines))
+        finally:
+            self.release()
+
+    def write_batch(self, data: str) -> None:
+        self.stream.write(data)
+        self.flush()
+
+
+class BatchedStreamHandler(BatchWriteMixin, logging.StreamHandler):
+    """支持批量寫入的控制台處理器"""
+
+
+class BatchedRotatingFileHandler(BatchWriteMixin, logging.handlers.RotatingFileHandler):
+    """支持批量寫入的輪轉文件處理器（整批寫入前檢查是否需要輪轉）"""
+
+    def write_batch(self, data: str) -> None:
+        if self.stream is None:
+            self.stream = self._open()
+        if self.maxBytes > 0:
+            position = self.stream.tell()
+            if position and position + len(data) >= self.maxBytes:
+                self.doRollover()
+        super().write_batch(data)
+
+
+class BatchingQueueListener:
+    """後台日誌寫入線程
+
+    阻塞等待第一條記錄，再不等待地取出隊列中已有的記錄（最多 batch_size 條）作為一批，
+    按目標分發給各處理器批量寫入。負載低時每條記錄立即寫出，負載高時自動合併寫入。
+    """
+
+    def __init__(
+        self,
+        log_queue: "queue.Queue",
+        targets: Dict[str, List[logging.Handler]],
+        stats: LogQueueStats,
+        batch_size: int = 256
+    ):
+        self.queue = log_queue
+        self.targets = targets
+        self.stats = stats
+        self.batch_size = batch_size
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """寫完隊列中剩餘的記錄後停止線程並關閉處理器"""
+        if self._thread is not None:
+            # 停止標記不受隊列容量限制，直接等待放入
+            self.queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+        for handlers in self.targets.values():
+            for handler in handlers:
+                handler.close()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(item is _STOP for item in batch)
+            self._write([item for item in batch if item is not _STOP])
+            if stop:
+                return
+
+    def _write(self, batch: list) -> None:
+        if not batch:
+            return
+        per_handler: Dict[logging.Handler, List[logging.LogRecord]] = {}
+        for target, record in batch:
+            for handler in self.targets.get(target, ()):
+                per_handler.setdefault(handler, []).append(record)
+        for handler, records in per_handler.items():
+            try:
+                if isinstance(handler, BatchWriteMixin):
+                    handler.emit_batch(records)
+                else:
+                    for record in records:
+                        if record.levelno >= handler.level:
+                            handler.handle(record)
+            except Exception:
+                # 寫入失敗（如磁盤已滿）不能讓寫入線程退出
+                handler.handleError(records[-1])
+        self.stats.record_batch(len(batch))
@@ -1,16 +1,26 @@
 """
 日誌配置模塊
 """
+import atexit
 import logging
 import logging.handlers
+import queue
 import sys
 import os
+from contextvars import ContextVar, Token
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, Optional
 import json
 
 from app.core.config import settings
+from app.core.log_queue import (
+    BatchedRotatingFileHandler,
+    BatchedStreamHandler,
+    BatchingQueueListener,
+    BoundedQueueHandler,
+    LogQueueStats
+)
 
 
 class JSONFormatter(logging.Formatter):
@@ -43,6 +53,9 @@ class JSONFormatter(logging.Formatter):
         if hasattr(record, 'method'):
             log_entry['method'] = record.method
         
+        if hasattr(record, 'rollup'):
+            log_entry['rollup'] = record.rollup
+        
         # 如果有異常信息，添加異常詳情
         if record.exc_info:
             log_entry['exception'] = self.formatException(record.exc_info)
@@ -51,21 +64,22 @@ class JSONFormatter(logging.Formatter):
 
 
 def setup_logging():
-    """設置應用程式日誌"""
+    """設置應用程式日誌
+
+    各記錄器只掛一個 BoundedQueueHandler，記錄放入有界隊列後立即返回；
+    控制台和文件處理器由後台線程 log-writer 批量寫入。
+    重複調用時先停止上一次的寫入線程（寫完剩餘記錄）再重新配置。
+    """
+    global _log_listener
     
     # 創建日誌目錄
     log_dir = Path('logs')
     log_dir.mkdir(exist_ok=True)
     
-    # 獲取根記錄器
-    root_logger = logging.getLogger()
-    root_logger.setLevel(logging.INFO)
-    
-    # 清除現有處理器
-    root_logger.handlers.clear()
+    shutdown_logging()
     
     # 控制台處理器
-    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler = BatchedStreamHandler(sys.stdout)
     console_handler.setLevel(logging.INFO)
     
     if settings.debug:
@@ -78,10 +92,9 @@ def setup_logging():
         console_formatter = JSONFormatter()
     
     console_handler.setFormatter(console_formatter)
-    root_logger.addHandler(console_handler)
     
     # 文件處理器 - 一般日誌
-    file_handler = logging.handlers.RotatingFileHandler(
+    file_handler = BatchedRotatingFileHandler(
         log_dir / 'app.log',
         maxBytes=10 * 1024 * 1024,  # 10MB
         backupCount=5,
@@ -89,10 +102,9 @@ def setup_logging():
     )
     file_handler.setLevel(logging.INFO)
     file_handler.setFormatter(JSONFormatter())
-    root_logger.addHandler(file_handler)
     
     # 文件處理器 - 錯誤日誌
-    error_handler = logging.handlers.RotatingFileHandler(
+    error_handler = BatchedRotatingFileHandler(
         log_dir / 'error.log',
         maxBytes=10 * 1024 * 1024,  # 10MB
         backupCount=10,
@@ -100,11 +112,9 @@ def setup_logging():
     )
     error_handler.setLevel(logging.ERROR)
     error_handler.setFormatter(JSONFormatter())
-    root_logger.addHandler(error_handler)
     
     # 安全事件日誌
-    security_logger = logging.getLogger('security')
-    security_handler = logging.handlers.RotatingFileHandler(
+    security_handler = BatchedRotatingFileHandler(
         log_dir / 'security.log',
         maxBytes=10 * 1024 * 1024,  # 10MB
         backupCount=20,
@@ -112,12 +122,9 @@ def setup_logging():
     )
     security_handler.setLevel(logging.WARNING)
     security_handler.setFormatter(JSONFormatter())
-    security_logger.addHandler(security_handler)
-    security_logger.setLevel(logging.WARNING)
     
     # 訪問日誌
-    access_logger = logging.getLogger('access')
-    access_handler = logging.handlers.RotatingFileHandler(
+    access_handler = BatchedRotatingFileHandler(
         log_dir / 'access.log',
         maxBytes=50 * 1024 * 1024,  # 50MB
         backupCount=10,
@@ -125,9 +132,48 @@ def setup_logging():
     )
     access_handler.setLevel(logging.INFO)
     access_handler.setFormatter(JSONFormatter())
-    access_logger.addHandler(access_handler)
+    
+    # 各記錄器的記錄進入同一個有界隊列，由後台線程按目標分發
+    log_queue = queue.Queue(maxsize=settings.log_queue_size)
+    targets = {
+        'root': [console_handler, file_handler, error_handler],
+        'security': [security_handler],
+        'access': [access_handler],
+    }
+    
+    def queue_handler(target: str) -> BoundedQueueHandler:
+        handler = BoundedQueueHandler(
+            log_queue,
+            target,
+            log_queue_stats,
+            policy=settings.log_queue_policy,
+            block_timeout=settings.log_queue_block_timeout
+        )
+        # 在記錄日誌的線程中注入請求上下文（後台寫入線程讀不到請求的 contextvars）
+        handler.addFilter(LogContextFilter())
+        return handler
+    
+    # 獲取根記錄器
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.INFO)
+    root_logger.addHandler(queue_handler('root'))
+    
+    security_logger = logging.getLogger('security')
+    security_logger.addHandler(queue_handler('security'))
+    security_logger.setLevel(logging.WARNING)
+    
+    access_logger = logging.getLogger('access')
+    access_logger.addHandler(queue_handler('access'))
     access_logger.setLevel(logging.INFO)
     
+    _log_listener = BatchingQueueListener(
+        log_queue,
+        targets,
+        log_queue_stats,
+        batch_size=settings.log_batch_size
+    )
+    _log_listener.start()
+    
     # 設置第三方庫的日誌級別
     logging.getLogger('uvicorn').setLevel(logging.WARNING)
     logging.getLogger('fastapi').setLevel(logging.WARNING)
@@ -136,31 +182,109 @@ def setup_logging():
     logging.info("日誌系統初始化完成")
 
 
+def shutdown_logging():
+    """寫完隊列中的剩餘記錄，停止後台寫入線程並移除隊列處理器"""
+    global _log_listener
+    
+    for name in (None, 'security', 'access'):
+        logger = logging.getLogger(name)
+        for handler in list(logger.handlers):
+            if name is None or isinstance(handler, BoundedQueueHandler):
+                logger.removeHandler(handler)
+    
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
+
+
+def get_logging_stats() -> dict:
+    """日誌隊列狀態：隊列長度、丟棄數、批量寫入統計"""
+    return {
+        "running": _log_listener is not None and _log_listener.running,
+        "queue_size": _log_listener.queue.qsize() if _log_listener is not None else 0,
+        "capacity": settings.log_queue_size,
+        "policy": settings.log_queue_policy,
+        **log_queue_stats.snapshot(),
+    }
+
+
+# 日誌隊列統計與後台寫入線程
+log_queue_stats = LogQueueStats()
+_log_listener: Optional[BatchingQueueListener] = None
+atexit.register(shutdown_logging)
+
+
 def get_logger(name: str) -> logging.Logger:
     """獲取指定名稱的記錄器"""
     return logging.getLogger(name)
 
 
+# 請求級日誌上下文：每個請求綁定自己的字典，協程和線程池任務各自繼承所在請求的上下文
+_log_context: ContextVar[Optional[Dict[str, Any]]] = ContextVar("log_context", default=None)
+
+
+def bind_log_context(**fields) -> Token:
+    """為當前請求綁定新的日誌上下文（如 request_id、ip_address、endpoint、method）
+
+    返回的 token 交給 reset_log_context 恢復外層上下文。
+    """
+    return _log_context.set(dict(fields))
+
+
+def update_log_context(**fields) -> None:
+    """補充當前請求的日誌上下文（如認證後得到的 user_id）
+
+    直接修改請求綁定的字典，線程池中執行的依賴補充的字段，中間件和後續日誌也能看到。
+    不在請求上下文中時忽略。
+    """
+    context = _log_context.get()
+    if context is not None:
+        context.update(fields)
+
+
+def reset_log_context(token: Token) -> None:
+    """恢復綁定前的日誌上下文"""
+    _log_context.reset(token)
+
+
+def get_log_context() -> Dict[str, Any]:
+    """當前日誌上下文的副本"""
+    context = _log_context.get()
+    return dict(context) if context else {}
+
+
+class LogContextFilter(logging.Filter):
+    """把當前請求的日誌上下文寫入日誌記錄
+
+    掛在隊列處理器上，在記錄日誌的線程中執行；記錄中已有的同名字段（extra 傳入）優先。
+    """
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _log_context.get()
+        if context:
+            for key, value in context.items():
+                if key not in record.__dict__:
+                    setattr(record, key, value)
+        return True
+
+
 class LogContext:
-    """日誌上下文管理器"""
+    """日誌上下文管理器
+
+    在 with 塊內把額外字段合併到當前日誌上下文，退出時恢復；只影響當前協程或線程。
+    """
     
     def __init__(self, logger: logging.Logger, **context):
         self.logger = logger
         self.context = context
-        self.old_factory = logging.getLogRecordFactory()
+        self.token: Optional[Token] = None
     
     def __enter__(self):
-        def record_factory(*args, **kwargs):
-            record = self.old_factory(*args, **kwargs)
-            for key, value in self.context.items():
-                setattr(record, key, value)
-            return record
-        
-        logging.setLogRecordFactory(record_factory)
+        self.token = bind_log_context(**{**get_log_context(), **self.context})
         return self.logger
     
     def __exit__(self, exc_type, exc_val, exc_tb):
-        logging.setLogRecordFactory(self.old_factory)
+        reset_log_context(self.token)
 
 
 def log_with_context(logger: logging.Logger, **context):
@@ -0,0 +1,406 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 請求延遲分桶（秒），與 Prometheus 客戶端的默認分桶一致
+LATENCY_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+# 單條 SQL 耗時分桶（秒）
+QUERY_BUCKETS: Tuple[float, ...] = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+# 未匹配任何路由的請求統一歸入此標籤，避免任意路徑撐大指標基數
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class Histogram:
+    """固定分桶直方圖
+
+    只保存各分桶計數、總和與總數，多個進程的直方圖可直接按桶相加；
+    分位數按 Prometheus histogram_quantile 的方式在桶內線性插值估算。
+    """
+
+    def __init__(self, buckets: Sequence[float], counts: Optional[List[int]] = None,
+                 total: float = 0.0, count: int = 0):
+        self.buckets = tuple(buckets)
+        # 最後一個計數對應 +Inf 桶
+        self.counts = list(counts) if counts is not None else [0] * (len(self.buckets) + 1)
+        self.sum = total
+        self.count = count
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other: "Histogram") -> None:
+        for index, value in enumerate(other.counts):
+            self.counts[index] += value
+        self.sum += other.sum
+        self.count += other.count
+
+    def quantile(self, q: float) -> float:
+        """估算分位數；落在 +Inf 桶時返回最大的有限邊界"""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.buckets[-1]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"counts": list(self.counts), "sum": self.sum, "count": self.count}
+
+    @classmethod
+    def from_dict(cls, buckets: Sequence[float], data: Dict[str, Any]) -> "Histogram":
+        return cls(buckets, data["counts"], data["sum"], data["count"])
+
+
+@dataclass
+class RequestQueryStats:
+    """單個請求內執行的 SQL 數量與總耗時"""
+    count: int = 0
+    seconds: float = 0.0
+
+
+class RouteMetrics:
+    """單個路由（方法 + 路由模板）的指標"""
+
+    def __init__(self):
+        self.statuses: Dict[str, int] = {}
+        self.errors = 0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.db_queries = 0
+        self.db_seconds = 0.0
+
+    def merge(self, other: "RouteMetrics") -> None:
+        for status, count in other.statuses.items():
+            self.statuses[status] = self.statuses.get(status, 0) + count
+        self.errors += other.errors
+        self.latency.merge(other.latency)
+        self.db_queries += other.db_queries
+        self.db_seconds += other.db_seconds
+
+    @property
+    def requests(self) -> int:
+        return sum(self.statuses.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "statuses": dict(self.statuses),
+            "errors": self.errors,
+            "latency": self.latency.to_dict(),
+            "db_queries": self.db_queries,
+            "db_seconds": self.db_seconds,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RouteMetrics":
+        metrics = cls()
+        metrics.statuses = dict(data["statuses"])
+        metrics.errors = data["errors"]
+        metrics.latency = Histogram.from_dict(LATENCY_BUCKETS, data["latency"])
+        metrics.db_queries = data["db_queries"]
+        metrics.db_seconds = data["db_seconds"]
+        return metrics
+
+
+RouteKey = Tuple[str, str]
+
+
+class MetricsSnapshot:
+    """某一時刻的全部指標，可序列化並與其他進程的快照合併"""
+
+    def __init__(self, routes: Optional[Dict[RouteKey, RouteMetrics]] = None,
+                 db_query_latency: Optional[Histogram] = None):
+        self.routes = routes if routes is not None else {}
+        self.db_query_latency = db_query_latency or Histogram(QUERY_BUCKETS)
+
+    def merge(self, other: "MetricsSnapshot") -> None:
+        for key, metrics in other.routes.items():
+            self.routes.setdefault(key, RouteMetrics()).merge(metrics)
+        self.db_query_latency.merge(other.db_query_latency)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "routes": [
+                {"method": method, "route": route, **metrics.to_dict()}
+                for (method, route), metrics in self.routes.items()
+            ],
+            "db_query_latency": self.db_query_latency.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MetricsSnapshot":
+        return cls(
+            routes={(item["method"], item["route"]): RouteMetrics.from_dict(item) for item in data["routes"]},
+            db_query_latency=Histogram.from_dict(QUERY_BUCKETS, data["db_query_latency"])
+        )
+
+
+class MultiProcessCollector:
+    """多進程指標收集器
+
+    每個 worker 定期把自己的快照原子寫入共享目錄下的 <worker_id>.json，
+    任一 worker 響應 /metrics 時讀取目錄下所有快照並合併。
+    已退出 worker 的計數保留，合併後的計數器不會因 worker 重啟而回退；
+    默認的 worker_id 由 pid 和啟動時間組成，pid 被重用時也不會覆蓋舊 worker 的快照。
+    目錄在服務啟動前應由主進程清空（見 clear_multiprocess_dir），否則上次運行的計數會被一併合併。
+    """
+
+    def __init__(self, directory: str, worker_id: Optional[str] = None):
+        self.directory = Path(directory)
+        self.worker_id = worker_id or f"{os.getpid()}-{time.time_ns()}"
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def path(self) -> Path:
+        return self.directory / f"{self.worker_id}.json"
+
+    def write(self, snapshot: MetricsSnapshot) -> None:
+        """寫入本 worker 的快照（先寫臨時文件再替換，讀取方不會讀到半個文件）"""
+        temp_path = self.path.with_suffix(".tmp")
+        temp_path.write_text(json.dumps(snapshot.to_dict()))
+        os.replace(temp_path, self.path)
+
+    def collect(self, own: MetricsSnapshot) -> MetricsSnapshot:
+        """合併本 worker 的實時快照與其他 worker 最近寫入的快照"""
+        merged = MetricsSnapshot()
+        merged.merge(own)
+        for path in sorted(self.directory.glob("*.json")):
+            if path == self.path:
+                continue
+            try:
+                merged.merge(MetricsSnapshot.from_dict(json.loads(path.read_text())))
+            except (OSError, ValueError, KeyError):
+                # 其他 worker 正在替換文件或文件已損壞時跳過，下次抓取再合併
+                continue
+        return merged
+
+
+class MetricsRegistry:
+    """應用指標註冊表
+
+    按路由模板（而非實際路徑）記錄請求數（按狀態碼）、錯誤數、延遲直方圖，
+    以及每個請求內的 SQL 數量和耗時；render() 輸出 Prometheus 文本格式。
+    """
+
+    def __init__(self, multiprocess_dir: Optional[str] = None, flush_interval: float = 5.0,
+                 worker_id: Optional[str] = None):
+        self._lock = threading.Lock()
+        self._snapshot = MetricsSnapshot()
+        self._flush_interval = flush_interval
+        self._flush_task: Optional[asyncio.Task] = None
+        self.collector = MultiProcessCollector(multiprocess_dir, worker_id) if multiprocess_dir else None
+
+    def observe_request(
+        self,
+        method: str,
+        route: str,
+        status_code: int,
+        duration: float,
+        queries: Optional[RequestQueryStats] = None
+    ) -> None:
+        """記錄一個已完成的請求"""
+        with self._lock:
+            metrics = self._snapshot.routes.get((method, route))
+            if metrics is None:
+                metrics = self._snapshot.routes[(method, route)] = RouteMetrics()
+            status = str(status_code)
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+            if status_code >= 400:
+                metrics.errors += 1
+            metrics.latency.observe(duration)
+            if queries is not None:
+                metrics.db_queries += queries.count
+                metrics.db_seconds += queries.seconds
+
+    def observe_query(self, duration: float) -> None:
+        """記錄一條 SQL 的執行耗時"""
+        with self._lock:
+            self._snapshot.db_query_latency.observe(duration)
+
+    def snapshot(self) -> MetricsSnapshot:
+        """本進程指標的副本"""
+        with self._lock:
+            return MetricsSnapshot.from_dict(self._snapshot.to_dict())
+
+    def collect(self) -> MetricsSnapshot:
+        """全部 worker 的合併指標（未啟用多進程時即本進程指標）"""
+        own = self.snapshot()
+        if self.collector is None:
+            return own
+        return self.collector.collect(own)
+
+    def flush(self) -> None:
+        """把本進程快照寫入多進程目錄"""
+        if self.collector is not None:
+            self.collector.write(self.snapshot())
+
+    def start_flusher(self) -> None:
+        """在當前事件循環中啟動定期寫入快照的任務（未啟用多進程時不啟動）
+
+        序列化和文件寫入在線程池中執行，不佔用請求路徑和事件循環。
+        """
+        if self.collector is not None and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_periodically())
+
+    async def stop_flusher(self) -> None:
+        """停止定期寫入任務"""
+        if self._flush_task is None:
+            return
+        self._flush_task.cancel()
+        try:
+            await self._flush_task
+        except asyncio.CancelledError:
+            pass
+        self._flush_task = None
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except OSError as e:
+                logger.warning(f"指標快照寫入失敗: {e}")
+
+    def reset(self) -> None:
+        with self._lock:
+            self._snapshot = MetricsSnapshot()
+
+    def render(self) -> str:
+        """以 Prometheus 文本格式輸出全部指標"""
+        return render_prometheus(self.collect())
+
+
+def clear_multiprocess_dir(directory: Optional[str]) -> None:
+    """清空多進程指標目錄；由主進程在啟動 worker 之前調用"""
+    if directory and os.path.isdir(directory):
+        shutil.rmtree(directory)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: Any) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _histogram_lines(name: str, histogram: Histogram, **labels: str) -> Iterable[str]:
+    cumulative = 0
+    for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+        cumulative += count
+        yield f"{name}_bucket{_labels(**labels, le=bound)} {cumulative}"
+    yield f"{name}_sum{_labels(**labels) if labels else ''} {histogram.sum}"
+    yield f"{name}_count{_labels(**labels) if labels else ''} {histogram.count}"
+
+
+def render_prometheus(snapshot: MetricsSnapshot) -> str:
+    """把指標快照轉為 Prometheus 文本格式"""
+    routes = sorted(snapshot.routes.items())
+    lines: List[str] = []
+
+    lines += ["# HELP http_requests_total 按路由模板和狀態碼統計的請求數",
+              "# TYPE http_requests_total counter"]
+    for (method, route), metrics in routes:
+        for status, count in sorted(metrics.statuses.items()):
+            lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+
+    lines += ["# HELP http_request_errors_total 狀態碼 >= 400 的請求數",
+              "# TYPE http_request_errors_total counter"]
+    for (method, route), metrics in routes:
+        lines.append(f"http_request_errors_total{_labels(method=method, route=route)} {metrics.errors}")
+
+    lines += ["# HELP http_request_duration_seconds 請求處理耗時",
+              "# TYPE http_request_duration_seconds histogram"]
+    for (method, route), metrics in routes:
+        lines += _histogram_lines("http_request_duration_seconds", metrics.latency, method=method, route=route)
+
+    lines += ["# HELP http_request_duration_quantile_seconds 由直方圖估算的請求耗時分位數",
+              "# TYPE http_request_duration_quantile_seconds gauge"]
+    for (method, route), metrics in routes:
+        for q in QUANTILES:
+            value = metrics.latency.quantile(q)
+            lines.append(
+                f"http_request_duration_quantile_seconds{_labels(method=method, route=route, quantile=q)} {value:.6f}"
+            )
+
+    lines += ["# HELP http_request_db_queries_total 請求內執行的 SQL 數",
+              "# TYPE http_request_db_queries_total counter"]
+    for (method, route), metrics in routes:
+        lines.append(f"http_request_db_queries_total{_labels(method=method, route=route)} {metrics.db_queries}")
+
+    lines += ["# HELP http_request_db_seconds_total 請求內執行 SQL 的總耗時",
+              "# TYPE http_request_db_seconds_total counter"]
+    for (method, route), metrics in routes:
+        lines.append(f"http_request_db_seconds_total{_labels(method=method, route=route)} {metrics.db_seconds}")
+
+    lines += ["# HELP db_query_duration_seconds 單條 SQL 執行耗時",
+              "# TYPE db_query_duration_seconds histogram"]
+    lines += _histogram_lines("db_query_duration_seconds", snapshot.db_query_latency)
+    return "\n".join(lines) + "\n"
+
+
+# 當前請求的 SQL 統計；由請求管道中間件在請求開始時設置
+_request_queries: ContextVar[Optional[RequestQueryStats]] = ContextVar("request_queries", default=None)
+
+
+def start_request_queries() -> Tuple[RequestQueryStats, Any]:
+    """開始統計當前請求的 SQL，返回統計對象和用於還原的令牌"""
+    stats = RequestQueryStats()
+    return stats, _request_queries.set(stats)
+
+
+def end_request_queries(token: Any) -> None:
+    _request_queries.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    context._metrics_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    start_time = getattr(context, "_metrics_start_time", None)
+    if start_time is None:
+        return
+    elapsed = time.perf_counter() - start_time
+    metrics_registry.observe_query(elapsed)
+    stats = _request_queries.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+
+
+def instrument_engine(engine) -> None:
+    """為同步引擎（異步引擎傳入 sync_engine）註冊 SQL 計時事件"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# 全局實例
+metrics_registry = MetricsRegistry(
+    multiprocess_dir=settings.metrics_multiproc_dir,
+    flush_interval=settings.metrics_flush_interval
+)
@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+from app.models.user import pwd_context
+
+
+class PasswordHasher:
+    """在專用的有界線程池中執行 bcrypt 哈希與驗證
+
+    bcrypt 每次調用耗時約 100–300ms，直接在 async 處理器中調用會阻塞事件循環。
+    線程池大小限制同時佔用的 CPU；排隊任務超過 max_queue 時直接返回 503，
+    登錄風暴不會無限堆積請求，也不會拖慢其他端點。
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 64):
+        self._max_workers = max_workers
+        self._max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self.peak_queue_depth = 0
+        self.completed = 0
+        self.rejected = 0
+        self._wait_seconds = 0.0
+        self._run_seconds = 0.0
+
+    async def hash(self, password: str) -> str:
+        """計算密碼哈希"""
+        return await self._run(pwd_context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """驗證密碼是否與哈希匹配"""
+        return await self._run(pwd_context.verify, password, hashed_password)
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            if self._pending - self._running >= self._max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="服務繁忙，請稍後重試",
+                    headers={"Retry-After": "1"}
+                )
+            self._pending += 1
+            self.peak_queue_depth = max(self.peak_queue_depth, self._pending - self._running)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._max_workers,
+                    thread_name_prefix="password-hasher"
+                )
+            executor = self._executor
+        submitted_at = time.perf_counter()
+
+        def task() -> Any:
+            started_at = time.perf_counter()
+            with self._lock:
+                self._running += 1
+                self._wait_seconds += started_at - submitted_at
+            try:
+                return func(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._pending -= 1
+                    self.completed += 1
+                    self._run_seconds += time.perf_counter() - started_at
+
+        future = executor.submit(task)
+        # 排隊中被取消（請求斷開或線程池關閉）的任務不會執行，需在此移出計數
+        future.add_done_callback(self._forget_if_cancelled)
+        return await asyncio.wrap_future(future)
+
+    def _forget_if_cancelled(self, future) -> None:
+        if future.cancelled():
+            with self._lock:
+                self._pending -= 1
+
+    @property
+    def queue_depth(self) -> int:
+        """已提交但尚未開始執行的任務數"""
+        with self._lock:
+            return self._pending - self._running
+
+    def shutdown(self) -> None:
+        """關閉線程池；之後的調用會重新創建"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """線程池與隊列統計"""
+        with self._lock:
+            completed = self.completed
+            return {
+                "workers": self._max_workers,
+                "max_queue": self._max_queue,
+                "in_flight": self._running,
+                "queue_depth": self._pending - self._running,
+                "peak_queue_depth": self.peak_queue_depth,
+                "completed": completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self._wait_seconds / completed * 1000, 2) if completed else 0.0,
+                "avg_run_ms": round(self._run_seconds / completed * 1000, 2) if completed else 0.0,
+            }
+
+
+# 全局實例
+password_hasher = PasswordHasher(
+    max_workers=settings.password_hash_workers,
+    max_queue=settings.password_hash_max_queue
+)
@@ -0,0 +1,129 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+Claims = Dict[str, Any]
+RevocationHook = Callable[[Claims], bool]
+
+
+class VerifiedTokenCache:
+    """已驗證 JWT 的進程內緩存
+
+    以令牌的 SHA-256 摘要為鍵（不保存令牌原文），值為解碼後的聲明和過期時間。
+    命中時省去 base64 解析和 HMAC 驗證，只剩一次哈希查找；
+    到達 exp 的條目視為未命中並刪除。撤銷的令牌在其 exp 之前一律視為無效，
+    另可註冊撤銷鉤子，按聲明判斷令牌是否已被撤銷。
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self._max_size = max_size
+        self._entries: "OrderedDict[bytes, Tuple[Claims, float]]" = OrderedDict()
+        self._revoked: Dict[bytes, float] = {}
+        self._hooks: List[RevocationHook] = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[Claims]:
+        """獲取未過期、未撤銷的令牌聲明，並記錄命中 / 未命中"""
+        key = self.digest(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() < entry[1]:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                claims = entry[0]
+            else:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+        if self._revoked_by_hook(claims):
+            self.invalidate(token)
+            return None
+        return claims
+
+    def set(self, token: str, claims: Claims) -> None:
+        """寫入已驗證的令牌聲明；沒有 exp 的令牌不緩存"""
+        exp = claims.get("exp")
+        if exp is None:
+            return
+        key = self.digest(token)
+        with self._lock:
+            self._entries[key] = (claims, float(exp))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, token: str) -> None:
+        """刪除指定令牌的緩存條目"""
+        with self._lock:
+            self._entries.pop(self.digest(token), None)
+
+    def revoke(self, token: str, expires_at: Optional[float] = None) -> None:
+        """撤銷令牌；撤銷記錄保留到令牌過期（默認取緩存中的 exp，沒有則保留一個令牌有效期）"""
+        key = self.digest(token)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if expires_at is None:
+                expires_at = entry[1] if entry is not None else (
+                    time.time() + settings.access_token_expire_minutes * 60
+                )
+            self._revoked[key] = expires_at
+            self._prune_revoked()
+
+    def is_revoked(self, token: str, claims: Claims) -> bool:
+        """令牌是否已被撤銷（顯式撤銷或撤銷鉤子返回 True）"""
+        key = self.digest(token)
+        with self._lock:
+            expires_at = self._revoked.get(key)
+            if expires_at is not None and time.time() < expires_at:
+                return True
+        return self._revoked_by_hook(claims)
+
+    def add_revocation_hook(self, hook: RevocationHook) -> None:
+        """註冊撤銷鉤子：接收令牌聲明，返回 True 表示令牌已被撤銷"""
+        self._hooks.append(hook)
+
+    def remove_revocation_hook(self, hook: RevocationHook) -> None:
+        self._hooks.remove(hook)
+
+    def clear(self) -> None:
+        """清空緩存、撤銷記錄和統計（不影響已註冊的鉤子）"""
+        with self._lock:
+            self._entries.clear()
+            self._revoked.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """緩存統計"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "revoked": len(self._revoked),
+            }
+
+    def _revoked_by_hook(self, claims: Claims) -> bool:
+        return any(hook(claims) for hook in self._hooks)
+
+    def _prune_revoked(self) -> None:
+        now = time.time()
+        for key in [key for key, expires_at in self._revoked.items() if expires_at <= now]:
+            del self._revoked[key]
+
+
+# 全局實例
+verified_token_cache = VerifiedTokenCache(max_size=settings.jwt_cache_max_size)
@@ -0,0 +1,182 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from app.core.config import settings
+from app.models import User
+
+
+@dataclass(frozen=True)
+class AuthenticatedUser:
+    """已認證用戶的投影，只包含鑑權所需的字段"""
+    id: int
+    username: str
+    is_active: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "AuthenticatedUser":
+        return cls(id=user.id, username=user.username, is_active=bool(user.is_active))
+
+
+class AuthenticatedUserCache:
+    """已認證用戶的進程內緩存
+
+    以令牌主體（用戶名）為鍵，命中時 get_current_user 不再查詢數據庫。
+    條目在 ttl 秒後過期；用戶停用、修改密碼或被刪除時，在該事務提交後失效（見下方 ORM 事件）。
+    ORM 事件只在本進程觸發，其他 worker 的修改要靠重新核對：條目核對後超過
+    revalidate_after 秒，get_current_user 按主鍵重新讀取 is_active 和用戶名，
+    因此多 worker 部署中停用或刪除最多延遲 revalidate_after 秒生效。
+    """
+
+    def __init__(self, ttl: float = 60.0, max_size: int = 10000, revalidate_after: Optional[float] = None):
+        self._ttl = ttl
+        self._max_size = max_size
+        self._revalidate_after = revalidate_after
+        # 用戶名 -> (用戶投影, 過期時間, 最近核對時間)
+        self._entries: "OrderedDict[str, Tuple[AuthenticatedUser, float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # 每次失效加一；查詢用戶期間發生過失效時，查詢結果可能已過時，不寫入緩存
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.revalidations = 0
+
+    def get(self, username: str) -> Optional[AuthenticatedUser]:
+        """獲取未過期的用戶投影，並記錄命中 / 未命中"""
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is not None and time.monotonic() < entry[1]:
+                self._entries.move_to_end(username)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[username]
+            self.misses += 1
+            return None
+
+    def generation(self) -> int:
+        """當前的失效代數，在查詢用戶之前讀取，寫入時傳給 set"""
+        with self._lock:
+            return self._generation
+
+    def set(self, user: AuthenticatedUser, generation: Optional[int] = None) -> None:
+        """寫入用戶投影（視為剛核對過），超出容量時淘汰最久未使用的條目
+
+        generation 與當前代數不同（查詢期間有失效）時放棄寫入。
+        """
+        now = time.monotonic()
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[user.username] = (user, now + self._ttl, now)
+            self._entries.move_to_end(user.username)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def needs_revalidation(self, username: str) -> bool:
+        """條目最近一次核對是否已超過 revalidate_after 秒"""
+        if self._revalidate_after is None:
+            return False
+        with self._lock:
+            entry = self._entries.get(username)
+            return entry is not None and time.monotonic() - entry[2] >= self._revalidate_after
+
+    def revalidated(self, user: AuthenticatedUser, generation: Optional[int] = None) -> None:
+        """記錄一次重新核對，並以核對結果刷新條目"""
+        with self._lock:
+            self.revalidations += 1
+        self.set(user, generation)
+
+    def invalidate(self, username: str) -> None:
+        """使指定用戶的緩存失效"""
+        with self._lock:
+            self._generation += 1
+            if self._entries.pop(username, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        """清空緩存和統計"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.invalidations = 0
+            self.revalidations = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """緩存統計；除需要重新核對的命中外，每次命中即省去一次用戶查詢"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "db_queries_saved": self.hits - self.revalidations,
+                "invalidations": self.invalidations,
+                "revalidations": self.revalidations,
+            }
+
+
+# 全局實例
+authenticated_user_cache = AuthenticatedUserCache(
+    ttl=settings.auth_user_cache_ttl,
+    max_size=settings.auth_user_cache_max_size,
+    revalidate_after=settings.auth_user_cache_revalidate_after
+)
+
+
+# 鑑權相關字段變化時使緩存失效；任何經由 ORM 的修改（停用、改密碼、改名）都會觸發
+INVALIDATING_ATTRIBUTES = ("is_active", "hashed_password", "username")
+
+# Session.info 中記錄待失效用戶名的鍵
+PENDING_KEY = "authenticated_user_pending_usernames"
+
+
+def invalidate_after_commit(session, usernames: Iterable[str]) -> None:
+    """記錄這些用戶在 session 的事務提交後失效（同時支持 AsyncSession）
+
+    在 flush 時就失效的話，並發請求仍會讀到提交前的行並重新緩存，事務回滾時又白白失效。
+    """
+    session = getattr(session, "sync_session", session)
+    session.info.setdefault(PENDING_KEY, set()).update(name for name in usernames if name)
+
+
+def _record_change(target: User, usernames: Iterable[str]) -> None:
+    session = object_session(target)
+    if session is not None:
+        invalidate_after_commit(session, usernames)
+    else:
+        for username in usernames:
+            if username:
+                authenticated_user_cache.invalidate(username)
+
+
+@event.listens_for(User, "after_update")
+def _invalidate_on_update(mapper, connection, target: User) -> None:
+    state = inspect(target)
+    if not any(state.attrs[name].history.has_changes() for name in INVALIDATING_ATTRIBUTES):
+        return
+    _record_change(target, {target.username, *state.attrs.username.history.deleted})
+
+
+@event.listens_for(User, "after_delete")
+def _invalidate_on_delete(mapper, connection, target: User) -> None:
+    _record_change(target, [target.username])
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session: Session) -> None:
+    for username in session.info.pop(PENDING_KEY, ()):
+        authenticated_user_cache.invalidate(username)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session: Session) -> None:
+    session.info.pop(PENDING_KEY, None)
@@ -1,20 +1,213 @@
-from sqlalchemy import create_engine
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncGenerator, Dict, Optional
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from app.core.config import settings
+from app.core.metrics import instrument_engine
 from app.models import Base
-import os
 
 # 數據庫配置
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./subscription_db.sqlite")
+DATABASE_URL = settings.database_url
+
+# 同步驅動到異步驅動的對應
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+class PoolMetrics:
+    """連接池指標 - 記錄連接獲取的等待時間與超時次數"""
+    
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._recent_waits = deque(maxlen=window)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+    
+    def record_checkout(self, wait: float):
+        """記錄一次成功獲取連接"""
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self._recent_waits.append(wait)
+    
+    def record_timeout(self):
+        """記錄一次獲取連接超時"""
+        with self._lock:
+            self.timeouts += 1
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """獲取指標快照（時間單位為毫秒）"""
+        with self._lock:
+            recent = sorted(self._recent_waits)
+            checkouts = self.checkouts
+            total_wait = self.total_wait
+            max_wait = self.max_wait
+            timeouts = self.timeouts
+        
+        p95 = recent[int(len(recent) * 0.95) - 1] if recent else 0.0
+        return {
+            "checkouts": checkouts,
+            "timeouts": timeouts,
+            "avg_wait_ms": round(total_wait / checkouts * 1000, 3) if checkouts else 0.0,
+            "p95_wait_ms": round(p95 * 1000, 3),
+            "max_wait_ms": round(max_wait * 1000, 3),
+        }
+
+class _TimedCheckoutMixin:
+    """記錄 connect() 耗時的連接池混入類"""
+    
+    metrics: PoolMetrics
+    
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.record_timeout()
+            raise
+        self.metrics.record_checkout(time.perf_counter() - start)
+        return connection
+
+sync_pool_metrics = PoolMetrics()
+async_pool_metrics = PoolMetrics()
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    """帶等待時間統計的 QueuePool"""
+    metrics = sync_pool_metrics
+
+class InstrumentedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    """帶等待時間統計的 AsyncAdaptedQueuePool"""
+    metrics = async_pool_metrics
+
+# SQLAlchemy 以類所在模塊命名連接池日誌記錄器，這裡與 sqlalchemy 日誌級別保持一致
+for _pool_class in (InstrumentedQueuePool, InstrumentedAsyncQueuePool):
+    logging.getLogger(f"{__name__}.{_pool_class.__name__}").setLevel(logging.WARNING)
+
+def is_sqlite_memory(url: str) -> bool:
+    """是否為 SQLite 內存數據庫（只能使用單連接池）"""
+    database = make_url(url).database
+    return not database or database == ":memory:" or "mode=memory" in url
+
+def build_engine_options(url: str, pool_class: type) -> Dict[str, Any]:
+    """根據配置構建引擎參數"""
+    if url.startswith("sqlite"):
+        options: Dict[str, Any] = {"connect_args": {"check_same_thread": False}}
+        if is_sqlite_memory(url):
+            # 內存數據庫使用 SQLAlchemy 默認的單連接池
+            return options
+    else:
+        options = {}
+    
+    options.update(
+        poolclass=pool_class,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+    )
+    return options
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """在每個新連接上應用 SQLite 性能設定"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout = {int(settings.sqlite_busy_timeout)}")
+        cursor.execute(f"PRAGMA journal_mode = {settings.sqlite_journal_mode}")
+        cursor.execute(f"PRAGMA synchronous = {settings.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA mmap_size = {int(settings.sqlite_mmap_size)}")
+        cursor.execute(f"PRAGMA cache_size = {int(settings.sqlite_cache_size)}")
+    finally:
+        cursor.close()
+
+def create_database_engine(url: str) -> Engine:
+    """創建同步數據庫引擎"""
+    database_engine = create_engine(url, **build_engine_options(url, InstrumentedQueuePool))
+    if url.startswith("sqlite"):
+        event.listen(database_engine, "connect", apply_sqlite_pragmas)
+    instrument_engine(database_engine)
+    return database_engine
+
+def create_async_database_engine(url: str) -> AsyncEngine:
+    """創建異步數據庫引擎"""
+    database_engine = create_async_engine(url, **build_engine_options(url, InstrumentedAsyncQueuePool))
+    if url.startswith("sqlite"):
+        event.listen(database_engine.sync_engine, "connect", apply_sqlite_pragmas)
+    instrument_engine(database_engine.sync_engine)
+    return database_engine
 
 # 創建數據庫引擎
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-else:
-    engine = create_engine(DATABASE_URL)
+engine = create_database_engine(DATABASE_URL)
 
 # 創建會話工廠
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 異步引擎延遲創建，未啟用時不需要安裝異步驅動
+_async_engine: Optional[AsyncEngine] = None
+_AsyncSessionLocal: Optional[sessionmaker] = None
+
+def to_async_database_url(url: str) -> str:
+    """將同步連接字串轉換為對應的異步驅動連接字串"""
+    scheme, separator, rest = url.partition("://")
+    if "+" in scheme or not separator:
+        return url
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}://{rest}"
+
+def get_async_engine() -> AsyncEngine:
+    """獲取異步數據庫引擎"""
+    global _async_engine
+    if _async_engine is None:
+        async_url = settings.async_database_url or to_async_database_url(DATABASE_URL)
+        _async_engine = create_async_database_engine(async_url)
+    return _async_engine
+
+def get_async_session_factory() -> sessionmaker:
+    """獲取異步會話工廠"""
+    global _AsyncSessionLocal
+    if _AsyncSessionLocal is None:
+        _AsyncSessionLocal = sessionmaker(
+            bind=get_async_engine(),
+            class_=AsyncSession,
+            autoflush=False,
+            expire_on_commit=False  # 提交後仍可讀取屬性，避免在事件循環外觸發延遲加載
+        )
+    return _AsyncSessionLocal
+
+def describe_pool(pool, metrics: PoolMetrics) -> Dict[str, Any]:
+    """描述連接池狀態與利用率"""
+    status: Dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        checked_out = pool.checkedout()
+        status.update(
+            size=pool.size(),
+            max_overflow=pool._max_overflow,
+            checked_out=checked_out,
+            checked_in=pool.checkedin(),
+            overflow=pool.overflow(),
+            utilisation=round(checked_out / capacity, 3) if capacity else 0.0,
+            checkout=metrics.snapshot(),
+        )
+    return status
+
+def get_pool_status() -> Dict[str, Any]:
+    """獲取同步與異步連接池的狀態"""
+    status = {"sync": describe_pool(engine.pool, sync_pool_metrics)}
+    if _async_engine is not None:
+        status["async"] = describe_pool(_async_engine.sync_engine.pool, async_pool_metrics)
+    return status
+
 # 創建表
 def create_tables():
     Base.metadata.create_all(bind=engine)
@@ -25,4 +218,17 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# 異步數據庫依賴
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with get_async_session_factory()() as db:
+        yield db
+
+async def dispose_async_engine():
+    """關閉異步引擎的連接池"""
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _AsyncSessionLocal = None
@@ -1,8 +1,11 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional, Generic, TypeVar
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Generic, Sequence, Tuple, TypeVar
 from sqlalchemy.orm import Session
 
 from app.models import User, Subscription, Budget
+from app.domain.interfaces.subscription_spec import SubscriptionSpec
+from app.models.subscription import SubscriptionCategory, SubscriptionCycle
 
 T = TypeVar('T')
 
@@ -51,9 +54,60 @@ class ISubscriptionRepository(BaseRepository[Subscription]):
     def get_active_by_user_id(self, user_id: int) -> List[Subscription]:
         pass
     
+    @abstractmethod
+    def find(self, spec: SubscriptionSpec) -> List[Subscription]:
+        pass
+    
     @abstractmethod
     def get_by_user_and_id(self, user_id: int, subscription_id: int) -> Optional[Subscription]:
         pass
+    
+    @abstractmethod
+    def count_by_user_id(self, user_id: int) -> int:
+        pass
+    
+    @abstractmethod
+    def get_page(
+        self,
+        user_id: int,
+        limit: int,
+        after: Optional[Tuple[datetime, int]] = None,
+        include_inactive: bool = False,
+        category: Optional[SubscriptionCategory] = None
+    ) -> List[Subscription]:
+        pass
+    
+    @abstractmethod
+    def count_listed(
+        self, user_id: int, include_inactive: bool = False, category: Optional[SubscriptionCategory] = None
+    ) -> int:
+        pass
+    
+    @abstractmethod
+    def get_category_cost_totals(self, user_id: int) -> Dict[str, Dict[str, float]]:
+        pass
+    
+    @abstractmethod
+    def get_active_started_before(
+        self, user_id: int, cutoffs: Dict[SubscriptionCycle, datetime]
+    ) -> List[Subscription]:
+        pass
+    
+    @abstractmethod
+    def bulk_set_active(self, user_id: int, subscription_ids: Iterable[int], is_active: bool) -> List[int]:
+        pass
+    
+    @abstractmethod
+    def bulk_delete(self, user_id: int, subscription_ids: Iterable[int]) -> List[int]:
+        pass
+    
+    @abstractmethod
+    def bulk_insert(self, rows: Sequence[Mapping]) -> int:
+        pass
+    
+    @abstractmethod
+    def iter_export_rows(self, user_id: Optional[int], batch_size: int = 1000) -> Iterator:
+        pass
 
 class IBudgetRepository(BaseRepository[Budget]):
     """預算 Repository 接口"""
@@ -62,6 +116,19 @@ class IBudgetRepository(BaseRepository[Budget]):
     def get_by_user_id(self, user_id: int) -> Optional[Budget]:
         pass
 
+class IExchangeRateRepository(ABC):
+    """匯率歷史 Repository 接口"""
+    
+    @abstractmethod
+    def add_snapshot(self, base: str, quotes: Mapping[str, float], as_of: datetime) -> int:
+        pass
+    
+    @abstractmethod
+    def get_snapshot(
+        self, base: Optional[str] = None, on: Optional[datetime] = None
+    ) -> Optional[Tuple[str, datetime, Dict[str, float]]]:
+        pass
+
 class IUnitOfWork(ABC):
     """工作單元接口"""
     
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from datetime import date, datetime
+from typing import Dict, Any, Optional, Union
 from decimal import Decimal
 
 class IExchangeRateService(ABC):
@@ -11,8 +12,17 @@ class IExchangeRateService(ABC):
         pass
     
     @abstractmethod
-    async def convert_currency(self, amount: float, from_currency: str, to_currency: str) -> float:
-        """貨幣轉換"""
+    async def get_exchange_rate_on(
+        self, from_currency: str, to_currency: str, on: Union[date, datetime]
+    ) -> Decimal:
+        """獲取指定日期生效的匯率"""
+        pass
+    
+    @abstractmethod
+    async def convert_currency(
+        self, amount: float, from_currency: str, to_currency: str, on: Optional[Union[date, datetime]] = None
+    ) -> float:
+        """貨幣轉換；指定 on 時使用該日期生效的匯率"""
         pass
     
     @abstractmethod
@@ -0,0 +1,65 @@
+"""
+訂閱查詢規格
+
+描述「要哪些訂閱」的不可變值對象，由 ISubscriptionRepository.find 編譯為單條 SQL 語句，
+只有符合條件的行才會離開數據庫。每個方法返回新的規格，可以鏈式組合：
+
+    SubscriptionSpec.for_user(user_id).active().in_categories(category).order_by("price").take(20)
+"""
+from dataclasses import dataclass, replace
+from typing import Optional, Tuple
+
+from app.models.subscription import Currency, SubscriptionCategory, SubscriptionCycle
+
+# 可排序的欄位；同值時總是再按 id 排序，結果順序穩定
+SORT_FIELDS = ("created_at", "start_date", "price", "name")
+
+
+@dataclass(frozen=True)
+class SubscriptionSpec:
+    """訂閱查詢規格；空的元組 / None 表示不按該條件篩選"""
+
+    user_id: int
+    is_active: Optional[bool] = None
+    categories: Tuple[SubscriptionCategory, ...] = ()
+    currencies: Tuple[Currency, ...] = ()
+    cycles: Tuple[SubscriptionCycle, ...] = ()
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    sort: str = "created_at"
+    descending: bool = True
+    limit: Optional[int] = None
+
+    def __post_init__(self):
+        if self.sort not in SORT_FIELDS:
+            raise ValueError(f"不支持的排序欄位: {self.sort}")
+        if self.limit is not None and self.limit < 1:
+            raise ValueError(f"limit 必須大於 0: {self.limit}")
+
+    @classmethod
+    def for_user(cls, user_id: int) -> "SubscriptionSpec":
+        """該用戶的所有訂閱，按創建時間倒序"""
+        return cls(user_id=user_id)
+
+    def active(self, is_active: Optional[bool] = True) -> "SubscriptionSpec":
+        """只要活躍（或非活躍）的訂閱；None 表示不限"""
+        return replace(self, is_active=is_active)
+
+    def in_categories(self, *categories: SubscriptionCategory) -> "SubscriptionSpec":
+        return replace(self, categories=tuple(categories))
+
+    def in_currencies(self, *currencies: Currency) -> "SubscriptionSpec":
+        return replace(self, currencies=tuple(currencies))
+
+    def with_cycles(self, *cycles: SubscriptionCycle) -> "SubscriptionSpec":
+        return replace(self, cycles=tuple(cycles))
+
+    def price_between(self, min_price: Optional[float] = None, max_price: Optional[float] = None) -> "SubscriptionSpec":
+        """台幣價格範圍（含邊界）"""
+        return replace(self, min_price=min_price, max_price=max_price)
+
+    def order_by(self, sort: str, descending: bool = True) -> "SubscriptionSpec":
+        return replace(self, sort=sort, descending=descending)
+
+    def take(self, limit: Optional[int]) -> "SubscriptionSpec":
+        return replace(self, limit=limit)
@@ -0,0 +1,47 @@
+from typing import Dict, Iterable
+
+from app.models.subscription import Subscription
+
+
+class BudgetAnalytics:
+    """預算分析累加器 - 一次遍歷得出預算分析所需的全部成本數據"""
+
+    def __init__(self):
+        self.total_monthly_cost = 0
+        self.total_yearly_cost = 0
+        self.category_costs: Dict[str, float] = {}
+        self.category_counts: Dict[str, int] = {}
+
+    @classmethod
+    def from_subscriptions(cls, subscriptions: Iterable[Subscription], subscription_service) -> "BudgetAnalytics":
+        """遍歷一次訂閱列表，每筆訂閱的月度 / 年度成本只計算一次"""
+        analytics = cls()
+        for subscription in subscriptions:
+            if subscription.is_active:
+                analytics.add(
+                    subscription.category.value,
+                    subscription_service.calculate_monthly_cost(subscription),
+                    subscription_service.calculate_yearly_cost(subscription)
+                )
+        return analytics
+
+    @classmethod
+    def from_category_totals(cls, category_totals: Dict[str, Dict[str, float]]) -> "BudgetAnalytics":
+        """由 Repository 的類別匯總結果構建"""
+        analytics = cls()
+        for category, totals in category_totals.items():
+            analytics.add(category, totals["monthly_cost"], totals["yearly_cost"], totals["count"])
+        return analytics
+
+    def add(self, category: str, monthly_cost: float, yearly_cost: float, count: int = 1) -> None:
+        """累加一筆（或一組）活躍訂閱的成本"""
+        # 累加順序與逐項 sum() 一致，保證結果逐位相同
+        self.total_monthly_cost += monthly_cost
+        self.total_yearly_cost += yearly_cost
+        self.category_costs[category] = self.category_costs.get(category, 0) + monthly_cost
+        self.category_counts[category] = self.category_counts.get(category, 0) + count
+
+    @property
+    def active_count(self) -> int:
+        """活躍訂閱數量"""
+        return sum(self.category_counts.values())
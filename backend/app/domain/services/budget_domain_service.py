@@ -1,10 +1,14 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 from decimal import Decimal
 
 from app.models.budget import Budget
 from app.models.subscription import Subscription
 from app.domain.services.subscription_domain_service import SubscriptionDomainService
+from app.domain.services.budget_analytics import BudgetAnalytics
+
+# Repository 類別匯總結果: {類別: {"count", "monthly_cost", "yearly_cost"}}
+CategoryTotals = Dict[str, Dict[str, float]]
 
 class BudgetDomainService:
     """預算領域服務 - 處理預算相關業務邏輯"""
@@ -12,8 +16,42 @@ class BudgetDomainService:
     def __init__(self, subscription_service: SubscriptionDomainService):
         self._subscription_service = subscription_service
     
+    def analyze(self, budget: Budget, analytics: BudgetAnalytics) -> Dict[str, Any]:
+        """根據一次累加的分析數據得出全部預算分析結果"""
+        usage_info = self._build_budget_usage(budget, analytics.total_monthly_cost)
+        category_usage = self._build_category_budget_usage(budget, analytics.category_costs)
+        
+        return {
+            "usage_info": usage_info,
+            "category_usage": category_usage,
+            "recommendations": self._build_recommendations(budget, usage_info, category_usage),
+            "savings_potential": self._build_savings_potential(
+                analytics.total_monthly_cost, analytics.total_yearly_cost
+            )
+        }
+    
+    def analyze_subscriptions(self, budget: Budget, subscriptions: List[Subscription]) -> Dict[str, Any]:
+        """單次遍歷訂閱列表完成預算分析"""
+        return self.analyze(budget, self._subscription_analytics(subscriptions))
+    
+    def analyze_totals(self, budget: Budget, category_totals: CategoryTotals) -> Dict[str, Any]:
+        """根據類別匯總成本完成預算分析"""
+        return self.analyze(budget, BudgetAnalytics.from_category_totals(category_totals))
+    
+    def _subscription_analytics(self, subscriptions: List[Subscription]) -> BudgetAnalytics:
+        return BudgetAnalytics.from_subscriptions(subscriptions, self._subscription_service)
+    
     def calculate_budget_usage(self, budget: Budget, subscriptions: List[Subscription]) -> Dict[str, Any]:
         """計算預算使用情況"""
+        analytics = self._subscription_analytics(subscriptions)
+        return self._build_budget_usage(budget, analytics.total_monthly_cost)
+    
+    def calculate_budget_usage_from_totals(self, budget: Budget, category_totals: CategoryTotals) -> Dict[str, Any]:
+        """根據類別匯總成本計算預算使用情況"""
+        analytics = BudgetAnalytics.from_category_totals(category_totals)
+        return self._build_budget_usage(budget, analytics.total_monthly_cost)
+    
+    def _build_budget_usage(self, budget: Budget, total_monthly_cost: float) -> Dict[str, Any]:
         if not budget:
             return {
                 "total_budget": 0,
@@ -24,7 +62,6 @@ class BudgetDomainService:
                 "over_budget_amount": 0
             }
         
-        total_monthly_cost = self._subscription_service.calculate_total_monthly_cost(subscriptions)
         remaining = budget.monthly_limit - total_monthly_cost
         usage_percentage = (total_monthly_cost / budget.monthly_limit * 100) if budget.monthly_limit > 0 else 0
         is_over_budget = total_monthly_cost > budget.monthly_limit
@@ -41,7 +78,15 @@ class BudgetDomainService:
     
     def calculate_category_budget_usage(self, budget: Budget, subscriptions: List[Subscription]) -> Dict[str, Any]:
         """計算各類別的預算使用情況"""
-        category_costs = self._subscription_service.calculate_category_costs(subscriptions)
+        analytics = self._subscription_analytics(subscriptions)
+        return self._build_category_budget_usage(budget, analytics.category_costs)
+    
+    def calculate_category_budget_usage_from_totals(self, budget: Budget, category_totals: CategoryTotals) -> Dict[str, Any]:
+        """根據類別匯總成本計算各類別的預算使用情況"""
+        analytics = BudgetAnalytics.from_category_totals(category_totals)
+        return self._build_category_budget_usage(budget, analytics.category_costs)
+    
+    def _build_category_budget_usage(self, budget: Budget, category_costs: Dict[str, float]) -> Dict[str, Any]:
         total_monthly_cost = sum(category_costs.values())
         
         result = {
@@ -64,14 +109,36 @@ class BudgetDomainService:
     
     def get_budget_recommendations(self, budget: Budget, subscriptions: List[Subscription]) -> List[str]:
         """獲取預算建議"""
+        if not budget:
+            return self._build_recommendations(budget, None, None)
+        
+        return self._recommendations_for(budget, self._subscription_analytics(subscriptions))
+    
+    def get_budget_recommendations_from_totals(self, budget: Budget, category_totals: CategoryTotals) -> List[str]:
+        """根據類別匯總成本獲取預算建議"""
+        if not budget:
+            return self._build_recommendations(budget, None, None)
+        
+        return self._recommendations_for(budget, BudgetAnalytics.from_category_totals(category_totals))
+    
+    def _recommendations_for(self, budget: Budget, analytics: BudgetAnalytics) -> List[str]:
+        """只構建建議所依賴的使用情況，不計算節省潛力"""
+        usage_info = self._build_budget_usage(budget, analytics.total_monthly_cost)
+        category_usage = self._build_category_budget_usage(budget, analytics.category_costs)
+        return self._build_recommendations(budget, usage_info, category_usage)
+    
+    def _build_recommendations(
+        self,
+        budget: Budget,
+        usage_info: Optional[Dict[str, Any]],
+        category_usage: Optional[Dict[str, Any]]
+    ) -> List[str]:
         recommendations = []
         
         if not budget:
             recommendations.append("建議設置月度預算限制以更好地管理訂閱支出")
             return recommendations
         
-        usage_info = self.calculate_budget_usage(budget, subscriptions)
-        
         if usage_info["is_over_budget"]:
             recommendations.append(f"當前支出超出預算 {usage_info['over_budget_amount']:.2f} 元，建議檢視並取消不必要的訂閱")
         
@@ -81,7 +148,6 @@ class BudgetDomainService:
             recommendations.append("預算使用率超過80%，建議注意支出控制")
         
         # 檢查是否有太多相同類別的訂閱
-        category_usage = self.calculate_category_budget_usage(budget, subscriptions)
         for category, info in category_usage["categories"].items():
             if info["percentage_of_budget"] > 50:
                 recommendations.append(f"「{category}」類別支出佔預算的{info['percentage_of_budget']:.1f}%，建議檢視是否有重複或不必要的訂閱")
@@ -105,20 +171,18 @@ class BudgetDomainService:
     
     def calculate_savings_potential(self, subscriptions: List[Subscription]) -> Dict[str, Any]:
         """計算潛在節省金額"""
-        yearly_costs = []
-        monthly_costs = []
-        
-        for subscription in subscriptions:
-            if subscription.is_active:
-                yearly_cost = self._subscription_service.calculate_yearly_cost(subscription)
-                monthly_cost = self._subscription_service.calculate_monthly_cost(subscription)
-                
-                yearly_costs.append(yearly_cost)
-                monthly_costs.append(monthly_cost)
-        
+        analytics = self._subscription_analytics(subscriptions)
+        return self._build_savings_potential(analytics.total_monthly_cost, analytics.total_yearly_cost)
+    
+    def calculate_savings_potential_from_totals(self, category_totals: CategoryTotals) -> Dict[str, Any]:
+        """根據類別匯總成本計算潛在節省金額"""
+        analytics = BudgetAnalytics.from_category_totals(category_totals)
+        return self._build_savings_potential(analytics.total_monthly_cost, analytics.total_yearly_cost)
+    
+    def _build_savings_potential(self, total_monthly_cost: float, total_yearly_cost: float) -> Dict[str, Any]:
         # 如果全部改為年付，可能的節省（假設年付有10%折扣）
-        potential_yearly_total = sum(yearly_costs) * 0.9  # 假設年付9折
-        current_yearly_total = sum(monthly_costs) * 12
+        potential_yearly_total = total_yearly_cost * 0.9  # 假設年付9折
+        current_yearly_total = total_monthly_cost * 12
         potential_savings = current_yearly_total - potential_yearly_total
         
         return {
@@ -126,4 +190,4 @@ class BudgetDomainService:
             "potential_yearly_cost": potential_yearly_total,
             "potential_annual_savings": max(0, potential_savings),
             "savings_percentage": (potential_savings / current_yearly_total * 100) if current_yearly_total > 0 else 0
-        }
\ No newline at end of file
+        }
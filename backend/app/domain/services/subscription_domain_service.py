@@ -1,26 +1,73 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from decimal import Decimal
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from dateutil.relativedelta import relativedelta
 
-from app.models.subscription import Subscription, SubscriptionCycle
+from app.models.subscription import Currency, Subscription, SubscriptionCycle
 from app.domain.interfaces.services import IExchangeRateService
 
+# 各週期的最短天數，用於在 SQL 中預篩選即將續費的訂閱
+MIN_CYCLE_DAYS = {
+    SubscriptionCycle.MONTHLY: 28,
+    SubscriptionCycle.QUARTERLY: 89,
+    SubscriptionCycle.YEARLY: 365,
+}
+
 class SubscriptionDomainService:
     """訂閱領域服務 - 處理核心業務邏輯"""
     
     def __init__(self, exchange_rate_service: IExchangeRateService):
         self._exchange_rate_service = exchange_rate_service
     
-    async def calculate_twd_price(self, original_price: float, currency: str) -> float:
-        """計算台幣價格"""
+    async def calculate_twd_price(
+        self, original_price: float, currency: str, on: Optional[datetime] = None
+    ) -> float:
+        """計算台幣價格；指定 on 時按該日期生效的匯率換算"""
         if currency == "TWD":
             return original_price
         
+        if on is not None:
+            return await self._exchange_rate_service.convert_currency(
+                original_price, currency, "TWD", on=on
+            )
         return await self._exchange_rate_service.convert_currency(
             original_price, currency, "TWD"
         )
     
+    async def twd_rate_snapshot(self, on: Optional[date] = None) -> Dict[str, Decimal]:
+        """各支持貨幣兌台幣的匯率快照（批量導入時按日期共用，避免逐行查詢匯率）
+
+        指定 on 時取該日期生效的匯率；無法獲取匯率的貨幣不在快照中。
+        """
+        snapshot = {Currency.TWD.value: Decimal(1)}
+        for currency in Currency:
+            if currency == Currency.TWD:
+                continue
+            try:
+                if on is not None:
+                    snapshot[currency.value] = await self._exchange_rate_service.get_exchange_rate_on(
+                        currency.value, "TWD", on
+                    )
+                else:
+                    snapshot[currency.value] = await self._exchange_rate_service.get_exchange_rate(
+                        currency.value, "TWD"
+                    )
+            except Exception:
+                continue
+        return snapshot
+    
+    @staticmethod
+    def twd_price_from_snapshot(
+        original_price: float, currency: str, snapshot: Dict[str, Decimal]
+    ) -> Optional[float]:
+        """按匯率快照換算台幣價格（與 convert_currency 的換算方式一致），快照中沒有該貨幣時返回 None"""
+        if currency == Currency.TWD.value:
+            return original_price
+        rate = snapshot.get(currency)
+        if rate is None:
+            return None
+        return float(Decimal(str(original_price)) * rate)
+    
     def calculate_monthly_cost(self, subscription: Subscription) -> float:
         """計算月度成本"""
         if subscription.cycle == SubscriptionCycle.MONTHLY:
@@ -60,6 +107,14 @@ class SubscriptionDomainService:
         warning_date = datetime.now() + timedelta(days=days_ahead)
         return next_billing <= warning_date
     
+    def renewal_start_cutoffs(self, days_ahead: int = 7) -> Dict[SubscriptionCycle, datetime]:
+        """各週期可能即將到期的最晚開始日期（寬鬆條件，結果仍需 is_due_soon 確認）"""
+        warning_date = datetime.now() + timedelta(days=days_ahead)
+        return {
+            cycle: warning_date - timedelta(days=days)
+            for cycle, days in MIN_CYCLE_DAYS.items()
+        }
+    
     def calculate_total_monthly_cost(self, subscriptions: List[Subscription]) -> float:
         """計算總月度成本"""
         return sum(self.calculate_monthly_cost(sub) for sub in subscriptions if sub.is_active)
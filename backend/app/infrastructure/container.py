@@ -127,16 +127,20 @@ def configure_container():
     """配置依賴注入容器"""
     from app.domain.interfaces.repositories import IUnitOfWork
     from app.domain.interfaces.services import IExchangeRateService
-    from app.infrastructure.unit_of_work import SQLAlchemyUnitOfWork
-    from app.infrastructure.services.exchange_rate_service_impl import ExchangeRateServiceImpl
+    from app.core.config import settings
+    from app.infrastructure.unit_of_work import SQLAlchemyUnitOfWork, AsyncSQLAlchemyUnitOfWork
+    from app.infrastructure.services.exchange_rate_service_impl import exchange_rate_service
     from app.domain.services.subscription_domain_service import SubscriptionDomainService
     from app.domain.services.budget_domain_service import BudgetDomainService
     from app.application.services.subscription_application_service import SubscriptionApplicationService
     from app.application.services.budget_application_service import BudgetApplicationService
     
     # 註冊基礎設施服務
-    container.register_transient(IUnitOfWork, SQLAlchemyUnitOfWork)
-    container.register_singleton(IExchangeRateService, ExchangeRateServiceImpl)
+    container.register_transient(
+        IUnitOfWork,
+        AsyncSQLAlchemyUnitOfWork if settings.use_async_database else SQLAlchemyUnitOfWork
+    )
+    container.register_instance(IExchangeRateService, exchange_rate_service)
     
     # 註冊領域服務
     container.register_singleton(SubscriptionDomainService, SubscriptionDomainService)
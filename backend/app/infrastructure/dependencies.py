@@ -1,10 +1,13 @@
 from fastapi import Depends
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Annotated
 
-from app.database.connection import get_db
-from app.infrastructure.unit_of_work import SQLAlchemyUnitOfWork
-from app.infrastructure.services.exchange_rate_service_impl import ExchangeRateServiceImpl
+from app.core.config import settings
+from app.database.connection import get_db, get_async_db
+from app.infrastructure.unit_of_work import SQLAlchemyUnitOfWork, AsyncSQLAlchemyUnitOfWork
+from app.infrastructure.services.exchange_rate_service_impl import exchange_rate_service
+from app.services.exchange_rate_service import ExchangeRateService, exchange_rate_service as live_exchange_rate_service
 from app.domain.services.subscription_domain_service import SubscriptionDomainService
 from app.domain.services.budget_domain_service import BudgetDomainService
 from app.application.services.subscription_application_service import SubscriptionApplicationService
@@ -14,14 +17,26 @@ from app.domain.interfaces.services import IExchangeRateService
 
 # 依賴注入類型別名
 DatabaseSession = Annotated[Session, Depends(get_db)]
+AsyncDatabaseSession = Annotated[AsyncSession, Depends(get_async_db)]
 
 def get_unit_of_work(db: DatabaseSession) -> IUnitOfWork:
     """獲取工作單元"""
     return SQLAlchemyUnitOfWork(db)
 
+def get_async_unit_of_work(db: AsyncDatabaseSession) -> IUnitOfWork:
+    """獲取異步工作單元"""
+    return AsyncSQLAlchemyUnitOfWork(db)
+
+# 根據配置選擇同步或異步的工作單元
+unit_of_work_provider = get_async_unit_of_work if settings.use_async_database else get_unit_of_work
+
 def get_exchange_rate_service() -> IExchangeRateService:
-    """獲取匯率服務"""
-    return ExchangeRateServiceImpl()
+    """獲取匯率服務（進程內共享實例）"""
+    return exchange_rate_service
+
+def get_live_exchange_rate_service() -> ExchangeRateService:
+    """獲取從外部 API 下載匯率的服務（v1 匯率端點使用，與舊版路由共享同一實例）"""
+    return live_exchange_rate_service
 
 def get_subscription_domain_service(
     exchange_service: IExchangeRateService = Depends(get_exchange_rate_service)
@@ -36,14 +51,14 @@ def get_budget_domain_service(
     return BudgetDomainService(subscription_service)
 
 def get_subscription_application_service(
-    uow: IUnitOfWork = Depends(get_unit_of_work),
+    uow: IUnitOfWork = Depends(unit_of_work_provider),
     domain_service: SubscriptionDomainService = Depends(get_subscription_domain_service)
 ) -> SubscriptionApplicationService:
     """獲取訂閱應用服務"""
     return SubscriptionApplicationService(uow, domain_service)
 
 def get_budget_application_service(
-    uow: IUnitOfWork = Depends(get_unit_of_work),
+    uow: IUnitOfWork = Depends(unit_of_work_provider),
     domain_service: BudgetDomainService = Depends(get_budget_domain_service)
 ) -> BudgetApplicationService:
     """獲取預算應用服務"""
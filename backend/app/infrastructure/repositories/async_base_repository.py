@@ -0,0 +1,85 @@
+from typing import List, Optional, Generic, TypeVar, Type
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+from app.domain.interfaces.repositories import BaseRepository
+
+T = TypeVar('T')
+
+class AsyncSQLAlchemyBaseRepository(BaseRepository[T], Generic[T]):
+    """SQLAlchemy 異步基礎 Repository 實現
+    
+    方法與 SQLAlchemyBaseRepository 一一對應，但以 AsyncSession 執行，
+    查詢期間不會阻塞事件循環。
+    """
+    
+    def __init__(self, db_session: AsyncSession, model_class: Type[T]):
+        self._db_session = db_session
+        self._model_class = model_class
+    
+    async def get_by_id(self, id: int) -> Optional[T]:
+        """根據 ID 獲取實體"""
+        try:
+            result = await self._db_session.execute(
+                select(self._model_class).where(self._model_class.id == id)
+            )
+            return result.scalars().first()
+        except SQLAlchemyError:
+            return None
+    
+    async def get_all(self) -> List[T]:
+        """獲取所有實體"""
+        try:
+            result = await self._db_session.execute(select(self._model_class))
+            return list(result.scalars().all())
+        except SQLAlchemyError:
+            return []
+    
+    async def create(self, entity: T) -> T:
+        """創建實體"""
+        try:
+            self._db_session.add(entity)
+            await self._db_session.flush()  # 刷新以獲取 ID，但不提交
+            await self._db_session.refresh(entity)
+            return entity
+        except SQLAlchemyError as e:
+            await self._db_session.rollback()
+            raise e
+    
+    async def update(self, entity: T) -> T:
+        """更新實體"""
+        try:
+            await self._db_session.merge(entity)
+            await self._db_session.flush()
+            await self._db_session.refresh(entity)
+            return entity
+        except SQLAlchemyError as e:
+            await self._db_session.rollback()
+            raise e
+    
+    async def delete(self, id: int) -> bool:
+        """刪除實體"""
+        try:
+            entity = await self.get_by_id(id)
+            if entity:
+                await self._db_session.delete(entity)
+                await self._db_session.flush()
+                return True
+            return False
+        except SQLAlchemyError as e:
+            await self._db_session.rollback()
+            raise e
+    
+    async def exists(self, id: int) -> bool:
+        """檢查實體是否存在"""
+        try:
+            return await self._count(self._model_class.id == id) > 0
+        except SQLAlchemyError:
+            return False
+    
+    async def _count(self, *criteria) -> int:
+        """統計符合條件的實體數量"""
+        result = await self._db_session.execute(
+            select(func.count()).select_from(self._model_class).where(*criteria)
+        )
+        return result.scalar_one()
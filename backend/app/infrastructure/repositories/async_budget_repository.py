@@ -0,0 +1,31 @@
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.domain.interfaces.repositories import IBudgetRepository
+from app.infrastructure.repositories.async_base_repository import AsyncSQLAlchemyBaseRepository
+from app.models.budget import Budget
+
+class AsyncBudgetRepository(AsyncSQLAlchemyBaseRepository[Budget], IBudgetRepository):
+    """預算 Repository 異步實現"""
+    
+    def __init__(self, db_session: AsyncSession):
+        super().__init__(db_session, Budget)
+    
+    async def get_by_user_id(self, user_id: int) -> Optional[Budget]:
+        """根據用戶 ID 獲取預算"""
+        try:
+            result = await self._db_session.execute(
+                select(Budget).where(Budget.user_id == user_id)
+            )
+            return result.scalars().first()
+        except SQLAlchemyError:
+            return None
+    
+    async def user_has_budget(self, user_id: int) -> bool:
+        """檢查用戶是否有預算設置"""
+        try:
+            return await self._count(Budget.user_id == user_id) > 0
+        except SQLAlchemyError:
+            return False
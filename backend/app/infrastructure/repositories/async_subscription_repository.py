@@ -0,0 +1,237 @@
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.domain.interfaces.repositories import ISubscriptionRepository
+from app.domain.interfaces.subscription_spec import SubscriptionSpec
+from app.infrastructure.repositories.async_base_repository import AsyncSQLAlchemyBaseRepository
+from app.infrastructure.repositories.subscription_queries import (
+    EXPORT_BATCH_SIZE,
+    bulk_delete_statement,
+    bulk_set_active_statement,
+    category_cost_totals_statement,
+    chunked_ids,
+    export_statement,
+    keyset_page_statement,
+    list_count_statement,
+    owned_ids_statement,
+    spec_statement,
+    started_before_criteria,
+    to_category_cost_totals,
+)
+from app.infrastructure.repositories.subscription_count_cache import (
+    invalidate_after_commit,
+    pending_invalidations,
+    subscription_count_cache,
+)
+from app.models.subscription import Subscription, SubscriptionCategory, SubscriptionCycle
+
+class AsyncSubscriptionRepository(AsyncSQLAlchemyBaseRepository[Subscription], ISubscriptionRepository):
+    """訂閱 Repository 異步實現"""
+    
+    def __init__(self, db_session: AsyncSession):
+        super().__init__(db_session, Subscription)
+    
+    async def _fetch_all(self, *criteria) -> List[Subscription]:
+        """按創建時間倒序獲取符合條件的訂閱"""
+        result = await self._db_session.execute(
+            select(Subscription).where(*criteria).order_by(Subscription.created_at.desc())
+        )
+        return list(result.scalars().all())
+    
+    async def get_by_user_id(self, user_id: int) -> List[Subscription]:
+        """根據用戶 ID 獲取所有訂閱"""
+        try:
+            return await self._fetch_all(Subscription.user_id == user_id)
+        except SQLAlchemyError:
+            return []
+    
+    async def get_active_by_user_id(self, user_id: int) -> List[Subscription]:
+        """根據用戶 ID 獲取活躍訂閱"""
+        try:
+            return await self._fetch_all(
+                Subscription.user_id == user_id,
+                Subscription.is_active == True
+            )
+        except SQLAlchemyError:
+            return []
+    
+    async def find(self, spec: SubscriptionSpec) -> List[Subscription]:
+        """按查詢規格獲取訂閱（單條 SQL 語句）"""
+        try:
+            result = await self._db_session.execute(spec_statement(spec))
+            return list(result.scalars())
+        except SQLAlchemyError:
+            return []
+    
+    async def get_by_user_and_id(self, user_id: int, subscription_id: int) -> Optional[Subscription]:
+        """根據用戶 ID 和訂閱 ID 獲取訂閱"""
+        try:
+            result = await self._db_session.execute(
+                select(Subscription).where(
+                    Subscription.id == subscription_id,
+                    Subscription.user_id == user_id
+                )
+            )
+            return result.scalars().first()
+        except SQLAlchemyError:
+            return None
+    
+    async def get_by_category(self, user_id: int, category: str) -> List[Subscription]:
+        """根據類別獲取用戶訂閱"""
+        try:
+            return await self._fetch_all(
+                Subscription.user_id == user_id,
+                Subscription.category == category,
+                Subscription.is_active == True
+            )
+        except SQLAlchemyError:
+            return []
+    
+    async def get_by_name_pattern(self, user_id: int, name_pattern: str) -> List[Subscription]:
+        """根據名稱模式搜索訂閱"""
+        try:
+            return await self._fetch_all(
+                Subscription.user_id == user_id,
+                Subscription.name.ilike(f"%{name_pattern}%")
+            )
+        except SQLAlchemyError:
+            return []
+    
+    async def count_by_user_id(self, user_id: int) -> int:
+        """統計用戶訂閱數量"""
+        try:
+            return await self._count(Subscription.user_id == user_id)
+        except SQLAlchemyError:
+            return 0
+    
+    async def count_active_by_user_id(self, user_id: int) -> int:
+        """統計用戶活躍訂閱數量"""
+        try:
+            return await self._count(
+                Subscription.user_id == user_id,
+                Subscription.is_active == True
+            )
+        except SQLAlchemyError:
+            return 0
+    
+    async def get_page(
+        self,
+        user_id: int,
+        limit: int,
+        after: Optional[Tuple[datetime, int]] = None,
+        include_inactive: bool = False,
+        category: Optional[SubscriptionCategory] = None
+    ) -> List[Subscription]:
+        """按 (created_at, id) 倒序獲取一頁訂閱（鍵集分頁），after 為上一頁最後一行的 (created_at, id)"""
+        try:
+            statement = keyset_page_statement(user_id, limit, after, include_inactive, category)
+            return list(await self._db_session.scalars(statement))
+        except SQLAlchemyError:
+            return []
+    
+    async def count_listed(
+        self, user_id: int, include_inactive: bool = False, category: Optional[SubscriptionCategory] = None
+    ) -> int:
+        """統計訂閱列表總數（優先讀取數量緩存，查詢期間有失效時不寫入緩存）"""
+        key = (include_inactive, category)
+        # 本事務中有未提交的修改時，緩存的數量不反映這些修改，查詢結果也只對本事務可見
+        pending = user_id in pending_invalidations(self._db_session)
+        count = None if pending else subscription_count_cache.get(user_id, key)
+        if count is None:
+            generation = subscription_count_cache.generation()
+            try:
+                count = await self._db_session.scalar(list_count_statement(user_id, include_inactive, category))
+            except SQLAlchemyError:
+                return 0
+            if not pending:
+                subscription_count_cache.set(user_id, key, count, generation)
+        return count
+    
+    async def get_category_cost_totals(self, user_id: int) -> Dict[str, Dict[str, float]]:
+        """按類別匯總活躍訂閱的數量、月度和年度成本"""
+        try:
+            rows = await self._db_session.execute(category_cost_totals_statement(user_id))
+            return to_category_cost_totals(rows)
+        except SQLAlchemyError:
+            return {}
+    
+    async def get_active_started_before(
+        self, user_id: int, cutoffs: Dict[SubscriptionCycle, datetime]
+    ) -> List[Subscription]:
+        """獲取各週期開始日期不晚於截止時間的活躍訂閱"""
+        try:
+            return await self._fetch_all(
+                Subscription.user_id == user_id,
+                Subscription.is_active == True,
+                started_before_criteria(cutoffs)
+            )
+        except SQLAlchemyError:
+            return []
+    
+    async def bulk_set_active(self, user_id: int, subscription_ids: Iterable[int], is_active: bool) -> List[int]:
+        """批量啟用 / 停用用戶的訂閱，返回受影響的訂閱 ID（每塊 ID 一條 UPDATE）"""
+        try:
+            affected = []
+            for chunk in chunked_ids(subscription_ids):
+                affected.extend(await self._execute_bulk(
+                    bulk_set_active_statement(user_id, chunk, is_active),
+                    owned_ids_statement(user_id, chunk),
+                    self._db_session.get_bind().dialect.update_returning
+                ))
+            invalidate_after_commit(self._db_session, [user_id])
+            return sorted(affected)
+        except SQLAlchemyError as e:
+            await self._db_session.rollback()
+            raise e
+    
+    async def bulk_delete(self, user_id: int, subscription_ids: Iterable[int]) -> List[int]:
+        """批量刪除用戶的訂閱，返回被刪除的訂閱 ID（每塊 ID 一條 DELETE）"""
+        try:
+            affected = []
+            for chunk in chunked_ids(subscription_ids):
+                affected.extend(await self._execute_bulk(
+                    bulk_delete_statement(user_id, chunk),
+                    owned_ids_statement(user_id, chunk),
+                    self._db_session.get_bind().dialect.delete_returning
+                ))
+            invalidate_after_commit(self._db_session, [user_id])
+            return sorted(affected)
+        except SQLAlchemyError as e:
+            await self._db_session.rollback()
+            raise e
+    
+    async def bulk_insert(self, rows: Sequence[Mapping]) -> int:
+        """批量插入訂閱（一條 executemany 形式的 INSERT），返回插入的行數"""
+        if not rows:
+            return 0
+        try:
+            await self._db_session.execute(insert(Subscription), list(rows))
+            invalidate_after_commit(self._db_session, {row["user_id"] for row in rows})
+            return len(rows)
+        except SQLAlchemyError as e:
+            await self._db_session.rollback()
+            raise e
+    
+    async def iter_export_rows(
+        self, user_id: Optional[int], batch_size: int = EXPORT_BATCH_SIZE
+    ) -> AsyncIterator[Any]:
+        """逐行迭代導出的訂閱列值（流式結果，每次讀取 batch_size 行）"""
+        result = await self._db_session.stream(export_statement(user_id, batch_size))
+        try:
+            async for row in result:
+                yield row
+        finally:
+            await result.close()
+    
+    async def _execute_bulk(self, statement, owned_ids, supports_returning: bool) -> List[int]:
+        """執行批量語句並返回受影響的 ID；數據庫不支持 RETURNING 時先查出屬於該用戶的 ID"""
+        if supports_returning:
+            result = await self._db_session.execute(statement.returning(Subscription.id))
+            return list(result.scalars())
+        ids = list((await self._db_session.execute(owned_ids)).scalars())
+        if ids:
+            await self._db_session.execute(statement)
+        return ids
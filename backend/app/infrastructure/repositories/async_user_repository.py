@@ -0,0 +1,48 @@
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.domain.interfaces.repositories import IUserRepository
+from app.infrastructure.repositories.async_base_repository import AsyncSQLAlchemyBaseRepository
+from app.models.user import User
+
+class AsyncUserRepository(AsyncSQLAlchemyBaseRepository[User], IUserRepository):
+    """用戶 Repository 異步實現"""
+    
+    def __init__(self, db_session: AsyncSession):
+        super().__init__(db_session, User)
+    
+    async def get_by_email(self, email: str) -> Optional[User]:
+        """根據郵箱獲取用戶"""
+        try:
+            result = await self._db_session.execute(
+                select(User).where(User.email == email)
+            )
+            return result.scalars().first()
+        except SQLAlchemyError:
+            return None
+    
+    async def get_by_username(self, username: str) -> Optional[User]:
+        """根據用戶名獲取用戶"""
+        try:
+            result = await self._db_session.execute(
+                select(User).where(User.username == username)
+            )
+            return result.scalars().first()
+        except SQLAlchemyError:
+            return None
+    
+    async def email_exists(self, email: str) -> bool:
+        """檢查郵箱是否已存在"""
+        try:
+            return await self._count(User.email == email) > 0
+        except SQLAlchemyError:
+            return False
+    
+    async def username_exists(self, username: str) -> bool:
+        """檢查用戶名是否已存在"""
+        try:
+            return await self._count(User.username == username) > 0
+        except SQLAlchemyError:
+            return False
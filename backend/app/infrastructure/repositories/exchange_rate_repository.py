@@ -0,0 +1,61 @@
+from datetime import datetime
+from typing import Dict, Mapping, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.domain.interfaces.repositories import IExchangeRateRepository
+from app.models.exchange_rate import ExchangeRate
+
+class ExchangeRateRepository(IExchangeRateRepository):
+    """匯率歷史 Repository 實現"""
+    
+    def __init__(self, db_session: Session):
+        self._db_session = db_session
+    
+    def add_snapshot(self, base: str, quotes: Mapping[str, float], as_of: datetime) -> int:
+        """寫入一張完整匯率表，返回寫入的行數"""
+        rows = [
+            {"base": base, "quote": quote, "rate": float(rate), "as_of": as_of}
+            for quote, rate in quotes.items()
+            if quote != base and rate
+        ]
+        if not rows:
+            return 0
+        try:
+            self._db_session.execute(ExchangeRate.__table__.insert(), rows)
+            self._db_session.flush()
+            return len(rows)
+        except SQLAlchemyError as e:
+            self._db_session.rollback()
+            raise e
+    
+    def get_snapshot(
+        self, base: Optional[str] = None, on: Optional[datetime] = None
+    ) -> Optional[Tuple[str, datetime, Dict[str, float]]]:
+        """獲取在 on 時刻生效（不晚於 on 的最新一張）的匯率表
+
+        返回 (基準貨幣, 匯率時間, {報價貨幣: 匯率})；未指定 on 時返回最新一張。
+        """
+        try:
+            latest = select(ExchangeRate.base, ExchangeRate.as_of)
+            if base is not None:
+                latest = latest.where(ExchangeRate.base == base)
+            if on is not None:
+                latest = latest.where(ExchangeRate.as_of <= on)
+            found = self._db_session.execute(
+                latest.order_by(ExchangeRate.as_of.desc()).limit(1)
+            ).first()
+            if found is None:
+                return None
+            
+            snapshot_base, as_of = found
+            rows = self._db_session.execute(
+                select(ExchangeRate.quote, ExchangeRate.rate).where(
+                    ExchangeRate.base == snapshot_base,
+                    ExchangeRate.as_of == as_of
+                )
+            ).all()
+            return snapshot_base, as_of, {quote: rate for quote, rate in rows}
+        except SQLAlchemyError:
+            return None
@@ -0,0 +1,135 @@
+"""
+訂閱數量緩存
+
+分頁列表的可選總數從這裡讀取，不必每翻一頁都執行一次 COUNT。
+條目按用戶分組：該用戶的訂閱經 ORM 新增 / 修改 / 刪除（見下方 ORM 事件），
+或經 Repository 的批量寫入時，記錄在所屬 Session 上，事務提交後整個用戶的條目才失效
+（提交前失效的話，並發的 COUNT 仍會讀到提交前的數量並重新緩存）；
+事務回滾時丟棄記錄。其他進程的修改在 ttl 秒後生效。
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.core.config import settings
+from app.models.subscription import Subscription
+
+
+class SubscriptionCountCache:
+    """按 (用戶, 篩選條件) 緩存訂閱數量，超出容量時淘汰最久未使用的用戶"""
+
+    def __init__(self, ttl: float = 300.0, max_users: int = 10000):
+        self._ttl = ttl
+        self._max_users = max_users
+        self._entries: "OrderedDict[int, Dict[Hashable, Tuple[int, float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # 每次失效加一；COUNT 查詢期間發生過失效時，查詢結果可能已過時，不寫入緩存
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, user_id: int, key: Hashable) -> Optional[int]:
+        """獲取未過期的數量，並記錄命中 / 未命中"""
+        with self._lock:
+            counts = self._entries.get(user_id)
+            entry = counts.get(key) if counts is not None else None
+            if entry is not None and time.monotonic() < entry[1]:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del counts[key]
+            self.misses += 1
+            return None
+
+    def generation(self) -> int:
+        """當前的失效代數，在查詢數量之前讀取，寫入時傳給 set"""
+        with self._lock:
+            return self._generation
+
+    def set(self, user_id: int, key: Hashable, count: int, generation: Optional[int] = None) -> None:
+        """寫入數量；generation 與當前代數不同（查詢期間有失效）時放棄寫入"""
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries.setdefault(user_id, {})[key] = (count, time.monotonic() + self._ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self._max_users:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        """使該用戶的所有數量失效"""
+        with self._lock:
+            self._generation += 1
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        """清空緩存和統計"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.invalidations = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """緩存統計；每次命中即省去一次 COUNT 查詢"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "users": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+# 全局實例
+subscription_count_cache = SubscriptionCountCache(
+    ttl=settings.subscription_count_cache_ttl,
+    max_users=settings.subscription_count_cache_max_users
+)
+
+
+# Session.info 中記錄待失效用戶的鍵
+PENDING_KEY = "subscription_count_pending_users"
+
+
+def invalidate_after_commit(session, user_ids: Iterable[int]) -> None:
+    """記錄這些用戶的數量在 session 的事務提交後失效（同時支持 AsyncSession）"""
+    session = getattr(session, "sync_session", session)
+    session.info.setdefault(PENDING_KEY, set()).update(user_ids)
+
+
+def pending_invalidations(session) -> Set[int]:
+    """session 中有未提交修改的用戶"""
+    session = getattr(session, "sync_session", session)
+    return session.info.get(PENDING_KEY, set())
+
+
+@event.listens_for(Subscription, "after_insert")
+@event.listens_for(Subscription, "after_update")
+@event.listens_for(Subscription, "after_delete")
+def _record_change(mapper, connection, target: Subscription) -> None:
+    session = object_session(target)
+    if session is not None:
+        invalidate_after_commit(session, [target.user_id])
+    else:
+        subscription_count_cache.invalidate(target.user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session: Session) -> None:
+    for user_id in session.info.pop(PENDING_KEY, ()):
+        subscription_count_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session: Session) -> None:
+    session.info.pop(PENDING_KEY, None)
@@ -0,0 +1,206 @@
+"""
+訂閱查詢語句
+
+同步與異步 Repository 共用的 SQL 構建函數，確保兩種實現發出相同的語句。
+"""
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import Delete, Select, Update, and_, case, delete, func, or_, select, tuple_, update
+
+from app.domain.interfaces.subscription_spec import SubscriptionSpec
+from app.models.subscription import Subscription, SubscriptionCategory, SubscriptionCycle
+
+# 批量操作每條語句的最大 ID 數，避免 IN 列表超出數據庫的綁定參數上限
+BULK_CHUNK_SIZE = 500
+
+# 導出時每次從遊標讀取的行數
+EXPORT_BATCH_SIZE = 1000
+
+# 導出的列（只查列值，不構造 ORM 實體）
+EXPORT_COLUMNS = (
+    Subscription.id,
+    Subscription.user_id,
+    Subscription.name,
+    Subscription.price,
+    Subscription.original_price,
+    Subscription.currency,
+    Subscription.cycle,
+    Subscription.category,
+    Subscription.start_date,
+    Subscription.is_active,
+    Subscription.created_at,
+    Subscription.updated_at,
+)
+
+# 按週期換算的月度 / 年度成本，與 SubscriptionDomainService 的換算規則一致
+# 以 cycle == 枚舉 的形式比較，讓綁定值經過 Enum 列類型轉換為存儲值
+MONTHLY_COST = case(
+    (Subscription.cycle == SubscriptionCycle.MONTHLY, Subscription.price),
+    (Subscription.cycle == SubscriptionCycle.QUARTERLY, Subscription.price / 3),
+    (Subscription.cycle == SubscriptionCycle.YEARLY, Subscription.price / 12),
+)
+
+YEARLY_COST = case(
+    (Subscription.cycle == SubscriptionCycle.MONTHLY, Subscription.price * 12),
+    (Subscription.cycle == SubscriptionCycle.QUARTERLY, Subscription.price * 4),
+    (Subscription.cycle == SubscriptionCycle.YEARLY, Subscription.price),
+)
+
+
+def category_cost_totals_statement(user_id: int) -> Select:
+    """活躍訂閱按類別匯總的月度 / 年度成本（單條 GROUP BY 查詢）"""
+    return (
+        select(
+            Subscription.category,
+            func.count(Subscription.id),
+            func.sum(MONTHLY_COST),
+            func.sum(YEARLY_COST),
+        )
+        .where(Subscription.user_id == user_id, Subscription.is_active == True)
+        .group_by(Subscription.category)
+    )
+
+
+def to_category_cost_totals(rows: Iterable[Any]) -> Dict[str, Dict[str, float]]:
+    """將匯總結果轉換為 {類別: {"count", "monthly_cost", "yearly_cost"}}"""
+    totals = {}
+    for category, count, monthly_cost, yearly_cost in rows:
+        totals[category.value] = {
+            "count": count,
+            "monthly_cost": monthly_cost or 0.0,
+            "yearly_cost": yearly_cost or 0.0,
+        }
+    return totals
+
+
+def started_before_criteria(cutoffs: Dict[SubscriptionCycle, datetime]):
+    """各週期開始日期不晚於對應截止時間的條件"""
+    return or_(*(
+        and_(Subscription.cycle == cycle, Subscription.start_date <= cutoff)
+        for cycle, cutoff in cutoffs.items()
+    ))
+
+
+def list_criteria(user_id: int, include_inactive: bool = False, category: Optional[SubscriptionCategory] = None) -> list:
+    """訂閱列表的篩選條件（與列表相同的索引前綴：user_id [, category] [, is_active]）"""
+    criteria = [Subscription.user_id == user_id]
+    if category is not None:
+        criteria.append(Subscription.category == category)
+    if not include_inactive:
+        criteria.append(Subscription.is_active == True)
+    return criteria
+
+
+def keyset_page_statement(
+    user_id: int,
+    limit: int,
+    after: Optional[Tuple[datetime, int]] = None,
+    include_inactive: bool = False,
+    category: Optional[SubscriptionCategory] = None
+) -> Select:
+    """按 (created_at, id) 倒序取一頁訂閱（鍵集分頁），after 為上一頁最後一行的 (created_at, id)
+
+    以行值比較 (created_at, id) < (:c, :id) 定位，由索引直接定位到起點，不需要 OFFSET 掃描。
+    比較的 created_at 取自游標所指的那一行在數據庫中的值，避免綁定參數與存儲格式
+    （如 SQLite 的文本時間）不一致；該行已被刪除時才使用游標中記錄的時間
+    （此時 SQLite 上可能重複返回與該行同一秒創建的行，但不會遺漏）。
+    """
+    statement = select(Subscription).where(*list_criteria(user_id, include_inactive, category))
+    if after is not None:
+        created_at, subscription_id = after
+        anchor = select(Subscription.created_at).where(
+            Subscription.id == subscription_id, Subscription.user_id == user_id
+        ).scalar_subquery()
+        statement = statement.where(
+            tuple_(Subscription.created_at, Subscription.id)
+            < tuple_(func.coalesce(anchor, created_at), subscription_id)
+        )
+    return statement.order_by(Subscription.created_at.desc(), Subscription.id.desc()).limit(limit)
+
+
+# SubscriptionSpec.sort 對應的列
+SPEC_SORT_COLUMNS = {
+    "created_at": Subscription.created_at,
+    "start_date": Subscription.start_date,
+    "price": Subscription.price,
+    "name": Subscription.name,
+}
+
+
+def spec_criteria(spec: SubscriptionSpec) -> list:
+    """查詢規格的篩選條件；單值的集合條件用等號，讓 SQLite 可以用到 (user_id, category, ...) 索引"""
+    criteria = [Subscription.user_id == spec.user_id]
+    for column, values in (
+        (Subscription.category, spec.categories),
+        (Subscription.currency, spec.currencies),
+        (Subscription.cycle, spec.cycles),
+    ):
+        if len(values) == 1:
+            criteria.append(column == values[0])
+        elif values:
+            criteria.append(column.in_(values))
+    if spec.is_active is not None:
+        criteria.append(Subscription.is_active == spec.is_active)
+    if spec.min_price is not None:
+        criteria.append(Subscription.price >= spec.min_price)
+    if spec.max_price is not None:
+        criteria.append(Subscription.price <= spec.max_price)
+    return criteria
+
+
+def spec_statement(spec: SubscriptionSpec) -> Select:
+    """把查詢規格編譯為單條 SELECT（篩選、排序、限制行數都在數據庫中完成）"""
+    column = SPEC_SORT_COLUMNS[spec.sort]
+    if spec.descending:
+        order = (column.desc(), Subscription.id.desc())
+    else:
+        order = (column.asc(), Subscription.id.asc())
+    statement = select(Subscription).where(*spec_criteria(spec)).order_by(*order)
+    if spec.limit is not None:
+        statement = statement.limit(spec.limit)
+    return statement
+
+
+def list_count_statement(
+    user_id: int, include_inactive: bool = False, category: Optional[SubscriptionCategory] = None
+) -> Select:
+    """訂閱列表的總數"""
+    return select(func.count(Subscription.id)).where(*list_criteria(user_id, include_inactive, category))
+
+
+def chunked_ids(ids: Iterable[int], size: int = BULK_CHUNK_SIZE) -> Iterator[List[int]]:
+    """去重後按 size 分塊（保持原順序）"""
+    unique_ids = list(dict.fromkeys(ids))
+    for start in range(0, len(unique_ids), size):
+        yield unique_ids[start:start + size]
+
+
+def owned_ids_statement(user_id: int, ids: List[int]) -> Select:
+    """ids 中屬於該用戶的訂閱 ID（數據庫不支持 RETURNING 時用於確定受影響的行）"""
+    return select(Subscription.id).where(Subscription.user_id == user_id, Subscription.id.in_(ids))
+
+
+def bulk_set_active_statement(user_id: int, ids: List[int], is_active: bool) -> Update:
+    """UPDATE ... SET is_active = :flag WHERE user_id = :u AND id IN (...)"""
+    return (
+        update(Subscription)
+        .where(Subscription.user_id == user_id, Subscription.id.in_(ids))
+        .values(is_active=is_active)
+    )
+
+
+def bulk_delete_statement(user_id: int, ids: List[int]) -> Delete:
+    """DELETE ... WHERE user_id = :u AND id IN (...)"""
+    return delete(Subscription).where(Subscription.user_id == user_id, Subscription.id.in_(ids))
+
+
+def export_statement(user_id: Optional[int] = None, batch_size: int = EXPORT_BATCH_SIZE) -> Select:
+    """按 ID 順序導出訂閱列值；user_id 為 None 時導出所有用戶
+
+    yield_per 讓結果以服務端遊標分批讀取，不一次性載入內存。
+    """
+    statement = select(*EXPORT_COLUMNS).order_by(Subscription.id)
+    if user_id is not None:
+        statement = statement.where(Subscription.user_id == user_id)
+    return statement.execution_options(yield_per=batch_size)
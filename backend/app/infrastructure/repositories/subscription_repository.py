@@ -1,10 +1,32 @@
-from typing import List, Optional
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 
 from app.domain.interfaces.repositories import ISubscriptionRepository
+from app.domain.interfaces.subscription_spec import SubscriptionSpec
 from app.infrastructure.repositories.base_repository import SQLAlchemyBaseRepository
-from app.models.subscription import Subscription
+from app.infrastructure.repositories.subscription_queries import (
+    EXPORT_BATCH_SIZE,
+    bulk_delete_statement,
+    bulk_set_active_statement,
+    category_cost_totals_statement,
+    chunked_ids,
+    export_statement,
+    keyset_page_statement,
+    list_count_statement,
+    owned_ids_statement,
+    spec_statement,
+    started_before_criteria,
+    to_category_cost_totals,
+)
+from app.infrastructure.repositories.subscription_count_cache import (
+    invalidate_after_commit,
+    pending_invalidations,
+    subscription_count_cache,
+)
+from app.models.subscription import Subscription, SubscriptionCategory, SubscriptionCycle
 
 class SubscriptionRepository(SQLAlchemyBaseRepository[Subscription], ISubscriptionRepository):
     """訂閱 Repository 實現"""
@@ -31,6 +53,13 @@ class SubscriptionRepository(SQLAlchemyBaseRepository[Subscription], ISubscripti
         except SQLAlchemyError:
             return []
     
+    def find(self, spec: SubscriptionSpec) -> List[Subscription]:
+        """按查詢規格獲取訂閱（單條 SQL 語句）"""
+        try:
+            return list(self._db_session.scalars(spec_statement(spec)))
+        except SQLAlchemyError:
+            return []
+    
     def get_by_user_and_id(self, user_id: int, subscription_id: int) -> Optional[Subscription]:
         """根據用戶 ID 和訂閱 ID 獲取訂閱"""
         try:
@@ -79,4 +108,126 @@ class SubscriptionRepository(SQLAlchemyBaseRepository[Subscription], ISubscripti
                 Subscription.is_active == True
             ).count()
         except SQLAlchemyError:
-            return 0
\ No newline at end of file
+            return 0
+    
+    def get_page(
+        self,
+        user_id: int,
+        limit: int,
+        after: Optional[Tuple[datetime, int]] = None,
+        include_inactive: bool = False,
+        category: Optional[SubscriptionCategory] = None
+    ) -> List[Subscription]:
+        """按 (created_at, id) 倒序獲取一頁訂閱（鍵集分頁），after 為上一頁最後一行的 (created_at, id)"""
+        try:
+            statement = keyset_page_statement(user_id, limit, after, include_inactive, category)
+            return list(self._db_session.scalars(statement))
+        except SQLAlchemyError:
+            return []
+    
+    def count_listed(
+        self, user_id: int, include_inactive: bool = False, category: Optional[SubscriptionCategory] = None
+    ) -> int:
+        """統計訂閱列表總數（優先讀取數量緩存，查詢期間有失效時不寫入緩存）"""
+        key = (include_inactive, category)
+        # 本事務中有未提交的修改時，緩存的數量不反映這些修改，查詢結果也只對本事務可見
+        pending = user_id in pending_invalidations(self._db_session)
+        count = None if pending else subscription_count_cache.get(user_id, key)
+        if count is None:
+            generation = subscription_count_cache.generation()
+            try:
+                count = self._db_session.scalar(list_count_statement(user_id, include_inactive, category))
+            except SQLAlchemyError:
+                return 0
+            if not pending:
+                subscription_count_cache.set(user_id, key, count, generation)
+        return count
+    
+    def get_category_cost_totals(self, user_id: int) -> Dict[str, Dict[str, float]]:
+        """按類別匯總活躍訂閱的數量、月度和年度成本"""
+        try:
+            rows = self._db_session.execute(category_cost_totals_statement(user_id))
+            return to_category_cost_totals(rows)
+        except SQLAlchemyError:
+            return {}
+    
+    def get_active_started_before(
+        self, user_id: int, cutoffs: Dict[SubscriptionCycle, datetime]
+    ) -> List[Subscription]:
+        """獲取各週期開始日期不晚於截止時間的活躍訂閱"""
+        try:
+            return self._db_session.query(Subscription).filter(
+                Subscription.user_id == user_id,
+                Subscription.is_active == True,
+                started_before_criteria(cutoffs)
+            ).order_by(Subscription.created_at.desc()).all()
+        except SQLAlchemyError:
+            return []
+    
+    def bulk_set_active(self, user_id: int, subscription_ids: Iterable[int], is_active: bool) -> List[int]:
+        """批量啟用 / 停用用戶的訂閱，返回受影響的訂閱 ID
+
+        每塊 ID 只發出一條 UPDATE ... WHERE user_id = :u AND id IN (...)，
+        不屬於該用戶或不存在的 ID 不受影響，也不出現在返回值中。
+        """
+        try:
+            affected = []
+            for chunk in chunked_ids(subscription_ids):
+                affected.extend(self._execute_bulk(
+                    bulk_set_active_statement(user_id, chunk, is_active),
+                    owned_ids_statement(user_id, chunk),
+                    self._db_session.get_bind().dialect.update_returning
+                ))
+            invalidate_after_commit(self._db_session, [user_id])
+            return sorted(affected)
+        except SQLAlchemyError as e:
+            self._db_session.rollback()
+            raise e
+    
+    def bulk_delete(self, user_id: int, subscription_ids: Iterable[int]) -> List[int]:
+        """批量刪除用戶的訂閱，返回被刪除的訂閱 ID（每塊 ID 一條 DELETE）"""
+        try:
+            affected = []
+            for chunk in chunked_ids(subscription_ids):
+                affected.extend(self._execute_bulk(
+                    bulk_delete_statement(user_id, chunk),
+                    owned_ids_statement(user_id, chunk),
+                    self._db_session.get_bind().dialect.delete_returning
+                ))
+            invalidate_after_commit(self._db_session, [user_id])
+            return sorted(affected)
+        except SQLAlchemyError as e:
+            self._db_session.rollback()
+            raise e
+    
+    def bulk_insert(self, rows: Sequence[Mapping]) -> int:
+        """批量插入訂閱（一條 executemany 形式的 INSERT），返回插入的行數
+
+        不構造 ORM 實體，也不回讀主鍵；rows 的鍵為 Subscription 的列名。
+        """
+        if not rows:
+            return 0
+        try:
+            self._db_session.execute(insert(Subscription), list(rows))
+            invalidate_after_commit(self._db_session, {row["user_id"] for row in rows})
+            return len(rows)
+        except SQLAlchemyError as e:
+            self._db_session.rollback()
+            raise e
+    
+    def iter_export_rows(self, user_id: Optional[int], batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[Any]:
+        """逐行迭代導出的訂閱列值（每次從遊標讀取 batch_size 行）；user_id 為 None 時包含所有用戶"""
+        result = self._db_session.execute(export_statement(user_id, batch_size))
+        try:
+            yield from result
+        finally:
+            result.close()
+    
+    def _execute_bulk(self, statement, owned_ids, supports_returning: bool) -> List[int]:
+        """執行批量語句並返回受影響的 ID；數據庫不支持 RETURNING 時先查出屬於該用戶的 ID"""
+        if supports_returning:
+            return list(self._db_session.execute(statement.returning(Subscription.id)).scalars())
+        ids = list(self._db_session.execute(owned_ids).scalars())
+        if ids:
+            self._db_session.execute(statement)
+        return ids
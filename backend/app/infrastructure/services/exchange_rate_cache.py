@@ -0,0 +1,141 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class ExchangeRateCache:
+    """進程內共享的匯率緩存
+
+    讀寫之間沒有 await，單個事件循環內的並發協程不會交錯；
+    另加線程鎖，供線程池中運行的同步端點安全共用。
+    同一個鍵的並發未命中只觸發一次加載，其餘調用者等待同一個結果。
+    設置 max_staleness 後，過期但未超出該時長的值會直接返回，同時在後台重新加載。
+    """
+
+    def __init__(self, ttl: timedelta = timedelta(hours=1), max_staleness: Optional[timedelta] = None):
+        self._ttl = ttl
+        self._max_staleness = max_staleness
+        self._entries: Dict[str, Tuple[Any, datetime]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.loads = 0
+        self.coalesced = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """獲取未過期的緩存值，並記錄命中 / 未命中"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and datetime.now() - entry[1] < self._ttl:
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def get_stale(self, key: str, max_staleness: Optional[timedelta] = None) -> Optional[Any]:
+        """獲取緩存值（包括已過期的），不計入統計
+
+        指定 max_staleness 時，過期超過該時長的值視為不存在。
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if max_staleness is not None and datetime.now() - entry[1] > self._ttl + max_staleness:
+                return None
+            return entry[0]
+
+    def age(self, key: str) -> Optional[float]:
+        """緩存值產生至今的秒數，不存在時返回 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return (datetime.now() - entry[1]).total_seconds() if entry is not None else None
+
+    def set(self, key: str, value: Any, stored_at: Optional[datetime] = None) -> None:
+        """寫入緩存；stored_at 為數據產生的時間，默認為當前時間"""
+        with self._lock:
+            self._entries[key] = (value, stored_at or datetime.now())
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]], wait: bool = True) -> Any:
+        """獲取緩存值，未命中時加載；同一鍵同時只有一個加載在進行
+
+        wait=False 時沒有可用值也不等待加載：在後台啟動加載後立即返回 None，
+        由調用方使用備用值（用於已有後台刷新器、請求路徑不應等待上游的情況）。
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        if self._max_staleness is not None:
+            stale = self.get_stale(key, self._max_staleness)
+            if stale is not None:
+                # 先返回舊值，由後台任務完成刷新
+                with self._lock:
+                    self.stale_hits += 1
+                self._start_load(key, loader)
+                return stale
+
+        if not wait:
+            self._start_load(key, loader)
+            return None
+
+        return await self.refresh(key, loader)
+
+    async def refresh(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """無論緩存是否過期都重新加載；已有加載在進行時等待同一個結果"""
+        # shield: 單個調用者被取消不應中斷其他調用者共享的加載
+        return await asyncio.shield(self._start_load(key, loader))
+
+    def _start_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            inflight = self._inflight.get(key)
+            # 其他事件循環（例如另一個線程）的 Future 無法在此等待
+            if inflight is not None and inflight.get_loop() is loop:
+                self.coalesced += 1
+                return inflight
+            inflight = loop.create_task(self._load(key, loader))
+            self._inflight[key] = inflight
+        # 後台刷新可能無人等待，取出異常避免 "exception was never retrieved"
+        inflight.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return inflight
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            with self._lock:
+                self.loads += 1
+            value = await loader()
+            if value is not None:
+                self.set(key, value)
+            return value
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is asyncio.current_task():
+                    del self._inflight[key]
+
+    def clear(self) -> None:
+        """清空緩存和統計"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.stale_hits = 0
+            self.loads = 0
+            self.coalesced = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """緩存統計"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "stale_hits": self.stale_hits,
+                "loads": self.loads,
+                "coalesced": self.coalesced,
+            }
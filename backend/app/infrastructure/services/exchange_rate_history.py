@@ -0,0 +1,72 @@
+import asyncio
+import logging
+from datetime import date, datetime, time
+from typing import Callable, Mapping, Optional, Union
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.database.connection import SessionLocal
+from app.infrastructure.repositories.exchange_rate_repository import ExchangeRateRepository
+from app.infrastructure.services.rate_matrix import RateMatrix
+
+logger = logging.getLogger(__name__)
+
+
+def end_of_day(on: Union[date, datetime]) -> datetime:
+    """日期按當天結束時刻計算，即當天最後一次刷新的匯率生效"""
+    if isinstance(on, datetime):
+        return on
+    return datetime.combine(on, time.max)
+
+
+class ExchangeRateHistory:
+    """匯率歷史存儲
+
+    匯率來源每次刷新後寫入完整匯率表；啟動時用最新一張預熱緩存，
+    並可按日期查找當時生效的匯率，不需要調用外部 API。
+    數據庫操作在線程池中執行，不阻塞事件循環；出錯時記錄日誌並視為無數據。
+    """
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self._session_factory = session_factory
+
+    async def save(self, base: str, quotes: Mapping[str, float], as_of: datetime) -> int:
+        """寫入一張匯率表，返回寫入的行數"""
+        return await asyncio.to_thread(self._save, base, dict(quotes), as_of)
+
+    async def latest(self, base: Optional[str] = None) -> Optional[RateMatrix]:
+        """最新一張匯率表構成的矩陣"""
+        return await asyncio.to_thread(self._load, base, None)
+
+    async def effective_on(self, on: Union[date, datetime], base: Optional[str] = None) -> Optional[RateMatrix]:
+        """在指定日期 / 時刻生效的匯率矩陣；早於最早記錄時返回 None"""
+        return await asyncio.to_thread(self._load, base, end_of_day(on))
+
+    def _save(self, base: str, quotes: Mapping[str, float], as_of: datetime) -> int:
+        db = self._session_factory()
+        try:
+            written = ExchangeRateRepository(db).add_snapshot(base, quotes, as_of)
+            db.commit()
+            return written
+        except SQLAlchemyError as e:
+            logger.warning(f"匯率歷史寫入失敗: {e}")
+            return 0
+        finally:
+            db.close()
+
+    def _load(self, base: Optional[str], on: Optional[datetime]) -> Optional[RateMatrix]:
+        try:
+            with self._session_factory() as db:
+                snapshot = ExchangeRateRepository(db).get_snapshot(base, on)
+        except SQLAlchemyError as e:
+            logger.warning(f"匯率歷史讀取失敗: {e}")
+            return None
+        if snapshot is None:
+            return None
+        snapshot_base, as_of, quotes = snapshot
+        return RateMatrix.from_quotes(snapshot_base, quotes, as_of=as_of)
+
+
+# 全局實例
+exchange_rate_history = ExchangeRateHistory()
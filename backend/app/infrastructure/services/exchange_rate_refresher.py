@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Protocol
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshableRateSource(Protocol):
+    """可由後台刷新的匯率來源"""
+
+    async def refresh_rate_matrix(self) -> Optional[Any]:
+        ...
+
+    def rate_age(self) -> Optional[float]:
+        ...
+
+    def set_background_refresh(self, enabled: bool) -> None:
+        ...
+
+
+class ExchangeRateRefresher:
+    """後台匯率刷新器
+
+    在緩存過期之前定期刷新匯率矩陣，請求路徑不必等待上游 API；
+    刷新失敗時按較短的間隔重試，期間請求繼續使用緩存中的舊匯率。
+    運行期間匯率來源切換為不等待加載：沒有可用匯率時請求直接使用預設匯率，
+    不會在上游故障時每次都等到超時。
+    """
+
+    def __init__(self, source: RefreshableRateSource, interval: float, retry_interval: float = 60.0):
+        self._source = source
+        self._interval = interval
+        self._retry_interval = min(retry_interval, interval)
+        self._task: Optional[asyncio.Task] = None
+        self.refreshes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_refresh_seconds: Optional[float] = None
+        self.last_success_at: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """在當前事件循環中啟動刷新任務"""
+        if not self.running:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            self._source.set_background_refresh(True)
+
+    async def stop(self) -> None:
+        """停止刷新任務"""
+        if self._task is None:
+            return
+        self._source.set_background_refresh(False)
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def refresh_once(self) -> bool:
+        """執行一次刷新並記錄耗時，返回是否成功"""
+        start = time.perf_counter()
+        try:
+            matrix = await self._source.refresh_rate_matrix()
+            error = None if matrix is not None else "匯率來源未返回數據"
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        self.last_refresh_seconds = time.perf_counter() - start
+        self.refreshes += 1
+
+        if error is None:
+            self.consecutive_failures = 0
+            self.last_success_at = datetime.now()
+            self.last_error = None
+            return True
+
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_error = error
+        logger.warning(f"匯率刷新失敗（連續 {self.consecutive_failures} 次）: {error}")
+        return False
+
+    async def _run(self) -> None:
+        while True:
+            succeeded = await self.refresh_once()
+            await asyncio.sleep(self._interval if succeeded else self._retry_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        """刷新指標：刷新耗時、失敗次數和當前匯率的年齡"""
+        rate_age = self._source.rate_age()
+        return {
+            "running": self.running,
+            "interval_seconds": self._interval,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "last_refresh_ms": round(self.last_refresh_seconds * 1000, 2) if self.last_refresh_seconds is not None else None,
+            "last_success_at": self.last_success_at.isoformat() if self.last_success_at else None,
+            "last_error": self.last_error,
+            "rate_age_seconds": round(rate_age, 1) if rate_age is not None else None,
+        }
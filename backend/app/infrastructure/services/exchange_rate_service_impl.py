@@ -1,18 +1,30 @@
-from typing import Dict
+from typing import Any, Dict, Optional, Union
 from decimal import Decimal
-import httpx
 import asyncio
-from datetime import datetime, timedelta
+import logging
+from datetime import date, datetime, timedelta
 
+from app.core.config import settings
 from app.domain.interfaces.services import IExchangeRateService
+from app.infrastructure.services.exchange_rate_cache import ExchangeRateCache
+from app.infrastructure.services.exchange_rate_history import ExchangeRateHistory, exchange_rate_history
+from app.infrastructure.services.rate_matrix import RateMatrix
+
+RATE_MATRIX_KEY = "rate_matrix"
+
+logger = logging.getLogger(__name__)
 
 class ExchangeRateServiceImpl(IExchangeRateService):
     """匯率服務實現"""
     
-    def __init__(self):
-        self._cache = {}
-        self._cache_expiry = {}
-        self._cache_duration = timedelta(hours=1)  # 緩存1小時
+    def __init__(self, cache: Optional[ExchangeRateCache] = None, history: Optional[ExchangeRateHistory] = None):
+        self._cache_duration = timedelta(seconds=settings.exchange_rate_cache_ttl)
+        self._max_staleness = timedelta(seconds=settings.exchange_rate_max_staleness)
+        self._cache = cache or ExchangeRateCache(self._cache_duration, self._max_staleness)
+        # 匯率歷史（可選）：用於按日期查詢當時生效的匯率
+        self._history = history
+        # 後台刷新器運行時為 True：請求路徑不重建矩陣，沿用緩存中的矩陣
+        self._background_refresh = False
         
         # 支持的貨幣
         self._supported_currencies = {
@@ -40,66 +52,83 @@ class ExchangeRateServiceImpl(IExchangeRateService):
         if from_currency == to_currency:
             return Decimal("1.0")
         
-        cache_key = f"{from_currency}_{to_currency}"
-        
-        # 檢查緩存
-        if self._is_cache_valid(cache_key):
-            return self._cache[cache_key]
-        
-        # 獲取匯率
         rate = await self._fetch_exchange_rate(from_currency, to_currency)
         
-        # 更新緩存
-        self._cache[cache_key] = rate
-        self._cache_expiry[cache_key] = datetime.now() + self._cache_duration
+        # 如果都找不到，返回默認匯率
+        return rate if rate is not None else Decimal("1.0")
+    
+    async def get_exchange_rate_on(
+        self, from_currency: str, to_currency: str, on: Union[date, datetime]
+    ) -> Decimal:
+        """獲取指定日期生效的匯率；沒有該日期的歷史記錄時使用當前匯率"""
+        if from_currency == to_currency:
+            return Decimal("1.0")
+        
+        if self._history is not None:
+            matrix = await self._history.effective_on(on)
+            rate = matrix.rate(from_currency, to_currency) if matrix is not None else None
+            if rate is not None:
+                return Decimal(str(rate))
         
-        return rate
+        return await self.get_exchange_rate(from_currency, to_currency)
     
-    async def convert_currency(self, amount: float, from_currency: str, to_currency: str) -> float:
-        """貨幣轉換"""
+    async def convert_currency(
+        self, amount: float, from_currency: str, to_currency: str, on: Optional[Union[date, datetime]] = None
+    ) -> float:
+        """貨幣轉換；指定 on 時使用該日期生效的匯率"""
         if from_currency == to_currency:
             return amount
         
-        rate = await self.get_exchange_rate(from_currency, to_currency)
+        if on is not None:
+            rate = await self.get_exchange_rate_on(from_currency, to_currency, on)
+        else:
+            rate = await self.get_exchange_rate(from_currency, to_currency)
         return float(Decimal(str(amount)) * rate)
     
     async def get_supported_currencies(self) -> Dict[str, str]:
         """獲取支持的貨幣列表"""
         return self._supported_currencies.copy()
     
-    def _is_cache_valid(self, cache_key: str) -> bool:
-        """檢查緩存是否有效"""
-        if cache_key not in self._cache:
-            return False
-        
-        if cache_key not in self._cache_expiry:
-            return False
-        
-        return datetime.now() < self._cache_expiry[cache_key]
+    def cache_stats(self) -> Dict[str, Any]:
+        """獲取緩存命中統計"""
+        return self._cache.stats()
     
-    async def _fetch_exchange_rate(self, from_currency: str, to_currency: str) -> Decimal:
-        """獲取匯率數據"""
-        # 首先嘗試直接查找
-        rate_key = (from_currency, to_currency)
-        if rate_key in self._mock_rates:
-            return self._mock_rates[rate_key]
-        
-        # 嘗試反向查找
-        reverse_key = (to_currency, from_currency)
-        if reverse_key in self._mock_rates:
-            return Decimal("1") / self._mock_rates[reverse_key]
-        
-        # 通過TWD作為中間貨幣
-        if from_currency != "TWD" and to_currency != "TWD":
-            try:
-                from_to_twd = await self.get_exchange_rate(from_currency, "TWD")
-                twd_to_target = await self.get_exchange_rate("TWD", to_currency)
-                return from_to_twd * twd_to_target
-            except:
-                pass
-        
-        # 如果都找不到，返回默認匯率
-        return Decimal("1.0")
+    async def get_rate_matrix(self) -> RateMatrix:
+        """獲取交叉匯率矩陣；過期時整體重建，並發請求共享一次重建
+
+        後台刷新器運行時，過期但未超出最長過期時間的矩陣直接返回，由刷新器負責重建。
+        """
+        if self._background_refresh:
+            matrix = self._cache.get_stale(RATE_MATRIX_KEY, self._max_staleness)
+            if matrix is not None:
+                return matrix
+        return await self._cache.get_or_load(RATE_MATRIX_KEY, self._build_rate_matrix)
+    
+    async def refresh_rate_matrix(self) -> RateMatrix:
+        """強制重建匯率矩陣（供後台刷新器調用）"""
+        return await self._cache.refresh(RATE_MATRIX_KEY, self._build_rate_matrix)
+    
+    def set_background_refresh(self, enabled: bool) -> None:
+        """由後台刷新器在啟動 / 停止時調用"""
+        self._background_refresh = enabled
+    
+    def rate_age(self) -> Optional[float]:
+        """當前緩存匯率的年齡（秒）"""
+        return self._cache.age(RATE_MATRIX_KEY)
+    
+    async def _build_rate_matrix(self) -> RateMatrix:
+        """由各貨幣兌台幣的匯率推導出全部交叉匯率"""
+        values = {
+            from_currency: rate
+            for (from_currency, to_currency), rate in self._mock_rates.items()
+            if to_currency == "TWD"
+        }
+        return RateMatrix.from_values("TWD", values)
+    
+    async def _fetch_exchange_rate(self, from_currency: str, to_currency: str) -> Optional[Decimal]:
+        """從匯率矩陣查找匯率"""
+        matrix = await self.get_rate_matrix()
+        return matrix.rate(from_currency, to_currency)
     
     async def _fetch_from_external_api(self, from_currency: str, to_currency: str) -> Decimal:
         """從外部API獲取匯率（實際實現時使用）"""
@@ -110,16 +139,19 @@ class ExchangeRateServiceImpl(IExchangeRateService):
         # - Alpha Vantage
         
         try:
-            async with httpx.AsyncClient() as client:
-                # 示例API調用（需要替換為真實的API）
-                # response = await client.get(f"https://api.exchangerate-api.com/v4/latest/{from_currency}")
-                # data = response.json()
-                # return Decimal(str(data["rates"][to_currency]))
-                pass
+            # 示例API調用（需要替換為真實的API，使用共享的 get_http_client()）
+            # response = await get_http_client().get(f"https://api.exchangerate-api.com/v4/latest/{from_currency}")
+            # data = response.json()
+            # return Decimal(str(data["rates"][to_currency]))
+            pass
         except Exception as e:
             # API調用失敗時的回退邏輯
-            print(f"外部匯率API調用失敗: {e}")
+            logger.warning(f"外部匯率API調用失敗: {e}")
             return await self._fetch_exchange_rate(from_currency, to_currency)
         
         # 暫時返回模擬數據
-        return await self._fetch_exchange_rate(from_currency, to_currency)
\ No newline at end of file
+        return await self._fetch_exchange_rate(from_currency, to_currency)
+
+
+# 進程內共享的匯率服務實例，DI 容器和 FastAPI 依賴都使用它
+exchange_rate_service = ExchangeRateServiceImpl(history=exchange_rate_history)
@@ -0,0 +1,227 @@
+import argparse
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Protocol, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.database.connection import SessionLocal
+from app.infrastructure.services.rate_matrix import RateMatrix
+from app.models.subscription import Currency, Subscription
+
+# 進度檢查點：貨幣 -> 已處理到的最大 ID（含）
+Checkpoint = Dict[str, int]
+
+
+@dataclass
+class RevaluationReport:
+    """重估結果"""
+    rows_changed: Dict[str, int] = field(default_factory=dict)
+    chunks: int = 0
+    elapsed_seconds: float = 0.0
+    checkpoint: Checkpoint = field(default_factory=dict)
+    # 本次使用的匯率（各貨幣兌目標貨幣）及其時間；續跑時與中斷前相同
+    rates: Dict[str, float] = field(default_factory=dict)
+    as_of: Optional[datetime] = None
+    resumed: bool = False
+
+    @property
+    def total_changed(self) -> int:
+        return sum(self.rows_changed.values())
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "rows_changed": dict(self.rows_changed),
+            "total_changed": self.total_changed,
+            "chunks": self.chunks,
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "rates": dict(self.rates),
+            "as_of": self.as_of.isoformat() if self.as_of else None,
+            "resumed": self.resumed,
+        }
+
+
+class CurrentRateSource(Protocol):
+    """提供當前匯率矩陣的匯率來源"""
+
+    async def preload_rate_history(self) -> bool:
+        ...
+
+    async def get_rate_matrix(self) -> Optional[Any]:
+        ...
+
+
+class PriceRevaluation:
+    """訂閱台幣價格批量重估
+
+    按貨幣發出集合式 UPDATE：SET price = original_price * :rate WHERE currency = :c，
+    並按主鍵區間分塊提交，限制每個事務的鎖持有時間。
+    只更新價格實際變化的行；每塊提交後記錄檢查點，中斷後從檢查點繼續即可。
+
+    重估把所有訂閱按同一份匯率換算為現值（rebase），不沿用創建 / 導入 / 更新時
+    按開始日期生效匯率計算的價格：運行後 price 表示按重估所用匯率的台幣價值。
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        chunk_size: int = 5000,
+        target_currency: str = Currency.TWD.value
+    ):
+        self._session_factory = session_factory
+        self._chunk_size = chunk_size
+        self._target_currency = target_currency
+
+    def run(
+        self,
+        matrix: RateMatrix,
+        checkpoint: Optional[Checkpoint] = None,
+        on_chunk: Optional[Callable[[Checkpoint], None]] = None
+    ) -> RevaluationReport:
+        """按匯率矩陣重估所有訂閱價格
+
+        checkpoint 為上次中斷時的進度；on_chunk 在每塊提交後以最新檢查點調用，可用於持久化進度。
+        """
+        start = time.perf_counter()
+        rates = matrix.rates_to(self._target_currency)
+        report = RevaluationReport(
+            checkpoint=dict(checkpoint or {}),
+            rates={currency: float(rate) for currency, rate in rates.items()},
+            as_of=matrix.as_of,
+            resumed=bool(checkpoint)
+        )
+
+        db = self._session_factory()
+        try:
+            max_id = db.execute(select(func.max(Subscription.id))).scalar() or 0
+            for currency in sorted(rates):
+                rate = float(rates[currency])
+                report.rows_changed.setdefault(currency, 0)
+                low = report.checkpoint.get(currency, 0)
+                while low < max_id:
+                    high = low + self._chunk_size
+                    changed = self._revalue_chunk(db, currency, rate, low, high)
+                    db.commit()
+                    report.rows_changed[currency] += changed
+                    report.chunks += 1
+                    report.checkpoint[currency] = high
+                    low = high
+                    if on_chunk is not None:
+                        on_chunk(dict(report.checkpoint))
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        report.elapsed_seconds = time.perf_counter() - start
+        return report
+
+    def run_with_checkpoint(self, path: Path, load_matrix: Callable[[], RateMatrix]) -> RevaluationReport:
+        """運行重估，每塊提交後把進度連同所用匯率寫入檢查點文件
+
+        檢查點文件存在時沿用其中記錄的匯率續跑，不調用 load_matrix，
+        保證中斷前後的行使用同一份匯率；完成後刪除檢查點。
+        """
+        saved = load_checkpoint(path, self._target_currency)
+        if saved is not None:
+            matrix, checkpoint = saved
+        else:
+            matrix, checkpoint = load_matrix(), None
+
+        report = self.run(
+            matrix,
+            checkpoint=checkpoint,
+            on_chunk=lambda progress: save_checkpoint(path, matrix, progress, self._target_currency)
+        )
+        path.unlink(missing_ok=True)
+        return report
+
+    @staticmethod
+    def _revalue_chunk(db: Session, currency: str, rate: float, low: int, high: int) -> int:
+        new_price = Subscription.original_price * rate
+        result = db.execute(
+            update(Subscription)
+            .where(
+                Subscription.id > low,
+                Subscription.id <= high,
+                Subscription.currency == Currency(currency),
+                Subscription.price != new_price
+            )
+            .values(price=new_price)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+
+def save_checkpoint(path: Path, matrix: RateMatrix, progress: Checkpoint, target_currency: str) -> None:
+    """寫入檢查點：進度、目標貨幣、匯率時間和各貨幣兌目標貨幣的匯率"""
+    path.write_text(json.dumps({
+        "target_currency": target_currency,
+        "as_of": matrix.as_of.isoformat(),
+        "rates": {currency: float(rate) for currency, rate in matrix.rates_to(target_currency).items()},
+        "progress": progress,
+    }))
+
+
+def load_checkpoint(path: Path, target_currency: str) -> Optional[Tuple[RateMatrix, Checkpoint]]:
+    """讀取檢查點，返回 (中斷前使用的匯率矩陣, 進度)；文件不存在時返回 None
+
+    沒有記錄匯率（舊格式）或目標貨幣不同的檢查點無法保證續跑結果一致，拋出 ValueError。
+    """
+    if not path.exists():
+        return None
+    state = json.loads(path.read_text())
+    if "rates" not in state or state.get("target_currency") != target_currency:
+        raise ValueError(f"檢查點 {path} 沒有記錄 {target_currency} 匯率，無法續跑；刪除後重新運行")
+    matrix = RateMatrix.from_values(
+        target_currency, state["rates"], as_of=datetime.fromisoformat(state["as_of"])
+    )
+    return matrix, state["progress"]
+
+
+async def current_rate_matrix(source: CurrentRateSource) -> RateMatrix:
+    """當前匯率矩陣：先從匯率歷史預熱，過期時從外部 API 更新
+
+    兩者都沒有可用匯率時拋出 RuntimeError，不用預設匯率覆蓋訂閱價格。
+    """
+    await source.preload_rate_history()
+    matrix = await source.get_rate_matrix()
+    if matrix is None:
+        raise RuntimeError("無法從匯率歷史或外部 API 獲取當前匯率，未重估任何訂閱")
+    return matrix
+
+
+def main() -> None:
+    """命令行入口：把全部訂閱價格按當前匯率換算為現值，支持斷點續跑"""
+    from app.core.http_client import close_http_client
+    from app.services.exchange_rate_service import exchange_rate_service
+
+    parser = argparse.ArgumentParser(
+        description="按當前匯率批量重估訂閱台幣價格（換算為現值，覆蓋按開始日期匯率計算的價格）"
+    )
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--checkpoint", type=Path, default=Path("revaluation_checkpoint.json"))
+    args = parser.parse_args()
+
+    async def load_matrix() -> RateMatrix:
+        try:
+            return await current_rate_matrix(exchange_rate_service)
+        finally:
+            await close_http_client()
+
+    # 續跑時沿用檢查點中的匯率，只有從頭開始時才獲取當前匯率
+    report = PriceRevaluation(chunk_size=args.chunk_size).run_with_checkpoint(
+        args.checkpoint,
+        lambda: asyncio.run(load_matrix())
+    )
+    print(json.dumps(report.to_dict(), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+from datetime import datetime
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+
+from app.models.subscription import Currency
+
+SUPPORTED_CURRENCIES = [currency.value for currency in Currency]
+
+
+class RateMatrix:
+    """交叉匯率矩陣
+
+    由一張基準匯率表一次推導出所有支持貨幣之間的匯率，構建後不再修改；
+    刷新時整體替換為新的矩陣實例，讀取方不會看到新舊混合的匯率。
+    """
+
+    def __init__(self, rates: Dict[Tuple[str, str], object], as_of: Optional[datetime] = None):
+        self._rates = rates
+        self.as_of = as_of or datetime.now()
+
+    @classmethod
+    def from_quotes(
+        cls,
+        base: str,
+        quotes: Mapping[str, object],
+        currencies: Iterable[str] = SUPPORTED_CURRENCIES,
+        as_of: Optional[datetime] = None
+    ) -> "RateMatrix":
+        """由報價表構建：quotes[c] 為 1 單位 base 可兌換的 c 數量（外部 API 的 latest/{base} 格式）"""
+        quotes = dict(quotes)
+        quotes.setdefault(base, 1)
+        available = [c for c in currencies if quotes.get(c)]
+        rates = {
+            (source, target): 1 if source == target else quotes[target] / quotes[source]
+            for source in available
+            for target in available
+        }
+        return cls(rates, as_of)
+
+    @classmethod
+    def from_values(
+        cls,
+        base: str,
+        values: Mapping[str, object],
+        currencies: Iterable[str] = SUPPORTED_CURRENCIES,
+        as_of: Optional[datetime] = None
+    ) -> "RateMatrix":
+        """由價值表構建：values[c] 為 1 單位 c 折合的 base 數量"""
+        values = dict(values)
+        values.setdefault(base, 1)
+        available = [c for c in currencies if values.get(c)]
+        rates = {
+            (source, target): 1 if source == target else values[source] / values[target]
+            for source in available
+            for target in available
+        }
+        return cls(rates, as_of)
+
+    def rate(self, from_currency: str, to_currency: str) -> Optional[object]:
+        """查詢匯率，貨幣不在矩陣中時返回 None"""
+        return self._rates.get((from_currency, to_currency))
+
+    def rates_to(self, to_currency: str) -> Dict[str, object]:
+        """所有貨幣兌換為指定貨幣的匯率"""
+        return {
+            source: rate
+            for (source, target), rate in self._rates.items()
+            if target == to_currency
+        }
+
+    @property
+    def currencies(self) -> list:
+        return sorted({source for source, _ in self._rates})
+
+    def __len__(self) -> int:
+        return len(self._rates)
@@ -1,11 +1,15 @@
 from typing import Optional
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import InvalidRequestError, SQLAlchemyError
 
 from app.domain.interfaces.repositories import IUnitOfWork, IUserRepository, ISubscriptionRepository, IBudgetRepository
 from app.infrastructure.repositories.user_repository import UserRepository
 from app.infrastructure.repositories.subscription_repository import SubscriptionRepository
 from app.infrastructure.repositories.budget_repository import BudgetRepository
+from app.infrastructure.repositories.async_user_repository import AsyncUserRepository
+from app.infrastructure.repositories.async_subscription_repository import AsyncSubscriptionRepository
+from app.infrastructure.repositories.async_budget_repository import AsyncBudgetRepository
 
 class SQLAlchemyUnitOfWork(IUnitOfWork):
     """SQLAlchemy Unit of Work 實現"""
@@ -41,7 +45,11 @@ class SQLAlchemyUnitOfWork(IUnitOfWork):
     def begin(self):
         """開始事務"""
         if not self._transaction_started:
-            self._db_session.begin()
+            try:
+                self._db_session.begin()
+            except InvalidRequestError:
+                # 之前的讀取已自動開啟事務，此時沿用該事務
+                pass
             self._transaction_started = True
     
     def commit(self):
@@ -83,4 +91,87 @@ class SQLAlchemyUnitOfWork(IUnitOfWork):
             self.rollback()
         else:
             self.commit()
-        self.close()
\ No newline at end of file
+        self.close()
+
+class AsyncSQLAlchemyUnitOfWork(IUnitOfWork):
+    """SQLAlchemy 異步 Unit of Work 實現
+    
+    基於 AsyncSession，事務方法與 Repository 方法均為協程，需要 await。
+    """
+    
+    def __init__(self, db_session: AsyncSession):
+        self._db_session = db_session
+        self._users: Optional[AsyncUserRepository] = None
+        self._subscriptions: Optional[AsyncSubscriptionRepository] = None
+        self._budgets: Optional[AsyncBudgetRepository] = None
+        self._transaction_started = False
+    
+    @property
+    def users(self) -> AsyncUserRepository:
+        """用戶 Repository"""
+        if self._users is None:
+            self._users = AsyncUserRepository(self._db_session)
+        return self._users
+    
+    @property
+    def subscriptions(self) -> AsyncSubscriptionRepository:
+        """訂閱 Repository"""
+        if self._subscriptions is None:
+            self._subscriptions = AsyncSubscriptionRepository(self._db_session)
+        return self._subscriptions
+    
+    @property
+    def budgets(self) -> AsyncBudgetRepository:
+        """預算 Repository"""
+        if self._budgets is None:
+            self._budgets = AsyncBudgetRepository(self._db_session)
+        return self._budgets
+    
+    async def begin(self):
+        """開始事務"""
+        if not self._transaction_started:
+            # 之前的讀取可能已自動開啟事務，此時沿用該事務
+            if not self._db_session.in_transaction():
+                await self._db_session.begin()
+            self._transaction_started = True
+    
+    async def commit(self):
+        """提交事務"""
+        try:
+            if self._transaction_started:
+                await self._db_session.commit()
+                self._transaction_started = False
+        except SQLAlchemyError as e:
+            await self.rollback()
+            raise e
+    
+    async def rollback(self):
+        """回滾事務"""
+        try:
+            if self._transaction_started:
+                await self._db_session.rollback()
+                self._transaction_started = False
+        except SQLAlchemyError:
+            pass  # 回滾失敗也沒關係
+    
+    async def close(self):
+        """關閉會話"""
+        try:
+            if self._transaction_started:
+                await self.rollback()
+            await self._db_session.close()
+        except SQLAlchemyError:
+            pass
+    
+    async def __aenter__(self):
+        """異步上下文管理器進入"""
+        await self.begin()
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """異步上下文管理器退出"""
+        if exc_type is not None:
+            await self.rollback()
+        else:
+            await self.commit()
+        await self.close()
@@ -1,16 +1,28 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from slowapi.errors import RateLimitExceeded
-from app.database.connection import create_tables
+from app.database.connection import create_tables, get_pool_status
 from app.core.config import settings
 from app.core.rate_limiter import (
     limiter, 
     rate_limit_exceeded_handler,
     get_rate_limiter_status
 )
-from app.core.logging_config import setup_logging, app_logger
-from app.middleware.logging_middleware import LoggingMiddleware, SecurityLoggingMiddleware
+from app.core.logging_config import setup_logging, shutdown_logging, get_logging_stats, app_logger
+from app.core.http_client import start_http_client, close_http_client, get_http_client_status
+from app.core.user_cache import authenticated_user_cache
+from app.core.token_cache import verified_token_cache
+from app.core.password_hasher import password_hasher
+from app.core.metrics import metrics_registry
+from app.core.access_log import access_log_sampler
+from app.common.middleware import RequestPipelineMiddleware
 from app.api import auth, subscriptions, budget, exchange_rates
+from app.services.exchange_rate_service import exchange_rate_service
+from app.infrastructure.services.exchange_rate_refresher import ExchangeRateRefresher
+
+# 匯率後台刷新器
+exchange_rate_refresher = ExchangeRateRefresher(exchange_rate_service, settings.exchange_rate_refresh_interval)
 
 # 創建 FastAPI 應用
 app = FastAPI(
@@ -32,9 +44,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 添加日誌中間件
-app.add_middleware(LoggingMiddleware)
-app.add_middleware(SecurityLoggingMiddleware)
+# 請求 ID、計時、訪問日誌和安全事件日誌在同一個純 ASGI 中間件中完成
+app.add_middleware(
+    RequestPipelineMiddleware,
+    validate_requests=False,
+    security_headers=False,
+    access_log=True,
+    security_log=True
+)
 
 # 啟動時創建數據庫表
 @app.on_event("startup")
@@ -46,6 +63,27 @@ async def startup_event():
     # 創建數據庫表
     create_tables()
     app_logger.info("數據庫表初始化完成")
+    
+    # 對外 HTTP 請求共享一個連接池
+    await start_http_client()
+    
+    # 從匯率歷史預熱緩存，再定期刷新，請求路徑不再等待上游 API
+    if await exchange_rate_service.preload_rate_history():
+        app_logger.info("已從匯率歷史預熱匯率緩存")
+    exchange_rate_refresher.start()
+    
+    # 多進程指標快照在後台定期寫入，不佔用請求路徑
+    metrics_registry.start_flusher()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await exchange_rate_refresher.stop()
+    await close_http_client()
+    password_hasher.shutdown()
+    await metrics_registry.stop_flusher()
+    metrics_registry.flush()
+    access_log_sampler.flush()
+    shutdown_logging()
 
 # 根路由
 @app.get("/")
@@ -61,9 +99,26 @@ async def root():
 async def health_check():
     return {
         "status": "healthy",
-        "rate_limiter": get_rate_limiter_status()
+        "rate_limiter": get_rate_limiter_status(),
+        "database": get_pool_status(),
+        "exchange_rate_cache": exchange_rate_service.cache_stats(),
+        "exchange_rate_refresher": exchange_rate_refresher.stats(),
+        "http_client": get_http_client_status(),
+        "token_cache": verified_token_cache.stats(),
+        "auth_user_cache": authenticated_user_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "logging": get_logging_stats(),
+        "access_log": access_log_sampler.stats()
     }
 
+# Prometheus 文本格式指標（多 worker 部署時合併全部 worker）
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(
+        metrics_registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
 # 包含路由
 app.include_router(auth.router, prefix="/api")
 app.include_router(subscriptions.router, prefix="/api")
@@ -1,14 +1,21 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.exceptions import RequestValidationError
 from pydantic import ValidationError
 from sqlalchemy.exc import SQLAlchemyError
 from slowapi.errors import RateLimitExceeded
 
-from app.database.connection import create_tables
+from app.database.connection import create_tables, dispose_async_engine, get_pool_status
 from app.core.config import settings
 from app.core.rate_limiter import limiter, rate_limit_exceeded_handler
-from app.core.logging_config import setup_logging, app_logger
+from app.core.logging_config import setup_logging, shutdown_logging, get_logging_stats, app_logger
+from app.core.http_client import start_http_client, close_http_client, get_http_client_status
+from app.core.user_cache import authenticated_user_cache
+from app.core.token_cache import verified_token_cache
+from app.core.password_hasher import password_hasher
+from app.core.metrics import metrics_registry
+from app.core.access_log import access_log_sampler
 from app.common.exception_handlers import (
     application_exception_handler,
     http_exception_handler,
@@ -18,19 +25,23 @@ from app.common.exception_handlers import (
     generic_exception_handler
 )
 from app.common.exceptions import ApplicationException
-from app.common.middleware import (
-    RequestValidationMiddleware,
-    ResponseHeadersMiddleware,
-    RequestTimingMiddleware,
-    RequestIDMiddleware,
-    APIMetricsMiddleware
-)
+from app.common.middleware import RequestPipelineMiddleware
 from app.infrastructure.container import configure_container
+from app.infrastructure.services.exchange_rate_service_impl import exchange_rate_service
+from app.infrastructure.services.exchange_rate_refresher import ExchangeRateRefresher
+from app.services.exchange_rate_service import exchange_rate_service as live_exchange_rate_service
 from app.api.v1.router import api_router
 
 # 配置依賴注入容器
 container = configure_container()
 
+# 匯率後台刷新器
+exchange_rate_refresher = ExchangeRateRefresher(exchange_rate_service, settings.exchange_rate_refresh_interval)
+# v1 匯率端點使用的外部 API 匯率服務
+live_exchange_rate_refresher = ExchangeRateRefresher(
+    live_exchange_rate_service, settings.exchange_rate_refresh_interval
+)
+
 # 創建 FastAPI 應用
 app = FastAPI(
     title="訂閱管理系統 API",
@@ -66,12 +77,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 添加自定義中間件
-app.add_middleware(APIMetricsMiddleware)
-app.add_middleware(ResponseHeadersMiddleware)
-app.add_middleware(RequestTimingMiddleware)
-app.add_middleware(RequestIDMiddleware)
-app.add_middleware(RequestValidationMiddleware, max_request_size=2*1024*1024)  # 2MB
+# 請求驗證、請求 ID、計時、安全頭和指標在同一個純 ASGI 中間件中完成
+app.add_middleware(
+    RequestPipelineMiddleware,
+    max_request_size=2*1024*1024,  # 2MB
+    # 按路徑後綴匹配，/api/v1 和舊的 /api 前綴下的導入端點使用相同上限
+    body_size_limits={"/subscriptions/import": settings.subscription_import_max_bytes}
+)
 
 # 啟動事件
 @app.on_event("startup")
@@ -85,12 +97,31 @@ async def startup_event():
     create_tables()
     app_logger.info("數據庫表初始化完成")
     
+    # 對外 HTTP 請求共享一個連接池
+    await start_http_client()
+    
+    # 預熱並定期刷新匯率，請求路徑不再等待上游 API
+    exchange_rate_refresher.start()
+    live_exchange_rate_refresher.start()
+    
+    # 多進程指標快照在後台定期寫入，不佔用請求路徑
+    metrics_registry.start_flusher()
+    
     app_logger.info("新架構初始化完成")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """應用關閉事件"""
+    await exchange_rate_refresher.stop()
+    await live_exchange_rate_refresher.stop()
+    await close_http_client()
+    password_hasher.shutdown()
+    await metrics_registry.stop_flusher()
+    metrics_registry.flush()
+    access_log_sampler.flush()
+    await dispose_async_engine()
     app_logger.info("訂閱管理系統 API 關閉")
+    shutdown_logging()
 
 # 根路由
 @app.get("/")
@@ -117,9 +148,28 @@ async def health_check():
     return {
         "status": "healthy",
         "version": "2.0.0",
-        "architecture": "Clean Architecture"
+        "architecture": "Clean Architecture",
+        "database": get_pool_status(),
+        "exchange_rate_cache": exchange_rate_service.cache_stats(),
+        "exchange_rate_refresher": exchange_rate_refresher.stats(),
+        "live_exchange_rate_cache": live_exchange_rate_service.cache_stats(),
+        "live_exchange_rate_refresher": live_exchange_rate_refresher.stats(),
+        "http_client": get_http_client_status(),
+        "token_cache": verified_token_cache.stats(),
+        "auth_user_cache": authenticated_user_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "logging": get_logging_stats(),
+        "access_log": access_log_sampler.stats()
     }
 
+# Prometheus 文本格式指標（多 worker 部署時合併全部 worker）
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(
+        metrics_registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
 # API 版本檢查
 @app.get("/api/version")
 async def api_version():
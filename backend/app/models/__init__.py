@@ -7,6 +7,7 @@ Base = declarative_base()
 from .user import User, pwd_context
 from .subscription import Subscription, SubscriptionCycle, SubscriptionCategory  
 from .budget import Budget
+from .exchange_rate import ExchangeRate
 
 # 配置模型關聯（在所有模型導入後）
 def configure_relationships():
@@ -23,5 +24,6 @@ __all__ = [
     "SubscriptionCycle",
     "SubscriptionCategory",
     "Budget",
+    "ExchangeRate",
     "pwd_context"
 ]
\ No newline at end of file
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index, UniqueConstraint
+from . import Base
+
+class ExchangeRate(Base):
+    """匯率歷史：每次刷新寫入一張以 base 為基準的完整匯率表（同一個 as_of）"""
+    __tablename__ = "exchange_rates"
+    __table_args__ = (
+        # 按時間點查找匯率表: WHERE base = ? AND as_of <= ? ORDER BY as_of DESC
+        UniqueConstraint("base", "as_of", "quote", name="uq_exchange_rates_base_as_of_quote"),
+        # 不限基準貨幣的時間點查找
+        Index("ix_exchange_rates_as_of", "as_of"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    base = Column(String(3), nullable=False)
+    quote = Column(String(3), nullable=False)
+    rate = Column(Float, nullable=False)  # 1 單位 base 可兌換的 quote 數量
+    as_of = Column(DateTime, nullable=False)
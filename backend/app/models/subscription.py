@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -30,6 +30,14 @@ class Currency(str, enum.Enum):
 
 class Subscription(Base):
     __tablename__ = "subscriptions"
+    __table_args__ = (
+        # 活躍訂閱列表 / 儀表板: WHERE user_id = ? AND is_active = ? ORDER BY created_at DESC
+        Index("ix_subscriptions_user_active_created", "user_id", "is_active", "created_at"),
+        # 類別篩選: WHERE user_id = ? AND category = ? AND is_active = ? ORDER BY created_at DESC
+        Index("ix_subscriptions_user_category_active", "user_id", "category", "is_active", "created_at"),
+        # 全部訂閱列表: WHERE user_id = ? ORDER BY created_at DESC
+        Index("ix_subscriptions_user_created", "user_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -1,19 +1,44 @@
-import httpx
 import json
-from datetime import datetime, timedelta
-from typing import Dict, Optional
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional, Union
 from sqlalchemy.orm import Session
 from app.database.connection import get_db
+from app.core.config import settings
+from app.core.http_client import get_http_client
+from app.infrastructure.services.exchange_rate_cache import ExchangeRateCache
+from app.infrastructure.services.exchange_rate_history import ExchangeRateHistory, exchange_rate_history
+from app.infrastructure.services.rate_matrix import RateMatrix
 import os
 
+RATE_MATRIX_KEY = "rate_matrix"
+
+# 預設匯率表（相對於USD）
+FALLBACK_USD_RATES = {
+    "USD": 1.0,
+    "TWD": 31.5,  # 1 USD = 31.5 TWD
+    "EUR": 0.92,  # 1 USD = 0.92 EUR
+    "JPY": 150.0, # 1 USD = 150 JPY
+    "GBP": 0.79,  # 1 USD = 0.79 GBP
+    "KRW": 1350.0, # 1 USD = 1350 KRW
+    "CNY": 7.3    # 1 USD = 7.3 CNY
+}
+
 class ExchangeRateService:
     """匯率服務 - 獲取和緩存匯率數據"""
     
-    def __init__(self):
+    def __init__(self, api_url: Optional[str] = None, history: Optional[ExchangeRateHistory] = None):
         self.base_url = "http://api.exchangeratesapi.io/v1"
+        self.api_url = api_url or settings.exchange_rate_api_url
         self.api_key = os.getenv("EXCHANGE_RATE_API_KEY", "your_api_key_here")
-        self.cache_duration = timedelta(hours=1)  # 緩存1小時
-        self._rate_cache = {}
+        self.base_currency = "USD"  # 只需下載這一張匯率表即可推導全部交叉匯率
+        self.cache_duration = timedelta(seconds=settings.exchange_rate_cache_ttl)
+        self.max_staleness = timedelta(seconds=settings.exchange_rate_max_staleness)
+        # 過期不超過 max_staleness 的匯率直接返回，並在後台刷新
+        self._rate_cache = ExchangeRateCache(self.cache_duration, self.max_staleness)
+        # 匯率歷史（可選）：下載的匯率表寫入數據庫，用於預熱和按日期查詢
+        self._history = history
+        # 後台刷新器運行時，請求路徑不等待上游下載，沒有可用匯率時直接使用預設匯率
+        self._background_refresh = False
         
     async def get_exchange_rate(self, from_currency: str, to_currency: str) -> Optional[float]:
         """獲取匯率，優先從緩存獲取"""
@@ -22,59 +47,100 @@ class ExchangeRateService:
         if from_currency == to_currency:
             return 1.0
             
-        cache_key = f"{from_currency}_{to_currency}"
-        
-        # 檢查緩存
-        if self._is_cache_valid(cache_key):
-            return self._rate_cache[cache_key]["rate"]
+        # 交叉匯率矩陣中查找；沒有可用矩陣或矩陣中沒有的貨幣使用預設匯率
+        matrix = await self.get_rate_matrix()
+        rate = matrix.rate(from_currency, to_currency) if matrix is not None else None
+        if rate is not None:
+            return rate
         
-        # 從API獲取匯率
+        return self._get_fallback_rate(from_currency, to_currency)
+    
+    async def get_rate_matrix(self) -> Optional[RateMatrix]:
+        """獲取交叉匯率矩陣，優先從緩存獲取；並發請求只發起一次API調用"""
         try:
-            rate = await self._fetch_rate_from_api(from_currency, to_currency)
-            if rate:
-                self._update_cache(cache_key, rate)
-                return rate
+            matrix = await self._rate_cache.get_or_load(
+                RATE_MATRIX_KEY, self._fetch_rate_matrix, wait=not self._background_refresh
+            )
         except Exception as e:
             print(f"獲取匯率失敗: {e}")
-            
-        # 回退到緩存的舊數據（如果存在）
-        if cache_key in self._rate_cache:
-            print(f"使用過期的緩存匯率: {cache_key}")
-            return self._rate_cache[cache_key]["rate"]
-            
+            matrix = None
+        
+        if matrix is None:
+            # 回退到緩存的舊數據（如果未超出最長過期時間）
+            matrix = self._rate_cache.get_stale(RATE_MATRIX_KEY, self.max_staleness)
+            if matrix is not None:
+                print("使用過期的緩存匯率")
+        return matrix
+    
+    def set_background_refresh(self, enabled: bool) -> None:
+        """由後台刷新器在啟動 / 停止時調用"""
+        self._background_refresh = enabled
+    
+    async def refresh_rate_matrix(self) -> Optional[RateMatrix]:
+        """強制重新下載匯率表（供後台刷新器調用），失敗時返回 None 且保留舊數據"""
+        return await self._rate_cache.refresh(RATE_MATRIX_KEY, self._fetch_rate_matrix)
+    
+    async def preload_rate_history(self) -> bool:
+        """從匯率歷史中載入最新一張匯率表預熱緩存，避免冷啟動時調用外部API"""
+        if self._history is None:
+            return False
+        matrix = await self._history.latest(self.base_currency)
+        if matrix is None:
+            return False
+        self._rate_cache.set(RATE_MATRIX_KEY, matrix, stored_at=matrix.as_of)
+        return True
+    
+    async def get_exchange_rate_on(
+        self, from_currency: str, to_currency: str, on: Union[date, datetime]
+    ) -> Optional[float]:
+        """獲取指定日期生效的匯率；沒有該日期的歷史記錄時使用當前匯率"""
+        if from_currency == to_currency:
+            return 1.0
+        
+        if self._history is not None:
+            matrix = await self._history.effective_on(on, self.base_currency)
+            rate = matrix.rate(from_currency, to_currency) if matrix is not None else None
+            if rate is not None:
+                return rate
+        
+        return await self.get_exchange_rate(from_currency, to_currency)
+    
+    def rate_age(self) -> Optional[float]:
+        """當前緩存匯率的年齡（秒）"""
+        return self._rate_cache.age(RATE_MATRIX_KEY)
+    
+    async def _fetch_rate_matrix(self) -> Optional[RateMatrix]:
+        """下載基準貨幣的完整匯率表，並推導出全部交叉匯率"""
+        rates = await self._fetch_rate_table(self.base_currency)
+        if rates:
+            matrix = RateMatrix.from_quotes(self.base_currency, rates)
+            if self._history is not None:
+                await self._history.save(self.base_currency, rates, matrix.as_of)
+            return matrix
+        
         return None
     
-    async def _fetch_rate_from_api(self, from_currency: str, to_currency: str) -> Optional[float]:
-        """從API獲取匯率"""
+    async def _fetch_rate_table(self, base_currency: str) -> Optional[Dict[str, float]]:
+        """從API獲取以 base_currency 為基準的完整匯率表"""
         
         try:
             # 嘗試使用免費的exchangerate-api.com（無需註冊）
-            backup_url = f"https://api.exchangerate-api.com/v4/latest/{from_currency}"
-            async with httpx.AsyncClient() as client:
-                response = await client.get(backup_url, timeout=10)
-                if response.status_code == 200:
-                    data = response.json()
-                    if "rates" in data and to_currency in data["rates"]:
-                        return data["rates"][to_currency]
+            backup_url = f"{self.api_url}/{base_currency}"
+            # 共享連接池，重用已建立的連接；超時由 settings.http_* 配置
+            response = await get_http_client().get(backup_url)
+            if response.status_code == 200:
+                data = response.json()
+                if "rates" in data:
+                    return data["rates"]
                         
         except Exception as e:
             print(f"API請求失敗: {e}")
         
-        # 如果API失敗，使用預設匯率
-        return self._get_fallback_rate(from_currency, to_currency)
+        return None
     
     def _get_fallback_rate(self, from_currency: str, to_currency: str) -> Optional[float]:
         """獲取預設匯率（備用方案）"""
-        # 預設匯率表（相對於USD）
-        default_rates = {
-            "USD": 1.0,
-            "TWD": 31.5,  # 1 USD = 31.5 TWD
-            "EUR": 0.92,  # 1 USD = 0.92 EUR
-            "JPY": 150.0, # 1 USD = 150 JPY
-            "GBP": 0.79,  # 1 USD = 0.79 GBP
-            "KRW": 1350.0, # 1 USD = 1350 KRW
-            "CNY": 7.3    # 1 USD = 7.3 CNY
-        }
+        default_rates = FALLBACK_USD_RATES
         
         if from_currency not in default_rates or to_currency not in default_rates:
             return None
@@ -85,24 +151,18 @@ class ExchangeRateService:
         
         return to_rate / from_rate
     
-    def _is_cache_valid(self, cache_key: str) -> bool:
-        """檢查緩存是否有效"""
-        if cache_key not in self._rate_cache:
-            return False
-            
-        cache_time = self._rate_cache[cache_key]["timestamp"]
-        return datetime.now() - cache_time < self.cache_duration
-    
-    def _update_cache(self, cache_key: str, rate: float):
-        """更新緩存"""
-        self._rate_cache[cache_key] = {
-            "rate": rate,
-            "timestamp": datetime.now()
-        }
+    def cache_stats(self) -> Dict[str, Any]:
+        """獲取緩存命中統計"""
+        return self._rate_cache.stats()
     
-    async def convert_currency(self, amount: float, from_currency: str, to_currency: str) -> Optional[float]:
-        """貨幣轉換"""
-        rate = await self.get_exchange_rate(from_currency, to_currency)
+    async def convert_currency(
+        self, amount: float, from_currency: str, to_currency: str, on: Optional[Union[date, datetime]] = None
+    ) -> Optional[float]:
+        """貨幣轉換；指定 on 時使用該日期生效的匯率"""
+        if on is not None:
+            rate = await self.get_exchange_rate_on(from_currency, to_currency, on)
+        else:
+            rate = await self.get_exchange_rate(from_currency, to_currency)
         if rate is not None:
             return round(amount * rate, 2)
         return None
@@ -149,4 +209,4 @@ class ExchangeRateService:
         return rates
 
 # 全局實例
-exchange_rate_service = ExchangeRateService()
\ No newline at end of file
+exchange_rate_service = ExchangeRateService(history=exchange_rate_history)
\ No newline at end of file
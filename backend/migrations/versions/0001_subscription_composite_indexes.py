@@ -0,0 +1,40 @@
+"""subscription composite indexes
+
+為訂閱列表 / 儀表板的熱點查詢添加複合索引，並為預算的 user_id 建立索引。
+所有查詢都以 user_id 過濾並按 created_at 倒序排列，索引包含排序列可避免臨時排序。
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ("ix_subscriptions_user_active_created", "subscriptions", ["user_id", "is_active", "created_at"]),
+    ("ix_subscriptions_user_category_active", "subscriptions", ["user_id", "category", "is_active", "created_at"]),
+    ("ix_subscriptions_user_created", "subscriptions", ["user_id", "created_at"]),
+    ("ix_budgets_user_id", "budgets", ["user_id"]),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 由 create_tables() 新建的數據庫已包含這些索引
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,47 @@
+"""exchange rates history
+
+持久化每次刷新得到的匯率表，用於啟動時預熱緩存，以及按日期查找當時生效的匯率。
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 01:00:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 由 create_tables() 新建的數據庫已包含此表
+    if sa.inspect(op.get_bind()).has_table("exchange_rates"):
+        return
+    op.create_table(
+        "exchange_rates",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("base", sa.String(length=3), nullable=False),
+        sa.Column("quote", sa.String(length=3), nullable=False),
+        sa.Column("rate", sa.Float(), nullable=False),
+        sa.Column("as_of", sa.DateTime(), nullable=False),
+        sa.UniqueConstraint("base", "as_of", "quote", name="uq_exchange_rates_base_as_of_quote"),
+    )
+    op.create_index("ix_exchange_rates_id", "exchange_rates", ["id"])
+    op.create_index("ix_exchange_rates_as_of", "exchange_rates", ["as_of"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not sa.inspect(op.get_bind()).has_table("exchange_rates"):
+        return
+    op.drop_index("ix_exchange_rates_as_of", table_name="exchange_rates", if_exists=True)
+    op.drop_index("ix_exchange_rates_id", table_name="exchange_rates", if_exists=True)
+    op.drop_table("exchange_rates")
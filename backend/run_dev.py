@@ -7,6 +7,12 @@ import sys
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 if __name__ == "__main__":
+    from app.core.config import settings
+    from app.core.metrics import clear_multiprocess_dir
+
+    # 清空上次運行留下的多進程指標快照，再啟動 worker
+    clear_multiprocess_dir(settings.metrics_multiproc_dir)
+
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
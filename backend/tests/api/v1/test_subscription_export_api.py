@@ -0,0 +1,267 @@
+"""
+訂閱流式導出測試
+
+測試 GET /api/v1/subscriptions/export 和管理員的 /export/all：
+- NDJSON / CSV 編碼與分塊
+- 只導出當前用戶的訂閱；管理員導出所有用戶
+- 導出的 CSV 可直接重新導入
+- 同步與異步 Repository 產出相同的行
+- 100 萬行導出時的內存佔用
+"""
+
+import asyncio
+import csv
+import io
+import json
+import os
+import sqlite3
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.api.v1.router import api_router
+from app.application.services.subscription_export import EXPORT_FIELDS, encode_export
+from app.common.async_utils import maybe_aiter
+from app.common.middleware import RequestPipelineMiddleware
+from app.core.auth import create_access_token
+from app.core.config import settings
+from app.core.rate_limiter import limiter, user_limiter
+from app.database.connection import get_db
+from app.infrastructure.dependencies import get_unit_of_work, unit_of_work_provider
+from app.infrastructure.repositories.async_subscription_repository import AsyncSubscriptionRepository
+from app.infrastructure.repositories.subscription_repository import SubscriptionRepository
+from tests.infrastructure.repositories.conftest import create_user_database
+
+EXPORT_PATH = "/api/v1/subscriptions/export"
+BENCHMARK_ROWS = 1_000_000
+
+
+def fill_subscriptions(path, rows_per_user):
+    """用 sqlite3 直接寫入測試數據：{user_id: 行數}"""
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.executemany(
+            "INSERT INTO subscriptions (user_id, name, price, original_price, currency, cycle, category, "
+            "start_date, is_active, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (user_id, f"sub-{user_id}-{index}", 31.5 * (index % 7 + 1), index % 7 + 1, "USD", "MONTHLY",
+                 "STREAMING", "2024-01-01 00:00:00.000000", index % 2, "2024-01-02 03:04:05")
+                for user_id, count in rows_per_user.items()
+                for index in range(count)
+            )
+        )
+    connection.close()
+
+
+@pytest.fixture
+def database_path(tmp_path):
+    """alice（id=1）、bob（id=2）和管理員 admin（id=3），訂閱由各測試寫入"""
+    path = tmp_path / "export.db"
+    create_user_database(path, {"id": 3, "email": "c@example.com", "username": "admin"})
+    return path
+
+
+@pytest.fixture
+def app(database_path, monkeypatch):
+    monkeypatch.setattr(settings, "admin_usernames", ["admin"])
+    engine = create_engine(f"sqlite:///{database_path}", connect_args={"check_same_thread": False})
+    session_factory = sessionmaker(bind=engine)
+    app = FastAPI()
+    app.state.limiter = limiter
+    app.add_middleware(RequestPipelineMiddleware)
+    app.include_router(api_router, prefix="/api/v1")
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[unit_of_work_provider] = get_unit_of_work
+    enabled = user_limiter.enabled
+    user_limiter.enabled = False
+    yield app
+    user_limiter.enabled = enabled
+    engine.dispose()
+
+
+def auth_headers(username):
+    return {"Authorization": f"Bearer {create_access_token({'sub': username})}"}
+
+
+def get(app, path, username, **params):
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path, params=params, headers=auth_headers(username))
+    return asyncio.run(run())
+
+
+async def rows_of(values):
+    for value in values:
+        yield value
+
+
+@pytest.mark.unit
+class TestExportEncoding:
+    """導出編碼測試類"""
+
+    def test_csv_header_only_when_empty(self):
+        """測試沒有訂閱時 CSV 只有表頭"""
+        async def run():
+            return [chunk async for chunk in encode_export(rows_of([]), "csv")]
+
+        assert asyncio.run(run()) == [(",".join(EXPORT_FIELDS) + "\n").encode()]
+
+    def test_rows_grouped_into_chunks(self):
+        """測試每攢滿 chunk_rows 行輸出一塊"""
+        row = (1, 1, "Netflix", 390.0, 390.0, "TWD", "monthly", "streaming", None, True, None, None)
+
+        async def run():
+            return [chunk async for chunk in encode_export(rows_of([row] * 5), "ndjson", chunk_rows=2)]
+
+        chunks = asyncio.run(run())
+        assert [chunk.count(b"\n") for chunk in chunks] == [2, 2, 1]
+        assert json.loads(chunks[0].splitlines()[0])["name"] == "Netflix"
+
+
+@pytest.mark.integration
+class TestSubscriptionExportApi:
+    """導出端點測試類"""
+
+    def test_ndjson_export_only_includes_own_subscriptions(self, app, database_path):
+        """測試用戶只導出自己的訂閱，枚舉和時間按值導出"""
+        fill_subscriptions(database_path, {1: 3, 2: 2})
+
+        response = get(app, EXPORT_PATH, "alice")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert 'filename="subscriptions.ndjson"' in response.headers["content-disposition"]
+        records = [json.loads(line) for line in response.text.splitlines()]
+        assert [record["user_id"] for record in records] == [1, 1, 1]
+        assert records[0]["currency"] == "USD"
+        assert records[0]["cycle"] == "monthly"
+        assert records[0]["start_date"] == "2024-01-01T00:00:00"
+
+    def test_csv_export_can_be_reimported(self, app, database_path):
+        """測試導出的 CSV 可以直接導入到另一個用戶"""
+        fill_subscriptions(database_path, {1: 4})
+        exported = get(app, EXPORT_PATH, "alice", format="csv")
+        assert exported.headers["content-type"] == "text/csv; charset=utf-8"
+        assert len(list(csv.DictReader(io.StringIO(exported.text)))) == 4
+
+        async def reimport():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.post(
+                    "/api/v1/subscriptions/import", content=exported.content,
+                    headers={**auth_headers("bob"), "Content-Type": "text/csv"}
+                )
+
+        assert asyncio.run(reimport()).json()["data"]["imported"] == 4
+        reexported = [json.loads(line) for line in get(app, EXPORT_PATH, "bob").text.splitlines()]
+        assert [record["name"] for record in reexported] == [f"sub-1-{index}" for index in range(4)]
+
+    def test_admin_export_includes_all_users(self, app, database_path):
+        """測試管理員導出所有用戶的訂閱，非管理員被拒絕"""
+        fill_subscriptions(database_path, {1: 3, 2: 2})
+
+        assert get(app, f"{EXPORT_PATH}/all", "alice").status_code == 403
+        response = get(app, f"{EXPORT_PATH}/all", "admin")
+
+        assert response.status_code == 200
+        assert [json.loads(line)["user_id"] for line in response.text.splitlines()] == [1, 1, 1, 2, 2]
+
+    def test_rejects_unknown_format(self, app):
+        """測試不支持的格式返回 422"""
+        assert get(app, EXPORT_PATH, "alice", format="xml").status_code == 422
+
+
+@pytest.mark.infrastructure
+class TestExportRows:
+    """導出行讀取測試類"""
+
+    def test_async_repository_matches_sync(self, database_path):
+        """測試異步實現流式讀取的行與同步實現一致"""
+        fill_subscriptions(database_path, {1: 25, 2: 5})
+        engine = create_engine(f"sqlite:///{database_path}")
+        with Session(engine) as session:
+            sync_rows = list(SubscriptionRepository(session).iter_export_rows(None, batch_size=10))
+        engine.dispose()
+
+        async def run():
+            async_engine = create_async_engine(f"sqlite+aiosqlite:///{database_path}")
+            try:
+                async with AsyncSession(async_engine) as session:
+                    rows = AsyncSubscriptionRepository(session).iter_export_rows(1, batch_size=10)
+                    return [row async for row in maybe_aiter(rows)]
+            finally:
+                await async_engine.dispose()
+
+        assert len(sync_rows) == 30
+        assert [tuple(row) for row in asyncio.run(run())] == [tuple(row) for row in sync_rows[:25]]
+
+
+def resident_memory():
+    """當前進程的常駐內存（字節）"""
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+@pytest.mark.performance
+@pytest.mark.skipif(not os.path.exists("/proc/self/statm"), reason="需要 /proc 讀取常駐內存")
+class TestExportMemory:
+    """導出內存佔用測試類"""
+
+    def test_export_million_rows_with_constant_memory(self, app, database_path):
+        """測試導出 100 萬行時內存增長遠小於響應大小（響應逐塊發送，不在內存中累積）"""
+        fill_subscriptions(database_path, {1: BENCHMARK_ROWS})
+        token = auth_headers("alice")["Authorization"].encode()
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": EXPORT_PATH, "raw_path": EXPORT_PATH.encode(), "root_path": "",
+            "query_string": b"format=ndjson", "headers": [(b"host", b"test"), (b"authorization", token)],
+            "client": ("127.0.0.1", 50000), "server": ("test", 80),
+        }
+        received = {"bytes": 0, "lines": 0, "status": None}
+        requests = [{"type": "http.request", "body": b"", "more_body": False}]
+        baseline = resident_memory()
+        peak = baseline
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            # 客戶端不斷開，直到響應發送完畢
+            await asyncio.Event().wait()
+
+        async def send(message):
+            nonlocal peak
+            if message["type"] == "http.response.start":
+                received["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                body = message.get("body", b"")
+                received["bytes"] += len(body)
+                received["lines"] += body.count(b"\n")
+                peak = max(peak, resident_memory())
+
+        start = time.perf_counter()
+        asyncio.run(app(scope, receive, send))
+        elapsed = time.perf_counter() - start
+
+        growth = peak - baseline
+        print(
+            f"\n導出 {BENCHMARK_ROWS} 行 NDJSON: 響應 {received['bytes'] / 1024 / 1024:.0f}MB, "
+            f"{elapsed:.1f}s, 常駐內存峰值增長 {growth / 1024 / 1024:.1f}MB"
+        )
+        assert received["status"] == 200
+        assert received["lines"] == BENCHMARK_ROWS
+        assert growth < 64 * 1024 * 1024
+        assert growth * 4 < received["bytes"]
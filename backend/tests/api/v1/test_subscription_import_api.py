@@ -0,0 +1,362 @@
+"""
+訂閱批量導入測試
+
+測試 POST /api/v1/subscriptions/import：
+- CSV / NDJSON 流式解析（跨塊的多字節字符、引號內換行、BOM、大小上限）
+- 逐行驗證，錯誤按行號返回，有效行照常導入
+- 按開始日期共用匯率快照，按批次事務插入
+- 中間件放行導入的 Content-Type 和更大的請求體
+- SQLite 上的導入吞吐量
+"""
+
+import asyncio
+import json
+import time
+from datetime import date
+from decimal import Decimal
+
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.api.v1.router import api_router
+from app.application.services.subscription_application_service import SubscriptionApplicationService
+from app.application.services.subscription_import import iter_lines, parse_import_stream
+from app.common.middleware import RequestPipelineMiddleware
+from app.core.auth import create_access_token
+from app.core.config import settings
+from app.core.rate_limiter import limiter, user_limiter
+from app.database.connection import get_db
+from app.domain.services.subscription_domain_service import SubscriptionDomainService
+from app.infrastructure.dependencies import get_exchange_rate_service, get_unit_of_work, unit_of_work_provider
+from app.infrastructure.unit_of_work import SQLAlchemyUnitOfWork
+from app.models import Base, User
+from app.models.subscription import Currency, Subscription
+
+IMPORT_PATH = "/api/v1/subscriptions/import"
+CSV_HEADER = "name,original_price,currency,cycle,category,start_date\n"
+BENCHMARK_ROWS = 50000
+
+
+class FakeExchangeRateService:
+    """固定匯率（2024-01-02 的 USD 匯率不同）；記錄查詢的日期，JPY 無法獲取"""
+
+    RATES = {"USD": Decimal("31.5"), "EUR": Decimal("34")}
+    HISTORICAL = {date(2024, 1, 2): {"USD": Decimal("30")}}
+
+    def __init__(self):
+        self.calls = 0
+        self.dates = set()
+
+    async def get_exchange_rate(self, from_currency, to_currency):
+        self.calls += 1
+        if from_currency not in self.RATES:
+            raise ValueError(f"no rate for {from_currency}")
+        return self.RATES[from_currency]
+
+    async def get_exchange_rate_on(self, from_currency, to_currency, on):
+        self.dates.add(on)
+        rate = self.HISTORICAL.get(on, {}).get(from_currency)
+        if rate is not None:
+            self.calls += 1
+            return rate
+        return await self.get_exchange_rate(from_currency, to_currency)
+
+
+async def byte_chunks(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def collect(records):
+    return [record async for record in records]
+
+
+def parse(data: bytes, import_format: str, chunk_size: int = 7, max_bytes=None, max_record_bytes=None):
+    return asyncio.run(collect(
+        parse_import_stream(byte_chunks(data, chunk_size), import_format, max_bytes, max_record_bytes)
+    ))
+
+
+def csv_rows(count: int) -> str:
+    currencies = ("TWD", "USD", "EUR")
+    return "".join(
+        f"sub-{index},{index % 500 + 1}.5,{currencies[index % 3]},monthly,streaming,2024-01-{index % 28 + 1:02d}\n"
+        for index in range(count)
+    )
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'import.db'}",
+        connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        db.add(User(id=1, username="import_user", email="i@example.com", hashed_password="x", is_active=True))
+        db.commit()
+    yield factory
+    engine.dispose()
+
+
+@pytest.fixture
+def exchange_service():
+    return FakeExchangeRateService()
+
+
+@pytest.fixture
+def client(session_factory, exchange_service):
+    app = FastAPI()
+    app.state.limiter = limiter
+    app.add_middleware(
+        RequestPipelineMiddleware,
+        max_request_size=1024,
+        body_size_limits={IMPORT_PATH: 64 * 1024 * 1024}
+    )
+    app.include_router(api_router, prefix="/api/v1")
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[unit_of_work_provider] = get_unit_of_work
+    app.dependency_overrides[get_exchange_rate_service] = lambda: exchange_service
+    enabled = user_limiter.enabled
+    user_limiter.enabled = False
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'import_user'})}"}
+
+    def post(body, content_type, params=None):
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                return await http.post(
+                    IMPORT_PATH, content=body, params=params,
+                    headers={**headers, "Content-Type": content_type}
+                )
+        return asyncio.run(run())
+
+    yield post
+    user_limiter.enabled = enabled
+
+
+def stored(session_factory):
+    with session_factory() as db:
+        return db.execute(
+            select(Subscription.name, Subscription.price, Subscription.currency).order_by(Subscription.id)
+        ).all()
+
+
+@pytest.mark.unit
+class TestImportParsing:
+    """導入文件解析測試類"""
+
+    def test_lines_split_across_chunks(self):
+        """測試多字節字符和換行被切在塊邊界時仍正確解碼，BOM 被去除"""
+        data = "﻿第一行\r\n第二行\n\n最後一行".encode("utf-8")
+
+        async def run():
+            return [line async for line in iter_lines(byte_chunks(data, 1))]
+
+        assert asyncio.run(run()) == ["第一行", "第二行", "", "最後一行"]
+
+    def test_csv_quoted_newline_and_field_count(self):
+        """測試 CSV 引號內的換行屬於同一條記錄，欄位數不符的行報錯"""
+        data = (
+            CSV_HEADER
+            + '"Netflix, 家庭\n方案",390,TWD,monthly,streaming,2024-01-01\n'
+            + "\n"
+            + "Spotify,149\n"
+        ).encode("utf-8")
+
+        records = parse(data, "csv")
+
+        assert records[0] == (1, {
+            "name": "Netflix, 家庭\n方案", "original_price": "390", "currency": "TWD",
+            "cycle": "monthly", "category": "streaming", "start_date": "2024-01-01"
+        }, None)
+        assert records[1][0] == 2 and records[1][1] is None
+        assert "欄位數量" in records[1][2]
+
+    def test_csv_unclosed_quote_is_capped_per_record(self):
+        """測試未閉合的引號只吞掉上限以內的行：超限時報告該行錯誤，其後的行照常解析"""
+        data = (CSV_HEADER + '"Broken,390,TWD,monthly,streaming,2024-01-01\n' + csv_rows(20)).encode("utf-8")
+
+        records = parse(data, "csv", max_record_bytes=200)
+
+        errors = [(row, error) for row, _, error in records if error]
+        assert errors == [(1, "記錄超過 200 字節上限（引號可能未閉合）")]
+        valid = [data["name"] for _, data, _ in records if data]
+        assert 0 < len(valid) < 20
+        assert valid[-1] == "sub-19"
+
+    def test_csv_requires_header_fields(self):
+        """測試 CSV 表頭缺少欄位時整個請求被拒絕"""
+        with pytest.raises(HTTPException) as exc_info:
+            parse(b"name,price\nNetflix,390\n", "csv")
+
+        assert exc_info.value.status_code == 400
+        assert "original_price" in exc_info.value.detail
+
+    def test_ndjson_reports_invalid_lines(self):
+        """測試 NDJSON 無效行按行號報錯，不影響其他行"""
+        data = b'{"name": "a"}\nnot json\n[1, 2]\n\n{"name": "b"}'
+
+        records = parse(data, "ndjson")
+
+        assert [(row, data) for row, data, _ in records] == [(1, {"name": "a"}), (2, None), (3, None), (4, {"name": "b"})]
+        assert records[1][2].startswith("JSON 格式錯誤")
+        assert records[2][2] == "每行必須是一個 JSON 對象"
+
+    def test_max_bytes_enforced_while_streaming(self):
+        """測試沒有 Content-Length 時在讀取過程中限制大小"""
+        with pytest.raises(HTTPException) as exc_info:
+            parse(b'{"name": "a"}\n' * 100, "ndjson", max_bytes=100)
+
+        assert exc_info.value.status_code == 413
+
+
+@pytest.mark.integration
+class TestSubscriptionImportApi:
+    """批量導入端點測試類"""
+
+    def test_csv_import_converts_with_dated_rate_snapshots(self, client, session_factory, exchange_service):
+        """測試 CSV 導入：每個開始日期只查詢一次匯率，台幣價格按開始日期生效的匯率換算"""
+        body = CSV_HEADER + csv_rows(30)
+
+        response = client(body.encode(), "text/csv; charset=utf-8")
+
+        assert response.status_code == 200, response.text
+        assert response.json()["data"] == {
+            "total_rows": 30, "imported": 30, "failed": 0, "errors": [], "errors_truncated": False,
+            "aborted": False, "abort_status_code": None, "abort_reason": None
+        }
+        rows = stored(session_factory)
+        assert len(rows) == 30
+        assert rows[1] == ("sub-1", pytest.approx(2.5 * 30), Currency.USD)
+        assert rows[4] == ("sub-4", pytest.approx(5.5 * 31.5), Currency.USD)
+        assert len(exchange_service.dates) == 28
+        assert exchange_service.calls == len(exchange_service.dates) * (len(Currency) - 1)
+
+    def test_per_row_errors(self, client, session_factory):
+        """測試無效行返回行號和原因，有效行照常導入"""
+        lines = [
+            {"name": "Netflix", "original_price": 390, "currency": "TWD", "cycle": "monthly",
+             "category": "streaming", "start_date": "2024-01-01"},
+            {"name": "Bad price", "original_price": -1, "currency": "TWD", "cycle": "monthly",
+             "category": "streaming", "start_date": "2024-01-01"},
+            {"name": "   ", "original_price": 10, "currency": "TWD", "cycle": "monthly",
+             "category": "streaming", "start_date": "2024-01-01"},
+            {"name": "No rate", "original_price": 10, "currency": "JPY", "cycle": "monthly",
+             "category": "streaming", "start_date": "2024-01-01"},
+            {"name": "Missing cycle", "original_price": 10, "currency": "USD"},
+        ]
+        body = "\n".join(json.dumps(line) for line in lines) + "\n{broken\n"
+
+        response = client(body.encode(), "application/x-ndjson")
+
+        data = response.json()["data"]
+        assert (data["total_rows"], data["imported"], data["failed"]) == (6, 1, 5)
+        errors = {error["row"]: error["errors"] for error in data["errors"]}
+        assert errors[2][0].startswith("original_price")
+        assert errors[3] == ["訂閱名稱不能為空"]
+        assert errors[4] == ["無法獲取 JPY 到 TWD 的匯率"]
+        assert {error.split(":")[0] for error in errors[5]} == {"cycle", "category", "start_date"}
+        assert errors[6][0].startswith("JSON 格式錯誤")
+        assert [row.name for row in stored(session_factory)] == ["Netflix"]
+
+    def test_format_parameter_and_unsupported_type(self, client):
+        """測試 format 參數指定格式；無法判斷格式時返回 415"""
+        body = CSV_HEADER + csv_rows(1)
+
+        assert client(body.encode(), "application/json", {"format": "csv"}).json()["data"]["imported"] == 1
+        assert client(body.encode(), "text/plain").status_code == 415
+
+    def test_body_size_limit_is_per_path(self, client):
+        """測試導入路徑使用單獨的大小上限，而其他路徑仍使用默認上限"""
+        body = (CSV_HEADER + csv_rows(200)).encode()
+        assert len(body) > 1024
+
+        assert client(body, "text/csv").status_code == 200
+
+    def test_stream_over_limit_returns_partial_result(self, client, session_factory, monkeypatch):
+        """測試分塊上傳（無 Content-Length）中途超出大小上限：返回 413 並帶上已導入的行數"""
+        monkeypatch.setattr(settings, "subscription_import_max_bytes", 2000)
+        monkeypatch.setattr(settings, "subscription_import_batch_size", 10)
+        body = (CSV_HEADER + csv_rows(100)).encode()
+        assert len(body) > 2000
+
+        response = client(byte_chunks(body, 256), "text/csv")
+
+        assert response.status_code == 413
+        payload = response.json()
+        assert payload["status"] == "error"
+        result = payload["data"]
+        assert result["aborted"] is True
+        assert result["abort_status_code"] == 413
+        assert 0 < result["imported"] == result["total_rows"] < 100
+        assert len(stored(session_factory)) == result["imported"]
+
+    def test_batches_committed_in_separate_transactions(self, session_factory):
+        """測試每批一條 executemany INSERT 並各自提交"""
+        engine = session_factory.kw["bind"]
+        statements = []
+        event.listen(
+            engine, "before_cursor_execute",
+            lambda conn, cursor, statement, params, context, executemany: statements.append((statement, executemany))
+        )
+        commits = []
+        event.listen(engine, "commit", lambda conn: commits.append(conn))
+        service = SubscriptionApplicationService(
+            SQLAlchemyUnitOfWork(Session(engine)), SubscriptionDomainService(FakeExchangeRateService())
+        )
+        records = parse_import_stream(byte_chunks((CSV_HEADER + csv_rows(250)).encode(), 4096), "csv")
+
+        result = asyncio.run(service.import_subscriptions(1, records, batch_size=100))
+
+        inserts = [statement for statement in statements if statement[0].startswith("INSERT")]
+        assert result.imported == 250
+        assert len(inserts) == 3
+        assert all(executemany for _, executemany in inserts)
+        assert len(commits) == 3
+
+    def test_errors_are_capped(self, session_factory):
+        """測試錯誤行超過上限時只返回前面的部分並標記截斷"""
+        engine = session_factory.kw["bind"]
+        service = SubscriptionApplicationService(
+            SQLAlchemyUnitOfWork(Session(engine)), SubscriptionDomainService(FakeExchangeRateService())
+        )
+        records = parse_import_stream(byte_chunks(b"{}\n" * 20, 64), "ndjson")
+
+        result = asyncio.run(service.import_subscriptions(1, records, max_errors=5))
+
+        assert (result.failed, len(result.errors), result.errors_truncated) == (20, 5, True)
+        assert [error.row for error in result.errors] == [1, 2, 3, 4, 5]
+
+
+@pytest.mark.performance
+class TestSubscriptionImportThroughput:
+    """批量導入吞吐量測試類"""
+
+    def test_csv_import_rate_on_sqlite(self, client, session_factory):
+        """測試 SQLite 上經端點的 CSV 導入每秒不少於 10000 行"""
+        body = (CSV_HEADER + csv_rows(BENCHMARK_ROWS)).encode()
+
+        start = time.perf_counter()
+        response = client(body, "text/csv")
+        elapsed = time.perf_counter() - start
+
+        assert response.status_code == 200, response.text
+        assert response.json()["data"]["imported"] == BENCHMARK_ROWS
+        with session_factory() as db:
+            assert db.scalar(select(func.count()).select_from(Subscription)) == BENCHMARK_ROWS
+        rate = BENCHMARK_ROWS / elapsed
+        print(f"\nCSV 導入 {BENCHMARK_ROWS} 行 ({len(body) / 1024 / 1024:.1f}MB): {elapsed:.2f}s, {rate:.0f} 行/秒")
+        assert rate >= 10000
@@ -23,7 +23,6 @@ from app.application.dtos.budget_dtos import (
     UpdateBudgetCommand
 )
 from app.models.budget import Budget
-from app.models.subscription import Subscription, SubscriptionCategory
 
 
 class TestBudgetApplicationService:
@@ -46,10 +45,7 @@ class TestBudgetApplicationService:
         """模擬預算領域服務"""
         mock_service = Mock(spec=BudgetDomainService)
         mock_service.validate_budget_data = Mock()
-        mock_service.calculate_budget_usage = Mock()
-        mock_service.calculate_category_budget_usage = Mock()
-        mock_service.get_budget_recommendations = Mock()
-        mock_service.calculate_savings_potential = Mock()
+        mock_service.analyze_totals = Mock()
         return mock_service
 
     @pytest.fixture
@@ -67,26 +63,12 @@ class TestBudgetApplicationService:
         )
 
     @pytest.fixture
-    def sample_subscriptions(self, test_user):
-        """訂閱樣本列表"""
-        return [
-            Subscription(
-                id=1,
-                name="Netflix",
-                price=390.0,
-                category=SubscriptionCategory.ENTERTAINMENT,
-                user_id=test_user.id,
-                is_active=True
-            ),
-            Subscription(
-                id=2,
-                name="Spotify",
-                price=149.0,
-                category=SubscriptionCategory.MUSIC,
-                user_id=test_user.id,
-                is_active=True
-            )
-        ]
+    def sample_category_totals(self):
+        """按類別匯總的訂閱成本樣本"""
+        return {
+            "streaming": {"count": 1, "monthly_cost": 390.0, "yearly_cost": 4680.0},
+            "music": {"count": 1, "monthly_cost": 149.0, "yearly_cost": 1788.0}
+        }
 
     @pytest.mark.unit
     @pytest.mark.application
@@ -294,13 +276,13 @@ class TestBudgetApplicationService:
         """獲取預算使用情況測試"""
 
         @pytest.mark.asyncio
-        async def test_get_budget_usage_with_budget(self, app_service, mock_uow, mock_domain_service, test_user, sample_budget, sample_subscriptions):
+        async def test_get_budget_usage_with_budget(self, app_service, mock_uow, mock_domain_service, test_user, sample_budget, sample_category_totals):
             """測試有預算時獲取使用情況"""
             mock_uow.budgets.get_by_user_id.return_value = sample_budget
-            mock_uow.subscriptions.get_active_by_user_id.return_value = sample_subscriptions
+            mock_uow.subscriptions.get_category_cost_totals.return_value = sample_category_totals
             
             # 模擬領域服務返回值
-            mock_domain_service.calculate_budget_usage.return_value = {
+            usage_info = {
                 "total_budget": 1000.0,
                 "used_amount": 539.0,
                 "remaining_amount": 461.0,
@@ -309,7 +291,7 @@ class TestBudgetApplicationService:
                 "over_budget_amount": 0
             }
             
-            mock_domain_service.calculate_category_budget_usage.return_value = {
+            category_usage = {
                 "total_budget": 1000.0,
                 "total_used": 539.0,
                 "categories": {
@@ -318,17 +300,24 @@ class TestBudgetApplicationService:
                 }
             }
             
-            mock_domain_service.get_budget_recommendations.return_value = [
+            recommendations = [
                 "預算使用率正常"
             ]
             
-            mock_domain_service.calculate_savings_potential.return_value = {
+            savings_potential = {
                 "current_yearly_cost": 6468.0,
                 "potential_yearly_cost": 5821.2,
                 "potential_annual_savings": 646.8,
                 "savings_percentage": 10.0
             }
             
+            mock_domain_service.analyze_totals.return_value = {
+                "usage_info": usage_info,
+                "category_usage": category_usage,
+                "recommendations": recommendations,
+                "savings_potential": savings_potential
+            }
+            
             result = await app_service.get_budget_usage(test_user.id)
             
             assert result.budget is not None
@@ -340,13 +329,13 @@ class TestBudgetApplicationService:
             assert result.savings_potential["potential_annual_savings"] == 646.8
 
         @pytest.mark.asyncio
-        async def test_get_budget_usage_without_budget(self, app_service, mock_uow, mock_domain_service, test_user, sample_subscriptions):
+        async def test_get_budget_usage_without_budget(self, app_service, mock_uow, mock_domain_service, test_user, sample_category_totals):
             """測試無預算時獲取使用情況"""
             mock_uow.budgets.get_by_user_id.return_value = None
-            mock_uow.subscriptions.get_active_by_user_id.return_value = sample_subscriptions
+            mock_uow.subscriptions.get_category_cost_totals.return_value = sample_category_totals
             
             # 模擬無預算的情況
-            mock_domain_service.calculate_budget_usage.return_value = {
+            usage_info = {
                 "total_budget": 0,
                 "used_amount": 0,
                 "remaining_amount": 0,
@@ -355,23 +344,30 @@ class TestBudgetApplicationService:
                 "over_budget_amount": 0
             }
             
-            mock_domain_service.calculate_category_budget_usage.return_value = {
+            category_usage = {
                 "total_budget": 0,
                 "total_used": 539.0,
                 "categories": {}
             }
             
-            mock_domain_service.get_budget_recommendations.return_value = [
+            recommendations = [
                 "建議設置月度預算限制以更好地管理訂閱支出"
             ]
             
-            mock_domain_service.calculate_savings_potential.return_value = {
+            savings_potential = {
                 "current_yearly_cost": 6468.0,
                 "potential_yearly_cost": 5821.2,
                 "potential_annual_savings": 646.8,
                 "savings_percentage": 10.0
             }
             
+            mock_domain_service.analyze_totals.return_value = {
+                "usage_info": usage_info,
+                "category_usage": category_usage,
+                "recommendations": recommendations,
+                "savings_potential": savings_potential
+            }
+            
             result = await app_service.get_budget_usage(test_user.id)
             
             assert result.budget is None
@@ -384,14 +380,14 @@ class TestBudgetApplicationService:
         """獲取預算分析測試"""
 
         @pytest.mark.asyncio
-        async def test_get_budget_analytics(self, app_service, mock_uow, mock_domain_service, test_user, sample_budget, sample_subscriptions):
+        async def test_get_budget_analytics(self, app_service, mock_uow, mock_domain_service, test_user, sample_budget, sample_category_totals):
             """測試獲取預算分析數據"""
             # 首先需要模擬 get_budget_usage 的依賴
             mock_uow.budgets.get_by_user_id.return_value = sample_budget
-            mock_uow.subscriptions.get_active_by_user_id.return_value = sample_subscriptions
+            mock_uow.subscriptions.get_category_cost_totals.return_value = sample_category_totals
             
             # 模擬領域服務返回值
-            mock_domain_service.calculate_budget_usage.return_value = {
+            usage_info = {
                 "total_budget": 1000.0,
                 "used_amount": 539.0,
                 "remaining_amount": 461.0,
@@ -400,20 +396,27 @@ class TestBudgetApplicationService:
                 "over_budget_amount": 0
             }
             
-            mock_domain_service.calculate_category_budget_usage.return_value = {
+            category_usage = {
                 "total_budget": 1000.0,
                 "total_used": 539.0,
                 "categories": {}
             }
             
-            mock_domain_service.get_budget_recommendations.return_value = []
-            mock_domain_service.calculate_savings_potential.return_value = {
+            recommendations = []
+            savings_potential = {
                 "current_yearly_cost": 6468.0,
                 "potential_yearly_cost": 5821.2,
                 "potential_annual_savings": 646.8,
                 "savings_percentage": 10.0
             }
             
+            mock_domain_service.analyze_totals.return_value = {
+                "usage_info": usage_info,
+                "category_usage": category_usage,
+                "recommendations": recommendations,
+                "savings_potential": savings_potential
+            }
+            
             result = await app_service.get_budget_analytics(test_user.id)
             
             assert result.current_month is not None
@@ -423,13 +426,13 @@ class TestBudgetApplicationService:
             assert result.trend_analysis["change_percentage"] == 0
 
         @pytest.mark.asyncio
-        async def test_get_budget_analytics_no_budget(self, app_service, mock_uow, mock_domain_service, test_user, sample_subscriptions):
+        async def test_get_budget_analytics_no_budget(self, app_service, mock_uow, mock_domain_service, test_user, sample_category_totals):
             """測試無預算時的分析數據"""
             mock_uow.budgets.get_by_user_id.return_value = None
-            mock_uow.subscriptions.get_active_by_user_id.return_value = sample_subscriptions
+            mock_uow.subscriptions.get_category_cost_totals.return_value = sample_category_totals
             
             # 模擬無預算的返回值
-            mock_domain_service.calculate_budget_usage.return_value = {
+            usage_info = {
                 "total_budget": 0,
                 "used_amount": 0,
                 "remaining_amount": 0,
@@ -438,23 +441,30 @@ class TestBudgetApplicationService:
                 "over_budget_amount": 0
             }
             
-            mock_domain_service.calculate_category_budget_usage.return_value = {
+            category_usage = {
                 "total_budget": 0,
                 "total_used": 539.0,
                 "categories": {}
             }
             
-            mock_domain_service.get_budget_recommendations.return_value = [
+            recommendations = [
                 "建議設置月度預算限制"
             ]
             
-            mock_domain_service.calculate_savings_potential.return_value = {
+            savings_potential = {
                 "current_yearly_cost": 6468.0,
                 "potential_yearly_cost": 5821.2,
                 "potential_annual_savings": 646.8,
                 "savings_percentage": 10.0
             }
             
+            mock_domain_service.analyze_totals.return_value = {
+                "usage_info": usage_info,
+                "category_usage": category_usage,
+                "recommendations": recommendations,
+                "savings_potential": savings_potential
+            }
+            
             result = await app_service.get_budget_analytics(test_user.id)
             
             assert result.current_month is not None
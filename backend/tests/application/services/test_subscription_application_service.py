@@ -19,6 +19,7 @@ from datetime import datetime
 from app.application.services.subscription_application_service import SubscriptionApplicationService
 from app.domain.services.subscription_domain_service import SubscriptionDomainService
 from app.domain.interfaces.repositories import IUnitOfWork, ISubscriptionRepository
+from app.domain.interfaces.subscription_spec import SubscriptionSpec
 from app.application.dtos.subscription_dtos import (
     CreateSubscriptionCommand,
     UpdateSubscriptionCommand,
@@ -54,6 +55,7 @@ class TestSubscriptionApplicationService:
         mock_service.calculate_total_monthly_cost = Mock()
         mock_service.calculate_total_yearly_cost = Mock()
         mock_service.calculate_category_costs = Mock()
+        mock_service.renewal_start_cutoffs = Mock()
         mock_service.is_due_soon = Mock()
         return mock_service
 
@@ -119,7 +121,7 @@ class TestSubscriptionApplicationService:
             
             # 驗證調用
             mock_domain_service.validate_subscription_data.assert_called_once()
-            mock_domain_service.calculate_twd_price.assert_called_once_with(390.0, "TWD")
+            mock_domain_service.calculate_twd_price.assert_called_once_with(390.0, "TWD", on=datetime(2024, 1, 1))
             mock_uow.begin.assert_called_once()
             mock_uow.subscriptions.create.assert_called_once()
             mock_uow.commit.assert_called_once()
@@ -188,7 +190,7 @@ class TestSubscriptionApplicationService:
             """測試獲取僅活躍訂閱"""
             query = SubscriptionQuery(user_id=test_user.id, include_inactive=False)
             
-            mock_uow.subscriptions.get_active_by_user_id.return_value = [sample_subscription]
+            mock_uow.subscriptions.find.return_value = [sample_subscription]
             mock_domain_service.calculate_monthly_cost.return_value = 390.0
             mock_domain_service.calculate_yearly_cost.return_value = 4680.0
             mock_domain_service.calculate_next_billing_date.return_value = datetime(2024, 2, 1)
@@ -197,14 +199,16 @@ class TestSubscriptionApplicationService:
             
             assert len(result) == 1
             assert result[0].name == "Netflix"
-            mock_uow.subscriptions.get_active_by_user_id.assert_called_once_with(test_user.id)
+            mock_uow.subscriptions.find.assert_called_once_with(
+                SubscriptionSpec.for_user(test_user.id).active()
+            )
 
         @pytest.mark.asyncio
         async def test_get_subscriptions_include_inactive(self, app_service, mock_uow, mock_domain_service, test_user, sample_subscription):
             """測試獲取包含非活躍訂閱"""
             query = SubscriptionQuery(user_id=test_user.id, include_inactive=True)
             
-            mock_uow.subscriptions.get_by_user_id.return_value = [sample_subscription]
+            mock_uow.subscriptions.find.return_value = [sample_subscription]
             mock_domain_service.calculate_monthly_cost.return_value = 390.0
             mock_domain_service.calculate_yearly_cost.return_value = 4680.0
             mock_domain_service.calculate_next_billing_date.return_value = datetime(2024, 2, 1)
@@ -212,7 +216,7 @@ class TestSubscriptionApplicationService:
             result = await app_service.get_subscriptions(query)
             
             assert len(result) == 1
-            mock_uow.subscriptions.get_by_user_id.assert_called_once_with(test_user.id)
+            mock_uow.subscriptions.find.assert_called_once_with(SubscriptionSpec.for_user(test_user.id))
 
         @pytest.mark.asyncio
         async def test_get_subscriptions_filter_by_category(self, app_service, mock_uow, mock_domain_service, test_user):
@@ -240,7 +244,8 @@ class TestSubscriptionApplicationService:
                 include_inactive=False
             )
             
-            mock_uow.subscriptions.get_active_by_user_id.return_value = [entertainment_sub, productivity_sub]
+            # 類別由數據庫篩選，Repository 只返回匹配的行
+            mock_uow.subscriptions.find.return_value = [entertainment_sub]
             mock_domain_service.calculate_monthly_cost.return_value = 390.0
             mock_domain_service.calculate_yearly_cost.return_value = 4680.0
             mock_domain_service.calculate_next_billing_date.return_value = datetime(2024, 2, 1)
@@ -250,6 +255,9 @@ class TestSubscriptionApplicationService:
             # 應該只返回娛樂類別的訂閱
             assert len(result) == 1
             assert result[0].name == "Netflix"
+            spec = mock_uow.subscriptions.find.call_args.args[0]
+            assert spec.is_active is True
+            assert spec.categories == (SubscriptionCategory.ENTERTAINMENT,)
 
     @pytest.mark.unit
     @pytest.mark.application
@@ -339,8 +347,24 @@ class TestSubscriptionApplicationService:
             
             await app_service.update_subscription(test_user.id, command)
             
-            # 驗證重新計算了台幣價格
-            mock_domain_service.calculate_twd_price.assert_called_once_with(10.0, "USD")
+            # 驗證按開始日期的匯率重新計算了台幣價格
+            mock_domain_service.calculate_twd_price.assert_called_once_with(10.0, "USD", on=datetime(2024, 1, 1))
+
+        @pytest.mark.asyncio
+        async def test_update_start_date_reprices_at_new_date(self, app_service, mock_uow, mock_domain_service, test_user, sample_subscription):
+            """測試修改開始日期時按新日期生效的匯率重新計算台幣價格"""
+            command = UpdateSubscriptionCommand(subscription_id=1, start_date=datetime(2023, 6, 1))
+            
+            mock_uow.subscriptions.get_by_user_and_id.return_value = sample_subscription
+            mock_domain_service.calculate_twd_price.return_value = 390.0
+            mock_uow.subscriptions.update.return_value = sample_subscription
+            mock_domain_service.calculate_monthly_cost.return_value = 390.0
+            mock_domain_service.calculate_yearly_cost.return_value = 4680.0
+            mock_domain_service.calculate_next_billing_date.return_value = datetime(2023, 7, 1)
+            
+            await app_service.update_subscription(test_user.id, command)
+            
+            mock_domain_service.calculate_twd_price.assert_called_once_with(390.0, "TWD", on=datetime(2023, 6, 1))
 
     @pytest.mark.unit
     @pytest.mark.application
@@ -379,19 +403,12 @@ class TestSubscriptionApplicationService:
         @pytest.mark.asyncio
         async def test_get_subscription_summary(self, app_service, mock_uow, mock_domain_service, test_user, sample_subscription):
             """測試獲取訂閱摘要"""
-            inactive_subscription = Subscription(
-                id=2,
-                name="Inactive Service",
-                is_active=False,
-                user_id=test_user.id
-            )
-            
-            subscriptions = [sample_subscription, inactive_subscription]
-            
-            mock_uow.subscriptions.get_by_user_id.return_value = subscriptions
-            mock_domain_service.calculate_total_monthly_cost.return_value = 390.0
-            mock_domain_service.calculate_total_yearly_cost.return_value = 4680.0
-            mock_domain_service.calculate_category_costs.return_value = {"entertainment": 390.0}
+            mock_uow.subscriptions.get_category_cost_totals.return_value = {
+                "entertainment": {"count": 1, "monthly_cost": 390.0, "yearly_cost": 4680.0}
+            }
+            mock_uow.subscriptions.count_by_user_id.return_value = 2
+            mock_uow.subscriptions.get_active_started_before.return_value = [sample_subscription]
+            mock_domain_service.renewal_start_cutoffs.return_value = {}
             mock_domain_service.is_due_soon.return_value = True
             mock_domain_service.calculate_monthly_cost.return_value = 390.0
             mock_domain_service.calculate_yearly_cost.return_value = 4680.0
@@ -403,7 +420,9 @@ class TestSubscriptionApplicationService:
             assert result.active_subscriptions == 1
             assert result.total_monthly_cost == 390.0
             assert result.total_yearly_cost == 4680.0
+            assert result.categories == {"entertainment": 390.0}
             assert len(result.upcoming_renewals) == 1
+            mock_uow.subscriptions.get_by_user_id.assert_not_called()
 
     @pytest.mark.unit
     @pytest.mark.application
@@ -418,11 +437,13 @@ class TestSubscriptionApplicationService:
                 operation="activate"
             )
             
-            mock_uow.subscriptions.get_by_user_and_id.return_value = sample_subscription
+            mock_uow.subscriptions.bulk_set_active.return_value = [1, 2]
             
             result = await app_service.bulk_operation(test_user.id, command)
             
             assert result is True
+            mock_uow.subscriptions.bulk_set_active.assert_called_once_with(test_user.id, [1, 2], True)
+            mock_uow.subscriptions.get_by_user_and_id.assert_not_called()
             mock_uow.begin.assert_called_once()
             mock_uow.commit.assert_called_once()
             mock_uow.close.assert_called_once()
@@ -435,13 +456,14 @@ class TestSubscriptionApplicationService:
                 operation="delete"
             )
             
-            mock_uow.subscriptions.get_by_user_and_id.return_value = sample_subscription
+            mock_uow.subscriptions.bulk_delete.return_value = [1, 2]
             
             result = await app_service.bulk_operation(test_user.id, command)
             
             assert result is True
-            # 應該調用刪除操作
-            assert mock_uow.subscriptions.delete.call_count == 2
+            # 應該以一次批量刪除完成
+            mock_uow.subscriptions.bulk_delete.assert_called_once_with(test_user.id, [1, 2])
+            mock_uow.subscriptions.delete.assert_not_called()
 
         @pytest.mark.asyncio
         async def test_bulk_operation_error_rollback(self, app_service, mock_uow, test_user):
@@ -451,7 +473,7 @@ class TestSubscriptionApplicationService:
                 operation="activate"
             )
             
-            mock_uow.subscriptions.get_by_user_and_id.side_effect = Exception("數據庫錯誤")
+            mock_uow.subscriptions.bulk_set_active.side_effect = Exception("數據庫錯誤")
             
             with pytest.raises(HTTPException) as exc_info:
                 await app_service.bulk_operation(test_user.id, command)
@@ -0,0 +1,165 @@
+"""
+請求處理管道中間件測試
+
+測試 RequestPipelineMiddleware：
+- 請求 ID、處理時間和安全響應頭
+- 請求大小與 Content-Type 驗證
+- 請求 / 錯誤計數
+- 訪問日誌模式下的異常處理
+- 流式響應不被緩衝
+"""
+
+import asyncio
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.common.middleware import RequestPipelineMiddleware
+
+
+def create_app(**options):
+    app = FastAPI()
+    app.add_middleware(RequestPipelineMiddleware, max_request_size=1024, **options)
+
+    @app.get("/ping")
+    async def ping(request: Request):
+        return {"request_id": request.state.request_id}
+
+    @app.post("/echo")
+    async def echo(payload: dict):
+        return payload
+
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    return app
+
+
+def pipeline_of(client):
+    """取出應用中間件棧裡的 RequestPipelineMiddleware 實例"""
+    layer = client.app.middleware_stack
+    while not isinstance(layer, RequestPipelineMiddleware):
+        layer = layer.app
+    return layer
+
+
+@pytest.mark.unit
+class TestRequestPipelineMiddleware:
+    """請求處理管道測試類"""
+
+    def test_adds_request_id_timing_and_security_headers(self):
+        """測試響應頭包含請求 ID、處理時間和安全頭，且請求 ID 與 request.state 一致"""
+        with TestClient(create_app()) as client:
+            response = client.get("/ping")
+
+        assert response.status_code == 200
+        assert response.headers["X-Request-ID"] == response.json()["request_id"]
+        assert float(response.headers["X-Process-Time"]) >= 0
+        assert response.headers["X-Content-Type-Options"] == "nosniff"
+        assert response.headers["X-Frame-Options"] == "DENY"
+        assert response.headers["X-API-Version"] == "1.0"
+
+    def test_security_headers_can_be_disabled(self):
+        """測試關閉安全頭後只保留請求 ID 和處理時間"""
+        with TestClient(create_app(security_headers=False)) as client:
+            response = client.get("/ping")
+
+        assert "X-Request-ID" in response.headers
+        assert "X-Frame-Options" not in response.headers
+
+    def test_rejects_oversized_request(self):
+        """測試請求體超過上限時返回 413"""
+        with TestClient(create_app()) as client:
+            response = client.post("/echo", json={"data": "x" * 2048})
+
+        assert response.status_code == 413
+        assert response.json()["message"] == "請求驗證失敗"
+        assert "X-Request-ID" in response.headers
+
+    def test_body_size_limit_matches_path_suffix(self):
+        """測試按路徑後綴放寬上限：同一路由掛載在不同前綴下都生效，其他路徑仍使用默認上限"""
+        app = create_app(body_size_limits={"/items/import": 64 * 1024})
+
+        @app.post("/api/v1/items/import")
+        @app.post("/api/items/import")
+        async def import_items(payload: dict):
+            return {"size": len(payload["data"])}
+
+        with TestClient(app) as client:
+            payload = {"data": "x" * 4096}
+            responses = [client.post(path, json=payload) for path in ("/api/v1/items/import", "/api/items/import")]
+            rejected = client.post("/echo", json=payload)
+
+        assert [response.status_code for response in responses] == [200, 200]
+        assert rejected.status_code == 413
+
+    def test_rejects_unsupported_content_type(self):
+        """測試 POST 請求的 Content-Type 不受支持時返回 415"""
+        with TestClient(create_app()) as client:
+            response = client.post("/echo", content="a=1", headers={"Content-Type": "text/plain"})
+            accepted = client.post("/echo", json={"a": 1})
+
+        assert response.status_code == 415
+        assert accepted.status_code == 200
+        assert accepted.json() == {"a": 1}
+
+    def test_validation_can_be_disabled(self):
+        """測試關閉驗證後不檢查 Content-Type"""
+        with TestClient(create_app(validate_requests=False)) as client:
+            response = client.post("/echo", content="a=1", headers={"Content-Type": "text/plain"})
+
+        assert response.status_code == 422
+
+    def test_counts_requests_and_errors(self):
+        """測試請求數和錯誤數（4xx / 5xx）"""
+        with TestClient(create_app(), raise_server_exceptions=False) as client:
+            client.get("/ping")
+            client.get("/not-found")
+            client.get("/boom")
+            pipeline = pipeline_of(client)
+
+        assert pipeline.request_count == 3
+        assert pipeline.error_count == 2
+
+    def test_access_log_mode_returns_json_500(self):
+        """測試訪問日誌模式下未處理異常返回帶請求 ID 的 500 響應"""
+        with TestClient(create_app(access_log=True), raise_server_exceptions=False) as client:
+            response = client.get("/boom")
+
+        assert response.status_code == 500
+        assert response.json() == {
+            "error": "內部服務器錯誤",
+            "request_id": response.headers["X-Request-ID"]
+        }
+
+    def test_streaming_response_is_not_buffered(self):
+        """測試流式響應的每個分塊都直接透傳到下游"""
+        async def chunks():
+            for index in range(3):
+                yield f"chunk-{index}\n".encode()
+
+        async def app(scope, receive, send):
+            await StreamingResponse(chunks())(scope, receive, send)
+
+        pipeline = RequestPipelineMiddleware(app)
+        messages = []
+
+        async def receive():
+            # 客戶端未斷開：流式響應監聽斷開事件時一直等待
+            await asyncio.Event().wait()
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            "type": "http", "method": "GET", "path": "/stream", "headers": [],
+            "query_string": b"", "client": ("127.0.0.1", 1234)
+        }
+        asyncio.run(pipeline(scope, receive, send))
+
+        bodies = [message["body"] for message in messages if message["type"] == "http.response.body"]
+        assert bodies[:3] == [b"chunk-0\n", b"chunk-1\n", b"chunk-2\n"]
+        assert scope["state"]["request_id"]
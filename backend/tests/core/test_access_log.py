@@ -0,0 +1,223 @@
+"""
+訪問日誌採樣測試
+
+測試 app.core.access_log.AccessLogSampler：
+- 成功請求按比例採樣，錯誤和慢請求始終記錄
+- 按路由定期寫匯總行（請求數、錯誤數、延遲分位數）
+- 經中間件的訪問日誌
+- 採樣後訪問日誌寫入量和文件輪轉次數
+"""
+
+import logging
+import logging.handlers
+import random
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app.common.middleware import RequestPipelineMiddleware
+from app.core.access_log import AccessLogSampler
+from app.core.logging_config import APILogger, JSONFormatter, bind_log_context, reset_log_context
+
+REQUESTS = 20000
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """記錄輪轉次數的文件處理器"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rollovers = 0
+
+    def doRollover(self):
+        self.rollovers += 1
+        super().doRollover()
+
+
+class CollectingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def access_records():
+    """替換 access 記錄器的處理器，收集寫入的記錄"""
+    logger = logging.getLogger("access")
+    handlers, level, propagate = logger.handlers, logger.level, logger.propagate
+    handler = CollectingHandler()
+    logger.handlers = [handler]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    yield handler.records
+    logger.handlers, logger.propagate = handlers, propagate
+    logger.setLevel(level)
+
+
+@pytest.mark.unit
+class TestAccessLogSampling:
+    """採樣決策測試類"""
+
+    def test_full_logging_by_default(self):
+        """測試默認每個請求都記錄，且不另寫匯總行"""
+        sampler = AccessLogSampler()
+
+        assert all(sampler.record("GET", "/health", 200, 0.001) for _ in range(100))
+        assert sampler.rollup_interval == 0
+        assert sampler.flush() == 0
+
+    def test_errors_and_slow_requests_always_logged(self):
+        """測試採樣比例為 0 時仍記錄錯誤和慢請求"""
+        sampler = AccessLogSampler(sample_rate=0.0, slow_threshold=0.5, rollup_interval=0)
+
+        assert sampler.record("GET", "/items", 200, 0.01) is False
+        assert sampler.record("GET", "/items", 404, 0.01) is True
+        assert sampler.record("POST", "/items", 500, 0.01) is True
+        assert sampler.record("GET", "/items", 200, 0.8) is True
+        assert sampler.stats()["skipped"] == 1
+
+    def test_successful_requests_sampled_at_ratio(self):
+        """測試成功請求按比例採樣"""
+        sampler = AccessLogSampler(sample_rate=0.1, rollup_interval=0, rng=random.Random(42))
+
+        logged = sum(sampler.record("GET", "/items", 200, 0.01) for _ in range(10000))
+
+        assert 900 < logged < 1100
+
+    def test_rejects_invalid_sample_rate(self):
+        """測試採樣比例超出範圍"""
+        with pytest.raises(ValueError):
+            AccessLogSampler(sample_rate=1.5)
+
+
+@pytest.mark.unit
+class TestAccessLogRollup:
+    """路由匯總測試類"""
+
+    def test_rollup_lines_per_route(self, access_records):
+        """測試匯總週期到期時每個路由寫一行匯總，包含未被採樣的請求"""
+        clock = FakeClock()
+        sampler = AccessLogSampler(sample_rate=0.0, rollup_interval=60, clock=clock)
+        for _ in range(98):
+            sampler.record("GET", "/api/v1/subscriptions/", 200, 0.02)
+        sampler.record("GET", "/api/v1/subscriptions/", 500, 0.02)
+        sampler.record("GET", "/health", 200, 0.001)
+        assert access_records == []
+
+        clock.now = 61
+        sampler.record("GET", "/health", 200, 0.001)
+
+        subscriptions, health = access_records
+        assert subscriptions.endpoint == "/api/v1/subscriptions/"
+        assert subscriptions.rollup["count"] == 99
+        assert subscriptions.rollup["errors"] == 1
+        assert subscriptions.rollup["logged"] == 1
+        assert subscriptions.rollup["window_seconds"] == 61
+        assert 10 <= subscriptions.rollup["latency_ms"]["p50"] <= 25
+        assert health.rollup["count"] == 2
+        assert sampler.stats()["pending_routes"] == 0
+
+    def test_rollup_does_not_carry_request_context(self, access_records):
+        """測試觸發匯總的請求的上下文不寫入匯總行"""
+        clock = FakeClock()
+        sampler = AccessLogSampler(rollup_interval=60, clock=clock)
+        token = bind_log_context(request_id="req-1", user_id=1)
+        try:
+            sampler.record("GET", "/health", 200, 0.001)
+            clock.now = 60
+            sampler.record("GET", "/health", 200, 0.001)
+        finally:
+            reset_log_context(token)
+
+        assert len(access_records) == 1
+        assert not hasattr(access_records[0], "request_id")
+
+    def test_rollup_can_be_disabled(self, access_records):
+        """測試匯總間隔為 0 時不寫匯總行"""
+        sampler = AccessLogSampler(rollup_interval=0)
+        sampler.record("GET", "/health", 200, 0.001)
+
+        assert sampler.flush() == 0
+        assert access_records == []
+
+
+@pytest.mark.integration
+class TestSampledAccessLogMiddleware:
+    """中間件訪問日誌採樣測試類"""
+
+    def test_middleware_logs_errors_and_rolls_up_routes(self, access_records):
+        """測試中間件只逐條記錄錯誤請求，匯總行按路由模板統計全部請求"""
+        sampler = AccessLogSampler(sample_rate=0.0, rollup_interval=3600)
+        app = FastAPI()
+        app.add_middleware(RequestPipelineMiddleware, access_log=True, access_sampler=sampler)
+
+        @app.get("/items/{item_id}")
+        async def get_item(item_id: int):
+            if item_id == 0:
+                raise HTTPException(status_code=404, detail="not found")
+            return {"id": item_id}
+
+        with TestClient(app) as client:
+            for item_id in range(5):
+                client.get(f"/items/{item_id}")
+
+        assert len(access_records) == 1
+        assert access_records[0].getMessage().startswith("GET /items/0 - Status: 404")
+        sampler.flush()
+        rollup = access_records[-1]
+        assert rollup.endpoint == "/items/{item_id}"
+        assert (rollup.rollup["count"], rollup.rollup["errors"]) == (5, 1)
+
+
+@pytest.mark.performance
+class TestAccessLogVolume:
+    """訪問日誌寫入量測試類"""
+
+    def write_access_log(self, path, sampler):
+        handler = CountingRotatingFileHandler(path, maxBytes=256 * 1024, backupCount=1000, encoding="utf-8")
+        handler.setFormatter(JSONFormatter())
+        logger = logging.getLogger("access")
+        logger.handlers = [handler]
+        rng = random.Random(7)
+        for index in range(REQUESTS):
+            status_code = 500 if index % 1000 == 0 else 200
+            response_time = rng.uniform(0.005, 0.05)
+            route = "/api/v1/subscriptions/{subscription_id}" if index % 2 else "/api/v1/subscriptions/"
+            if sampler.record("GET", route, status_code, response_time):
+                APILogger.log_request("GET", route, 1, "127.0.0.1", status_code, response_time)
+        sampler.flush()
+        handler.close()
+        written = sum(file.stat().st_size for file in path.parent.iterdir())
+        return written, handler.rollovers
+
+    def test_sampling_reduces_volume_and_rotation(self, tmp_path, access_records):
+        """測試採樣 1% 時訪問日誌寫入量和輪轉次數下降兩個數量級"""
+        (tmp_path / "full").mkdir()
+        (tmp_path / "sampled").mkdir()
+        full_bytes, full_rollovers = self.write_access_log(
+            tmp_path / "full" / "access.log", AccessLogSampler(rollup_interval=60)
+        )
+        sampled_bytes, sampled_rollovers = self.write_access_log(
+            tmp_path / "sampled" / "access.log",
+            AccessLogSampler(sample_rate=0.01, rollup_interval=60, rng=random.Random(7))
+        )
+
+        print(
+            f"\n{REQUESTS} 個請求的訪問日誌: 全量 {full_bytes / 1024:.0f}KB / 輪轉 {full_rollovers} 次, "
+            f"採樣 1% {sampled_bytes / 1024:.0f}KB / 輪轉 {sampled_rollovers} 次"
+        )
+        assert sampled_bytes * 30 < full_bytes
+        assert full_rollovers >= 10
+        assert sampled_rollovers == 0
@@ -0,0 +1,256 @@
+"""
+請求級日誌上下文測試
+
+測試 app.core.logging_config 中基於 contextvars 的日誌上下文：
+- 過濾器注入上下文字段，extra 傳入的字段優先
+- LogContext 嵌套與恢復
+- 並發請求的日誌記錄只帶自己請求的 request_id / user_id
+- 每條日誌的上下文注入開銷（記錄工廠替換 vs 過濾器）
+"""
+
+import asyncio
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+from fastapi import Depends, FastAPI, Request
+
+from app.common.middleware import RequestPipelineMiddleware
+from app.core.logging_config import (
+    LogContextFilter,
+    bind_log_context,
+    get_log_context,
+    log_with_context,
+    reset_log_context,
+    update_log_context
+)
+
+RECORDS = 20000
+
+
+class CollectingHandler(logging.Handler):
+    """收集日誌記錄（帶上下文過濾器）"""
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.addFilter(LogContextFilter())
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def captured():
+    handler = CollectingHandler()
+    logger = logging.getLogger("test.log_context")
+    logger.handlers = [handler]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    yield logger, handler.records
+    logger.handlers = []
+
+
+@pytest.mark.unit
+class TestLogContextFilter:
+    """日誌上下文過濾器測試類"""
+
+    def test_injects_bound_fields(self, captured):
+        """測試綁定的字段寫入記錄，未綁定時不添加"""
+        logger, records = captured
+        logger.info("綁定前")
+        token = bind_log_context(request_id="req-1", endpoint="/health")
+        update_log_context(user_id=7)
+        logger.info("綁定後")
+        reset_log_context(token)
+
+        assert not hasattr(records[0], "request_id")
+        assert (records[1].request_id, records[1].endpoint, records[1].user_id) == ("req-1", "/health", 7)
+        assert get_log_context() == {}
+
+    def test_extra_takes_precedence(self, captured):
+        """測試 extra 傳入的同名字段不被上下文覆蓋"""
+        logger, records = captured
+        token = bind_log_context(user_id=1)
+        logger.info("記錄", extra={"user_id": 2})
+        reset_log_context(token)
+
+        assert records[0].user_id == 2
+
+    def test_update_outside_request_is_ignored(self):
+        """測試不在請求上下文中時補充字段被忽略"""
+        update_log_context(user_id=1)
+
+        assert get_log_context() == {}
+
+    def test_log_context_nests_and_restores(self, captured):
+        """測試 LogContext 合併外層上下文，退出後恢復"""
+        logger, records = captured
+        token = bind_log_context(request_id="req-1")
+        with log_with_context(logger, operation="import") as context_logger:
+            context_logger.info("內層")
+        logger.info("外層")
+        reset_log_context(token)
+
+        assert (records[0].request_id, records[0].operation) == ("req-1", "import")
+        assert records[1].request_id == "req-1"
+        assert not hasattr(records[1], "operation")
+
+
+@pytest.mark.integration
+class TestConcurrentLogContext:
+    """並發請求日誌上下文測試類"""
+
+    def test_concurrent_tasks_and_threads_keep_their_own_context(self, captured):
+        """測試交錯執行的協程和線程只看到自己綁定的上下文"""
+        logger, records = captured
+
+        async def handle(index):
+            token = bind_log_context(request_id=f"task-{index}")
+            try:
+                for step in range(5):
+                    logger.info("task-%d step %d", index, step)
+                    await asyncio.sleep(random.random() / 1000)
+            finally:
+                reset_log_context(token)
+
+        async def run_tasks():
+            await asyncio.gather(*(handle(index) for index in range(50)))
+
+        def handle_in_thread(index):
+            token = bind_log_context(request_id=f"thread-{index}")
+            try:
+                for step in range(5):
+                    logger.info("thread-%d step %d", index, step)
+                    time.sleep(random.random() / 1000)
+            finally:
+                reset_log_context(token)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [executor.submit(handle_in_thread, index) for index in range(50)]
+            asyncio.run(run_tasks())
+            for future in futures:
+                future.result()
+
+        assert len(records) == 500
+        for record in records:
+            assert record.getMessage().split()[0] == record.request_id
+
+    def test_requests_through_middleware_are_correlated(self, captured):
+        """測試並發請求經中間件後，端點、線程池中的依賴和訪問日誌都帶正確的請求 ID 和用戶 ID"""
+        logger, records = captured
+        app = FastAPI()
+        app.add_middleware(RequestPipelineMiddleware)
+        access_records = []
+        access_handler = CollectingHandler()
+        access_handler.emit = access_records.append
+        middleware_logger = logging.getLogger("app.common.middleware")
+        middleware_logger.addHandler(access_handler)
+        middleware_level = middleware_logger.level
+        middleware_logger.setLevel(logging.INFO)
+
+        def current_user(request: Request):
+            # 同步依賴在線程池中執行
+            user_id = int(request.query_params["user"])
+            update_log_context(user_id=user_id)
+            logger.info("認證用戶 %d", user_id)
+            return user_id
+
+        @app.get("/work")
+        async def work(request: Request, user_id: int = Depends(current_user)):
+            for step in range(3):
+                logger.info("處理 %s", request.state.request_id)
+                await asyncio.sleep(random.random() / 1000)
+            return {"request_id": request.state.request_id}
+
+        async def run_requests():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await asyncio.gather(*(client.get(f"/work?user={user}") for user in range(30)))
+
+        try:
+            responses = asyncio.run(run_requests())
+        finally:
+            middleware_logger.removeHandler(access_handler)
+            middleware_logger.setLevel(middleware_level)
+
+        users_by_request = {
+            response.headers["X-Request-ID"]: int(response.request.url.params["user"]) for response in responses
+        }
+        assert len(users_by_request) == 30
+        handler_records = [record for record in records if record.getMessage().startswith("處理")]
+        assert len(handler_records) == 90
+        for record in handler_records:
+            assert record.getMessage() == f"處理 {record.request_id}"
+            assert record.user_id == users_by_request[record.request_id]
+        for record in [record for record in records if record.getMessage().startswith("認證用戶")]:
+            assert record.getMessage() == f"認證用戶 {users_by_request[record.request_id]}"
+        assert len(access_records) == 30
+        for record in access_records:
+            assert record.user_id == users_by_request[record.request_id]
+            assert record.endpoint == "/work"
+
+
+class LegacyLogContext:
+    """改動前的實現：進入時替換全局記錄工廠"""
+
+    def __init__(self, **context):
+        self.context = context
+        self.old_factory = logging.getLogRecordFactory()
+
+    def __enter__(self):
+        def record_factory(*args, **kwargs):
+            record = self.old_factory(*args, **kwargs)
+            for key, value in self.context.items():
+                setattr(record, key, value)
+            return record
+
+        logging.setLogRecordFactory(record_factory)
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        logging.setLogRecordFactory(self.old_factory)
+
+
+def log_records(logger):
+    start = time.perf_counter()
+    for index in range(RECORDS):
+        logger.info("GET /api/v1/subscriptions/%d", index)
+    return time.perf_counter() - start
+
+
+@pytest.mark.performance
+class TestLogContextOverhead:
+    """日誌上下文開銷測試類"""
+
+    def test_filter_overhead_not_higher_than_record_factory(self):
+        """測試每條日誌的上下文注入開銷不高於記錄工廠替換"""
+        fields = {"request_id": "req-1", "user_id": 1, "ip_address": "127.0.0.1", "endpoint": "/api", "method": "GET"}
+        legacy_logger = logging.getLogger("test.log_context.legacy")
+        legacy_logger.handlers = [logging.NullHandler()]
+        legacy_logger.propagate = False
+        legacy_logger.setLevel(logging.INFO)
+        context_logger = logging.getLogger("test.log_context.contextvars")
+        context_handler = logging.NullHandler()
+        context_handler.addFilter(LogContextFilter())
+        context_logger.handlers = [context_handler]
+        context_logger.propagate = False
+        context_logger.setLevel(logging.INFO)
+
+        # 外層中間件和內層 log_with_context 各包一層
+        with LegacyLogContext(**fields), LegacyLogContext(operation="list"):
+            legacy = min(log_records(legacy_logger) for _ in range(3))
+        token = bind_log_context(**fields)
+        try:
+            with log_with_context(context_logger, operation="list"):
+                contextvars = min(log_records(context_logger) for _ in range(3))
+        finally:
+            reset_log_context(token)
+
+        print(
+            f"\n{RECORDS} 條帶上下文的日誌: 記錄工廠替換 {legacy * 1000:.0f}ms, "
+            f"contextvars + 過濾器 {contextvars * 1000:.0f}ms"
+        )
+        assert contextvars < legacy
@@ -0,0 +1,289 @@
+"""
+隊列化日誌管道測試
+
+測試 app.core.log_queue 和 setup_logging：
+- 記錄在後台線程寫入
+- 隊列滿時按策略丟棄或等待，並計數
+- 積壓的記錄合併為一次批量寫入
+- 批量寫入時的文件輪轉
+- 磁盤變慢時調用線程的日誌開銷（直接寫入 vs 入隊）
+"""
+
+import io
+import json
+import logging
+import queue
+import threading
+import time
+
+import pytest
+
+from app.core import logging_config
+from app.core.log_queue import (
+    BLOCK,
+    DROP,
+    BatchedRotatingFileHandler,
+    BatchedStreamHandler,
+    BatchingQueueListener,
+    BoundedQueueHandler,
+    LogQueueStats
+)
+from app.core.logging_config import JSONFormatter
+
+RECORDS = 2000
+SLOW_WRITE = 0.0002
+
+
+class RecordingStream(io.StringIO):
+    """記錄每次 write 調用的線程和內容"""
+
+    def __init__(self):
+        super().__init__()
+        self.writes = []
+
+    def write(self, data):
+        self.writes.append((threading.current_thread().name, data))
+        return super().write(data)
+
+
+class SlowStream(io.StringIO):
+    """每次 write 固定延遲，模擬繁忙的磁盤或網絡文件系統"""
+
+    def write(self, data):
+        time.sleep(SLOW_WRITE)
+        return super().write(data)
+
+
+def make_logger(name, handler):
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+
+@pytest.fixture
+def stats():
+    return LogQueueStats()
+
+
+@pytest.mark.unit
+class TestBoundedQueueHandler:
+    """有界隊列處理器測試類"""
+
+    def test_records_are_written_on_background_thread(self, stats):
+        """測試記錄由後台線程 log-writer 寫出"""
+        stream = RecordingStream()
+        console = BatchedStreamHandler(stream)
+        console.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+        log_queue = queue.Queue(maxsize=100)
+        listener = BatchingQueueListener(log_queue, {"root": [console]}, stats)
+        logger = make_logger("test.log_queue.thread", BoundedQueueHandler(log_queue, "root", stats))
+
+        listener.start()
+        logger.info("用戶 %s 登入", "alice")
+        listener.stop()
+
+        assert stream.getvalue() == "INFO 用戶 alice 登入\n"
+        assert {thread for thread, _ in stream.writes} == {"log-writer"}
+
+    def test_message_args_are_merged_when_enqueued(self, stats):
+        """測試入隊時合併消息參數，之後修改參數對象不影響日誌內容"""
+        log_queue = queue.Queue()
+        logger = make_logger("test.log_queue.args", BoundedQueueHandler(log_queue, "root", stats))
+        payload = {"plan": "basic"}
+
+        logger.info("訂閱 %s", payload)
+        payload["plan"] = "premium"
+
+        _, record = log_queue.get_nowait()
+        assert record.getMessage() == "訂閱 {'plan': 'basic'}"
+
+    def test_drop_policy_counts_dropped_records(self, stats):
+        """測試隊列已滿時丟棄策略立即返回並按級別計數"""
+        log_queue = queue.Queue(maxsize=2)
+        logger = make_logger("test.log_queue.drop", BoundedQueueHandler(log_queue, "root", stats, policy=DROP))
+
+        start = time.perf_counter()
+        for index in range(5):
+            logger.info("記錄 %d", index)
+        logger.warning("警告")
+        elapsed = time.perf_counter() - start
+
+        snapshot = stats.snapshot()
+        assert log_queue.qsize() == 2
+        assert snapshot["enqueued"] == 2
+        assert snapshot["dropped"] == 4
+        assert snapshot["dropped_by_level"] == {"INFO": 3, "WARNING": 1}
+        assert elapsed < 0.5
+
+    def test_drop_policy_waits_for_error_records(self, stats):
+        """測試丟棄策略下 ERROR 記錄仍等待隊列騰出空間"""
+        log_queue = queue.Queue(maxsize=1)
+        logger = make_logger(
+            "test.log_queue.error",
+            BoundedQueueHandler(log_queue, "root", stats, policy=DROP, block_timeout=2.0)
+        )
+        logger.info("佔滿隊列")
+        threading.Timer(0.05, log_queue.get_nowait).start()
+
+        logger.error("數據庫連接失敗")
+
+        _, record = log_queue.get(timeout=1)
+        assert record.getMessage() == "數據庫連接失敗"
+        assert stats.snapshot()["dropped"] == 0
+
+    def test_block_policy_waits_then_drops_after_timeout(self, stats):
+        """測試等待策略在超時前等待空間，超時後丟棄並計數"""
+        log_queue = queue.Queue(maxsize=1)
+        logger = make_logger(
+            "test.log_queue.block",
+            BoundedQueueHandler(log_queue, "root", stats, policy=BLOCK, block_timeout=0.05)
+        )
+        logger.info("佔滿隊列")
+
+        start = time.perf_counter()
+        logger.info("超時丟棄")
+        elapsed = time.perf_counter() - start
+
+        assert elapsed >= 0.05
+        assert stats.snapshot()["dropped_by_level"] == {"INFO": 1}
+
+    def test_rejects_unknown_policy(self, stats):
+        """測試不支持的策略"""
+        with pytest.raises(ValueError):
+            BoundedQueueHandler(queue.Queue(), "root", stats, policy="spill")
+
+
+@pytest.mark.unit
+class TestBatchingQueueListener:
+    """後台批量寫入線程測試類"""
+
+    def test_backlog_is_written_in_one_batch(self, stats):
+        """測試積壓的記錄合併為一次 write，並按目標和級別分發"""
+        app_stream, error_stream, access_stream = RecordingStream(), RecordingStream(), RecordingStream()
+        app_handler = BatchedStreamHandler(app_stream)
+        error_handler = BatchedStreamHandler(error_stream)
+        error_handler.setLevel(logging.ERROR)
+        access_handler = BatchedStreamHandler(access_stream)
+        log_queue = queue.Queue()
+        root = make_logger("test.log_queue.batch", BoundedQueueHandler(log_queue, "root", stats))
+        access = make_logger("test.log_queue.access", BoundedQueueHandler(log_queue, "access", stats))
+
+        # 啟動前寫入，模擬寫入線程跟不上時的積壓
+        for index in range(100):
+            root.info("記錄 %d", index)
+        root.error("錯誤")
+        access.info("GET /health")
+        listener = BatchingQueueListener(
+            log_queue, {"root": [app_handler, error_handler], "access": [access_handler]}, stats
+        )
+        listener.start()
+        listener.stop()
+
+        assert len(app_stream.writes) == 1
+        assert app_stream.getvalue().splitlines()[:2] == ["記錄 0", "記錄 1"]
+        assert len(app_stream.getvalue().splitlines()) == 101
+        assert error_stream.getvalue() == "錯誤\n"
+        assert access_stream.getvalue() == "GET /health\n"
+        snapshot = stats.snapshot()
+        assert snapshot["batches"] == 1
+        assert snapshot["records_written"] == 102
+
+    def test_batch_size_limits_records_per_write(self, stats):
+        """測試每批記錄數不超過 batch_size"""
+        stream = RecordingStream()
+        log_queue = queue.Queue()
+        logger = make_logger("test.log_queue.limit", BoundedQueueHandler(log_queue, "root", stats))
+        for index in range(25):
+            logger.info("記錄 %d", index)
+
+        listener = BatchingQueueListener(log_queue, {"root": [BatchedStreamHandler(stream)]}, stats, batch_size=10)
+        listener.start()
+        listener.stop()
+
+        assert len(stream.writes) == 3
+        assert stats.snapshot()["max_batch"] == 10
+
+    def test_rotating_handler_rolls_over_before_batch(self, stats, tmp_path):
+        """測試批量寫入前超出大小上限時先輪轉文件"""
+        handler = BatchedRotatingFileHandler(tmp_path / "app.log", maxBytes=200, backupCount=2, encoding="utf-8")
+        log_queue = queue.Queue()
+        listener = BatchingQueueListener(log_queue, {"root": [handler]}, stats, batch_size=5)
+        logger = make_logger("test.log_queue.rotate", BoundedQueueHandler(log_queue, "root", stats))
+        for index in range(20):
+            logger.info("x" * 30 + str(index))
+
+        listener.start()
+        listener.stop()
+
+        assert (tmp_path / "app.log.1").exists()
+        assert (tmp_path / "app.log").read_text(encoding="utf-8").splitlines()[-1].endswith("19")
+
+
+@pytest.mark.integration
+class TestSetupLogging:
+    """日誌系統初始化測試類"""
+
+    def test_loggers_write_through_queue(self, tmp_path, monkeypatch):
+        """測試各記錄器經隊列寫入原有的日誌文件"""
+        monkeypatch.chdir(tmp_path)
+        try:
+            logging_config.setup_logging()
+            stats = logging_config.get_logging_stats()
+            logging.getLogger("app").error("應用錯誤")
+            logging.getLogger("security").warning("可疑請求")
+            logging.getLogger("access").info("GET /health")
+        finally:
+            logging_config.shutdown_logging()
+
+        logs = tmp_path / "logs"
+        app_messages = [json.loads(line)["message"] for line in (logs / "app.log").read_text().splitlines()]
+        assert stats["running"] is True
+        assert stats["policy"] == "drop"
+        assert "應用錯誤" in app_messages
+        assert "可疑請求" in app_messages
+        assert json.loads((logs / "error.log").read_text())["message"] == "應用錯誤"
+        assert json.loads((logs / "security.log").read_text())["message"] == "可疑請求"
+        assert json.loads((logs / "access.log").read_text())["message"] == "GET /health"
+        assert logging_config.get_logging_stats()["running"] is False
+
+
+@pytest.mark.performance
+class TestQueuedLoggingPerformance:
+    """調用線程日誌開銷測試類"""
+
+    def test_caller_does_not_wait_for_slow_disk(self, stats):
+        """測試磁盤寫入變慢時，入隊的調用線程耗時遠低於直接寫入"""
+        direct_handler = logging.StreamHandler(SlowStream())
+        direct_handler.setFormatter(JSONFormatter())
+        direct = make_logger("test.log_queue.perf.direct", direct_handler)
+
+        queued_stream = SlowStream()
+        queued_handler = BatchedStreamHandler(queued_stream)
+        queued_handler.setFormatter(JSONFormatter())
+        log_queue = queue.Queue(maxsize=RECORDS * 2)
+        listener = BatchingQueueListener(log_queue, {"root": [queued_handler]}, stats)
+        queued = make_logger("test.log_queue.perf.queued", BoundedQueueHandler(log_queue, "root", stats))
+
+        start = time.perf_counter()
+        for index in range(RECORDS):
+            direct.info("GET /api/v1/subscriptions/%d - 200", index)
+        direct_elapsed = time.perf_counter() - start
+
+        listener.start()
+        start = time.perf_counter()
+        for index in range(RECORDS):
+            queued.info("GET /api/v1/subscriptions/%d - 200", index)
+        queued_elapsed = time.perf_counter() - start
+        listener.stop()
+
+        snapshot = stats.snapshot()
+        print(
+            f"\n{RECORDS} 條日誌的調用線程耗時（每次 write 延遲 {SLOW_WRITE * 1000:.1f}ms）: "
+            f"直接寫入 {direct_elapsed * 1000:.0f}ms, 入隊 {queued_elapsed * 1000:.0f}ms; "
+            f"後台 {snapshot['batches']} 次寫入，平均每批 {snapshot['avg_batch']} 條"
+        )
+        assert snapshot["dropped"] == 0
+        assert len(queued_stream.getvalue().splitlines()) == RECORDS
+        assert queued_elapsed * 3 < direct_elapsed
@@ -0,0 +1,244 @@
+"""
+指標註冊表測試
+
+測試 app.core.metrics：
+- 直方圖分位數估算
+- 按路由模板記錄請求數、錯誤數和延遲
+- 每個請求內的 SQL 數量和耗時
+- Prometheus 文本格式輸出
+- 多進程快照合併、後台寫入和啟動前清空
+"""
+
+import asyncio
+import multiprocessing
+
+import pytest
+from fastapi import APIRouter, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.common.middleware import RequestPipelineMiddleware
+from app.core.metrics import (
+    LATENCY_BUCKETS,
+    UNMATCHED_ROUTE,
+    Histogram,
+    MetricsRegistry,
+    clear_multiprocess_dir,
+    instrument_engine
+)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'metrics.db'}", connect_args={"check_same_thread": False})
+    instrument_engine(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+
+@pytest.fixture
+def client(registry, engine):
+    app = FastAPI()
+    app.add_middleware(RequestPipelineMiddleware, metrics=registry)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        if item_id == 0:
+            raise HTTPException(status_code=404, detail="not found")
+        return {"id": item_id}
+
+    @app.get("/report")
+    def report():
+        # 同步端點在線程池中執行，SQL 仍計入當前請求
+        with engine.connect() as conn:
+            return {"values": [conn.execute(text(f"SELECT {index}")).scalar() for index in range(3)]}
+
+    router = APIRouter()
+
+    @router.get("/{subscription_id}")
+    async def get_subscription(subscription_id: int):
+        return {"id": subscription_id}
+
+    api_router = APIRouter()
+    api_router.include_router(router, prefix="/subscriptions")
+    app.include_router(api_router, prefix="/api/v1")
+
+    with TestClient(app) as client:
+        yield client
+
+
+def record_in_worker(directory):
+    registry = MetricsRegistry(multiprocess_dir=directory)
+    registry.observe_request("GET", "/health", 200, 0.01)
+    registry.flush()
+
+
+@pytest.mark.unit
+class TestHistogram:
+    """直方圖測試類"""
+
+    def test_quantiles_interpolate_within_buckets(self):
+        """測試分位數在桶內線性插值"""
+        histogram = Histogram((0.1, 0.2, 0.4))
+        for _ in range(50):
+            histogram.observe(0.05)
+        for _ in range(50):
+            histogram.observe(0.3)
+
+        assert histogram.quantile(0.5) == pytest.approx(0.1)
+        assert histogram.quantile(0.75) == pytest.approx(0.3)
+        assert histogram.quantile(0.99) == pytest.approx(0.396)
+
+    def test_overflow_returns_largest_bound(self):
+        """測試落在 +Inf 桶的分位數返回最大有限邊界"""
+        histogram = Histogram((0.1, 0.2))
+        histogram.observe(5.0)
+
+        assert histogram.counts == [0, 0, 1]
+        assert histogram.quantile(0.99) == 0.2
+
+    def test_merge(self):
+        """測試直方圖按桶相加"""
+        first, second = Histogram(LATENCY_BUCKETS), Histogram(LATENCY_BUCKETS)
+        first.observe(0.01)
+        second.observe(0.01)
+        second.observe(3.0)
+        first.merge(second)
+
+        assert first.count == 3
+        assert first.sum == pytest.approx(3.02)
+
+
+@pytest.mark.integration
+class TestRequestMetrics:
+    """請求指標測試類"""
+
+    def test_records_by_route_template(self, client, registry):
+        """測試不同路徑參數的請求歸入同一個路由模板"""
+        for item_id in (1, 2, 0):
+            client.get(f"/items/{item_id}")
+        client.get("/no-such-route")
+
+        routes = registry.snapshot().routes
+        item_metrics = routes[("GET", "/items/{item_id}")]
+        assert item_metrics.statuses == {"200": 2, "404": 1}
+        assert item_metrics.errors == 1
+        assert item_metrics.latency.count == 3
+        assert routes[("GET", UNMATCHED_ROUTE)].statuses == {"404": 1}
+
+    def test_nested_router_template_includes_prefixes(self, client, registry):
+        """測試嵌套路由的模板包含各層前綴"""
+        client.get("/api/v1/subscriptions/7")
+        client.get("/api/v1/subscriptions/8")
+
+        routes = registry.snapshot().routes
+        assert routes[("GET", "/api/v1/subscriptions/{subscription_id}")].requests == 2
+
+    def test_counts_queries_per_request(self, client, registry):
+        """測試記錄請求內執行的 SQL 數量和耗時"""
+        client.get("/report")
+        client.get("/report")
+        client.get("/items/1")
+
+        routes = registry.snapshot().routes
+        assert routes[("GET", "/report")].db_queries == 6
+        assert routes[("GET", "/report")].db_seconds > 0
+        assert routes[("GET", "/items/{item_id}")].db_queries == 0
+
+    def test_render_prometheus_text(self, client, registry):
+        """測試 Prometheus 文本格式輸出"""
+        client.get("/items/1")
+        client.get("/report")
+
+        output = registry.render()
+
+        assert "# TYPE http_requests_total counter" in output
+        assert 'http_requests_total{method="GET",route="/items/{item_id}",status="200"} 1' in output
+        assert 'http_request_duration_seconds_bucket{method="GET",route="/report",le="+Inf"} 1' in output
+        assert 'http_request_duration_quantile_seconds{method="GET",route="/report",quantile="0.99"}' in output
+        assert 'http_request_db_queries_total{method="GET",route="/report"} 3' in output
+        assert "# TYPE db_query_duration_seconds histogram" in output
+
+
+@pytest.mark.integration
+class TestMultiProcessMetrics:
+    """多進程指標測試類"""
+
+    def test_merges_worker_snapshots(self, tmp_path):
+        """測試任一 worker 抓取時合併其他 worker 寫入的快照"""
+        first = MetricsRegistry(multiprocess_dir=str(tmp_path), worker_id="1")
+        second = MetricsRegistry(multiprocess_dir=str(tmp_path), worker_id="2")
+        first.observe_request("GET", "/health", 200, 0.01)
+        first.observe_request("GET", "/health", 500, 0.02)
+        second.observe_request("GET", "/health", 200, 0.03)
+        first.flush()
+
+        merged = second.collect().routes[("GET", "/health")]
+
+        assert merged.statuses == {"200": 2, "500": 1}
+        assert merged.errors == 1
+        assert merged.latency.count == 3
+
+    def test_collects_from_other_processes(self, tmp_path):
+        """測試合併真實子進程寫入的指標"""
+        context = multiprocessing.get_context("fork")
+        workers = [context.Process(target=record_in_worker, args=(str(tmp_path),)) for _ in range(3)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(timeout=30)
+
+        registry = MetricsRegistry(multiprocess_dir=str(tmp_path), worker_id="scraper")
+        output = registry.render()
+
+        assert [worker.exitcode for worker in workers] == [0, 0, 0]
+        assert 'http_requests_total{method="GET",route="/health",status="200"} 3' in output
+
+    def test_requests_do_not_write_snapshots(self, tmp_path):
+        """測試記錄請求時不寫文件，快照由後台任務定期寫入"""
+        registry = MetricsRegistry(multiprocess_dir=str(tmp_path), flush_interval=0.01, worker_id="1")
+
+        async def run():
+            registry.observe_request("GET", "/health", 200, 0.01)
+            written_on_request = list(tmp_path.glob("*.json"))
+            registry.start_flusher()
+            await asyncio.sleep(0.2)
+            await registry.stop_flusher()
+            return written_on_request
+
+        assert asyncio.run(run()) == []
+        scraper = MetricsRegistry(multiprocess_dir=str(tmp_path), worker_id="scraper")
+        assert scraper.collect().routes[("GET", "/health")].statuses == {"200": 1}
+
+    def test_reused_pid_keeps_previous_worker_counts(self, tmp_path):
+        """測試同一 pid 的新 worker 不覆蓋已退出 worker 的快照，合併的計數不回退"""
+        exited = MetricsRegistry(multiprocess_dir=str(tmp_path))
+        for _ in range(3):
+            exited.observe_request("GET", "/health", 200, 0.01)
+        exited.flush()
+        restarted = MetricsRegistry(multiprocess_dir=str(tmp_path))
+        restarted.observe_request("GET", "/health", 200, 0.01)
+        restarted.flush()
+
+        scraper = MetricsRegistry(multiprocess_dir=str(tmp_path), worker_id="scraper")
+
+        assert exited.collector.path != restarted.collector.path
+        assert scraper.collect().routes[("GET", "/health")].statuses == {"200": 4}
+
+    def test_clear_multiprocess_dir(self, tmp_path):
+        """測試啟動前清空上次運行留下的快照"""
+        directory = tmp_path / "metrics"
+        registry = MetricsRegistry(multiprocess_dir=str(directory), worker_id="1")
+        registry.observe_request("GET", "/health", 200, 0.01)
+        registry.flush()
+
+        clear_multiprocess_dir(str(directory))
+        clear_multiprocess_dir(None)
+
+        scraper = MetricsRegistry(multiprocess_dir=str(directory), worker_id="scraper")
+        assert scraper.collect().routes == {}
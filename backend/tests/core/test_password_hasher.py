@@ -0,0 +1,92 @@
+"""
+密碼哈希線程池測試
+
+測試 PasswordHasher：
+- 哈希與驗證結果與 User 模型一致
+- 排隊超過上限時返回 503 並計入拒絕數
+- 排隊中的任務被取消後不再佔用隊列計數
+"""
+
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.password_hasher import PasswordHasher
+from app.models import User
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(max_workers=1, max_queue=1)
+    yield hasher
+    hasher.shutdown()
+
+
+@pytest.mark.unit
+@pytest.mark.auth
+class TestPasswordHasher:
+    """密碼哈希線程池測試類"""
+
+    def test_hash_and_verify(self, hasher):
+        """測試線程池中生成的哈希可被 User 模型驗證"""
+        async def run():
+            hashed = await hasher.hash("secret1")
+            return hashed, await hasher.verify("secret1", hashed), await hasher.verify("wrong", hashed)
+
+        hashed, correct, wrong = asyncio.run(run())
+
+        assert User(username="u", hashed_password=hashed).verify_password("secret1")
+        assert correct is True
+        assert wrong is False
+        stats = hasher.stats()
+        assert stats["completed"] == 3
+        assert stats["in_flight"] == 0
+        assert stats["queue_depth"] == 0
+
+    def test_rejects_when_queue_is_full(self, hasher):
+        """測試工作線程忙且隊列已滿時返回 503"""
+        release = threading.Event()
+
+        async def run():
+            running = asyncio.ensure_future(hasher._run(release.wait))
+            queued = asyncio.ensure_future(hasher._run(lambda: True))
+            while hasher.stats()["in_flight"] == 0:
+                await asyncio.sleep(0.001)
+            with pytest.raises(HTTPException) as exc_info:
+                await hasher._run(lambda: True)
+            depth = hasher.queue_depth
+            release.set()
+            await asyncio.gather(running, queued)
+            return exc_info.value, depth
+
+        error, depth = asyncio.run(run())
+
+        assert error.status_code == 503
+        assert error.headers == {"Retry-After": "1"}
+        assert depth == 1
+        stats = hasher.stats()
+        assert stats["rejected"] == 1
+        assert stats["peak_queue_depth"] == 1
+        assert stats["completed"] == 2
+
+    def test_cancelled_queued_task_is_forgotten(self, hasher):
+        """測試排隊中的請求被取消後隊列計數歸零"""
+        release = threading.Event()
+
+        async def run():
+            running = asyncio.ensure_future(hasher._run(release.wait))
+            while hasher.stats()["in_flight"] == 0:
+                await asyncio.sleep(0.001)
+            queued = asyncio.ensure_future(hasher._run(lambda: True))
+            await asyncio.sleep(0.01)
+            queued.cancel()
+            await asyncio.sleep(0.01)
+            release.set()
+            await running
+
+        asyncio.run(run())
+
+        assert hasher.queue_depth == 0
+        assert hasher.stats()["completed"] == 1
@@ -0,0 +1,136 @@
+"""
+已驗證令牌緩存測試
+
+測試 verify_token 的令牌聲明緩存：
+- 同一令牌只解碼驗證一次，之後只做哈希查找
+- 到達 exp 的令牌不再有效
+- 顯式撤銷和撤銷鉤子
+- 緩存命中與完整驗證的單次耗時對比
+"""
+
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from jose import jwt
+
+from app.core.config import settings
+from app.core.auth import create_access_token, verify_token
+from app.core.token_cache import VerifiedTokenCache, verified_token_cache
+
+REQUESTS = 2000
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    verified_token_cache.clear()
+    yield
+    verified_token_cache.clear()
+
+
+@pytest.mark.unit
+@pytest.mark.auth
+class TestVerifiedTokenCache:
+    """令牌緩存測試類"""
+
+    def test_decodes_each_token_once(self):
+        """測試同一令牌的重複驗證只解碼一次"""
+        token = create_access_token({"sub": "alice"})
+
+        with patch("app.core.auth.jwt.decode", wraps=jwt.decode) as decode:
+            usernames = [verify_token(token) for _ in range(50)]
+
+        assert usernames == ["alice"] * 50
+        assert decode.call_count == 1
+        stats = verified_token_cache.stats()
+        assert stats["size"] == 1
+        assert stats["hits"] == 49
+        assert stats["hit_ratio"] == 0.98
+
+    def test_does_not_store_raw_token(self):
+        """測試緩存鍵為令牌摘要而非令牌原文"""
+        token = create_access_token({"sub": "alice"})
+        verify_token(token)
+
+        assert token not in verified_token_cache._entries
+        assert VerifiedTokenCache.digest(token) in verified_token_cache._entries
+
+    def test_expired_entry_is_rejected(self):
+        """測試緩存中的令牌到達 exp 後不再有效"""
+        token = create_access_token({"sub": "alice"}, expires_delta=timedelta(minutes=1))
+        assert verify_token(token) == "alice"
+
+        with patch("app.core.token_cache.time.time", return_value=time.time() + 120):
+            assert verified_token_cache.get(token) is None
+        assert verified_token_cache.stats()["size"] == 0
+
+    def test_invalid_tokens_are_not_cached(self):
+        """測試簽名錯誤的令牌不寫入緩存"""
+        forged = jwt.encode({"sub": "alice", "exp": time.time() + 60}, "wrong-key", algorithm="HS256")
+
+        assert verify_token(forged) is None
+        assert verify_token("") is None
+        assert verified_token_cache.stats()["size"] == 0
+
+    def test_revoke(self):
+        """測試撤銷後的令牌即使簽名有效也被拒絕"""
+        token = create_access_token({"sub": "alice"})
+        other = create_access_token({"sub": "bob"})
+        verify_token(token)
+        verify_token(other)
+
+        verified_token_cache.revoke(token)
+
+        assert verify_token(token) is None
+        assert verify_token(other) == "bob"
+        assert verified_token_cache.stats()["revoked"] == 1
+
+    def test_revocation_hook(self):
+        """測試撤銷鉤子對已緩存和未緩存的令牌都生效"""
+        cached = create_access_token({"sub": "alice"})
+        fresh = create_access_token({"sub": "alice", "scope": "fresh"})
+        verify_token(cached)
+
+        def revoke_alice(claims):
+            return claims.get("sub") == "alice"
+
+        verified_token_cache.add_revocation_hook(revoke_alice)
+        try:
+            assert verify_token(cached) is None
+            assert verify_token(fresh) is None
+            assert verify_token(create_access_token({"sub": "bob"})) == "bob"
+        finally:
+            verified_token_cache.remove_revocation_hook(revoke_alice)
+
+    def test_evicts_least_recently_used(self):
+        """測試超出容量時淘汰最久未使用的條目"""
+        cache = VerifiedTokenCache(max_size=2)
+        exp = time.time() + 60
+        for token in ("a", "b"):
+            cache.set(token, {"sub": token, "exp": exp})
+        cache.get("a")
+        cache.set("c", {"sub": "c", "exp": exp})
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+
+    @pytest.mark.performance
+    def test_cached_verification_is_faster(self):
+        """測試緩存命中的單次驗證耗時低於完整解碼驗證"""
+        token = create_access_token({"sub": "alice"})
+
+        start = time.perf_counter()
+        for _ in range(REQUESTS):
+            jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        decode_us = (time.perf_counter() - start) / REQUESTS * 1e6
+
+        verify_token(token)
+        start = time.perf_counter()
+        for _ in range(REQUESTS):
+            verify_token(token)
+        cached_us = (time.perf_counter() - start) / REQUESTS * 1e6
+
+        print(f"\n單次令牌驗證: 完整解碼 {decode_us:.1f}µs, 緩存命中 {cached_us:.1f}µs")
+        assert cached_us < decode_us / 3
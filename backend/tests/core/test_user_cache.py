@@ -0,0 +1,245 @@
+"""
+已認證用戶緩存測試
+
+測試 get_current_user 的用戶投影緩存：
+- 命中時不查詢數據庫，可統計命中率和省去的查詢數
+- TTL 過期與容量淘汰
+- 停用、修改密碼、刪除用戶的事務提交後緩存失效，回滾時不失效
+- 其他 worker 的修改在超過核對間隔後生效
+"""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, User
+from app.core.auth import create_access_token, get_current_active_user, get_current_user
+from app.core.user_cache import AuthenticatedUser, AuthenticatedUserCache, authenticated_user_cache
+
+REQUESTS = 100
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'users.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def user(db):
+    user = User(username="cached_user", hashed_password="not-a-real-hash", is_active=True)
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    authenticated_user_cache.clear()
+    yield
+    authenticated_user_cache.clear()
+
+
+@pytest.fixture
+def user_queries(engine):
+    """記錄 get_current_user 按用戶名查詢用戶的語句"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SELECT") and "WHERE users.username = ?" in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def credentials_for(username):
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_access_token({"sub": username}))
+
+
+def authenticate(credentials, db):
+    return asyncio.run(get_current_user(credentials, db))
+
+
+@pytest.mark.unit
+@pytest.mark.auth
+class TestAuthenticatedUserCache:
+    """用戶投影緩存測試類"""
+
+    def test_miss_then_hit(self):
+        """測試首次未命中、寫入後命中"""
+        cache = AuthenticatedUserCache()
+        projection = AuthenticatedUser(id=1, username="alice", is_active=True)
+
+        assert cache.get("alice") is None
+        cache.set(projection)
+        assert cache.get("alice") == projection
+        assert cache.stats()["db_queries_saved"] == 1
+
+    def test_expired_entry_is_a_miss(self):
+        """測試過期條目算作未命中"""
+        cache = AuthenticatedUserCache(ttl=-1)
+        cache.set(AuthenticatedUser(id=1, username="alice", is_active=True))
+
+        assert cache.get("alice") is None
+        assert cache.stats()["size"] == 0
+
+    def test_evicts_least_recently_used(self):
+        """測試超出容量時淘汰最久未使用的條目"""
+        cache = AuthenticatedUserCache(max_size=2)
+        for index, name in enumerate(["alice", "bob"]):
+            cache.set(AuthenticatedUser(id=index, username=name, is_active=True))
+        cache.get("alice")
+        cache.set(AuthenticatedUser(id=3, username="carol", is_active=True))
+
+        assert cache.get("bob") is None
+        assert cache.get("alice") is not None
+        assert cache.get("carol") is not None
+
+    def test_revalidation_after_bound(self):
+        """測試條目超過核對間隔後需要重新核對，核對後重新計時"""
+        fresh = AuthenticatedUserCache(revalidate_after=60)
+        stale = AuthenticatedUserCache(revalidate_after=0)
+        projection = AuthenticatedUser(id=1, username="alice", is_active=True)
+        fresh.set(projection)
+        stale.set(projection)
+
+        assert fresh.needs_revalidation("alice") is False
+        assert stale.needs_revalidation("alice") is True
+        assert AuthenticatedUserCache().needs_revalidation("alice") is False
+
+        stale.get("alice")
+        stale.revalidated(projection)
+        assert stale.stats()["revalidations"] == 1
+        assert stale.stats()["db_queries_saved"] == 0
+
+    def test_set_skipped_after_concurrent_invalidation(self):
+        """測試讀取用戶期間發生過失效時，讀到的舊數據不寫入緩存"""
+        cache = AuthenticatedUserCache()
+        generation = cache.generation()
+        cache.invalidate("alice")
+
+        cache.set(AuthenticatedUser(id=1, username="alice", is_active=True), generation)
+
+        assert cache.get("alice") is None
+
+
+@pytest.mark.integration
+@pytest.mark.auth
+class TestCachedCurrentUser:
+    """get_current_user 緩存測試類"""
+
+    def test_repeated_requests_query_once(self, db, user, user_queries):
+        """測試同一令牌的重複請求只查詢一次用戶表"""
+        credentials = credentials_for(user.username)
+
+        results = [authenticate(credentials, db) for _ in range(REQUESTS)]
+
+        assert len(user_queries) == 1
+        assert results[0] == AuthenticatedUser(id=user.id, username=user.username, is_active=True)
+        assert all(result == results[0] for result in results)
+        stats = authenticated_user_cache.stats()
+        assert stats["hit_ratio"] == (REQUESTS - 1) / REQUESTS
+        assert stats["db_queries_saved"] == REQUESTS - 1
+
+    def test_deactivation_invalidates(self, db, user, user_queries):
+        """測試停用用戶後立即失效，下一次請求被拒絕"""
+        credentials = credentials_for(user.username)
+        authenticate(credentials, db)
+
+        user.is_active = False
+        db.commit()
+
+        current_user = authenticate(credentials, db)
+        assert len(user_queries) == 2
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(get_current_active_user(current_user))
+        assert exc_info.value.status_code == 400
+
+    def test_password_change_invalidates(self, db, user):
+        """測試修改密碼後緩存失效"""
+        authenticate(credentials_for(user.username), db)
+
+        user.hashed_password = "another-hash"
+        db.commit()
+
+        assert authenticated_user_cache.get(user.username) is None
+        assert authenticated_user_cache.stats()["invalidations"] == 1
+
+    def test_invalidated_only_after_commit(self, db, user):
+        """測試停用在 flush 時只記錄，事務提交後緩存才失效"""
+        authenticate(credentials_for(user.username), db)
+
+        user.is_active = False
+        db.flush()
+        assert authenticated_user_cache.get(user.username) is not None
+
+        db.commit()
+        assert authenticated_user_cache.get(user.username) is None
+
+    def test_rollback_keeps_cache(self, db, user):
+        """測試回滾的修改不使緩存失效，也不留到下一個事務"""
+        authenticate(credentials_for(user.username), db)
+
+        user.is_active = False
+        db.flush()
+        db.rollback()
+        db.commit()
+
+        assert authenticated_user_cache.get(user.username) is not None
+        assert authenticated_user_cache.stats()["invalidations"] == 0
+
+    def test_unrelated_update_keeps_cache(self, db, user):
+        """測試修改與鑑權無關的字段不使緩存失效"""
+        authenticate(credentials_for(user.username), db)
+
+        user.email = "cached@example.com"
+        db.commit()
+
+        assert authenticated_user_cache.get(user.username) is not None
+
+    @pytest.mark.parametrize("statement,status_code", [
+        ("UPDATE users SET is_active = 0 WHERE id = :id", 400),
+        ("DELETE FROM users WHERE id = :id", 401),
+    ])
+    def test_other_worker_changes_apply_after_revalidation(
+        self, engine, db, user, monkeypatch, statement, status_code
+    ):
+        """測試其他 worker 的停用或刪除（不觸發本進程的 ORM 事件）在超過核對間隔後生效"""
+        credentials = credentials_for(user.username)
+        authenticate(credentials, db)
+        with engine.begin() as conn:
+            conn.execute(text(statement), {"id": user.id})
+
+        assert authenticate(credentials, db).is_active is True
+
+        monkeypatch.setattr(authenticated_user_cache, "_revalidate_after", 0)
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(get_current_active_user(authenticate(credentials, db)))
+        assert exc_info.value.status_code == status_code
+
+    def test_deleted_user_is_rejected(self, db, user):
+        """測試刪除用戶後令牌不再有效"""
+        credentials = credentials_for(user.username)
+        authenticate(credentials, db)
+
+        db.delete(user)
+        db.commit()
+
+        with pytest.raises(HTTPException) as exc_info:
+            authenticate(credentials, db)
+        assert exc_info.value.status_code == 401
@@ -0,0 +1,125 @@
+"""
+數據庫連接配置測試
+
+測試引擎創建：
+- 連接池參數來自配置
+- SQLite 性能 PRAGMA
+- 連接池狀態與等待時間指標
+"""
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import settings
+from app.database.connection import (
+    InstrumentedQueuePool,
+    PoolMetrics,
+    build_engine_options,
+    create_database_engine,
+    describe_pool,
+    is_sqlite_memory,
+    to_async_database_url,
+)
+
+
+class TestDatabaseConnection:
+    """數據庫連接配置測試類"""
+
+    @pytest.fixture
+    def file_engine(self, tmp_path):
+        """創建文件型 SQLite 引擎"""
+        engine = create_database_engine(f"sqlite:///{tmp_path / 'pool.db'}")
+        yield engine
+        engine.dispose()
+
+    @pytest.mark.unit
+    class TestEngineOptions:
+        """引擎參數測試"""
+
+        def test_pool_options_follow_settings(self, monkeypatch):
+            """測試連接池參數來自配置"""
+            monkeypatch.setattr(settings, "db_pool_size", 7)
+            monkeypatch.setattr(settings, "db_max_overflow", 3)
+            monkeypatch.setattr(settings, "db_pool_timeout", 2.5)
+            monkeypatch.setattr(settings, "db_pool_recycle", 600)
+            monkeypatch.setattr(settings, "db_pool_pre_ping", False)
+
+            options = build_engine_options("postgresql://db/app", InstrumentedQueuePool)
+
+            assert options["poolclass"] is InstrumentedQueuePool
+            assert options["pool_size"] == 7
+            assert options["max_overflow"] == 3
+            assert options["pool_timeout"] == 2.5
+            assert options["pool_recycle"] == 600
+            assert options["pool_pre_ping"] is False
+            assert "connect_args" not in options
+
+        def test_sqlite_memory_keeps_default_pool(self):
+            """測試內存數據庫不設置連接池大小"""
+            options = build_engine_options("sqlite:///:memory:", InstrumentedQueuePool)
+
+            assert options == {"connect_args": {"check_same_thread": False}}
+            assert is_sqlite_memory("sqlite://")
+            assert not is_sqlite_memory("sqlite:///./app.sqlite")
+
+        def test_async_database_url(self):
+            """測試異步驅動連接字串轉換"""
+            assert to_async_database_url("sqlite:///./app.sqlite") == "sqlite+aiosqlite:///./app.sqlite"
+            assert to_async_database_url("postgresql://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+            assert to_async_database_url("postgresql+psycopg://db/app") == "postgresql+psycopg://db/app"
+
+    @pytest.mark.integration
+    class TestSQLitePragmas:
+        """SQLite 性能設定測試"""
+
+        def test_pragmas_applied_on_connect(self, file_engine):
+            """測試每個連接都應用了 PRAGMA"""
+            with file_engine.connect() as conn:
+                assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+                assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+                assert conn.execute(text("PRAGMA busy_timeout")).scalar() == settings.sqlite_busy_timeout
+                assert conn.execute(text("PRAGMA cache_size")).scalar() == settings.sqlite_cache_size
+
+    @pytest.mark.integration
+    class TestPoolStatus:
+        """連接池狀態測試"""
+
+        def test_file_engine_uses_instrumented_pool(self, file_engine):
+            """測試文件數據庫使用帶統計的連接池"""
+            assert isinstance(file_engine.pool, InstrumentedQueuePool)
+            assert file_engine.pool.size() == settings.db_pool_size
+
+        def test_utilisation_and_checkout_wait(self, file_engine):
+            """測試連接池利用率與等待時間統計"""
+            metrics = PoolMetrics()
+            checkouts_before = InstrumentedQueuePool.metrics.checkouts
+
+            with file_engine.connect():
+                status = describe_pool(file_engine.pool, InstrumentedQueuePool.metrics)
+                assert status["checked_out"] == 1
+                capacity = settings.db_pool_size + settings.db_max_overflow
+                assert status["utilisation"] == round(1 / capacity, 3)
+
+            status = describe_pool(file_engine.pool, metrics)
+            assert status["checked_out"] == 0
+            assert set(status["checkout"]) == {"checkouts", "timeouts", "avg_wait_ms", "p95_wait_ms", "max_wait_ms"}
+            assert InstrumentedQueuePool.metrics.checkouts > checkouts_before
+
+        def test_non_queue_pool_reports_class_only(self):
+            """測試非 QueuePool 只報告類型"""
+            assert describe_pool(StaticPool(lambda: None), PoolMetrics()) == {"pool_class": "StaticPool"}
+
+        def test_metrics_snapshot(self):
+            """測試等待時間快照"""
+            metrics = PoolMetrics()
+            for wait in (0.001, 0.002, 0.010):
+                metrics.record_checkout(wait)
+            metrics.record_timeout()
+
+            snapshot = metrics.snapshot()
+
+            assert snapshot["checkouts"] == 3
+            assert snapshot["timeouts"] == 1
+            assert snapshot["max_wait_ms"] == 10.0
+            assert snapshot["avg_wait_ms"] == pytest.approx(4.333, abs=0.001)
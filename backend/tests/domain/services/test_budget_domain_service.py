@@ -96,6 +96,20 @@ class TestBudgetDomainService:
             assert result["is_over_budget"] is False
             assert result["over_budget_amount"] == 0
 
+        def test_calculate_budget_usage_builds_only_usage(self, budget_service, sample_budget, sample_subscriptions, mock_subscription_service):
+            """測試只取使用情況時不構建類別分析、建議和節省潛力"""
+            mock_subscription_service.calculate_total_monthly_cost.return_value = 800.0
+            budget_service._build_category_budget_usage = Mock()
+            budget_service._build_recommendations = Mock()
+            budget_service._build_savings_potential = Mock()
+            
+            result = budget_service.calculate_budget_usage(sample_budget, sample_subscriptions)
+            
+            assert result["used_amount"] == 800.0
+            budget_service._build_category_budget_usage.assert_not_called()
+            budget_service._build_recommendations.assert_not_called()
+            budget_service._build_savings_potential.assert_not_called()
+
         def test_calculate_budget_usage_over_budget(self, budget_service, sample_budget, sample_subscriptions, mock_subscription_service):
             """測試超出預算情況"""
             # 模擬總月度成本為1200元，超出預算
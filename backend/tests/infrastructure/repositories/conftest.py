@@ -0,0 +1,49 @@
+"""
+訂閱 Repository 測試共用的數據庫夾具
+
+user_database 是只有 alice（id=1）和 bob（id=2）兩個用戶的臨時 SQLite 數據庫；
+各測試文件覆蓋 database_path，在其基礎上寫入自己需要的訂閱，engine 按該文件的 database_path 創建。
+"""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.models import Base, User
+
+USERS = (
+    {"id": 1, "email": "a@example.com", "username": "alice"},
+    {"id": 2, "email": "b@example.com", "username": "bob"},
+)
+
+
+def create_user_database(path, *extra_users):
+    """創建所有表並寫入 alice、bob 和 extra_users（User 的字段字典）"""
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all(
+            User(hashed_password="x", is_active=True, **fields) for fields in (*USERS, *extra_users)
+        )
+        session.commit()
+    engine.dispose()
+
+
+@pytest.fixture
+def user_database(tmp_path):
+    path = tmp_path / "subscriptions.db"
+    create_user_database(path)
+    return path
+
+
+@pytest.fixture
+def database_path(user_database):
+    """默認沒有訂閱；測試文件覆蓋此夾具寫入自己的數據"""
+    return user_database
+
+
+@pytest.fixture
+def engine(database_path):
+    engine = create_engine(f"sqlite:///{database_path}", connect_args={"check_same_thread": False})
+    yield engine
+    engine.dispose()
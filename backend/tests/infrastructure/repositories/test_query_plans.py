@@ -0,0 +1,150 @@
+"""
+Repository 查詢計劃測試
+
+對 Repository 方法實際發出的 SQL 執行 EXPLAIN QUERY PLAN：
+- 熱點查詢必須命中索引，不允許全表掃描
+- 按 created_at 排序的列表查詢不應產生臨時排序
+"""
+
+import re
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app.domain.interfaces.subscription_spec import SubscriptionSpec
+from app.models import Base
+from app.models.subscription import SubscriptionCategory, SubscriptionCycle
+from app.infrastructure.repositories.subscription_repository import SubscriptionRepository
+from app.infrastructure.repositories.budget_repository import BudgetRepository
+from app.infrastructure.repositories.user_repository import UserRepository
+from app.infrastructure.repositories.exchange_rate_repository import ExchangeRateRepository
+
+
+# "SCAN subscriptions" 為全表掃描；"SCAN subscriptions USING INDEX ..." 為索引掃描
+FULL_SCAN = re.compile(r"^SCAN (subscriptions|budgets|users|exchange_rates)(?! USING)")
+TEMP_SORT = "USE TEMP B-TREE FOR ORDER BY"
+
+SUBSCRIPTION_QUERIES = [
+    ("get_by_user_id", (1,)),
+    ("get_active_by_user_id", (1,)),
+    ("find", (SubscriptionSpec.for_user(1),)),
+    ("find", (SubscriptionSpec.for_user(1).active(),)),
+    ("find", (SubscriptionSpec.for_user(1).active().in_categories(SubscriptionCategory.MUSIC),)),
+    ("get_by_user_and_id", (1, 1)),
+    ("get_by_category", (1, SubscriptionCategory.MUSIC)),
+    ("get_by_name_pattern", (1, "net")),
+    ("count_by_user_id", (1,)),
+    ("count_active_by_user_id", (1,)),
+    ("get_by_id", (1,)),
+    ("get_category_cost_totals", (1,)),
+    ("get_active_started_before", (1, {cycle: datetime(2024, 1, 1) for cycle in SubscriptionCycle})),
+]
+
+BUDGET_QUERIES = [
+    ("get_by_user_id", (1,)),
+    ("user_has_budget", (1,)),
+]
+
+USER_QUERIES = [
+    ("get_by_email", ("a@example.com",)),
+    ("get_by_username", ("alice",)),
+    ("email_exists", ("a@example.com",)),
+    ("username_exists", ("alice",)),
+]
+
+
+EXCHANGE_RATE_QUERIES = [
+    ("get_snapshot", ("USD", None)),
+    ("get_snapshot", ("USD", datetime(2024, 6, 1))),
+    ("get_snapshot", (None, datetime(2024, 6, 1))),
+]
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """使用模型定義（含索引）創建臨時 SQLite 數據庫"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'plans.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def captured(engine):
+    """記錄 Repository 發出的所有 SQL 語句"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def explain(engine, statements):
+    """返回每條語句的查詢計劃明細"""
+    details = []
+    for statement, parameters in statements:
+        with engine.connect() as conn:
+            rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+            details.extend(row[3] for row in rows)
+    return details
+
+
+def plan_for(engine, captured, repository, method, args):
+    """執行 Repository 方法並取得其 SQL 的查詢計劃"""
+    captured.clear()
+    getattr(repository, method)(*args)
+    statements = list(captured)
+    assert statements, f"{method} 沒有發出任何 SQL"
+    return explain(engine, statements)
+
+
+@pytest.mark.infrastructure
+class TestQueryPlans:
+    """查詢計劃測試類"""
+
+    @pytest.mark.parametrize("method,args", SUBSCRIPTION_QUERIES)
+    def test_subscription_queries_use_indexes(self, engine, captured, method, args):
+        """測試訂閱查詢不做全表掃描也不做臨時排序"""
+        with Session(engine) as session:
+            details = plan_for(engine, captured, SubscriptionRepository(session), method, args)
+
+        assert not [d for d in details if FULL_SCAN.match(d)], details
+        assert not [d for d in details if TEMP_SORT in d], details
+
+    @pytest.mark.parametrize("method,args", BUDGET_QUERIES)
+    def test_budget_queries_use_indexes(self, engine, captured, method, args):
+        """測試預算查詢命中 user_id 索引"""
+        with Session(engine) as session:
+            details = plan_for(engine, captured, BudgetRepository(session), method, args)
+
+        assert not [d for d in details if FULL_SCAN.match(d)], details
+
+    @pytest.mark.parametrize("method,args", USER_QUERIES)
+    def test_user_queries_use_indexes(self, engine, captured, method, args):
+        """測試用戶查詢命中唯一索引"""
+        with Session(engine) as session:
+            details = plan_for(engine, captured, UserRepository(session), method, args)
+
+        assert not [d for d in details if FULL_SCAN.match(d)], details
+
+    @pytest.mark.parametrize("method,args", EXCHANGE_RATE_QUERIES)
+    def test_exchange_rate_queries_use_indexes(self, engine, captured, method, args):
+        """測試按時間點查找匯率表命中索引且不做臨時排序"""
+        with Session(engine) as session:
+            repository = ExchangeRateRepository(session)
+            repository.add_snapshot("USD", {"TWD": 31.5, "EUR": 0.92}, datetime(2024, 1, 1))
+            details = plan_for(engine, captured, repository, method, args)
+
+        assert not [d for d in details if FULL_SCAN.match(d)], details
+        assert not [d for d in details if TEMP_SORT in d], details
+
+    def test_full_scan_is_detected(self, engine):
+        """測試檢測規則本身能識別全表掃描"""
+        details = explain(engine, [("SELECT * FROM subscriptions WHERE price > ?", (1,))])
+
+        assert [d for d in details if FULL_SCAN.match(d)], details
@@ -0,0 +1,140 @@
+"""
+訂閱匯總查詢測試
+
+測試在資料庫中完成的成本匯總：
+- 按類別匯總的月度 / 年度成本與領域服務逐筆計算一致
+- 只統計活躍訂閱且不載入訂閱實體
+- 即將續費的 SQL 預篩選不遺漏任何到期訂閱
+"""
+
+import random
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app.models import Base, User
+from app.models.subscription import Subscription, SubscriptionCycle, SubscriptionCategory, Currency
+from app.domain.interfaces.services import IExchangeRateService
+from app.domain.services.subscription_domain_service import SubscriptionDomainService
+from app.domain.services.budget_domain_service import BudgetDomainService
+from app.infrastructure.repositories.subscription_repository import SubscriptionRepository
+
+
+@pytest.fixture
+def session(tmp_path):
+    """臨時 SQLite 會話，包含兩個用戶的隨機訂閱"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'aggregates.db'}")
+    Base.metadata.create_all(engine)
+
+    rng = random.Random(42)
+    with Session(engine) as session:
+        session.add_all([
+            User(id=1, email="a@example.com", username="alice", hashed_password="x"),
+            User(id=2, email="b@example.com", username="bob", hashed_password="x"),
+        ])
+        for index in range(300):
+            session.add(Subscription(
+                user_id=1 if index % 3 else 2,
+                name=f"sub-{index}",
+                price=round(rng.uniform(10, 2000), 2),
+                original_price=100.0,
+                currency=Currency.TWD,
+                cycle=rng.choice(list(SubscriptionCycle)),
+                category=rng.choice(list(SubscriptionCategory)),
+                start_date=datetime.now() - timedelta(days=rng.randint(0, 800)),
+                is_active=rng.random() > 0.2,
+            ))
+        session.commit()
+        yield session
+
+    engine.dispose()
+
+
+@pytest.fixture
+def subscription_service():
+    return SubscriptionDomainService(Mock(spec=IExchangeRateService))
+
+
+@pytest.mark.infrastructure
+class TestCategoryCostTotals:
+    """類別成本匯總測試類"""
+
+    def test_totals_match_domain_calculations(self, session, subscription_service):
+        """測試 SQL 匯總結果與逐筆計算一致"""
+        repo = SubscriptionRepository(session)
+        subscriptions = repo.get_by_user_id(1)
+
+        totals = repo.get_category_cost_totals(1)
+        expected_monthly = subscription_service.calculate_category_costs(subscriptions)
+
+        assert set(totals) == set(expected_monthly)
+        for category, cost in expected_monthly.items():
+            active = [s for s in subscriptions if s.is_active and s.category.value == category]
+            assert totals[category]["count"] == len(active)
+            assert totals[category]["monthly_cost"] == pytest.approx(cost)
+            assert totals[category]["yearly_cost"] == pytest.approx(
+                sum(subscription_service.calculate_yearly_cost(s) for s in active)
+            )
+
+    def test_totals_do_not_load_entities(self, session):
+        """測試匯總查詢不會載入任何訂閱實體"""
+        loaded = []
+
+        def record(target, context):
+            loaded.append(target)
+
+        event.listen(Subscription, "load", record)
+        try:
+            totals = SubscriptionRepository(session).get_category_cost_totals(1)
+        finally:
+            event.remove(Subscription, "load", record)
+
+        assert totals
+        assert loaded == []
+
+    def test_totals_for_user_without_subscriptions(self, session):
+        """測試沒有訂閱的用戶返回空結果"""
+        assert SubscriptionRepository(session).get_category_cost_totals(999) == {}
+
+    def test_budget_usage_from_totals_matches_list_version(self, session, subscription_service):
+        """測試基於匯總的預算分析與基於實體列表的結果一致"""
+        repo = SubscriptionRepository(session)
+        subscriptions = repo.get_active_by_user_id(1)
+        totals = repo.get_category_cost_totals(1)
+        budget_service = BudgetDomainService(subscription_service)
+        budget = Mock(monthly_limit=5000.0)
+
+        from_list = budget_service.calculate_budget_usage(budget, subscriptions)
+        from_totals = budget_service.calculate_budget_usage_from_totals(budget, totals)
+        assert from_totals["used_amount"] == pytest.approx(from_list["used_amount"])
+        assert from_totals["usage_percentage"] == pytest.approx(from_list["usage_percentage"], abs=0.01)
+
+        savings_list = budget_service.calculate_savings_potential(subscriptions)
+        savings_totals = budget_service.calculate_savings_potential_from_totals(totals)
+        for key in savings_list:
+            assert savings_totals[key] == pytest.approx(savings_list[key])
+
+        # 類別建議的順序取決於分組順序，只比較內容
+        assert sorted(budget_service.get_budget_recommendations_from_totals(budget, totals)) == sorted(
+            budget_service.get_budget_recommendations(budget, subscriptions)
+        )
+
+
+@pytest.mark.infrastructure
+class TestRenewalCandidates:
+    """即將續費預篩選測試類"""
+
+    def test_candidates_include_every_due_subscription(self, session, subscription_service):
+        """測試預篩選結果包含所有即將到期的訂閱"""
+        repo = SubscriptionRepository(session)
+        active = repo.get_active_by_user_id(1)
+
+        candidates = repo.get_active_started_before(1, subscription_service.renewal_start_cutoffs(7))
+
+        due = {s.id for s in active if subscription_service.is_due_soon(s, days_ahead=7)}
+        due_from_candidates = {s.id for s in candidates if subscription_service.is_due_soon(s, days_ahead=7)}
+        assert due_from_candidates == due
+        assert len(candidates) < len(active)
@@ -0,0 +1,240 @@
+"""
+訂閱批量操作測試
+
+測試 Repository 的集合式批量操作：
+- 批量啟用 / 停用與刪除只影響該用戶的訂閱，並返回受影響的 ID
+- 每塊 ID 一條 UPDATE / DELETE，大列表自動分塊
+- 數據庫不支持 RETURNING 時的回退路徑
+- 同步與異步實現結果一致
+- 會話已自動開啟事務時工作單元沿用該事務
+- 應用服務批量操作的語句數（逐筆 vs 集合）
+"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+from app.application.dtos.subscription_dtos import BulkSubscriptionOperationCommand
+from app.application.services.subscription_application_service import SubscriptionApplicationService
+from app.infrastructure.repositories.async_subscription_repository import AsyncSubscriptionRepository
+from app.infrastructure.repositories.subscription_queries import BULK_CHUNK_SIZE, chunked_ids
+from app.infrastructure.repositories.subscription_repository import SubscriptionRepository
+from app.infrastructure.unit_of_work import SQLAlchemyUnitOfWork
+from app.models.subscription import Subscription, SubscriptionCycle, SubscriptionCategory, Currency
+
+SUBSCRIPTIONS = 1200
+
+
+@pytest.fixture
+def database_path(database_path):
+    """alice 1..1200（偶數 ID 已停用），bob 1201..1210"""
+    engine = create_engine(f"sqlite:///{database_path}")
+    with Session(engine) as session:
+        session.add_all([
+            Subscription(
+                id=index,
+                user_id=1 if index <= SUBSCRIPTIONS else 2,
+                name=f"sub-{index}",
+                price=100.0,
+                original_price=100.0,
+                currency=Currency.TWD,
+                cycle=SubscriptionCycle.MONTHLY,
+                category=SubscriptionCategory.OTHER,
+                start_date=datetime(2024, 1, 1),
+                is_active=index % 2 == 1,
+            )
+            for index in range(1, SUBSCRIPTIONS + 11)
+        ])
+        session.commit()
+    engine.dispose()
+    return database_path
+
+
+def count_statements(engine):
+    """記錄引擎執行的 SQL 語句"""
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def active_flags(engine, ids):
+    with Session(engine) as session:
+        rows = session.execute(select(Subscription.id, Subscription.is_active).where(Subscription.id.in_(ids)))
+        return dict(rows.all())
+
+
+@pytest.mark.unit
+class TestChunkedIds:
+    """ID 分塊測試類"""
+
+    def test_deduplicates_and_chunks(self):
+        """測試去重並保持順序分塊"""
+        assert list(chunked_ids([3, 1, 3, 2, 1, 5], size=2)) == [[3, 1], [2, 5]]
+        assert list(chunked_ids([])) == []
+
+
+@pytest.mark.infrastructure
+class TestBulkSetActive:
+    """批量啟用 / 停用測試類"""
+
+    def test_updates_only_owned_subscriptions(self, engine):
+        """測試只更新該用戶的訂閱，返回受影響的 ID"""
+        with Session(engine) as session:
+            affected = SubscriptionRepository(session).bulk_set_active(1, [2, 4, 1201, 99999], True)
+            session.commit()
+
+        assert affected == [2, 4]
+        assert active_flags(engine, [2, 4, 1201]) == {2: True, 4: True, 1201: True}
+
+    def test_one_statement_per_chunk(self, engine):
+        """測試每塊 ID 只發出一條 UPDATE"""
+        statements = count_statements(engine)
+        ids = list(range(1, SUBSCRIPTIONS + 1))
+        with Session(engine) as session:
+            affected = SubscriptionRepository(session).bulk_set_active(1, ids, False)
+            session.commit()
+
+        updates = [statement for statement in statements if statement.startswith("UPDATE")]
+        assert len(updates) == -(-SUBSCRIPTIONS // BULK_CHUNK_SIZE)
+        assert not [statement for statement in statements if statement.startswith("SELECT")]
+        assert affected == ids
+        assert set(active_flags(engine, ids).values()) == {False}
+
+    def test_fallback_without_returning(self, engine, monkeypatch):
+        """測試數據庫不支持 RETURNING 時先查出 ID 再更新"""
+        monkeypatch.setattr(engine.dialect, "update_returning", False)
+        statements = count_statements(engine)
+        with Session(engine) as session:
+            affected = SubscriptionRepository(session).bulk_set_active(1, [2, 1201], True)
+            session.commit()
+
+        assert affected == [2]
+        assert [statement.split()[0] for statement in statements] == ["SELECT", "UPDATE"]
+        assert active_flags(engine, [2, 1201]) == {2: True, 1201: True}
+
+    def test_loaded_entities_are_synchronized(self, engine):
+        """測試會話中已載入的實體同步更新後的狀態"""
+        with Session(engine) as session:
+            repo = SubscriptionRepository(session)
+            subscription = repo.get_by_user_and_id(1, 1)
+            repo.bulk_set_active(1, [1], False)
+
+            assert subscription.is_active is False
+
+
+@pytest.mark.infrastructure
+class TestBulkDelete:
+    """批量刪除測試類"""
+
+    def test_deletes_only_owned_subscriptions(self, engine):
+        """測試只刪除該用戶的訂閱，返回被刪除的 ID"""
+        statements = count_statements(engine)
+        with Session(engine) as session:
+            deleted = SubscriptionRepository(session).bulk_delete(1, [1, 3, 3, 1205])
+            session.commit()
+
+        assert deleted == [1, 3]
+        assert len([statement for statement in statements if statement.startswith("DELETE")]) == 1
+        assert active_flags(engine, [1, 3, 1205]) == {1205: True}
+
+    def test_fallback_without_returning(self, engine, monkeypatch):
+        """測試數據庫不支持 RETURNING 時的刪除"""
+        monkeypatch.setattr(engine.dialect, "delete_returning", False)
+        with Session(engine) as session:
+            deleted = SubscriptionRepository(session).bulk_delete(1, [1, 1205])
+            session.commit()
+
+        assert deleted == [1]
+        assert active_flags(engine, [1, 1205]) == {1205: True}
+
+
+@pytest.mark.infrastructure
+class TestAsyncBulkOperations:
+    """異步批量操作測試類"""
+
+    def test_async_repository_matches_sync(self, database_path):
+        """測試異步實現的結果與同步實現一致"""
+        async def run():
+            async_engine = create_async_engine(f"sqlite+aiosqlite:///{database_path}")
+            try:
+                async with AsyncSession(async_engine) as session:
+                    repo = AsyncSubscriptionRepository(session)
+                    activated = await repo.bulk_set_active(1, list(range(1, SUBSCRIPTIONS + 1)), True)
+                    deleted = await repo.bulk_delete(1, [1, 2, 1201])
+                    await session.commit()
+                    remaining = await repo.count_by_user_id(1)
+                return activated, deleted, remaining
+            finally:
+                await async_engine.dispose()
+
+        activated, deleted, remaining = asyncio.run(run())
+
+        assert len(activated) == SUBSCRIPTIONS
+        assert deleted == [1, 2]
+        assert remaining == SUBSCRIPTIONS - 2
+
+
+@pytest.mark.infrastructure
+class TestUnitOfWorkBegin:
+    """工作單元事務測試類"""
+
+    def test_begin_after_autobegin_reuses_transaction(self, engine):
+        """測試先讀取（會話已自動開啟事務）再 begin 時沿用該事務，提交後寫入生效"""
+        uow = SQLAlchemyUnitOfWork(Session(engine))
+        assert uow.subscriptions.get_by_user_and_id(1, 2) is not None
+
+        uow.begin()
+        uow.subscriptions.bulk_set_active(1, [2], True)
+        uow.commit()
+        uow.close()
+
+        assert active_flags(engine, [2]) == {2: True}
+
+
+class LoopingBulkOperation:
+    """改動前的實現：逐筆查詢再逐筆更新 / 刪除"""
+
+    def __init__(self, uow):
+        self._uow = uow
+
+    def run(self, user_id, command):
+        self._uow.begin()
+        for subscription_id in command.subscription_ids:
+            subscription = self._uow.subscriptions.get_by_user_and_id(user_id, subscription_id)
+            if subscription:
+                if command.operation == "delete":
+                    self._uow.subscriptions.delete(subscription_id)
+                else:
+                    subscription.is_active = command.operation == "activate"
+                    self._uow.subscriptions.update(subscription)
+        self._uow.commit()
+        self._uow.close()
+
+
+@pytest.mark.performance
+class TestBulkOperationRoundTrips:
+    """批量操作往返次數測試類"""
+
+    @pytest.mark.parametrize("operation", ["deactivate", "delete"])
+    def test_set_based_operation_uses_one_statement(self, engine, operation):
+        """測試 100 個 ID 的批量操作從數百次往返降為一條語句"""
+        command = BulkSubscriptionOperationCommand(subscription_ids=list(range(1, 201, 2)), operation=operation)
+
+        statements = count_statements(engine)
+        LoopingBulkOperation(SQLAlchemyUnitOfWork(Session(engine))).run(1, command)
+        looping = len(statements)
+
+        # 集合式實現處理另一批 ID，避免受上面修改的影響
+        statements.clear()
+        command = BulkSubscriptionOperationCommand(subscription_ids=list(range(101, 301, 2)), operation=operation)
+        service = SubscriptionApplicationService(SQLAlchemyUnitOfWork(Session(engine)), None)
+        assert asyncio.run(service.bulk_operation(1, command)) is True
+        set_based = len(statements)
+
+        print(f"\n100 個 ID 的 {operation}: 逐筆 {looping} 條語句, 集合式 {set_based} 條語句")
+        assert looping >= 200
+        assert set_based == 1
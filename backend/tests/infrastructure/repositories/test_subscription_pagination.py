@@ -0,0 +1,365 @@
+"""
+訂閱列表鍵集分頁測試
+
+測試按 (created_at, id) 倒序的游標分頁：
+- 逐頁翻完不重複、不遺漏（包括同一秒內創建的大量訂閱）
+- 篩選條件、游標所指的行被刪除後繼續翻頁
+- 總數讀自數量緩存，寫入的事務提交後失效
+- 端點的 limit / cursor 參數與 metadata
+- 深分頁時鍵集分頁與 OFFSET 的耗時對比
+"""
+
+import asyncio
+import sqlite3
+import time
+from datetime import datetime
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.api.v1.router import api_router
+from app.common.pagination import decode_cursor, encode_cursor
+from app.core.auth import create_access_token
+from app.core.rate_limiter import limiter, user_limiter
+from app.database.connection import get_db
+from app.infrastructure.dependencies import get_unit_of_work, unit_of_work_provider
+from app.infrastructure.repositories.async_subscription_repository import AsyncSubscriptionRepository
+from app.infrastructure.repositories.subscription_count_cache import subscription_count_cache
+from app.infrastructure.repositories.subscription_queries import keyset_page_statement
+from app.infrastructure.repositories.subscription_repository import SubscriptionRepository
+from app.models.subscription import Currency, Subscription, SubscriptionCategory, SubscriptionCycle
+
+SUBSCRIPTIONS = 250
+BENCHMARK_ROWS = 100000
+
+
+def fill_subscriptions(path, user_id, count, created_at=None):
+    """用 sqlite3 寫入訂閱；不指定 created_at 時由數據庫默認值填入（同一秒）
+
+    每 5 筆中 1 筆已停用，類別在 streaming / software 之間交替。
+    """
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.executemany(
+            "INSERT INTO subscriptions (user_id, name, price, original_price, currency, cycle, category, "
+            "start_date, is_active" + (", created_at" if created_at else "") + ") "
+            "VALUES (?, ?, 100, 100, 'TWD', 'MONTHLY', ?, '2024-01-01 00:00:00', ?" + (", ?" if created_at else "") + ")",
+            (
+                (user_id, f"sub-{index}", "STREAMING" if index % 2 else "SOFTWARE", index % 5 != 0)
+                + ((created_at(index),) if created_at else ())
+                for index in range(count)
+            )
+        )
+    connection.close()
+
+
+@pytest.fixture
+def database_path(database_path):
+    """alice 250 筆：前 100 筆各自不同的創建時間，其餘 150 筆同一秒創建；bob 10 筆"""
+    fill_subscriptions(database_path, 1, 100, lambda index: f"2024-03-01 00:{index // 60:02d}:{index % 60:02d}")
+    fill_subscriptions(database_path, 1, SUBSCRIPTIONS - 100)
+    fill_subscriptions(database_path, 2, 10)
+    return database_path
+
+
+@pytest.fixture(autouse=True)
+def clear_count_cache():
+    subscription_count_cache.clear()
+    yield
+    subscription_count_cache.clear()
+
+
+def expected_ids(engine, **filters):
+    """不分頁時按 (created_at, id) 倒序的完整結果"""
+    with Session(engine) as session:
+        statement = keyset_page_statement(1, 10 ** 6, **filters)
+        return [subscription.id for subscription in session.scalars(statement)]
+
+
+def walk_pages(repo, limit, after=None, **filters):
+    """從 after 之後逐頁讀取，返回 (所有 ID, 頁數)"""
+    ids, pages = [], 0
+    while True:
+        page = repo.get_page(1, limit, after, **filters)
+        pages += 1
+        ids.extend(subscription.id for subscription in page)
+        if len(page) < limit:
+            return ids, pages
+        after = (page[-1].created_at, page[-1].id)
+
+
+def count_statements(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+@pytest.mark.unit
+class TestPaginationCursor:
+    """分頁游標測試類"""
+
+    def test_round_trip(self):
+        """測試游標編碼後可解碼回 (created_at, id)，且不含填充字符"""
+        cursor = encode_cursor(datetime(2024, 3, 1, 12, 30, 5, 123), 42)
+
+        assert "=" not in cursor
+        assert decode_cursor(cursor) == (datetime(2024, 3, 1, 12, 30, 5, 123), 42)
+
+    @pytest.mark.parametrize("cursor", ["not-a-cursor", "WzEsMl0", "WyJ4IiwgMV0", "WyIyMDI0LTAxLTAxIiwidHJ1ZSJd"])
+    def test_rejects_invalid_cursor(self, cursor):
+        """測試無法解碼或內容不正確的游標"""
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+
+@pytest.mark.infrastructure
+class TestKeysetPagination:
+    """鍵集分頁測試類"""
+
+    def test_pages_cover_every_row_once(self, engine):
+        """測試逐頁翻完的結果與不分頁時一致，同一秒內創建的訂閱也不重複、不遺漏"""
+        with Session(engine) as session:
+            ids, pages = walk_pages(SubscriptionRepository(session), 30, include_inactive=True)
+
+        assert ids == expected_ids(engine, include_inactive=True)
+        assert len(ids) == SUBSCRIPTIONS
+        assert pages == -(-SUBSCRIPTIONS // 30)
+
+    def test_filters(self, engine):
+        """測試只返回活躍訂閱和指定類別"""
+        filters = {"category": SubscriptionCategory.STREAMING}
+        with Session(engine) as session:
+            ids, _ = walk_pages(SubscriptionRepository(session), 17, **filters)
+            subscriptions = [session.get(Subscription, subscription_id) for subscription_id in ids]
+
+        assert ids == expected_ids(engine, **filters)
+        assert {(s.user_id, s.category, s.is_active) for s in subscriptions} == {(1, SubscriptionCategory.STREAMING, True)}
+
+    def test_continues_after_cursor_row_is_deleted(self, engine):
+        """測試游標所指的行被刪除後，下一頁從游標中記錄的時間繼續，不遺漏後面的行"""
+        with Session(engine) as session:
+            repo = SubscriptionRepository(session)
+            last = repo.get_page(1, 20, include_inactive=True)[-1]
+            after = (last.created_at, last.id)
+            repo.delete(last.id)
+            session.commit()
+            rest, _ = walk_pages(repo, 50, after, include_inactive=True)
+
+        remaining = expected_ids(engine, include_inactive=True)[19:]
+        assert set(remaining) <= set(rest)
+
+    def test_uses_index_range_without_sort(self, engine):
+        """測試下一頁由索引範圍直接定位，不需要臨時排序"""
+        statement = keyset_page_statement(1, 20, (datetime(2024, 3, 1), 50))
+        sql = str(statement.compile(engine, compile_kwargs={"literal_binds": True}))
+        with engine.connect() as connection:
+            plan = " ".join(row[3] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+
+        assert "ix_subscriptions_user_active_created (user_id=? AND is_active=? AND created_at<?)" in plan
+        assert "TEMP B-TREE" not in plan
+
+    def test_async_repository_matches_sync(self, engine, database_path):
+        """測試異步實現的分頁結果與同步實現一致"""
+        async def run():
+            async_engine = create_async_engine(f"sqlite+aiosqlite:///{database_path}")
+            try:
+                async with AsyncSession(async_engine) as session:
+                    repo = AsyncSubscriptionRepository(session)
+                    first = await repo.get_page(1, 40)
+                    second = await repo.get_page(1, 40, (first[-1].created_at, first[-1].id))
+                    return [s.id for s in first + second], await repo.count_listed(1)
+            finally:
+                await async_engine.dispose()
+
+        ids, total = asyncio.run(run())
+
+        assert ids == expected_ids(engine)[:80]
+        assert total == SUBSCRIPTIONS - SUBSCRIPTIONS // 5
+
+
+@pytest.mark.infrastructure
+class TestSubscriptionCountCache:
+    """分頁總數緩存測試類"""
+
+    def test_count_served_from_cache(self, engine):
+        """測試同一篩選條件的總數只查詢一次"""
+        statements = count_statements(engine)
+        with Session(engine) as session:
+            repo = SubscriptionRepository(session)
+            counts = [repo.count_listed(1, include_inactive=True) for _ in range(5)]
+
+        assert counts == [SUBSCRIPTIONS] * 5
+        assert len([statement for statement in statements if "count(" in statement]) == 1
+        assert subscription_count_cache.stats()["hits"] == 4
+
+    def test_writes_invalidate_count(self, engine):
+        """測試 ORM 新增、批量停用和批量插入後總數重新計算"""
+        with Session(engine) as session:
+            repo = SubscriptionRepository(session)
+            active = SUBSCRIPTIONS - SUBSCRIPTIONS // 5
+            assert repo.count_listed(1) == active
+
+            repo.create(Subscription(
+                user_id=1, name="new", price=1.0, original_price=1.0, currency=Currency.TWD,
+                cycle=SubscriptionCycle.MONTHLY, category=SubscriptionCategory.OTHER, start_date=datetime(2024, 1, 1)
+            ))
+            assert repo.count_listed(1) == active + 1
+
+            repo.bulk_set_active(1, [2, 3], False)
+            assert repo.count_listed(1) == active - 1
+
+            repo.bulk_insert([{
+                "user_id": 1, "name": "imported", "price": 1.0, "original_price": 1.0, "currency": Currency.TWD,
+                "cycle": SubscriptionCycle.MONTHLY, "category": SubscriptionCategory.OTHER,
+                "start_date": datetime(2024, 1, 1), "is_active": True,
+            }])
+            assert repo.count_listed(1) == active
+            session.commit()
+
+    def test_invalidated_after_commit_not_before(self, engine):
+        """測試其他 Session 在提交前重新緩存的數量會在提交後失效；回滾不使緩存失效"""
+        active = SUBSCRIPTIONS - SUBSCRIPTIONS // 5
+        with Session(engine) as writer, Session(engine) as reader:
+            writer_repo, reader_repo = SubscriptionRepository(writer), SubscriptionRepository(reader)
+            writer_repo.bulk_set_active(1, [2, 3], False)
+            writer_repo.create(Subscription(
+                user_id=1, name="new", price=1.0, original_price=1.0, currency=Currency.TWD,
+                cycle=SubscriptionCycle.MONTHLY, category=SubscriptionCategory.OTHER, start_date=datetime(2024, 1, 1)
+            ))
+
+            # 寫入尚未提交：其他 Session 看到並緩存提交前的數量
+            assert reader_repo.count_listed(1) == active
+            reader.rollback()
+            writer.commit()
+
+            assert reader_repo.count_listed(1) == active - 1
+
+            writer_repo.bulk_set_active(1, [4], False)
+            writer.rollback()
+            invalidations = subscription_count_cache.stats()["invalidations"]
+            assert reader_repo.count_listed(1) == active - 1
+            assert subscription_count_cache.stats()["invalidations"] == invalidations
+
+    def test_count_queried_during_invalidation_is_not_cached(self):
+        """測試查詢數量期間發生失效時，查詢結果不寫入緩存"""
+        generation = subscription_count_cache.generation()
+        subscription_count_cache.invalidate(1)
+        subscription_count_cache.set(1, "key", 10, generation)
+
+        assert subscription_count_cache.get(1, "key") is None
+
+
+@pytest.fixture
+def client(engine):
+    session_factory = sessionmaker(bind=engine)
+    app = FastAPI()
+    app.state.limiter = limiter
+    app.include_router(api_router, prefix="/api/v1")
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[unit_of_work_provider] = get_unit_of_work
+    enabled = user_limiter.enabled
+    user_limiter.enabled = False
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'alice'})}"}
+
+    def get(**params):
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                return await http.get("/api/v1/subscriptions/", params=params, headers=headers)
+        return asyncio.run(run())
+
+    yield get
+    user_limiter.enabled = enabled
+
+
+@pytest.mark.integration
+class TestSubscriptionListPaginationApi:
+    """訂閱列表分頁端點測試類"""
+
+    def test_paginates_with_opaque_cursor(self, client, engine):
+        """測試按 metadata.next_cursor 翻完所有頁，最後一頁沒有下一頁游標"""
+        ids, cursor = [], None
+        while True:
+            params = {"limit": 100, "include_inactive": True, "include_total": True}
+            if cursor:
+                params["cursor"] = cursor
+            body = client(**params).json()
+            ids.extend(item["id"] for item in body["data"])
+            assert body["metadata"]["total"] == SUBSCRIPTIONS
+            cursor = body["metadata"]["next_cursor"]
+            if cursor is None:
+                assert body["metadata"]["has_more"] is False
+                break
+
+        assert ids == expected_ids(engine, include_inactive=True)
+
+    def test_cursor_without_limit_uses_default(self, client):
+        """測試只傳 cursor 時使用默認每頁數量，且不返回總數"""
+        first = client(limit=5).json()
+        body = client(cursor=first["metadata"]["next_cursor"]).json()
+
+        assert body["metadata"]["limit"] == 50
+        assert len(body["data"]) == 50
+        assert "total" not in body["metadata"]
+
+    def test_invalid_cursor_and_limit(self, client):
+        """測試無效游標返回 400，超出上限的 limit 返回 422"""
+        assert client(cursor="not-a-cursor").status_code == 400
+        assert client(limit=1000).status_code == 422
+
+    def test_without_pagination_returns_everything(self, client):
+        """測試不傳分頁參數時保持返回全部活躍訂閱"""
+        body = client().json()
+
+        assert len(body["data"]) == SUBSCRIPTIONS - SUBSCRIPTIONS // 5
+        assert body["metadata"] is None
+
+
+@pytest.mark.performance
+class TestDeepPagination:
+    """深分頁耗時測試類"""
+
+    def test_keyset_page_cost_independent_of_depth(self, user_database):
+        """測試 10 萬筆訂閱的深頁：鍵集分頁的耗時遠低於 OFFSET"""
+        fill_subscriptions(
+            user_database, 1, BENCHMARK_ROWS, lambda index: f"2024-01-01 00:00:{index % 60:02d}.{index:06d}"
+        )
+        engine = create_engine(f"sqlite:///{user_database}")
+
+        with Session(engine) as session:
+            depth = BENCHMARK_ROWS - 1000
+            boundary = session.execute(
+                keyset_page_statement(1, 1, include_inactive=True).offset(depth - 1)
+            ).scalar_one()
+            after = (boundary.created_at, boundary.id)
+            base = keyset_page_statement(1, 50, include_inactive=True)
+
+            def timed(statement):
+                start = time.perf_counter()
+                for _ in range(20):
+                    ids = [subscription.id for subscription in session.scalars(statement)]
+                    session.expunge_all()
+                return (time.perf_counter() - start) / 20, ids
+
+            offset_time, offset_ids = timed(base.offset(depth))
+            keyset_time, keyset_ids = timed(keyset_page_statement(1, 50, after, include_inactive=True))
+        engine.dispose()
+
+        print(
+            f"\n{BENCHMARK_ROWS} 筆訂閱第 {depth} 行起的一頁: OFFSET {offset_time * 1000:.1f}ms, "
+            f"鍵集分頁 {keyset_time * 1000:.2f}ms"
+        )
+        assert keyset_ids == offset_ids
+        assert keyset_time * 5 < offset_time
@@ -0,0 +1,278 @@
+"""
+訂閱查詢規格測試
+
+測試 SubscriptionSpec 與 Repository.find：
+- 規格的鏈式組合與參數校驗
+- 各篩選條件、排序和 limit 的結果與在 Python 中篩選一致
+- 組合後的規格只發出一條 SQL，條件全部在 WHERE 中
+- 同步與異步 Repository 返回相同的行
+- 應用服務只從數據庫取出匹配的行
+- 按類別篩選時與「全部取出再過濾」的耗時對比
+"""
+
+import asyncio
+import sqlite3
+import time
+from unittest.mock import Mock
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+from app.application.dtos.subscription_dtos import SubscriptionQuery
+from app.application.services.subscription_application_service import SubscriptionApplicationService
+from app.domain.interfaces.services import IExchangeRateService
+from app.domain.interfaces.subscription_spec import SubscriptionSpec
+from app.domain.services.subscription_domain_service import SubscriptionDomainService
+from app.infrastructure.repositories.async_subscription_repository import AsyncSubscriptionRepository
+from app.infrastructure.repositories.subscription_repository import SubscriptionRepository
+from app.infrastructure.unit_of_work import SQLAlchemyUnitOfWork
+from app.models.subscription import Currency, Subscription, SubscriptionCategory, SubscriptionCycle
+
+CATEGORIES = list(SubscriptionCategory)
+CURRENCIES = list(Currency)
+CYCLES = list(SubscriptionCycle)
+SUBSCRIPTIONS = 400
+BENCHMARK_ROWS = 20000
+
+
+def fill_subscriptions(path, user_id, count):
+    """用 sqlite3 寫入訂閱：類別、幣種、週期、價格輪流變化，每 3 筆中 1 筆已停用，創建時間各不相同"""
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.executemany(
+            "INSERT INTO subscriptions (user_id, name, price, original_price, currency, cycle, category, "
+            "start_date, is_active, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, '2024-01-01 00:00:00', ?, ?)",
+            (
+                (
+                    user_id, f"sub-{index:05d}", float(index % 50 * 10), float(index % 50),
+                    CURRENCIES[index % len(CURRENCIES)].name, CYCLES[index % len(CYCLES)].name,
+                    CATEGORIES[index % len(CATEGORIES)].name, index % 3 != 0,
+                    f"2024-{index // 28000 % 12 + 1:02d}-{index // 1000 % 28 + 1:02d} "
+                    f"{index // 60 // 60 % 24:02d}:{index // 60 % 60:02d}:{index % 60:02d}",
+                )
+                for index in range(count)
+            )
+        )
+    connection.close()
+
+
+@pytest.fixture
+def database_path(database_path):
+    """alice 400 筆、bob 30 筆"""
+    fill_subscriptions(database_path, 1, SUBSCRIPTIONS)
+    fill_subscriptions(database_path, 2, 30)
+    return database_path
+
+
+def reference(engine, predicate, key=lambda s: (s.created_at, s.id), reverse=True):
+    """把 alice 的所有訂閱取出後在 Python 中篩選和排序，作為期望結果"""
+    with Session(engine) as session:
+        subscriptions = SubscriptionRepository(session).get_by_user_id(1)
+        return [s.id for s in sorted(filter(predicate, subscriptions), key=key, reverse=reverse)]
+
+
+def find_ids(engine, spec):
+    with Session(engine) as session:
+        return [subscription.id for subscription in SubscriptionRepository(session).find(spec)]
+
+
+def record_statements(engine):
+    statements = []
+    event.listen(
+        engine, "before_cursor_execute",
+        lambda conn, cursor, statement, parameters, context, executemany: statements.append((statement, parameters))
+    )
+    return statements
+
+
+@pytest.mark.unit
+class TestSubscriptionSpec:
+    """查詢規格測試類"""
+
+    def test_chaining_returns_new_specs(self):
+        """測試每一步返回新規格，原規格不變"""
+        base = SubscriptionSpec.for_user(1)
+        spec = base.active().in_categories(SubscriptionCategory.MUSIC, SubscriptionCategory.NEWS).take(10)
+
+        assert base == SubscriptionSpec(user_id=1)
+        assert spec.is_active is True
+        assert spec.categories == (SubscriptionCategory.MUSIC, SubscriptionCategory.NEWS)
+        assert spec.limit == 10
+        assert spec.active(None).is_active is None
+
+    def test_rejects_unknown_sort_field(self):
+        """測試不支持的排序欄位在構造時被拒絕"""
+        with pytest.raises(ValueError):
+            SubscriptionSpec.for_user(1).order_by("user_id")
+
+    def test_rejects_non_positive_limit(self):
+        """測試 limit 必須大於 0"""
+        with pytest.raises(ValueError):
+            SubscriptionSpec.for_user(1).take(0)
+
+
+@pytest.mark.infrastructure
+class TestFindBySpec:
+    """Repository.find 測試類"""
+
+    @pytest.mark.parametrize("spec,predicate", [
+        (SubscriptionSpec.for_user(1), lambda s: True),
+        (SubscriptionSpec.for_user(1).active(), lambda s: s.is_active),
+        (SubscriptionSpec.for_user(1).active(False), lambda s: not s.is_active),
+        (
+            SubscriptionSpec.for_user(1).in_categories(SubscriptionCategory.MUSIC),
+            lambda s: s.category == SubscriptionCategory.MUSIC,
+        ),
+        (
+            SubscriptionSpec.for_user(1).in_categories(SubscriptionCategory.MUSIC, SubscriptionCategory.GAMING),
+            lambda s: s.category in (SubscriptionCategory.MUSIC, SubscriptionCategory.GAMING),
+        ),
+        (
+            SubscriptionSpec.for_user(1).in_currencies(Currency.USD, Currency.JPY),
+            lambda s: s.currency in (Currency.USD, Currency.JPY),
+        ),
+        (
+            SubscriptionSpec.for_user(1).with_cycles(SubscriptionCycle.YEARLY),
+            lambda s: s.cycle == SubscriptionCycle.YEARLY,
+        ),
+        (SubscriptionSpec.for_user(1).price_between(100, 250), lambda s: 100 <= s.price <= 250),
+        (SubscriptionSpec.for_user(1).price_between(min_price=400), lambda s: s.price >= 400),
+    ])
+    def test_filters_match_python_filtering(self, engine, spec, predicate):
+        """測試各篩選條件的結果與在 Python 中篩選一致"""
+        expected = reference(engine, predicate)
+
+        assert expected
+        assert find_ids(engine, spec) == expected
+
+    def test_sort_and_limit(self, engine):
+        """測試按價格升序（同價按 id）並限制行數"""
+        spec = SubscriptionSpec.for_user(1).active().order_by("price", descending=False).take(15)
+        expected = reference(engine, lambda s: s.is_active, key=lambda s: (s.price, s.id), reverse=False)[:15]
+
+        assert find_ids(engine, spec) == expected
+
+    def test_combined_spec_is_one_statement(self, engine):
+        """測試組合規格只發出一條 SQL，所有條件都在數據庫中執行"""
+        spec = (
+            SubscriptionSpec.for_user(1).active()
+            .in_categories(SubscriptionCategory.STREAMING, SubscriptionCategory.SOFTWARE)
+            .in_currencies(Currency.TWD, Currency.USD, Currency.EUR)
+            .with_cycles(SubscriptionCycle.MONTHLY, SubscriptionCycle.YEARLY)
+            .price_between(50, 450)
+            .order_by("name")
+            .take(5)
+        )
+        expected = reference(
+            engine,
+            lambda s: (
+                s.is_active
+                and s.category in spec.categories
+                and s.currency in spec.currencies
+                and s.cycle in spec.cycles
+                and 50 <= s.price <= 450
+            ),
+            key=lambda s: (s.name, s.id),
+        )[:5]
+        statements = record_statements(engine)
+
+        ids = find_ids(engine, spec)
+
+        assert ids == expected
+        assert len(statements) == 1
+        sql = statements[0][0]
+        for fragment in ("is_active", "category IN", "currency IN", "cycle IN", "price >=", "price <=", "LIMIT"):
+            assert fragment in sql
+
+    def test_other_users_are_excluded(self, engine):
+        """測試只返回規格中用戶的訂閱"""
+        with Session(engine) as session:
+            subscriptions = SubscriptionRepository(session).find(SubscriptionSpec.for_user(2).active())
+
+        assert len(subscriptions) == 20
+        assert {subscription.user_id for subscription in subscriptions} == {2}
+
+    def test_async_repository_matches_sync(self, engine, database_path):
+        """測試異步實現發出相同的查詢並返回相同的行"""
+        spec = SubscriptionSpec.for_user(1).active().in_currencies(Currency.USD).price_between(max_price=300)
+        expected = find_ids(engine, spec)
+
+        async def run():
+            async_engine = create_async_engine(f"sqlite+aiosqlite:///{database_path}")
+            try:
+                async with AsyncSession(async_engine) as session:
+                    return [s.id for s in await AsyncSubscriptionRepository(session).find(spec)]
+            finally:
+                await async_engine.dispose()
+
+        assert expected
+        assert asyncio.run(run()) == expected
+
+
+@pytest.mark.integration
+class TestGetSubscriptionsBySpec:
+    """應用服務列表查詢測試類"""
+
+    def test_only_matching_rows_are_loaded(self, engine):
+        """測試按類別列出活躍訂閱時，數據庫只返回匹配的行"""
+        expected = reference(engine, lambda s: s.is_active and s.category == SubscriptionCategory.MUSIC)
+        statements = record_statements(engine)
+        fetched = []
+
+        def record_load(target, context):
+            fetched.append(target.id)
+
+        event.listen(Subscription, "load", record_load)
+        try:
+            service = SubscriptionApplicationService(
+                SQLAlchemyUnitOfWork(Session(engine)), SubscriptionDomainService(Mock(spec=IExchangeRateService))
+            )
+            query = SubscriptionQuery(user_id=1, category=SubscriptionCategory.MUSIC)
+            result = asyncio.run(service.get_subscriptions(query))
+        finally:
+            event.remove(Subscription, "load", record_load)
+
+        assert [dto.id for dto in result] == expected
+        assert sorted(fetched) == sorted(expected)
+        assert len(statements) == 1
+
+
+@pytest.mark.performance
+class TestFindPerformance:
+    """查詢規格性能測試類"""
+
+    def test_category_filter_in_sql_is_faster(self, user_database):
+        """測試按類別篩選時，在 SQL 中篩選比取出所有活躍訂閱再在 Python 中過濾更快"""
+        fill_subscriptions(user_database, 1, BENCHMARK_ROWS)
+        engine = create_engine(f"sqlite:///{user_database}")
+        spec = SubscriptionSpec.for_user(1).active().in_categories(SubscriptionCategory.MUSIC)
+
+        def python_filter():
+            with Session(engine) as session:
+                subscriptions = SubscriptionRepository(session).get_active_by_user_id(1)
+                return [s.id for s in subscriptions if s.category == SubscriptionCategory.MUSIC]
+
+        def sql_filter():
+            with Session(engine) as session:
+                return [s.id for s in SubscriptionRepository(session).find(spec)]
+
+        def best_of(function, runs=3):
+            timings = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                result = function()
+                timings.append(time.perf_counter() - start)
+            return min(timings), result
+
+        python_time, python_ids = best_of(python_filter)
+        sql_time, sql_ids = best_of(sql_filter)
+        engine.dispose()
+
+        print(
+            f"\n{BENCHMARK_ROWS} 行中按類別篩選 {len(sql_ids)} 行: "
+            f"Python 過濾 {python_time * 1000:.1f}ms, SQL 篩選 {sql_time * 1000:.1f}ms"
+        )
+        assert sql_ids == python_ids
+        assert sql_time * 3 < python_time
@@ -0,0 +1 @@
+# 基礎設施服務測試包
@@ -0,0 +1,148 @@
+"""
+匯率緩存測試
+
+測試進程內共享的匯率緩存：
+- 命中 / 未命中統計
+- 過期處理
+- DI 容器與 FastAPI 依賴共用同一個匯率服務實例
+- v1 匯率端點使用從外部 API 下載匯率的服務
+"""
+
+import asyncio
+from datetime import timedelta
+from decimal import Decimal
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api.v1.router import api_router
+from app.core.rate_limiter import limiter
+from app.domain.interfaces.services import IExchangeRateService
+from app.infrastructure.container import configure_container
+from app.infrastructure.dependencies import (
+    get_exchange_rate_service,
+    get_live_exchange_rate_service,
+    get_subscription_domain_service,
+)
+from app.infrastructure.services.exchange_rate_cache import ExchangeRateCache
+from app.infrastructure.services.exchange_rate_service_impl import ExchangeRateServiceImpl, exchange_rate_service
+from app.services import exchange_rate_service as live_module
+from app.services.exchange_rate_service import ExchangeRateService
+
+
+class FakeLiveExchangeRateService(ExchangeRateService):
+    """匯率表由測試提供，不發出網絡請求"""
+
+    async def _fetch_rate_table(self, base_currency):
+        return {"USD": 1.0, "TWD": 30.0, "EUR": 0.9}
+
+
+@pytest.mark.unit
+@pytest.mark.infrastructure
+class TestExchangeRateCache:
+    """匯率緩存測試類"""
+
+    def test_miss_then_hit(self):
+        """測試首次未命中、寫入後命中"""
+        cache = ExchangeRateCache()
+
+        assert cache.get("USD_TWD") is None
+        cache.set("USD_TWD", Decimal("31.5"))
+        assert cache.get("USD_TWD") == Decimal("31.5")
+
+        stats = cache.stats()
+        assert (stats["size"], stats["hits"], stats["misses"], stats["hit_ratio"]) == (1, 1, 1, 0.5)
+
+    def test_expired_entry_is_a_miss(self):
+        """測試過期條目算作未命中，但仍可作為舊值讀取"""
+        cache = ExchangeRateCache(ttl=timedelta(seconds=-1))
+        cache.set("USD_TWD", Decimal("31.5"))
+
+        assert cache.get("USD_TWD") is None
+        assert cache.get_stale("USD_TWD") == Decimal("31.5")
+        assert cache.stats()["misses"] == 1
+
+    def test_clear_resets_stats(self):
+        """測試清空緩存同時重置統計"""
+        cache = ExchangeRateCache()
+        cache.set("USD_TWD", Decimal("31.5"))
+        cache.get("USD_TWD")
+
+        cache.clear()
+
+        assert cache.stats() == {
+            "size": 0, "hits": 0, "misses": 0, "hit_ratio": 0.0, "stale_hits": 0, "loads": 0, "coalesced": 0
+        }
+
+
+@pytest.mark.unit
+@pytest.mark.infrastructure
+class TestSharedExchangeRateService:
+    """共享匯率服務測試類"""
+
+    def test_dependency_returns_shared_instance(self):
+        """測試 FastAPI 依賴每次返回同一個實例"""
+        assert get_exchange_rate_service() is get_exchange_rate_service()
+        assert get_exchange_rate_service() is exchange_rate_service
+
+    def test_v1_endpoints_use_live_service(self):
+        """測試 v1 匯率端點使用與舊版路由相同的外部 API 匯率服務，而不是模擬匯率"""
+        assert get_live_exchange_rate_service() is live_module.exchange_rate_service
+
+        app = FastAPI()
+        app.state.limiter = limiter
+        app.include_router(api_router, prefix="/api/v1")
+        live_service = FakeLiveExchangeRateService()
+        app.dependency_overrides[get_live_exchange_rate_service] = lambda: live_service
+
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                currencies = await client.get("/api/v1/exchange-rates/currencies")
+                converted = await client.get(
+                    "/api/v1/exchange-rates/convert",
+                    params={"amount": 10, "from_currency": "USD", "to_currency": "TWD"}
+                )
+                return currencies, converted
+
+        currencies, converted = asyncio.run(run())
+
+        assert currencies.status_code == 200
+        assert set(currencies.json()["data"]) == {"TWD", "USD"}
+        assert converted.json()["data"]["exchange_rate"] == 30.0
+        assert converted.json()["data"]["converted_amount"] == 300.0
+
+    def test_container_resolves_shared_instance(self):
+        """測試 DI 容器解析出與 FastAPI 依賴相同的實例"""
+        container = configure_container()
+
+        assert container.resolve(IExchangeRateService) is exchange_rate_service
+
+    def test_domain_services_share_cache(self):
+        """測試不同請求構建的領域服務共用緩存"""
+        exchange_rate_service._cache.clear()
+        first = get_subscription_domain_service(get_exchange_rate_service())
+        second = get_subscription_domain_service(get_exchange_rate_service())
+
+        async def convert():
+            await first.calculate_twd_price(10, "USD")
+            await second.calculate_twd_price(10, "USD")
+
+        asyncio.run(convert())
+
+        assert exchange_rate_service.cache_stats()["hits"] == 1
+        assert exchange_rate_service.cache_stats()["misses"] == 1
+
+    def test_concurrent_lookups_count_every_call(self):
+        """測試並發查詢時統計不丟失"""
+        service = ExchangeRateServiceImpl()
+
+        async def lookups():
+            await asyncio.gather(*(service.get_exchange_rate("USD", "TWD") for _ in range(200)))
+
+        asyncio.run(lookups())
+
+        stats = service.cache_stats()
+        assert stats["hits"] + stats["misses"] == 200
+        assert stats["loads"] == 1
@@ -0,0 +1,191 @@
+"""
+匯率歷史測試
+
+測試持久化的匯率表：
+- 匯率來源下載後寫入 exchange_rates 表
+- 啟動時從最新一張匯率表預熱緩存，不調用外部 API
+- 按日期查找當時生效的匯率
+"""
+
+import asyncio
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base
+from app.models.exchange_rate import ExchangeRate
+from app.infrastructure.services.exchange_rate_history import ExchangeRateHistory
+from app.infrastructure.services.exchange_rate_service_impl import ExchangeRateServiceImpl
+from app.services.exchange_rate_service import ExchangeRateService
+from tests.infrastructure.services.test_exchange_rate_single_flight import StubRateServer
+
+SNAPSHOTS = [
+    (datetime(2024, 1, 1, 9), {"TWD": 30.0, "EUR": 0.90}),
+    (datetime(2024, 6, 1, 9), {"TWD": 32.0, "EUR": 0.93}),
+    (datetime(2025, 1, 1, 9), {"TWD": 33.0, "EUR": 0.95}),
+]
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rates.db'}")
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def history(session_factory):
+    return ExchangeRateHistory(session_factory)
+
+
+@pytest.fixture
+def seeded_history(history):
+    async def seed():
+        for as_of, quotes in SNAPSHOTS:
+            await history.save("USD", quotes, as_of)
+
+    asyncio.run(seed())
+    return history
+
+
+@pytest.fixture
+def stub_server():
+    with StubRateServer() as server:
+        yield server
+
+
+@pytest.fixture
+def failing_server():
+    with StubRateServer(tables={}) as server:
+        yield server
+
+
+@pytest.mark.unit
+@pytest.mark.infrastructure
+class TestExchangeRateHistory:
+    """匯率歷史存儲測試類"""
+
+    def test_latest_snapshot(self, seeded_history):
+        """測試最新一張匯率表"""
+        matrix = asyncio.run(seeded_history.latest("USD"))
+
+        assert matrix.as_of == datetime(2025, 1, 1, 9)
+        assert matrix.rate("USD", "TWD") == 33.0
+        assert matrix.rate("EUR", "TWD") == pytest.approx(33.0 / 0.95)
+
+    @pytest.mark.parametrize("on,expected", [
+        (date(2024, 1, 1), 30.0),
+        (date(2024, 5, 31), 30.0),
+        (datetime(2024, 6, 1, 8), 30.0),
+        (date(2024, 6, 1), 32.0),
+        (date(2030, 1, 1), 33.0),
+    ])
+    def test_effective_on(self, seeded_history, on, expected):
+        """測試按日期查找當時生效的匯率表（日期按當天結束計算）"""
+        matrix = asyncio.run(seeded_history.effective_on(on))
+
+        assert matrix.rate("USD", "TWD") == expected
+
+    def test_before_first_snapshot(self, seeded_history):
+        """測試早於最早記錄的日期沒有匯率"""
+        assert asyncio.run(seeded_history.effective_on(date(2023, 12, 31))) is None
+
+    def test_empty_history(self, history):
+        """測試沒有任何記錄時返回 None"""
+        assert asyncio.run(history.latest()) is None
+
+    def test_database_errors_read_as_no_data(self, caplog):
+        """測試無法連接數據庫時記錄日誌並視為無數據，預熱和按日期查詢不拋出異常"""
+        def unavailable():
+            raise OperationalError("SELECT 1", {}, Exception("database is locked"))
+
+        history = ExchangeRateHistory(unavailable)
+        service = ExchangeRateService(history=history)
+
+        async def run():
+            return (
+                await history.effective_on(date(2024, 7, 1)),
+                await history.latest(),
+                await service.preload_rate_history(),
+            )
+
+        assert asyncio.run(run()) == (None, None, False)
+        assert "匯率歷史讀取失敗" in caplog.text
+
+
+@pytest.mark.integration
+@pytest.mark.infrastructure
+class TestHistoryBackedServices:
+    """使用匯率歷史的匯率服務測試類"""
+
+    def test_fetched_table_is_persisted(self, stub_server, history, session_factory):
+        """測試下載的匯率表寫入數據庫"""
+        service = ExchangeRateService(api_url=stub_server.url, history=history)
+
+        asyncio.run(service.get_exchange_rate("USD", "TWD"))
+
+        with session_factory() as db:
+            rows = db.execute(select(func.count()).select_from(ExchangeRate)).scalar()
+        assert rows == 6  # 基準貨幣 USD 之外的 6 種貨幣
+        assert asyncio.run(history.latest("USD")).rate("USD", "TWD") == 31.5
+
+    def test_warm_start_skips_upstream(self, failing_server, seeded_history):
+        """測試新進程從歷史預熱後不調用外部 API"""
+        service = ExchangeRateService(api_url=failing_server.url, history=seeded_history)
+        as_of = datetime.now() - timedelta(minutes=10)
+
+        async def run():
+            await seeded_history.save("USD", {"TWD": 31.8, "EUR": 0.91}, as_of)
+            preloaded = await service.preload_rate_history()
+            return preloaded, await service.get_exchange_rate("USD", "TWD")
+
+        preloaded, rate = asyncio.run(run())
+
+        assert preloaded is True
+        assert rate == 31.8
+        assert sum(failing_server.hits.values()) == 0
+        assert service.rate_age() >= 600
+
+    def test_preloaded_table_past_max_staleness_is_not_served(self, failing_server, seeded_history):
+        """測試預熱的匯率超出最長過期時間後不再使用"""
+        service = ExchangeRateService(api_url=failing_server.url, history=seeded_history)
+
+        async def run():
+            await service.preload_rate_history()
+            return await service.get_exchange_rate("USD", "TWD")
+
+        rate = asyncio.run(run())
+
+        assert rate == service._get_fallback_rate("USD", "TWD")
+        assert sum(failing_server.hits.values()) == 1
+
+    def test_convert_on_start_date_without_network(self, failing_server, seeded_history):
+        """測試按訂閱開始日期換算不調用外部 API"""
+        service = ExchangeRateService(api_url=failing_server.url, history=seeded_history)
+
+        converted = asyncio.run(service.convert_currency(10, "USD", "TWD", on=datetime(2024, 3, 15)))
+
+        assert converted == 300.0
+        assert sum(failing_server.hits.values()) == 0
+
+    def test_impl_reads_history_for_dated_rates(self, seeded_history):
+        """測試 v1 匯率服務按日期查找歷史匯率，沒有記錄時使用當前匯率"""
+        service = ExchangeRateServiceImpl(history=seeded_history)
+
+        async def run():
+            return (
+                await service.get_exchange_rate_on("USD", "TWD", date(2024, 7, 1)),
+                await service.get_exchange_rate_on("USD", "TWD", date(2020, 1, 1)),
+                await service.convert_currency(10, "USD", "TWD", on=date(2024, 7, 1)),
+            )
+
+        historical, before_history, converted = asyncio.run(run())
+
+        assert historical == Decimal("32.0")
+        assert before_history == Decimal("31.5")
+        assert converted == 320.0
@@ -0,0 +1,223 @@
+"""
+匯率後台刷新測試
+
+測試 stale-while-revalidate 和後台刷新器：
+- 過期但未超出最長過期時間的匯率立即返回，同時在後台刷新
+- 超出最長過期時間且上游不可用時回退到預設匯率
+- 後台刷新器運行時，沒有可用匯率的請求不等待上游，直接使用預設匯率
+- 刷新器記錄刷新耗時、失敗次數和匯率年齡
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.infrastructure.services.exchange_rate_cache import ExchangeRateCache
+from app.infrastructure.services.exchange_rate_refresher import ExchangeRateRefresher
+from app.infrastructure.services.exchange_rate_service_impl import ExchangeRateServiceImpl
+from app.infrastructure.services.rate_matrix import RateMatrix
+from app.services.exchange_rate_service import RATE_MATRIX_KEY, ExchangeRateService
+from tests.infrastructure.services.test_exchange_rate_single_flight import UPSTREAM_DELAY, StubRateServer
+
+
+def make_service(url, ttl=timedelta(hours=1), max_staleness=timedelta(hours=6)):
+    service = ExchangeRateService(api_url=url)
+    service.max_staleness = max_staleness
+    service._rate_cache = ExchangeRateCache(ttl, max_staleness)
+    return service
+
+
+def put_matrix(service, usd_to_twd, age):
+    """寫入指定年齡的舊匯率矩陣"""
+    matrix = RateMatrix.from_quotes("USD", {"TWD": usd_to_twd})
+    service._rate_cache._entries[RATE_MATRIX_KEY] = (matrix, datetime.now() - age)
+
+
+@pytest.fixture
+def stub_server():
+    with StubRateServer() as server:
+        yield server
+
+
+@pytest.fixture
+def failing_server():
+    with StubRateServer(tables={}) as server:
+        yield server
+
+
+@pytest.mark.integration
+@pytest.mark.infrastructure
+class TestStaleWhileRevalidate:
+    """過期匯率後台刷新測試類"""
+
+    def test_stale_rate_is_served_while_refreshing(self, stub_server):
+        """測試過期匯率立即返回，刷新在後台完成"""
+        service = make_service(stub_server.url)
+        put_matrix(service, 30.0, age=timedelta(hours=2))
+
+        async def run():
+            start = time.perf_counter()
+            stale_rate = await service.get_exchange_rate("USD", "TWD")
+            elapsed = time.perf_counter() - start
+            await asyncio.sleep(UPSTREAM_DELAY * 2)
+            fresh_rate = await service.get_exchange_rate("USD", "TWD")
+            return stale_rate, elapsed, fresh_rate
+
+        stale_rate, elapsed, fresh_rate = asyncio.run(run())
+
+        assert stale_rate == 30.0
+        assert elapsed < UPSTREAM_DELAY / 2
+        assert fresh_rate == 31.5
+        assert stub_server.hits["USD"] == 1
+        assert service.cache_stats()["stale_hits"] == 1
+
+    def test_failed_refresh_keeps_serving_stale_rate(self, failing_server):
+        """測試上游失敗時在最長過期時間內繼續使用舊匯率"""
+        service = make_service(failing_server.url)
+        put_matrix(service, 30.0, age=timedelta(hours=2))
+
+        async def run():
+            refreshed = await service.refresh_rate_matrix()
+            return refreshed, await service.get_exchange_rate("USD", "TWD")
+
+        refreshed, rate = asyncio.run(run())
+
+        assert refreshed is None
+        assert rate == 30.0
+
+    def test_too_stale_rate_falls_back(self, failing_server):
+        """測試超出最長過期時間且上游失敗時使用預設匯率"""
+        service = make_service(failing_server.url, max_staleness=timedelta(hours=1))
+        put_matrix(service, 30.0, age=timedelta(hours=3))
+
+        rate = asyncio.run(service.get_exchange_rate("USD", "TWD"))
+
+        assert rate == service._get_fallback_rate("USD", "TWD") == 31.5
+        assert sum(failing_server.hits.values()) == 1
+
+
+    def test_no_rate_with_refresher_uses_fallback_without_waiting(self, stub_server):
+        """測試刷新器運行時，沒有可用匯率的請求立即使用預設匯率，加載在後台完成"""
+        service = make_service(stub_server.url)
+        service.set_background_refresh(True)
+
+        async def run():
+            start = time.perf_counter()
+            rates = await asyncio.gather(*(service.get_exchange_rate("USD", "TWD") for _ in range(5)))
+            elapsed = time.perf_counter() - start
+            await asyncio.sleep(UPSTREAM_DELAY * 2)
+            return rates, elapsed, await service.get_exchange_rate("USD", "TWD")
+
+        rates, elapsed, fresh_rate = asyncio.run(run())
+
+        assert rates == [service._get_fallback_rate("USD", "TWD")] * 5
+        assert elapsed < UPSTREAM_DELAY / 2
+        assert fresh_rate == 31.5
+        assert stub_server.hits["USD"] == 1
+
+    def test_too_stale_rate_with_refresher_does_not_wait_for_outage(self, failing_server):
+        """測試上游故障且匯率過舊時，刷新器運行期間請求不等待失敗的加載"""
+        service = make_service(failing_server.url, max_staleness=timedelta(hours=1))
+        put_matrix(service, 30.0, age=timedelta(hours=3))
+        service.set_background_refresh(True)
+
+        async def run():
+            start = time.perf_counter()
+            rate = await service.get_exchange_rate("USD", "TWD")
+            return rate, time.perf_counter() - start
+
+        rate, elapsed = asyncio.run(run())
+
+        assert rate == service._get_fallback_rate("USD", "TWD")
+        assert elapsed < UPSTREAM_DELAY / 2
+
+
+@pytest.mark.unit
+@pytest.mark.infrastructure
+class TestExchangeRateRefresher:
+    """後台刷新器測試類"""
+
+    def test_refresh_records_latency_and_age(self, stub_server):
+        """測試成功刷新記錄耗時與匯率年齡"""
+        service = make_service(stub_server.url)
+        refresher = ExchangeRateRefresher(service, interval=3000)
+
+        assert asyncio.run(refresher.refresh_once()) is True
+
+        stats = refresher.stats()
+        assert stats["refreshes"] == 1
+        assert stats["failures"] == 0
+        assert stats["last_refresh_ms"] >= UPSTREAM_DELAY * 1000
+        assert stats["rate_age_seconds"] < 1
+        assert stats["last_success_at"] is not None
+
+    def test_refresh_failure_is_counted(self, failing_server):
+        """測試刷新失敗計入失敗次數"""
+        service = make_service(failing_server.url)
+        refresher = ExchangeRateRefresher(service, interval=3000)
+
+        async def run():
+            await refresher.refresh_once()
+            await refresher.refresh_once()
+
+        asyncio.run(run())
+
+        stats = refresher.stats()
+        assert (stats["refreshes"], stats["failures"], stats["consecutive_failures"]) == (2, 2, 2)
+        assert stats["last_error"]
+        assert stats["rate_age_seconds"] is None
+
+    def test_start_and_stop_switch_source_to_background_refresh(self, stub_server):
+        """測試刷新器啟動時匯率來源不再等待加載，停止後恢復"""
+        service = make_service(stub_server.url)
+        refresher = ExchangeRateRefresher(service, interval=3000)
+
+        async def run():
+            refresher.start()
+            started = service._background_refresh
+            await refresher.stop()
+            return started
+
+        assert asyncio.run(run()) is True
+        assert service._background_refresh is False
+
+    def test_background_task_refreshes_periodically(self):
+        """測試後台任務按間隔刷新，停止後不再運行"""
+        cache = ExchangeRateCache()
+        refresher = ExchangeRateRefresher(ExchangeRateServiceImpl(cache), interval=0.02)
+
+        async def run():
+            refresher.start()
+            await asyncio.sleep(0.15)
+            running = refresher.running
+            await refresher.stop()
+            return running
+
+        assert asyncio.run(run()) is True
+        assert refresher.running is False
+        assert refresher.refreshes >= 3
+        assert cache.stats()["loads"] == refresher.refreshes
+
+    def test_impl_serves_stale_matrix_without_rebuilding_while_refresher_runs(self):
+        """測試 ExchangeRateServiceImpl 在刷新器運行時沿用過期矩陣，停止後恢復請求路徑重建"""
+        cache = ExchangeRateCache(timedelta(hours=1), timedelta(hours=6))
+        service = ExchangeRateServiceImpl(cache)
+        stale = RateMatrix.from_quotes("USD", {"TWD": 30.0})
+        cache._entries[RATE_MATRIX_KEY] = (stale, datetime.now() - timedelta(hours=3))
+
+        async def run():
+            service.set_background_refresh(True)
+            during = await service.get_rate_matrix()
+            loads_during = cache.stats()["loads"]
+            service.set_background_refresh(False)
+            await service.get_rate_matrix()
+            await asyncio.sleep(0.05)
+            return during, loads_during
+
+        during, loads_during = asyncio.run(run())
+
+        assert during is stale
+        assert loads_during == 0
+        assert cache.stats()["loads"] == 1
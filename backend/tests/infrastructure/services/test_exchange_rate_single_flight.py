@@ -0,0 +1,196 @@
+"""
+匯率請求合併測試
+
+使用本地樁 HTTP 服務統計上游請求次數：
+- 大量並發未命中只觸發一次上游請求
+- 不同貨幣對共用同一次基準匯率表請求
+- 加載失敗時所有等待者都得到結果（回退匯率）
+"""
+
+import asyncio
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.infrastructure.services.exchange_rate_cache import ExchangeRateCache
+from app.infrastructure.services.exchange_rate_service_impl import ExchangeRateServiceImpl
+from app.services.exchange_rate_service import ExchangeRateService
+
+CONCURRENT_REQUESTS = 500
+UPSTREAM_DELAY = 0.2
+
+RATE_TABLES = {
+    "USD": {"USD": 1, "TWD": 31.5, "EUR": 0.92, "JPY": 150.0, "GBP": 0.79, "KRW": 1350.0, "CNY": 7.3},
+}
+
+
+class StubRateServer:
+    """模擬 exchangerate-api 的本地服務，記錄每個路徑的請求次數"""
+
+    def __init__(self, tables=RATE_TABLES):
+        self.hits = Counter()
+        hits = self.hits
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                base = self.path.rstrip("/").rsplit("/", 1)[-1]
+                hits[base] += 1
+                time.sleep(UPSTREAM_DELAY)
+                if base not in tables:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = json.dumps({"base": base, "rates": tables[base]}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_port}/v4/latest"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def stub_server():
+    with StubRateServer() as server:
+        yield server
+
+
+@pytest.fixture
+def failing_server():
+    with StubRateServer(tables={}) as server:
+        yield server
+
+
+@pytest.mark.integration
+@pytest.mark.infrastructure
+class TestSingleFlight:
+    """並發請求合併測試類"""
+
+    def test_concurrent_misses_fetch_once(self, stub_server):
+        """測試 500 個並發未命中只發起一次上游請求"""
+        service = ExchangeRateService(api_url=stub_server.url)
+
+        async def run():
+            return await asyncio.gather(*(
+                service.get_exchange_rate("USD", "TWD") for _ in range(CONCURRENT_REQUESTS)
+            ))
+
+        rates = asyncio.run(run())
+
+        assert rates == [31.5] * CONCURRENT_REQUESTS
+        assert stub_server.hits["USD"] == 1
+        stats = service.cache_stats()
+        assert stats["loads"] == 1
+        assert stats["coalesced"] == CONCURRENT_REQUESTS - 1
+
+    def test_pairs_share_one_base_table_fetch(self, stub_server):
+        """測試不同貨幣對共用一次基準匯率表請求"""
+        service = ExchangeRateService(api_url=stub_server.url)
+
+        async def run():
+            return await asyncio.gather(*(
+                service.get_exchange_rate(base, "TWD")
+                for _ in range(CONCURRENT_REQUESTS // 2)
+                for base in ("USD", "EUR")
+            ))
+
+        rates = asyncio.run(run())
+
+        assert rates[0::2] == [31.5] * (CONCURRENT_REQUESTS // 2)
+        assert rates[1::2] == [pytest.approx(31.5 / 0.92)] * (CONCURRENT_REQUESTS // 2)
+        assert stub_server.hits == Counter({"USD": 1})
+
+    def test_failed_upstream_is_fetched_once_and_falls_back(self, failing_server):
+        """測試上游失敗時仍只請求一次，並返回回退匯率"""
+        service = ExchangeRateService(api_url=failing_server.url)
+
+        async def run():
+            return await asyncio.gather(*(
+                service.get_exchange_rate("GBP", "TWD") for _ in range(CONCURRENT_REQUESTS)
+            ))
+
+        rates = asyncio.run(run())
+
+        assert sum(failing_server.hits.values()) == 1
+        assert len(set(rates)) == 1
+        assert rates[0] == pytest.approx(31.5 / 0.79)
+
+    def test_cross_rate_lookups_share_one_build(self):
+        """測試經 TWD 中轉的匯率在並發下只構建一次矩陣"""
+        cache = ExchangeRateCache()
+        service = ExchangeRateServiceImpl(cache)
+
+        async def run():
+            return await asyncio.gather(*(
+                service.get_exchange_rate("USD", "EUR") for _ in range(CONCURRENT_REQUESTS)
+            ))
+
+        rates = asyncio.run(run())
+
+        assert len(set(rates)) == 1
+        assert cache.stats()["loads"] == 1
+
+
+@pytest.mark.unit
+@pytest.mark.infrastructure
+class TestGetOrLoad:
+    """get_or_load 行為測試類"""
+
+    def test_cancelled_waiter_does_not_cancel_shared_load(self):
+        """測試取消單個等待者不影響共享加載"""
+        cache = ExchangeRateCache()
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 42
+
+        async def run():
+            first = asyncio.ensure_future(cache.get_or_load("k", loader))
+            second = asyncio.ensure_future(cache.get_or_load("k", loader))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await second
+
+        assert asyncio.run(run()) == 42
+        assert calls == [1]
+        assert cache.get("k") == 42
+
+    def test_errors_propagate_to_all_waiters(self):
+        """測試加載異常傳遞給所有等待者，且不寫入緩存"""
+        cache = ExchangeRateCache()
+
+        async def loader():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+        async def run():
+            return await asyncio.gather(
+                *(cache.get_or_load("k", loader) for _ in range(10)), return_exceptions=True
+            )
+
+        results = asyncio.run(run())
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert cache.stats()["loads"] == 1
+        assert cache.get_stale("k") is None
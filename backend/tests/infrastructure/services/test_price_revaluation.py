@@ -0,0 +1,227 @@
+"""
+訂閱價格批量重估測試
+
+測試按匯率矩陣批量重估台幣價格：
+- 集合式 UPDATE 按貨幣、按主鍵區間分塊執行
+- 只統計價格實際變化的行，重複運行不再修改
+- 中斷後從檢查點繼續，結果與一次運行相同
+- 檢查點記錄所用匯率，續跑時沿用，不受當前匯率變化影響
+- 當前匯率取自匯率歷史或外部 API，都沒有時拒絕重估
+"""
+
+import asyncio
+import json
+import time
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base
+from app.models.subscription import Currency, Subscription, SubscriptionCategory, SubscriptionCycle
+from app.infrastructure.services.exchange_rate_history import ExchangeRateHistory
+from app.infrastructure.services.price_revaluation import (
+    PriceRevaluation,
+    current_rate_matrix,
+    load_checkpoint,
+    save_checkpoint
+)
+from app.infrastructure.services.rate_matrix import RateMatrix
+from app.services.exchange_rate_service import ExchangeRateService
+
+ROWS = 20_000
+CHUNK_SIZE = 2_000
+CURRENCIES = [Currency.TWD, Currency.USD, Currency.EUR, Currency.JPY]
+
+OLD_RATES = {"TWD": 31.5, "EUR": 0.92, "JPY": 150.0}
+NEW_RATES = {"TWD": 32.0, "EUR": 0.90, "JPY": 160.0}
+MATRIX_CURRENCIES = len(NEW_RATES) + 1  # 加上基準貨幣 USD
+
+
+def expected_price(original_price, currency, quotes):
+    matrix = RateMatrix.from_quotes("USD", quotes)
+    return original_price * float(matrix.rate(currency.value, "TWD"))
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'revaluation.db'}")
+    Base.metadata.create_all(engine)
+    rows = []
+    for index in range(1, ROWS + 1):
+        currency = CURRENCIES[index % len(CURRENCIES)]
+        original_price = float(index % 100 + 1)
+        rows.append({
+            "id": index,
+            "user_id": index % 50 + 1,
+            "name": f"sub-{index}",
+            "price": expected_price(original_price, currency, OLD_RATES),
+            "original_price": original_price,
+            "currency": currency.name,
+            "cycle": SubscriptionCycle.MONTHLY.name,
+            "category": SubscriptionCategory.OTHER.name,
+            "start_date": datetime(2024, 1, 1),
+            "is_active": True,
+        })
+    with engine.begin() as conn:
+        conn.execute(Subscription.__table__.insert(), rows)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def revaluation(engine):
+    return PriceRevaluation(sessionmaker(bind=engine), chunk_size=CHUNK_SIZE)
+
+
+def prices(engine):
+    with engine.connect() as conn:
+        return dict(conn.execute(select(Subscription.id, Subscription.price)).all())
+
+
+def assert_revalued(engine, quotes):
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(Subscription.original_price, Subscription.currency, Subscription.price)
+        ).all()
+    for original_price, currency, price in rows:
+        assert price == pytest.approx(expected_price(original_price, currency, quotes))
+
+
+@pytest.mark.integration
+@pytest.mark.infrastructure
+class TestPriceRevaluation:
+    """價格重估測試類"""
+
+    def test_revalues_changed_currencies(self, engine, revaluation):
+        """測試只有匯率變化的貨幣被更新，TWD 價格不變"""
+        report = revaluation.run(RateMatrix.from_quotes("USD", NEW_RATES))
+
+        assert report.rows_changed["TWD"] == 0
+        assert report.rows_changed["USD"] == ROWS // len(CURRENCIES)
+        assert report.total_changed == ROWS * 3 // len(CURRENCIES)
+        assert_revalued(engine, NEW_RATES)
+
+    def test_second_run_changes_nothing(self, engine, revaluation):
+        """測試相同匯率重複運行不再修改任何行"""
+        matrix = RateMatrix.from_quotes("USD", NEW_RATES)
+        revaluation.run(matrix)
+
+        assert revaluation.run(matrix).total_changed == 0
+
+    def test_updates_are_set_based_and_chunked(self, engine, revaluation):
+        """測試每塊每種貨幣只發出一條 UPDATE"""
+        updates = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("UPDATE"):
+                updates.append(statement)
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            report = revaluation.run(RateMatrix.from_quotes("USD", NEW_RATES))
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+        chunks_per_currency = ROWS // CHUNK_SIZE
+        assert report.chunks == chunks_per_currency * MATRIX_CURRENCIES
+        assert len(updates) == report.chunks
+
+    def test_resume_from_checkpoint(self, engine, revaluation):
+        """測試中斷後從檢查點繼續，結果與一次運行相同"""
+        matrix = RateMatrix.from_quotes("USD", NEW_RATES)
+        saved = {}
+        committed = []
+
+        def interrupt_after_five_chunks(checkpoint):
+            saved.update(checkpoint)
+            committed.append(checkpoint)
+            if len(committed) == 5:
+                raise KeyboardInterrupt
+
+        with pytest.raises(KeyboardInterrupt):
+            revaluation.run(matrix, on_chunk=interrupt_after_five_chunks)
+        first = prices(engine)
+
+        resumed = revaluation.run(matrix, checkpoint=saved)
+
+        assert resumed.chunks == MATRIX_CURRENCIES * (ROWS // CHUNK_SIZE) - 5
+        assert_revalued(engine, NEW_RATES)
+        assert first != prices(engine)
+
+    def test_checkpoint_file_keeps_rates_for_resume(self, engine, revaluation, tmp_path):
+        """測試檢查點文件記錄匯率：續跑時沿用中斷前的匯率，即使當前匯率已變化"""
+        path = tmp_path / "checkpoint.json"
+        matrix = RateMatrix.from_quotes("USD", NEW_RATES)
+        committed = []
+
+        def interrupt_after_five_chunks(progress):
+            save_checkpoint(path, matrix, progress, "TWD")
+            committed.append(progress)
+            if len(committed) == 5:
+                raise KeyboardInterrupt
+
+        with pytest.raises(KeyboardInterrupt):
+            revaluation.run(matrix, on_chunk=interrupt_after_five_chunks)
+        state = json.loads(path.read_text())
+        assert state["rates"]["USD"] == pytest.approx(NEW_RATES["TWD"])
+        assert state["as_of"] == matrix.as_of.isoformat()
+
+        # 續跑時當前匯率已經不同，但不應被使用
+        report = revaluation.run_with_checkpoint(path, lambda: RateMatrix.from_quotes("USD", OLD_RATES))
+
+        assert report.resumed
+        assert report.as_of == matrix.as_of
+        assert report.to_dict()["rates"]["USD"] == pytest.approx(NEW_RATES["TWD"])
+        assert_revalued(engine, NEW_RATES)
+        assert not path.exists()
+
+    def test_checkpoint_without_rates_is_rejected(self, tmp_path):
+        """測試沒有記錄匯率的舊格式檢查點拒絕續跑"""
+        path = tmp_path / "checkpoint.json"
+        path.write_text(json.dumps({"USD": 2000}))
+
+        with pytest.raises(ValueError):
+            load_checkpoint(path, "TWD")
+
+    def test_current_rates_come_from_history(self, engine):
+        """測試從匯率歷史取得當前匯率（不使用預設匯率），並據此重估"""
+        history = ExchangeRateHistory(sessionmaker(bind=engine))
+        service = ExchangeRateService(api_url="http://127.0.0.1:9", history=history)
+
+        async def load():
+            await history.save("USD", NEW_RATES, datetime.now())
+            return await current_rate_matrix(service)
+
+        matrix = asyncio.run(load())
+        PriceRevaluation(sessionmaker(bind=engine), chunk_size=CHUNK_SIZE).run(matrix)
+
+        assert_revalued(engine, NEW_RATES)
+
+    def test_no_current_rates_is_an_error(self, engine, revaluation, tmp_path):
+        """測試沒有可用的當前匯率時拒絕重估，價格保持不變"""
+        class NoRates:
+            async def preload_rate_history(self):
+                return False
+
+            async def get_rate_matrix(self):
+                return None
+
+        before = prices(engine)
+
+        with pytest.raises(RuntimeError):
+            revaluation.run_with_checkpoint(
+                tmp_path / "checkpoint.json", lambda: asyncio.run(current_rate_matrix(NoRates()))
+            )
+        assert prices(engine) == before
+
+    @pytest.mark.performance
+    def test_bulk_speed(self, engine, revaluation):
+        """測試集合式重估的吞吐量"""
+        start = time.perf_counter()
+        report = revaluation.run(RateMatrix.from_quotes("USD", NEW_RATES))
+        elapsed = time.perf_counter() - start
+
+        print(f"\n重估 {ROWS} 筆訂閱: 修改 {report.total_changed} 行, {report.chunks} 塊, {elapsed * 1000:.1f}ms")
+        assert report.total_changed / elapsed > 50_000
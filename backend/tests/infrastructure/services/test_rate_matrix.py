@@ -0,0 +1,124 @@
+"""
+交叉匯率矩陣測試
+
+測試由一張基準匯率表推導的匯率矩陣：
+- 所有支持貨幣兩兩之間都有匯率
+- 報價表 / 價值表兩種構建方式
+- 服務查詢結果與原先逐對計算一致
+- 刷新時整體替換矩陣
+"""
+
+import asyncio
+from decimal import Decimal
+
+import pytest
+
+from app.infrastructure.services.exchange_rate_cache import ExchangeRateCache
+from app.infrastructure.services.exchange_rate_service_impl import RATE_MATRIX_KEY, ExchangeRateServiceImpl
+from app.infrastructure.services.rate_matrix import SUPPORTED_CURRENCIES, RateMatrix
+from app.services.exchange_rate_service import FALLBACK_USD_RATES
+
+TWD_VALUES = {
+    "USD": Decimal("31.5"),
+    "EUR": Decimal("34.2"),
+    "JPY": Decimal("0.22"),
+    "GBP": Decimal("39.8"),
+    "KRW": Decimal("0.024"),
+    "CNY": Decimal("4.35"),
+}
+
+
+@pytest.mark.unit
+@pytest.mark.infrastructure
+class TestRateMatrix:
+    """匯率矩陣測試類"""
+
+    def test_covers_every_currency_pair(self):
+        """測試 7 種貨幣構成完整的 7x7 矩陣"""
+        matrix = RateMatrix.from_quotes("USD", FALLBACK_USD_RATES)
+
+        assert len(SUPPORTED_CURRENCIES) == 7
+        assert len(matrix) == 49
+        assert matrix.currencies == sorted(SUPPORTED_CURRENCIES)
+        for currency in SUPPORTED_CURRENCIES:
+            assert matrix.rate(currency, currency) == 1
+
+    def test_from_quotes(self):
+        """測試由 latest/{base} 報價表推導交叉匯率"""
+        matrix = RateMatrix.from_quotes("USD", {"TWD": 31.5, "EUR": 0.92})
+
+        assert matrix.rate("USD", "TWD") == 31.5
+        assert matrix.rate("TWD", "USD") == pytest.approx(1 / 31.5)
+        assert matrix.rate("EUR", "TWD") == pytest.approx(31.5 / 0.92)
+        assert matrix.rate("JPY", "TWD") is None
+
+    def test_from_values(self):
+        """測試由 TWD 價值表推導交叉匯率"""
+        matrix = RateMatrix.from_values("TWD", TWD_VALUES)
+
+        assert matrix.rate("USD", "TWD") == Decimal("31.5")
+        assert matrix.rate("TWD", "USD") == Decimal("1") / Decimal("31.5")
+        assert matrix.rate("USD", "EUR") == Decimal("31.5") / Decimal("34.2")
+        assert matrix.rates_to("TWD")["GBP"] == Decimal("39.8")
+
+    def test_round_trip_is_consistent(self):
+        """測試往返匯率乘積為 1"""
+        matrix = RateMatrix.from_quotes("USD", FALLBACK_USD_RATES)
+
+        for source in SUPPORTED_CURRENCIES:
+            for target in SUPPORTED_CURRENCIES:
+                assert matrix.rate(source, target) * matrix.rate(target, source) == pytest.approx(1)
+
+
+@pytest.mark.unit
+@pytest.mark.infrastructure
+class TestMatrixBackedService:
+    """矩陣查詢的匯率服務測試類"""
+
+    @pytest.mark.parametrize("from_currency", SUPPORTED_CURRENCIES)
+    @pytest.mark.parametrize("to_currency", SUPPORTED_CURRENCIES)
+    def test_matches_pairwise_calculation(self, from_currency, to_currency):
+        """測試矩陣查詢與原先逐對經 TWD 計算的結果一致"""
+        service = ExchangeRateServiceImpl(ExchangeRateCache())
+
+        if from_currency == to_currency:
+            expected = Decimal("1.0")
+        elif to_currency == "TWD":
+            expected = TWD_VALUES[from_currency]
+        elif from_currency == "TWD":
+            expected = Decimal("1") / TWD_VALUES[to_currency]
+        else:
+            expected = TWD_VALUES[from_currency] / TWD_VALUES[to_currency]
+
+        rate = asyncio.run(service.get_exchange_rate(from_currency, to_currency))
+
+        assert rate == expected
+
+    def test_all_pairs_share_one_build(self):
+        """測試查詢全部 49 個貨幣對只構建一次矩陣"""
+        cache = ExchangeRateCache()
+        service = ExchangeRateServiceImpl(cache)
+
+        async def lookups():
+            for source in SUPPORTED_CURRENCIES:
+                for target in SUPPORTED_CURRENCIES:
+                    await service.get_exchange_rate(source, target)
+
+        asyncio.run(lookups())
+
+        assert cache.stats()["loads"] == 1
+        assert cache.stats()["size"] == 1
+
+    def test_refresh_swaps_whole_matrix(self):
+        """測試刷新時矩陣整體替換，先前取得的矩陣保持不變"""
+        cache = ExchangeRateCache()
+        service = ExchangeRateServiceImpl(cache)
+        before = asyncio.run(service.get_rate_matrix())
+
+        cache.set(RATE_MATRIX_KEY, RateMatrix.from_values("TWD", {"USD": Decimal("32")}))
+        after = asyncio.run(service.get_rate_matrix())
+
+        assert after is not before
+        assert after.rate("USD", "TWD") == Decimal("32")
+        assert before.rate("USD", "TWD") == Decimal("31.5")
+        assert len(before) == 49
@@ -0,0 +1,138 @@
+"""
+同步 / 異步數據訪問並發延遲基準測試
+
+比較 SQLAlchemyUnitOfWork 與 AsyncSQLAlchemyUnitOfWork 在同一事件循環上
+處理並發請求時的表現：
+- 數據庫請求本身的 p99 延遲
+- 同時進行的輕量請求（不訪問數據庫）的 p99 延遲
+
+同步 Session 會在查詢期間阻塞事件循環，輕量請求只能排隊等待；
+異步 Session 在等待數據庫時讓出事件循環。
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from statistics import quantiles
+
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.common.async_utils import maybe_await
+from app.database.connection import to_async_database_url
+from app.infrastructure.unit_of_work import SQLAlchemyUnitOfWork, AsyncSQLAlchemyUnitOfWork
+from app.models import Base, User, Subscription
+
+USER_COUNT = 500
+SUBSCRIPTIONS_PER_USER = 200
+CONCURRENT_DB_REQUESTS = 40
+PROBE_INTERVAL = 0.002
+
+
+def p99(samples):
+    """計算第 99 百分位"""
+    return quantiles(samples, n=100, method="inclusive")[98]
+
+
+@pytest.fixture(scope="module")
+def database_url(tmp_path_factory):
+    """建立包含大量訂閱的文件數據庫"""
+    path = tmp_path_factory.mktemp("async_bench") / "bench.db"
+    url = f"sqlite:///{path}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": i, "username": f"user{i}", "hashed_password": "x", "is_active": True}
+            for i in range(1, USER_COUNT + 1)
+        ])
+        conn.execute(insert(Subscription), [
+            {
+                "user_id": user_id,
+                "name": f"service-{user_id}-{n}",
+                "price": 100.0,
+                "original_price": 100.0,
+                "currency": "TWD",
+                "cycle": "MONTHLY",
+                "category": "OTHER",
+                "start_date": datetime(2024, 1, 1),
+                "is_active": n % 2 == 0,
+            }
+            for user_id in range(1, USER_COUNT + 1)
+            for n in range(SUBSCRIPTIONS_PER_USER)
+        ])
+    
+    engine.dispose()
+    return url
+
+
+async def run_scenario(uow_factory):
+    """並發執行數據庫請求，同時以固定間隔發出輕量請求"""
+    db_latencies = []
+    probe_latencies = []
+    done = asyncio.Event()
+    
+    async def db_request(user_id, arrived_at):
+        uow = uow_factory()
+        try:
+            await maybe_await(uow.subscriptions.count_active_by_user_id(user_id))
+            await maybe_await(uow.subscriptions.get_active_by_user_id(user_id))
+        finally:
+            await maybe_await(uow.close())
+        # 從請求到達開始計時，包含等待事件循環的排隊時間
+        db_latencies.append(time.perf_counter() - arrived_at)
+    
+    async def probe():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0)
+            probe_latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(PROBE_INTERVAL)
+    
+    probe_task = asyncio.create_task(probe())
+    await asyncio.sleep(PROBE_INTERVAL)
+    arrived_at = time.perf_counter()
+    await asyncio.gather(*(
+        db_request(user_id % USER_COUNT + 1, arrived_at) for user_id in range(CONCURRENT_DB_REQUESTS)
+    ))
+    done.set()
+    await probe_task
+    
+    return {
+        "db_p99": p99(db_latencies),
+        "probe_p99": p99(probe_latencies),
+        "probe_max": max(probe_latencies),
+    }
+
+
+@pytest.mark.performance
+@pytest.mark.slow
+class TestAsyncDatabasePerformance:
+    """同步與異步 Unit of Work 並發延遲對比"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_p99_latency(self, database_url):
+        """異步 Unit of Work 不應讓數據庫查詢阻塞其他請求"""
+        sync_engine = create_engine(database_url, connect_args={"check_same_thread": False})
+        SyncSession = sessionmaker(bind=sync_engine, autoflush=False)
+        async_engine = create_async_engine(to_async_database_url(database_url), pool_size=10)
+        AsyncSessionFactory = sessionmaker(bind=async_engine, class_=AsyncSession, expire_on_commit=False)
+        
+        try:
+            before = await run_scenario(lambda: SQLAlchemyUnitOfWork(SyncSession()))
+            after = await run_scenario(lambda: AsyncSQLAlchemyUnitOfWork(AsyncSessionFactory()))
+        finally:
+            sync_engine.dispose()
+            await async_engine.dispose()
+        
+        print(f"\n並發 {CONCURRENT_DB_REQUESTS} 個數據庫請求 ({USER_COUNT * SUBSCRIPTIONS_PER_USER} 行):")
+        print(f"同步 UoW - 數據庫請求 p99: {before['db_p99'] * 1000:.1f}ms, "
+              f"輕量請求 p99: {before['probe_p99'] * 1000:.2f}ms (最大 {before['probe_max'] * 1000:.1f}ms)")
+        print(f"異步 UoW - 數據庫請求 p99: {after['db_p99'] * 1000:.1f}ms, "
+              f"輕量請求 p99: {after['probe_p99'] * 1000:.2f}ms (最大 {after['probe_max'] * 1000:.1f}ms)")
+        
+        # 同步查詢期間事件循環被佔用，輕量請求的尾延遲必然更高
+        assert after["probe_p99"] < before["probe_p99"]
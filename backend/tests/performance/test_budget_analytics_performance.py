@@ -0,0 +1,160 @@
+"""
+預算分析單次遍歷基準測試
+
+比較原先四個方法各自遍歷訂閱列表（約六次遍歷、每次重算月度成本）
+與 BudgetAnalytics 單次累加的耗時，並確認兩者輸出逐位相同。
+"""
+
+import random
+import time
+from datetime import datetime
+from unittest.mock import Mock
+
+import pytest
+
+from app.models.budget import Budget
+from app.models.subscription import Subscription, SubscriptionCycle, SubscriptionCategory, Currency
+from app.domain.interfaces.services import IExchangeRateService
+from app.domain.services.subscription_domain_service import SubscriptionDomainService
+from app.domain.services.budget_domain_service import BudgetDomainService
+
+SUBSCRIPTIONS_PER_USER = 10_000
+ROUNDS = 5
+
+
+class LegacyBudgetAnalysis:
+    """改動前 BudgetApplicationService.get_budget_usage 的多次遍歷實現"""
+
+    def __init__(self, subscription_service: SubscriptionDomainService):
+        self._subscription_service = subscription_service
+
+    def budget_usage(self, budget, subscriptions):
+        total_monthly_cost = self._subscription_service.calculate_total_monthly_cost(subscriptions)
+        remaining = budget.monthly_limit - total_monthly_cost
+        usage_percentage = (total_monthly_cost / budget.monthly_limit * 100) if budget.monthly_limit > 0 else 0
+        return {
+            "total_budget": budget.monthly_limit,
+            "used_amount": total_monthly_cost,
+            "remaining_amount": remaining,
+            "usage_percentage": round(usage_percentage, 2),
+            "is_over_budget": total_monthly_cost > budget.monthly_limit,
+            "over_budget_amount": max(0, total_monthly_cost - budget.monthly_limit)
+        }
+
+    def category_usage(self, budget, subscriptions):
+        category_costs = self._subscription_service.calculate_category_costs(subscriptions)
+        total_monthly_cost = sum(category_costs.values())
+        result = {"total_budget": budget.monthly_limit, "total_used": total_monthly_cost, "categories": {}}
+        for category, cost in category_costs.items():
+            percentage = (cost / total_monthly_cost * 100) if total_monthly_cost > 0 else 0
+            budget_percentage = (cost / budget.monthly_limit * 100) if budget.monthly_limit > 0 else 0
+            result["categories"][category] = {
+                "cost": cost,
+                "percentage_of_total": round(percentage, 2),
+                "percentage_of_budget": round(budget_percentage, 2)
+            }
+        return result
+
+    def recommendations(self, budget, subscriptions):
+        recommendations = []
+        usage_info = self.budget_usage(budget, subscriptions)
+        if usage_info["is_over_budget"]:
+            recommendations.append(f"當前支出超出預算 {usage_info['over_budget_amount']:.2f} 元，建議檢視並取消不必要的訂閱")
+        if usage_info["usage_percentage"] > 90:
+            recommendations.append("預算使用率超過90%，接近預算上限")
+        elif usage_info["usage_percentage"] > 80:
+            recommendations.append("預算使用率超過80%，建議注意支出控制")
+        for category, info in self.category_usage(budget, subscriptions)["categories"].items():
+            if info["percentage_of_budget"] > 50:
+                recommendations.append(f"「{category}」類別支出佔預算的{info['percentage_of_budget']:.1f}%，建議檢視是否有重複或不必要的訂閱")
+        return recommendations
+
+    def savings_potential(self, subscriptions):
+        yearly_costs = []
+        monthly_costs = []
+        for subscription in subscriptions:
+            if subscription.is_active:
+                yearly_costs.append(self._subscription_service.calculate_yearly_cost(subscription))
+                monthly_costs.append(self._subscription_service.calculate_monthly_cost(subscription))
+        potential_yearly_total = sum(yearly_costs) * 0.9
+        current_yearly_total = sum(monthly_costs) * 12
+        potential_savings = current_yearly_total - potential_yearly_total
+        return {
+            "current_yearly_cost": current_yearly_total,
+            "potential_yearly_cost": potential_yearly_total,
+            "potential_annual_savings": max(0, potential_savings),
+            "savings_percentage": (potential_savings / current_yearly_total * 100) if current_yearly_total > 0 else 0
+        }
+
+    def analyze(self, budget, subscriptions):
+        return {
+            "usage_info": self.budget_usage(budget, subscriptions),
+            "category_usage": self.category_usage(budget, subscriptions),
+            "recommendations": self.recommendations(budget, subscriptions),
+            "savings_potential": self.savings_potential(subscriptions)
+        }
+
+
+@pytest.fixture(scope="module")
+def subscriptions():
+    """單個用戶的大量訂閱"""
+    rng = random.Random(7)
+    return [
+        Subscription(
+            id=index,
+            user_id=1,
+            name=f"sub-{index}",
+            price=round(rng.uniform(1, 3000), 2),
+            original_price=100.0,
+            currency=Currency.TWD,
+            cycle=rng.choice(list(SubscriptionCycle)),
+            category=rng.choice(list(SubscriptionCategory)),
+            start_date=datetime(2024, 1, 1),
+            is_active=rng.random() > 0.1
+        )
+        for index in range(SUBSCRIPTIONS_PER_USER)
+    ]
+
+
+@pytest.fixture(scope="module")
+def subscription_service():
+    return SubscriptionDomainService(Mock(spec=IExchangeRateService))
+
+
+def best_of(func, rounds=ROUNDS):
+    """多輪運行取最短耗時"""
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+@pytest.mark.performance
+class TestBudgetAnalyticsPerformance:
+    """預算分析性能測試類"""
+
+    @pytest.mark.parametrize("monthly_limit", [1_000_000.0, 500_000.0, 100.0])
+    def test_single_pass_output_is_identical(self, subscriptions, subscription_service, monthly_limit):
+        """測試單次遍歷與多次遍歷的輸出完全相同"""
+        budget = Budget(id=1, user_id=1, monthly_limit=monthly_limit)
+        legacy = LegacyBudgetAnalysis(subscription_service)
+        domain_service = BudgetDomainService(subscription_service)
+
+        assert domain_service.analyze_subscriptions(budget, subscriptions) == legacy.analyze(budget, subscriptions)
+
+    def test_single_pass_is_faster(self, subscriptions, subscription_service):
+        """測試單次遍歷比多次遍歷更快"""
+        budget = Budget(id=1, user_id=1, monthly_limit=1_000_000.0)
+        legacy = LegacyBudgetAnalysis(subscription_service)
+        domain_service = BudgetDomainService(subscription_service)
+
+        legacy_time = best_of(lambda: legacy.analyze(budget, subscriptions))
+        single_pass_time = best_of(lambda: domain_service.analyze_subscriptions(budget, subscriptions))
+
+        print(
+            f"\n{SUBSCRIPTIONS_PER_USER} 筆訂閱: 多次遍歷 {legacy_time * 1000:.1f}ms, "
+            f"單次遍歷 {single_pass_time * 1000:.1f}ms, 加速 {legacy_time / single_pass_time:.1f}x"
+        )
+        assert single_pass_time < legacy_time / 2
@@ -0,0 +1,164 @@
+"""
+共享 HTTP 客戶端基準測試
+
+對本地樁服務比較兩種請求方式的單次延遲：
+- 每次請求新建 httpx.AsyncClient（新連接、新連接池）
+- 應用共享的帶連接池客戶端（keep-alive 重用連接）
+並確認每主機並發限制生效。
+"""
+
+import asyncio
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from app.core.http_client import HostLimitedTransport, create_http_client, get_http_client, close_http_client
+
+REQUESTS = 200
+SLOW_DELAY = 0.05
+
+
+class KeepAliveStubServer:
+    """支持 keep-alive 的本地服務，記錄連接數和最大並發數"""
+
+    def __init__(self):
+        self.connections = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # 響應頭和響應體一次寫出，避免 keep-alive 連接上的 Nagle / 延遲確認停頓
+            wbufsize = -1
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with lock:
+                    stub.connections += 1
+
+            def do_GET(self):
+                with lock:
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    if self.path.startswith("/slow"):
+                        time.sleep(SLOW_DELAY)
+                    body = json.dumps({"base": "USD", "rates": {"TWD": 31.5}}).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with lock:
+                        stub.in_flight -= 1
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def stub_server():
+    with KeepAliveStubServer() as server:
+        yield server
+
+
+async def per_call_client(url):
+    """改動前：每次請求新建客戶端"""
+    latencies = []
+    for _ in range(REQUESTS):
+        start = time.perf_counter()
+        async with httpx.AsyncClient() as client:
+            response = await client.get(url, timeout=10)
+            response.json()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def shared_client(url):
+    """改動後：共享帶連接池的客戶端"""
+    client = create_http_client()
+    latencies = []
+    try:
+        for _ in range(REQUESTS):
+            start = time.perf_counter()
+            response = await client.get(url)
+            response.json()
+            latencies.append(time.perf_counter() - start)
+    finally:
+        await client.aclose()
+    return latencies
+
+
+@pytest.mark.performance
+class TestSharedHttpClient:
+    """共享 HTTP 客戶端測試類"""
+
+    def test_shared_client_reuses_connections_and_is_faster(self, stub_server):
+        """測試共享客戶端重用連接，單次延遲低於每次新建客戶端"""
+        url = f"{stub_server.url}/v4/latest/USD"
+
+        per_call = asyncio.run(per_call_client(url))
+        per_call_connections = stub_server.connections
+        shared = asyncio.run(shared_client(url))
+        shared_connections = stub_server.connections - per_call_connections
+
+        per_call_ms = statistics.median(per_call) * 1000
+        shared_ms = statistics.median(shared) * 1000
+        print(
+            f"\n{REQUESTS} 次請求單次延遲中位數: 每次新建客戶端 {per_call_ms:.2f}ms "
+            f"({per_call_connections} 個連接), 共享客戶端 {shared_ms:.2f}ms ({shared_connections} 個連接)"
+        )
+        assert per_call_connections == REQUESTS
+        assert shared_connections == 1
+        assert shared_ms < per_call_ms
+
+    def test_per_host_limit(self, stub_server):
+        """測試同一主機的並發請求數不超過限制"""
+        async def run():
+            transport = HostLimitedTransport(httpx.AsyncHTTPTransport(), max_per_host=3)
+            async with httpx.AsyncClient(transport=transport) as client:
+                responses = await asyncio.gather(*(
+                    client.get(f"{stub_server.url}/slow") for _ in range(12)
+                ))
+            return [response.status_code for response in responses]
+
+        assert asyncio.run(run()) == [200] * 12
+        assert stub_server.max_in_flight == 3
+
+    def test_application_client_lifecycle(self):
+        """測試共享客戶端在同一事件循環內為單例，關閉後重新創建"""
+        async def run():
+            first = get_http_client()
+            same = get_http_client()
+            await close_http_client()
+            recreated = get_http_client()
+            await close_http_client()
+            return first, same, recreated
+
+        first, same, recreated = asyncio.run(run())
+
+        assert first is same
+        assert first.is_closed
+        assert recreated is not first
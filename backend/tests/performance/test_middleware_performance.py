@@ -0,0 +1,187 @@
+"""
+中間件管道基準測試
+
+對比兩種中間件配置下 /health 和訂閱列表端點的吞吐量（req/s）：
+- 改動前：五層 BaseHTTPMiddleware（驗證、請求 ID、計時、響應頭、指標）
+- 改動後：單個純 ASGI 的 RequestPipelineMiddleware
+"""
+
+import asyncio
+import time
+import uuid
+from datetime import datetime
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.api.v1.router import api_router
+from app.common.middleware import RequestPipelineMiddleware
+from app.core.auth import create_access_token
+from app.core.rate_limiter import limiter, user_limiter
+from app.database.connection import get_db
+from app.infrastructure.dependencies import get_unit_of_work, unit_of_work_provider
+from app.models import Base, User
+from app.models.subscription import Currency, Subscription, SubscriptionCategory, SubscriptionCycle
+
+REQUESTS = 300
+SUBSCRIPTIONS = 20
+
+
+class LegacyValidationMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        content_length = request.headers.get("content-length")
+        if content_length and int(content_length) > 2 * 1024 * 1024:
+            return JSONResponse(status_code=413, content={"message": "請求驗證失敗"})
+        if request.method in ["POST", "PUT", "PATCH"]:
+            content_type = request.headers.get("content-type", "")
+            if not content_type.startswith(("application/json", "multipart/form-data")):
+                return JSONResponse(status_code=415, content={"message": "不支持的Content-Type"})
+        return await call_next(request)
+
+
+class LegacyHeadersMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        response.headers["X-Content-Type-Options"] = "nosniff"
+        response.headers["X-Frame-Options"] = "DENY"
+        response.headers["X-XSS-Protection"] = "1; mode=block"
+        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+        response.headers["X-API-Version"] = "1.0"
+        response.headers["X-Process-Time"] = str(time.time() - request.state.start_time)
+        return response
+
+
+class LegacyTimingMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        request.state.start_time = time.time()
+        return await call_next(request)
+
+
+class LegacyRequestIDMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        request_id = str(uuid.uuid4())
+        request.state.request_id = request_id
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id
+        return response
+
+
+class LegacyMetricsMiddleware(BaseHTTPMiddleware):
+    request_count = 0
+    error_count = 0
+
+    async def dispatch(self, request, call_next):
+        LegacyMetricsMiddleware.request_count += 1
+        response = await call_next(request)
+        if response.status_code >= 400:
+            LegacyMetricsMiddleware.error_count += 1
+        return response
+
+
+def create_app(session_factory, pipeline):
+    app = FastAPI()
+    app.state.limiter = limiter
+    app.add_middleware(CORSMiddleware, allow_origins=["http://localhost:5173"], allow_methods=["*"])
+    if pipeline:
+        app.add_middleware(RequestPipelineMiddleware, max_request_size=2 * 1024 * 1024)
+    else:
+        # 與改動前 main_new.py 相同的添加順序
+        app.add_middleware(LegacyMetricsMiddleware)
+        app.add_middleware(LegacyHeadersMiddleware)
+        app.add_middleware(LegacyTimingMiddleware)
+        app.add_middleware(LegacyRequestIDMiddleware)
+        app.add_middleware(LegacyValidationMiddleware)
+
+    @app.get("/health")
+    async def health_check():
+        return {"status": "healthy", "version": "2.0.0"}
+
+    app.include_router(api_router, prefix="/api/v1")
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[unit_of_work_provider] = get_unit_of_work
+    return app
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'middleware.db'}",
+        connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    db = factory()
+    user = User(username="bench_user", hashed_password="not-a-real-hash", is_active=True)
+    db.add(user)
+    db.flush()
+    db.add_all([
+        Subscription(
+            user_id=user.id, name=f"sub-{index}", price=100.0 + index, original_price=100.0 + index,
+            currency=Currency.TWD, cycle=SubscriptionCycle.MONTHLY, category=SubscriptionCategory.OTHER,
+            start_date=datetime(2024, 1, 1), is_active=True
+        )
+        for index in range(SUBSCRIPTIONS)
+    ])
+    db.commit()
+    db.close()
+    yield factory
+    engine.dispose()
+
+
+@pytest.fixture
+def no_rate_limit():
+    enabled = user_limiter.enabled
+    user_limiter.enabled = False
+    yield
+    user_limiter.enabled = enabled
+
+
+async def requests_per_second(app, path, headers=None):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        for _ in range(20):
+            response = await client.get(path, headers=headers)
+            assert response.status_code == 200, response.text
+        start = time.perf_counter()
+        for _ in range(REQUESTS):
+            await client.get(path, headers=headers)
+        return REQUESTS / (time.perf_counter() - start)
+
+
+@pytest.mark.performance
+class TestMiddlewarePipelineThroughput:
+    """中間件管道吞吐量測試類"""
+
+    def test_pipeline_throughput(self, session_factory, no_rate_limit):
+        """測試單個純 ASGI 中間件的吞吐量高於五層 BaseHTTPMiddleware"""
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': 'bench_user'})}"}
+        results = {}
+        for pipeline in (False, True):
+            app = create_app(session_factory, pipeline)
+            results[pipeline] = (
+                asyncio.run(requests_per_second(app, "/health")),
+                asyncio.run(requests_per_second(app, "/api/v1/subscriptions/", headers))
+            )
+
+        (legacy_health, legacy_list), (pipeline_health, pipeline_list) = results[False], results[True]
+        print(
+            f"\n/health: 五層 BaseHTTPMiddleware {legacy_health:.0f} req/s, 純 ASGI {pipeline_health:.0f} req/s"
+            f"\n訂閱列表 ({SUBSCRIPTIONS} 筆): 五層 BaseHTTPMiddleware {legacy_list:.0f} req/s, "
+            f"純 ASGI {pipeline_list:.0f} req/s"
+        )
+        assert pipeline_health > legacy_health * 1.5
+        assert pipeline_list > legacy_list
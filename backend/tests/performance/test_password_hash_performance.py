@@ -0,0 +1,91 @@
+"""
+密碼哈希線程池基準測試
+
+在登錄風暴期間測量另一個端點的延遲：
+- bcrypt 直接在 async 處理器中執行（阻塞事件循環）
+- bcrypt 交給 password_hasher 的有界線程池
+"""
+
+import asyncio
+import statistics
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.core.password_hasher import PasswordHasher
+from app.models.user import pwd_context
+
+LOGINS = 8
+PING_INTERVAL = 0.02
+PASSWORD = "storm-password"
+
+
+def create_app(hasher):
+    app = FastAPI()
+    hashed_password = pwd_context.hash(PASSWORD)
+
+    @app.post("/login-blocking")
+    async def login_blocking():
+        """改動前：在事件循環中直接驗證密碼"""
+        return {"ok": pwd_context.verify(PASSWORD, hashed_password)}
+
+    @app.post("/login")
+    async def login():
+        """改動後：在專用線程池中驗證密碼"""
+        return {"ok": await hasher.verify(PASSWORD, hashed_password)}
+
+    @app.get("/ping")
+    async def ping():
+        return {"status": "ok"}
+
+    return app
+
+
+async def login_storm(app, login_path):
+    """並發發出登錄請求，同時按固定節奏請求 /ping
+
+    /ping 的延遲從計劃發出的時刻算起，事件循環被阻塞的時間也計入其中。
+    """
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        storm = asyncio.gather(*(client.post(login_path) for _ in range(LOGINS)))
+        latencies = []
+        started_at = time.perf_counter()
+        while not storm.done():
+            scheduled_at = started_at + len(latencies) * PING_INTERVAL
+            await asyncio.sleep(max(0.0, scheduled_at - time.perf_counter()))
+            await client.get("/ping")
+            latencies.append(time.perf_counter() - scheduled_at)
+        responses = await storm
+    assert all(response.json() == {"ok": True} for response in responses)
+    return latencies
+
+
+@pytest.mark.performance
+@pytest.mark.auth
+class TestPasswordHashUnderLoginStorm:
+    """登錄風暴下的端點延遲測試類"""
+
+    def test_other_endpoints_stay_responsive(self):
+        """測試線程池化後登錄風暴期間 /ping 的最大延遲遠低於阻塞版本"""
+        hasher = PasswordHasher(max_workers=4, max_queue=LOGINS)
+        app = create_app(hasher)
+        try:
+            blocking = asyncio.run(login_storm(app, "/login-blocking"))
+            pooled = asyncio.run(login_storm(app, "/login"))
+        finally:
+            hasher.shutdown()
+
+        blocking_max = max(blocking) * 1000
+        pooled_max = max(pooled) * 1000
+        print(
+            f"\n{LOGINS} 個並發登錄期間 /ping 延遲: "
+            f"阻塞 最大 {blocking_max:.1f}ms 中位數 {statistics.median(blocking) * 1000:.1f}ms; "
+            f"線程池 最大 {pooled_max:.1f}ms 中位數 {statistics.median(pooled) * 1000:.1f}ms "
+            f"({len(pooled)} 次 /ping); 統計 {hasher.stats()}"
+        )
+        assert hasher.stats()["completed"] == LOGINS
+        assert hasher.stats()["peak_queue_depth"] >= LOGINS - 4
+        assert pooled_max < blocking_max / 2